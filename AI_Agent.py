@@ -1,12 +1,18 @@
 import streamlit as st
 from services.langchain_agent import LangChainFedExAgent
-from services.shipping_integration import (
-    get_fedex_shipping_quotes,
+from services.shipping_integration import get_fedex_shipping_quotes
+from services.shipping_display import (
     format_fedex_results,
     display_fedex_summary,
-    display_errors
+    display_errors,
+    display_rate_shop
 )
-from datetime import datetime
+from services.rate_estimator import estimate_fedex_rates
+from services.prefetch import quote_prefetcher
+from services.rate_shopping import rate_shopper, DEFAULT_TOP_N
+from services.job_queue import JobQueue, current_job, SUCCEEDED, CANCELLED
+from services.settings import get_settings
+from services.chat_history import build_chat_message, split_history, history_page
 import time
 
 # Configure as single page app
@@ -81,6 +87,14 @@ try:
 except FileNotFoundError:
     pass  # CSS file not found, continue with default styling
 
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """Worker pool shared by every session, so slow calls survive reruns"""
+    return JobQueue(max_workers=get_settings().job_workers)
+
+
+job_queue = get_job_queue()
+
 # Initialize session state
 if 'langchain_agent' not in st.session_state:
     st.session_state.langchain_agent = LangChainFedExAgent()
@@ -91,6 +105,18 @@ if 'messages' not in st.session_state:
     st.session_state.messages = []
 if 'connected' not in st.session_state:
     st.session_state.connected = False
+if 'chat_job' not in st.session_state:
+    st.session_state.chat_job = None
+if 'quote_job' not in st.session_state:
+    st.session_state.quote_job = None
+if 'quote_results' not in st.session_state:
+    st.session_state.quote_results = None
+if 'rate_shop_job' not in st.session_state:
+    st.session_state.rate_shop_job = None
+if 'rate_shop_results' not in st.session_state:
+    st.session_state.rate_shop_results = None
+if 'rate_shop_error' not in st.session_state:
+    st.session_state.rate_shop_error = None
 
 st.header("AI Shipping Assistant with FedEx API")
 
@@ -109,68 +135,88 @@ if not st.session_state.connected:
         st.rerun()
 
 # Chat history
-for message in st.session_state.messages:
-    role = message["role"]
-    content = message["content"]
-    timestamp = message["timestamp"]
-    
+def render_debug_info(message):
+    """Debug panel for an assistant message, built only when its toggle is on"""
+    debug_info = message["debug_info"]
+    if debug_info["tool_calls_made"]:
+        label = f"Debug Info - Tools Used ({len(debug_info['tools_used'])})"
+    else:
+        label = "Debug Info - No Tools Used"
+    if not st.toggle(label, key=f"debug_{message['id']}"):
+        return
+
+    if debug_info["tool_calls_made"]:
+        st.success("AI Agent successfully called FedEx API tools")
+        for i, tool_info in enumerate(debug_info['tools_used'], 1):
+            st.write(f"**Tool {i}: {tool_info['tool']}**")
+            st.json(tool_info['input'])
+            st.text_area(f"Tool Output {i}:", tool_info['output'], height=100, key=f"tool_output_{message['id']}_{i}")
+    else:
+        st.warning("AI did not call any tools for this response. This might indicate hallucination.")
+        if debug_info.get("error"):
+            st.error(f"Error: {debug_info['error']}")
+
+
+def render_message(message):
+    """Draw one render-ready message (see services.chat_history.build_chat_message)"""
     # Use Streamlit's built-in chat message display
-    with st.chat_message(role):
-        # Check if this is a FedEx quote response with debug info
-        show_copy_button = False
-        copyable_text = ""
-        
-        if role == "assistant" and "debug_info" in message:
-            debug_info = message["debug_info"]
-            if debug_info.get("tool_calls_made", False) and debug_info.get('tools_used'):
-                # Check tool output for structured format
-                tool_output = debug_info['tools_used'][0]['output']
-                if "Package:" in tool_output and "From:" in tool_output and "To:" in tool_output:
-                    # Extract the structured information from tool output
-                    lines = tool_output.split('\n')
-                    package_line = ""
-                    from_line = ""
-                    to_line = ""
-                    
-                    for line in lines:
-                        if line.startswith("From:"):
-                            from_line = line.strip()
-                        elif line.startswith("To:"):
-                            to_line = line.strip()
-                        elif line.startswith("Package:"):
-                            package_line = line.strip()
-                    
-                    if package_line and from_line and to_line:
-                        copyable_text = f"{package_line} {from_line} {to_line}"
-                        show_copy_button = True
-        
+    with st.chat_message(message["role"]):
         # Display content
-        st.write(content)
+        st.write(message["content"])
         
         # Show copy button if applicable
-        if show_copy_button:
+        if message["copyable_text"]:
             col1, col2 = st.columns([5, 1])
             with col2:
-                if st.button("📋 Copy Details", key=f"copy_{timestamp}", help="Copy package and route details"):
-                    st.code(copyable_text, language=None)
+                if st.button("📋 Copy Details", key=f"copy_{message['id']}", help="Copy package and route details"):
+                    st.code(message["copyable_text"], language=None)
                     st.success("📋 Details ready to copy! Select the text above.")
-            
-    
+
     # Show debug information for assistant messages if available
-    if role == "assistant" and "debug_info" in message:
-        debug_info = message["debug_info"]
-        if debug_info.get("tool_calls_made", False):
-            with st.expander(f"Debug Info - Tools Used ({len(debug_info.get('tools_used', []))})"):
-                st.success("AI Agent successfully called FedEx API tools")
-                for i, tool_info in enumerate(debug_info.get('tools_used', []), 1):
-                    st.write(f"**Tool {i}: {tool_info['tool']}**")
-                    st.json(tool_info['input'])
-                    st.text_area(f"Tool Output {i}:", tool_info['output'], height=100)
-        else:
-            with st.expander("Debug Info - No Tools Used"):
-                st.warning("AI did not call any tools for this response. This might indicate hallucination.")
-                if "error" in debug_info:
-                    st.error(f"Error: {debug_info['error']}")
+    if "debug_info" in message:
+        render_debug_info(message)
+
+
+older_messages, recent_messages = split_history(st.session_state.messages)
+if older_messages and st.toggle(f"Show earlier messages ({len(older_messages)})", key="show_older_messages"):
+    page_count = history_page(older_messages, 1)[1]
+    page = 1
+    if page_count > 1:
+        page = st.number_input("Page (1 = most recent)", min_value=1, max_value=page_count, value=1, key="history_page")
+    for message in history_page(older_messages, page)[0]:
+        render_message(message)
+
+for message in recent_messages:
+    render_message(message)
+
+@st.fragment(run_every=1.0)
+def poll_chat_job():
+    """Show the pending agent reply and add it to the chat once the job finishes"""
+    job = job_queue.get(st.session_state.chat_job)
+    if job is not None and not job.done:
+        col1, col2 = st.columns([6, 1])
+        col1.info("Agent is working on your request.")
+        if col2.button("Cancel", key=f"cancel_{job.id}", use_container_width=True):
+            job_queue.cancel(job.id)
+        return
+
+    st.session_state.chat_job = None
+    if job is None:
+        response, debug_info = "Error: The request expired before a reply was collected.", {"error": "job expired"}
+    elif job.status == SUCCEEDED:
+        response, debug_info = job.result
+    elif job.status == CANCELLED:
+        response, debug_info = "Request cancelled.", {"error": "cancelled by user"}
+    else:
+        response, debug_info = f"Error processing your request: {job.error}", {"error": job.error}
+
+    # Parse the reply for display once, here, rather than on every rerun
+    st.session_state.messages.append(build_chat_message("assistant", response, debug_info))
+    st.rerun()
+
+
+if st.session_state.chat_job:
+    poll_chat_job()
 
 # Chat input
 with st.form("chat_form", clear_on_submit=True):
@@ -186,27 +232,21 @@ with st.form("chat_form", clear_on_submit=True):
     if send_button and user_input:
         if not st.session_state.connected:
             st.error("Please connect to OpenAI first.")
+        elif st.session_state.chat_job:
+            st.warning("Please wait for the agent to finish the current request.")
         else:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            
             # Add user message
-            st.session_state.messages.append({
-                "role": "user", 
-                "content": user_input, 
-                "timestamp": timestamp
-            })
+            st.session_state.messages.append(build_chat_message("user", user_input))
             
-            # Get AI response with tool calling and debug info
-            with st.spinner("Agent is working on your request."):
-                response, debug_info = st.session_state.langchain_agent.send_message(user_input)
+            # If the message already holds a complete shipment, start the FedEx quotes now
+            # so they overlap with the LLM call; the agent's tool call picks them up
+            quote_prefetcher.prefetch_text(user_input)
             
-            # Add AI response
-            st.session_state.messages.append({
-                "role": "assistant", 
-                "content": response, 
-                "timestamp": datetime.now().strftime("%H:%M:%S"),
-                "debug_info": debug_info  # Store debug info
-            })
+            # Get AI response with tool calling and debug info in the background;
+            # poll_chat_job adds it to the chat when it is ready
+            st.session_state.chat_job = job_queue.submit(
+                "chat", st.session_state.langchain_agent.send_message, user_input
+            )
             
             st.rerun()
 
@@ -245,18 +285,106 @@ with st.form("fedex_shipping_form"):
         width = st.number_input("Width (in)", min_value=1.0, step=0.5, format="%.1f", value=5.0, key="package_width")
         height = st.number_input("Height (in)", min_value=1.0, step=0.5, format="%.1f", value=7.0, key="package_height")
 
+    col5, col6 = st.columns(2)
+    with col5:
+        compare_carriers = st.checkbox("Also compare other carriers", value=False, key="compare_carriers")
+    with col6:
+        top_n = st.number_input("Carrier options to show", min_value=1, max_value=10, value=DEFAULT_TOP_N, key="top_n")
+
     submit = st.form_submit_button("Get FedEx Shipping Quotes", use_container_width=True)
 
+
+def publish_rate_shop_progress(result):
+    """Hand each intermediate rate shop result to the job, so the page shows options as they arrive"""
+    job = current_job()
+    if job is not None:
+        job.set_progress(
+            result['received'] / max(result['requested'], 1),
+            f"{result['received']} of {result['requested']} carrier quotes received",
+            partial=result
+        )
+
+
 # Handle Form Submission
 if submit:
     dimensions = {"length": length, "width": width, "height": height}
 
-    with st.spinner("Fetching FedEx rates..."):
-        # Use the FedEx-only shipping integration with default packaging
-        results = get_fedex_shipping_quotes(
-            origin, destination, weight, dimensions, "YOUR_PACKAGING"
+    # Replace any quote request still in flight
+    job_queue.cancel(st.session_state.quote_job)
+    job_queue.cancel(st.session_state.rate_shop_job)
+    st.session_state.quote_results = None
+    st.session_state.rate_shop_results = None
+    st.session_state.rate_shop_error = None
+    st.session_state.rate_shop_job = None
+    if compare_carriers:
+        st.session_state.rate_shop_job = job_queue.submit(
+            "rate_shop", rate_shopper.shop, origin, destination, weight, dimensions,
+            top_n=int(top_n), on_update=publish_rate_shop_progress
         )
+    st.session_state.quote_estimates = estimate_fedex_rates(
+        origin["postalCode"], destination["postalCode"], weight, dimensions
+    )["estimates"]
+    # Use the FedEx-only shipping integration with default packaging
+    st.session_state.quote_job = job_queue.submit(
+        "quotes", get_fedex_shipping_quotes, origin, destination, weight, dimensions, "YOUR_PACKAGING"
+    )
+
+
+@st.fragment(run_every=1.0)
+def poll_quote_job():
+    """Show instant offline estimates while the live quotes load, then hand the results to the page"""
+    job = job_queue.get(st.session_state.quote_job)
+    if job is not None and not job.done:
+        estimates = st.session_state.get("quote_estimates")
+        if estimates:
+            st.info("Estimated while live FedEx rates load: " + " • ".join(
+                f"{e['service_type']} ~${e['estimate']:.2f} (${e['low']:.2f}-${e['high']:.2f})"
+                for e in sorted(estimates, key=lambda e: e['estimate'])
+            ))
+        st.progress(job.progress, text=job.message or "Fetching FedEx rates...")
+        return
 
+    st.session_state.quote_job = None
+    if job is None:
+        st.session_state.quote_results = {'quotes': {}, 'errors': ["The quote request expired before it finished"]}
+    elif job.status == SUCCEEDED:
+        st.session_state.quote_results = job.result
+    elif job.status == CANCELLED:
+        st.session_state.quote_results = None
+    else:
+        st.session_state.quote_results = {'quotes': {}, 'errors': [f"Error calling FedEx API: {job.error}"]}
+    st.rerun()
+
+
+@st.fragment(run_every=1.0)
+def poll_rate_shop_job():
+    """Show the best carrier options found so far, then hand the final set to the page"""
+    job = job_queue.get(st.session_state.rate_shop_job)
+    if job is not None and not job.done:
+        st.progress(job.progress, text=job.message or "Comparing carriers...")
+        if job.partial is not None:
+            display_rate_shop(job.partial)
+        return
+
+    st.session_state.rate_shop_job = None
+    if job is None:
+        st.session_state.rate_shop_error = "The carrier comparison expired before it finished"
+    elif job.status == SUCCEEDED:
+        st.session_state.rate_shop_results = job.result
+    elif job.status != CANCELLED:
+        # Kept for the next run, which shows it (the rerun below clears this fragment)
+        st.session_state.rate_shop_error = f"Error comparing carriers: {job.error}"
+    st.rerun()
+
+
+if st.session_state.quote_job:
+    poll_quote_job()
+
+if st.session_state.rate_shop_job:
+    poll_rate_shop_job()
+
+results = st.session_state.quote_results
+if results is not None:
     # Display any errors
     if results['errors']:
         display_errors(results['errors'])
@@ -274,6 +402,12 @@ if submit:
     else:
         st.error("No FedEx shipping quotes were retrieved. Please check your addresses and try again.")
 
+if st.session_state.rate_shop_error:
+    display_errors([st.session_state.rate_shop_error])
+
+if st.session_state.rate_shop_results is not None:
+    display_rate_shop(st.session_state.rate_shop_results)
+
 # Footer
 st.markdown("---")
 st.markdown("*Powered by OpenAI GPT + LangChain + FedEx Sandbox API • Built with Streamlit*")
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Headless Quote API Service
+ASGI app exposing FedEx quotes and the shipping agent over HTTP, alongside the Streamlit UI
+
+Run with:
+    python api_server.py --workers 4 --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from services.carrier_client import get_carrier_client
+from services.fedexAPI import STANDARD_SERVICES, get_fedex_freight_rate
+from services.lane_warmup import LaneWarmupScheduler
+from services.metrics import metrics
+from services.packages import is_multi_piece, multi_package_shipment
+from services.prefetch import quote_prefetcher
+from services.quote_cache import extract_rates, make_quote_key
+from services.quote_history import get_quote_history
+from services.quote_scheduler import BATCH, with_priority
+from services.settings import PROFILE_ENV_VAR, get_settings
+from services.ship_optimizer import ship_optimizer
+
+MAX_BATCH_SHIPMENTS = 500
+MAX_CHAT_SESSIONS = 256
+
+SERVICE_CODES = [service_code for service_code, _ in STANDARD_SERVICES]
+
+
+class RequestError(ValueError):
+    """Raised for malformed API request bodies (returned as HTTP 400)"""
+
+
+def _error(message: str, status_code: int = 400) -> JSONResponse:
+    return JSONResponse(
+        {'success': False, 'error': message, 'timestamp': datetime.utcnow().isoformat()},
+        status_code=status_code
+    )
+
+
+def _parse_address(body: Dict[str, Any], field: str) -> Dict[str, str]:
+    address = body.get(field)
+    if not isinstance(address, dict):
+        raise RequestError(f"Missing required field: {field}")
+    postal_code = address.get('postal_code', address.get('postalCode'))
+    for key, value in (('city', address.get('city')), ('state', address.get('state')), ('postal_code', postal_code)):
+        if not value:
+            raise RequestError(f"Missing required {field} field: {key}")
+    return {
+        'street': address.get('street', ''),
+        'city': address['city'],
+        'state': address['state'],
+        'postal_code': str(postal_code)
+    }
+
+
+def _parse_packages(packages: Any) -> List[Dict[str, Any]]:
+    if not isinstance(packages, list) or not all(isinstance(package, dict) for package in packages):
+        raise RequestError("packages must be a list of objects")
+    parsed = []
+    for package in packages:
+        dimensions = package.get('dimensions') or {}
+        try:
+            parsed.append({
+                'weight': float(package['weight']),
+                'dimensions': {key: float(dimensions.get(key, 12.0)) for key in ('length', 'width', 'height')},
+                'count': int(package.get('count', 1))
+            })
+        except (KeyError, TypeError, ValueError):
+            raise RequestError("Each package needs a numeric weight, dimensions and count")
+        if parsed[-1]['count'] < 1:
+            raise RequestError("Package count must be at least 1")
+    return parsed
+
+
+def parse_quote_request(body: Any) -> Dict[str, Any]:
+    """
+    Validate a /quotes request body.
+
+    Expected body:
+        {"origin": {...}, "destination": {...}, "weight": 9.0,
+         "dimensions": {"length": 4, "width": 5, "height": 7},
+         "service_types": ["FEDEX_GROUND", ...]}  (optional)
+
+    Multi-box orders send "packages" instead of weight and dimensions:
+        [{"weight": 9.0, "dimensions": {...}, "count": 3}, ...]
+    """
+    if not isinstance(body, dict):
+        raise RequestError("Request body must be a JSON object")
+    if body.get('packages'):
+        shipment = multi_package_shipment(_parse_packages(body['packages']))
+    else:
+        try:
+            weight = float(body['weight'])
+        except (KeyError, TypeError, ValueError):
+            raise RequestError("Missing or invalid required field: weight")
+        dimensions = body.get('dimensions') or {}
+        try:
+            dimensions = {key: float(dimensions.get(key, 12.0)) for key in ('length', 'width', 'height')}
+        except (TypeError, ValueError):
+            raise RequestError("Invalid dimensions")
+        shipment = {'weight': weight, 'dimensions': dimensions}
+    service_types = body.get('service_types') or SERVICE_CODES
+    if not isinstance(service_types, list) or not all(isinstance(code, str) for code in service_types):
+        raise RequestError("service_types must be a list of FedEx service codes")
+    return {
+        'origin': _parse_address(body, 'origin'),
+        'destination': _parse_address(body, 'destination'),
+        'shipment': shipment,
+        'service_types': service_types
+    }
+
+
+def _format_service_result(service_type: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    if not result.get('success'):
+        return {'service_type': service_type, 'success': False, 'error': result.get('error', 'Unknown error')}
+    rates = extract_rates(result.get('data'))
+    if not rates:
+        return {'service_type': service_type, 'success': False, 'error': 'No rates returned'}
+    rate = rates[0]
+    source = 'fedex_api'
+    if result.get('stale'):
+        source = 'last_known_price'
+    elif result.get('cached'):
+        source = 'cache'
+    return {
+        'service_type': rate['service_type'] or service_type,
+        'service_name': rate['service_name'],
+        'success': True,
+        'amount': rate['amount'],
+        'currency': rate['currency'],
+        'transit_time': rate['transit_time'],
+        'source': source
+    }
+
+
+async def _quote(request: Dict[str, Any], semaphore: asyncio.Semaphore) -> Dict[str, Dict[str, Any]]:
+    """Quote every requested service of one shipment concurrently"""
+    async def quote_service(service_type: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await run_in_threadpool(
+                get_fedex_freight_rate,
+                request['origin'],
+                request['destination'],
+                dict(request['shipment'], service_type=service_type)
+            )
+
+    results = await asyncio.gather(*(quote_service(code) for code in request['service_types']))
+    return dict(zip(request['service_types'], results))
+
+
+def _quote_response(request: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    services = [_format_service_result(code, results[code]) for code in request['service_types']]
+    quotes = sorted((s for s in services if s['success']), key=lambda s: s['amount'])
+    return {
+        'success': bool(quotes),
+        'quotes': quotes,
+        'errors': [f"{s['service_type']}: {s['error']}" for s in services if not s['success']],
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+
+async def quotes_endpoint(request: Request) -> JSONResponse:
+    """POST /quotes - live FedEx quotes for one shipment"""
+    try:
+        quote_request = parse_quote_request(await request.json())
+    except json.JSONDecodeError:
+        return _error("Request body must be valid JSON")
+    except RequestError as e:
+        return _error(str(e))
+    results = await _quote(quote_request, request.app.state.semaphore)
+    return JSONResponse(_quote_response(quote_request, results))
+
+
+async def optimize_endpoint(request: Request) -> JSONResponse:
+    """
+    POST /quotes/optimize - best ship date and service for a delivery deadline.
+
+    Takes a /quotes body plus optional "deliver_by" and "earliest_ship_date"
+    (YYYY-MM-DD or weekday name) and returns the cost/arrival Pareto frontier.
+    """
+    try:
+        body = await request.json()
+        quote_request = parse_quote_request(body)
+    except json.JSONDecodeError:
+        return _error("Request body must be valid JSON")
+    except RequestError as e:
+        return _error(str(e))
+    shipment = quote_request['shipment']
+    if is_multi_piece(shipment):
+        return _error("packages are not supported by /quotes/optimize; send one box's weight and dimensions")
+    async with request.app.state.semaphore:
+        try:
+            result = await run_in_threadpool(
+                ship_optimizer.optimize,
+                quote_request['origin'],
+                quote_request['destination'],
+                shipment['weight'],
+                shipment['dimensions'],
+                deliver_by=body.get('deliver_by'),
+                earliest_ship_date=body.get('earliest_ship_date')
+            )
+        except ValueError as e:
+            return _error(f"Invalid date: {e}")
+    return JSONResponse(dict(result, success=bool(result['frontier'])))
+
+
+async def batch_quotes_endpoint(request: Request) -> JSONResponse:
+    """
+    POST /quotes/batch - quotes for many shipments.
+
+    Identical shipment/service pairs (same lane, package, service, pickup
+    type and ship date) are quoted once and the result is shared.
+    """
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        return _error("Request body must be valid JSON")
+    shipments = body.get('shipments') if isinstance(body, dict) else None
+    if not isinstance(shipments, list) or not shipments:
+        return _error("Missing required field: shipments")
+    if len(shipments) > MAX_BATCH_SHIPMENTS:
+        return _error(f"At most {MAX_BATCH_SHIPMENTS} shipments per batch")
+
+    parsed: List[Optional[Dict[str, Any]]] = []
+    errors: List[Optional[str]] = []
+    for shipment in shipments:
+        try:
+            parsed.append(parse_quote_request(shipment))
+            errors.append(None)
+        except RequestError as e:
+            parsed.append(None)
+            errors.append(str(e))
+
+    # De-duplicate on the quote cache key (the exact lane) so repeated requests cost one FedEx call
+    unique: Dict[Tuple, Tuple[Dict[str, Any], str]] = {}
+    for quote_request in filter(None, parsed):
+        for service_type in quote_request['service_types']:
+            shipment = dict(quote_request['shipment'], service_type=service_type)
+            key = make_quote_key(quote_request['origin'], quote_request['destination'], shipment)
+            unique.setdefault(key, (quote_request, service_type))
+
+    # Batches queue behind their own semaphore and at batch priority, so a
+    # large batch never holds the slots interactive /quotes requests need
+    semaphore = request.app.state.batch_semaphore
+
+    async def quote_unique(quote_request: Dict[str, Any], service_type: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await run_in_threadpool(
+                with_priority,
+                BATCH,
+                get_fedex_freight_rate,
+                quote_request['origin'],
+                quote_request['destination'],
+                dict(quote_request['shipment'], service_type=service_type)
+            )
+
+    keys = list(unique)
+    unique_results = dict(zip(keys, await asyncio.gather(*(quote_unique(*unique[key]) for key in keys))))
+
+    responses = []
+    for quote_request, error in zip(parsed, errors):
+        if quote_request is None:
+            responses.append({'success': False, 'quotes': [], 'errors': [error]})
+            continue
+        results = {}
+        for service_type in quote_request['service_types']:
+            shipment = dict(quote_request['shipment'], service_type=service_type)
+            results[service_type] = unique_results[
+                make_quote_key(quote_request['origin'], quote_request['destination'], shipment)
+            ]
+        responses.append(_quote_response(quote_request, results))
+
+    return JSONResponse({
+        'results': responses,
+        'unique_quotes': len(keys),
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+
+class _ChatSession:
+    """One session's agent; its lock covers connecting the agent and every turn"""
+
+    def __init__(self):
+        self.agent: Any = None
+        self.lock = threading.Lock()
+
+
+class ChatSessions:
+    """
+    Bounded LRU of LangChain agents, one per chat session.
+
+    Each session is connected once, and its turns run one at a time: an
+    agent's conversation memory isn't safe to share between requests.
+    """
+
+    def __init__(self, max_sessions: int = MAX_CHAT_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _session(self, session_id: str) -> _ChatSession:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _ChatSession()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def _connect(self, session: _ChatSession) -> Tuple[Any, Optional[str]]:
+        """Create and connect the session's agent on first use (call with session.lock held)"""
+        if session.agent is None:
+            # Imported lazily: the quote endpoints don't need LangChain
+            from services.langchain_agent import LangChainFedExAgent
+            agent = LangChainFedExAgent()
+            success, message = agent.initialize_connection()
+            if not success:
+                return None, message
+            session.agent = agent
+        return session.agent, None
+
+    def get(self, session_id: str) -> Tuple[Any, Optional[str]]:
+        """Return (agent, error) for a session, creating and connecting the agent on first use"""
+        session = self._session(session_id)
+        with session.lock:
+            return self._connect(session)
+
+    @contextmanager
+    def turn(self, session_id: str) -> Iterator[Tuple[Any, Optional[str]]]:
+        """(agent, error) for one turn; other turns of the session wait until the block ends"""
+        session = self._session(session_id)
+        with session.lock:
+            yield self._connect(session)
+
+
+def _ndjson(event: Dict[str, Any]) -> bytes:
+    return (json.dumps(event, default=str) + "\n").encode('utf-8')
+
+
+async def chat_endpoint(request: Request) -> StreamingResponse:
+    """
+    POST /chat - talk to the shipping agent; the reply streams as
+    newline-delimited JSON events (session, tool, observation, message, done).
+    """
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        return _error("Request body must be valid JSON")
+    message = body.get('message') if isinstance(body, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        return _error("Missing required field: message")
+    session_id = body.get('session_id') or uuid.uuid4().hex
+
+    # Same speculative prefetch as the Streamlit chat
+    quote_prefetcher.prefetch_text(message)
+    sessions: ChatSessions = request.app.state.chat_sessions
+
+    def events():
+        yield _ndjson({'type': 'session', 'session_id': session_id})
+        with sessions.turn(session_id) as (agent, error):
+            if agent is None:
+                yield _ndjson({'type': 'error', 'error': error})
+                return
+            for event in agent.stream_message(message):
+                yield _ndjson(event)
+        yield _ndjson({'type': 'done'})
+
+    # Starlette iterates sync generators in its threadpool, so the event loop stays free
+    return StreamingResponse(events(), media_type='application/x-ndjson')
+
+
+async def health_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse({'status': 'ok', 'timestamp': datetime.utcnow().isoformat()})
+
+
+async def metrics_endpoint(request: Request) -> JSONResponse:
+    """
+    GET /metrics - carrier request counters and latency summaries for this
+    worker, plus live queue depth and wait times per quote priority class
+    """
+    snapshot = metrics.snapshot()
+    scheduler = get_carrier_client().scheduler
+    if scheduler is not None:
+        snapshot['scheduler'] = scheduler.stats()
+    return JSONResponse(snapshot)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    app.state.semaphore = asyncio.Semaphore(get_settings().api_concurrency)
+    app.state.batch_semaphore = asyncio.Semaphore(get_settings().api_concurrency)
+    app.state.chat_sessions = ChatSessions()
+    # Re-quotes popular lanes before business hours (WARMUP_TIMES); one worker
+    # claims each run and warmed prices reach the others through quote history
+    app.state.lane_warmup = LaneWarmupScheduler()
+    app.state.lane_warmup.start()
+    yield
+    # Graceful shutdown: stop speculative work and flush queued quote history
+    app.state.lane_warmup.stop()
+    quote_prefetcher.shutdown(wait=False)
+    await run_in_threadpool(get_quote_history().close)
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health_endpoint, methods=['GET']),
+        Route('/metrics', metrics_endpoint, methods=['GET']),
+        Route('/quotes', quotes_endpoint, methods=['POST']),
+        Route('/quotes/batch', batch_quotes_endpoint, methods=['POST']),
+        Route('/quotes/optimize', optimize_endpoint, methods=['POST']),
+        Route('/chat', chat_endpoint, methods=['POST']),
+    ],
+    lifespan=lifespan
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless FedEx quote API")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes")
+    parser.add_argument('--profile', choices=['sandbox', 'prod', 'mock'],
+                        help=f"Settings profile (default: ${PROFILE_ENV_VAR} or sandbox)")
+    parser.add_argument('--graceful-timeout', type=int, default=30,
+                        help="Seconds to let in-flight requests finish on shutdown")
+    args = parser.parse_args()
+    if args.profile:
+        # Worker processes inherit the environment and load the same settings
+        os.environ[PROFILE_ENV_VAR] = args.profile
+
+    uvicorn.run(
+        "api_server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Scenario Replay Benchmark
+Replays the recorded end-to-end scenarios (FedEx integration, AI agent vs
+direct API) from their cassettes - no network or credentials - and reports
+wall time per run. Recorded latencies are scaled by --latency-scale, so 1.0
+reproduces the live timing and 0 measures only the local code path.
+
+Record the cassettes once with live credentials:
+    CASSETTE_MODE=record python test_fedex_integration.py
+    CASSETTE_MODE=record python test_ai_vs_direct.py
+
+Usage:
+    python scenario_benchmark.py                      # every scenario, recorded latency
+    python scenario_benchmark.py --latency-scale 0 --runs 20
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+from typing import Dict, Any, Callable, List
+
+from services.cassette import DEFAULT_CASSETTE_DIR, REPLAY, CassetteMismatch, use_cassette
+
+
+def _fedex_integration(cassette):
+    from test_fedex_integration import run_fedex_integration
+    if not run_fedex_integration():
+        raise AssertionError("fedex_integration scenario reported failure")
+
+
+def _ai_vs_direct(cassette):
+    from test_ai_vs_direct import run_ai_vs_direct_comparison
+    run_ai_vs_direct_comparison(cassette.settings, cassette.httpx_client())
+
+
+SCENARIOS: Dict[str, Callable] = {
+    'fedex_integration': _fedex_integration,
+    'ai_vs_direct': _ai_vs_direct,
+}
+
+
+def replay_scenario(name: str, runs: int, latency_scale: float) -> Dict[str, Any]:
+    """
+    Replay one scenario runs times (scenario output is suppressed).
+
+    Returns:
+        Dict with keys: scenario, runs, requests (per run), min_ms, median_ms, max_ms
+
+    Raises:
+        FileNotFoundError: If the scenario has no cassette
+        CassetteMismatch: If the scenario made a request the cassette doesn't have
+    """
+    timings: List[float] = []
+    requests_per_run = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        with use_cassette(name, mode=REPLAY, latency_scale=latency_scale) as cassette:
+            with contextlib.redirect_stdout(io.StringIO()):
+                SCENARIOS[name](cassette)
+        timings.append((time.perf_counter() - started) * 1000)
+        requests_per_run = cassette.played
+    return {
+        'scenario': name,
+        'runs': runs,
+        'requests': requests_per_run,
+        'min_ms': min(timings),
+        'median_ms': statistics.median(timings),
+        'max_ms': max(timings)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded scenarios as offline benchmarks")
+    parser.add_argument('scenarios', nargs='*', default=list(SCENARIOS), help="Scenarios to run (default: all)")
+    parser.add_argument('--runs', type=int, default=5, help="Replays per scenario")
+    parser.add_argument('--latency-scale', type=float, default=1.0, help="Multiplier on recorded latencies")
+    args = parser.parse_args()
+
+    failures = []
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            failures.append(f"Unknown scenario: {name}")
+            continue
+        try:
+            result = replay_scenario(name, args.runs, args.latency_scale)
+        except FileNotFoundError:
+            failures.append(f"{name}: no cassette in {DEFAULT_CASSETTE_DIR}")
+            continue
+        except (CassetteMismatch, AssertionError) as e:
+            failures.append(f"{name}: {e}")
+            continue
+        print(
+            f"✅ {name}: {result['requests']} requests/run, median {result['median_ms']:.0f} ms "
+            f"(min {result['min_ms']:.0f}, max {result['max_ms']:.0f}, {result['runs']} runs)"
+        )
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
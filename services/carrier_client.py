@@ -0,0 +1,615 @@
+"""
+Carrier Client
+One rate-quote client with pluggable backends (FedEx v1, FedEx v2, local mock).
+Connection pooling, OAuth token caching, retries, the quote cache, stale
+fallback and metrics are implemented here once and apply to every backend.
+"""
+
+import contextlib
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .fedex_payload import get_payload_template, postal_code
+from .metrics import Metrics, metrics as shared_metrics
+from .packages import is_multi_piece, package_groups
+from .quote_cache import QuoteCache, quote_cache, make_quote_key, normalize_quote, build_rate_result, quote_scope
+from .quote_history import get_quote_history
+from .quote_scheduler import INTERACTIVE, PREFETCH, QuoteScheduler, QuoteShed, current_priority, with_priority
+from .settings import Settings, get_settings
+from .shared_cache import get_shared_store
+from .zone_index import lane_zone, billable_weight
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# The shared tier (when configured), then quote history, back the in-process quote cache
+quote_cache.set_shared(get_shared_store)
+quote_cache.set_backing(get_quote_history)
+
+# How long a process waits for another process's token refresh before fetching its own
+SHARED_REFRESH_WAIT_SECONDS = 2.0
+SHARED_REFRESH_POLL_SECONDS = 0.05
+
+
+class CarrierError(Exception):
+    """Raised by helpers that need a successful quote (e.g. quotes.get_all_quotes)"""
+
+
+def _error(message: str, **extra: Any) -> Dict[str, Any]:
+    result = {'success': False, 'error': message, 'timestamp': datetime.utcnow().isoformat()}
+    result.update(extra)
+    return result
+
+
+class CarrierBackend:
+    """
+    Request/response format of one carrier API.
+
+    Backends only describe the wire format; transport and every performance
+    layer live in CarrierClient.
+    """
+
+    name = 'base'
+    requires_auth = True
+    history_source: Optional[str] = None  # Quote history source label; None = don't record
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+
+    def rates_url(self) -> str:
+        raise NotImplementedError
+
+    def build_body(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        shipment: Dict[str, Any],
+        options: Dict[str, Any]
+    ) -> bytes:
+        raise NotImplementedError
+
+    def quote_locally(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        shipment: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Backends that don't call over HTTP return the FedEx-style reply here"""
+        return None
+
+
+class FedExV1Backend(CarrierBackend):
+    """FedEx rate API v1 (sandbox)"""
+
+    name = 'fedex_v1'
+    history_source = 'fedex_api_v1'
+
+    def rates_url(self) -> str:
+        return self.settings.fedex.rates_url
+
+    def build_body(self, origin, destination, shipment, options):
+        template = get_payload_template(
+            'v1',
+            self.settings.fedex.account_number,
+            include_transit_times=options.get('include_transit_times', True)
+        )
+        return template.build_bytes(origin, destination, shipment)
+
+
+class FedExV2Backend(CarrierBackend):
+    """FedEx rate API v2 (production)"""
+
+    name = 'fedex_v2'
+    history_source = 'fedex_api_v2'
+
+    def rates_url(self) -> str:
+        return self.settings.fedex.rates_v2_url
+
+    def build_body(self, origin, destination, shipment, options):
+        template = get_payload_template(
+            'v2',
+            self.settings.fedex.account_number,
+            client_id=self.settings.fedex.client_id,
+            packaging_type=options.get('packaging_type', 'YOUR_PACKAGING')
+        )
+        return template.build_bytes(origin, destination, shipment)
+
+
+# Mock price model: base + per-zone + per-billable-lb, scaled per service
+_MOCK_SERVICES = {
+    'FEDEX_GROUND': (1.0, None),
+    'GROUND_HOME_DELIVERY': (1.05, None),
+    'FEDEX_EXPRESS_SAVER': (2.1, 'THREE_DAYS'),
+    'FEDEX_2_DAY': (2.7, 'TWO_DAYS'),
+    'FEDEX_2_DAY_AM': (3.0, 'TWO_DAYS'),
+    'STANDARD_OVERNIGHT': (4.2, 'ONE_DAY'),
+    'PRIORITY_OVERNIGHT': (4.8, 'ONE_DAY'),
+    'FIRST_OVERNIGHT': (6.5, 'ONE_DAY'),
+}
+_GROUND_TRANSIT = {1: 'ONE_DAY', 2: 'TWO_DAYS', 3: 'THREE_DAYS', 4: 'FOUR_DAYS', 5: 'FIVE_DAYS'}
+
+
+def mock_rate(
+    origin_postal_code: str,
+    destination_postal_code: str,
+    weight: float,
+    length: float,
+    width: float,
+    height: float,
+    service_type: str
+) -> Optional[Tuple[float, str]]:
+    """
+    Deterministic offline price for a FedEx service.
+
+    Returns:
+        (amount in USD, FedEx-style transit time) or None for unknown services
+    """
+    if service_type not in _MOCK_SERVICES:
+        return None
+    zone = lane_zone(origin_postal_code, destination_postal_code) or 5
+    lbs = billable_weight(weight, length, width, height)
+    multiplier, transit = _MOCK_SERVICES[service_type]
+    amount = round((8.5 + 1.15 * zone + 0.42 * lbs * (1 + zone / 10)) * multiplier, 2)
+    if transit is None:
+        transit = _GROUND_TRANSIT[min(max(zone - 1, 1), 5)]
+    return amount, transit
+
+
+class MockBackend(CarrierBackend):
+    """
+    Deterministic local rates for development and load tests - no network,
+    no credentials. Prices follow zone and billable weight like real tariffs.
+    """
+
+    name = 'mock'
+    requires_auth = False
+
+    def quote_locally(self, origin, destination, shipment):
+        service_type = shipment.get('service_type', 'FEDEX_GROUND')
+        amount = 0.0
+        for group in package_groups(shipment):
+            dimensions = group['dimensions']
+            rate = mock_rate(
+                postal_code(origin),
+                postal_code(destination),
+                group['weight'],
+                dimensions['length'],
+                dimensions['width'],
+                dimensions['height'],
+                service_type
+            )
+            if rate is None:
+                return None
+            amount += rate[0] * group['count']
+            transit = rate[1]
+        return build_rate_result([{
+            'service_type': service_type,
+            'amount': round(amount, 2),
+            'currency': 'USD',
+            'transit_time': transit
+        }])['data']
+
+
+BACKENDS = {
+    FedExV1Backend.name: FedExV1Backend,
+    FedExV2Backend.name: FedExV2Backend,
+    MockBackend.name: MockBackend,
+}
+
+
+def build_session(pool_size: int) -> requests.Session:
+    """HTTP session with a keep-alive connection pool (retries are done by CarrierClient)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class TokenCache:
+    """
+    OAuth client-credentials token, reused until shortly before it expires.
+
+    Only one thread refreshes at a time; the others wait for its token. With a
+    shared tier the token is also shared between processes: a process adopts
+    the shared token before fetching, and refreshes under a shared lock so a
+    fleet restart makes one auth call rather than one per worker.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        session: requests.Session,
+        metrics: Metrics = shared_metrics,
+        shared_factory: Optional[Callable] = None,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.settings = settings
+        self.session = session
+        self.metrics = metrics
+        self.shared_factory = shared_factory
+        self._sleep = sleep
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def _shared_name(self) -> Tuple[str, str]:
+        return (self.settings.fedex.client_id or '', self.settings.fedex.auth_url)
+
+    def get(self) -> Optional[str]:
+        """Cached token, fetching a new one when missing or about to expire"""
+        if self._token and time.monotonic() < self._expires_at:
+            return self._token
+        with self._lock:
+            if self._token and time.monotonic() < self._expires_at:
+                return self._token
+            shared = self.shared_factory() if self.shared_factory is not None else None
+            if shared is None:
+                return self._refresh()
+            return self._shared_refresh(shared)
+
+    def invalidate(self, token: Optional[str] = None):
+        """Drop the cached token (only if it is still the given one)"""
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0.0
+        shared = self.shared_factory() if self.shared_factory is not None else None
+        if shared is not None:
+            shared.delete_token(self._shared_name, token)
+
+    def _adopt(self, shared) -> Optional[str]:
+        entry = shared.get_token(self._shared_name)
+        if entry is None:
+            return None
+        self._token, expires_at = entry
+        self._expires_at = time.monotonic() + (expires_at - time.time())
+        self.metrics.increment('carrier.auth_shared_hits')
+        return self._token
+
+    def _shared_refresh(self, shared) -> Optional[str]:
+        token = self._adopt(shared)
+        if token:
+            return token
+        name = self._shared_name
+        deadline = time.monotonic() + SHARED_REFRESH_WAIT_SECONDS
+        # Another process is refreshing: wait a little for its token rather than fetching a second one
+        while not shared.lock(name, self.settings.fedex.auth_timeout_seconds + SHARED_REFRESH_WAIT_SECONDS):
+            if time.monotonic() >= deadline:
+                return self._refresh()
+            self._sleep(SHARED_REFRESH_POLL_SECONDS)
+            token = self._adopt(shared)
+            if token:
+                return token
+        try:
+            token = self._adopt(shared) or self._refresh()
+            if token:
+                shared.put_token(name, token, time.time() + (self._expires_at - time.monotonic()))
+            return token
+        finally:
+            shared.unlock(name)
+
+    def _refresh(self) -> Optional[str]:
+        fedex = self.settings.fedex
+        if not fedex.has_credentials:
+            print("Error: FedEx credentials not found in .env file")
+            return None
+        try:
+            with self.metrics.timer('carrier.auth_latency'):
+                response = self.session.post(
+                    fedex.auth_url,
+                    data={
+                        'grant_type': 'client_credentials',
+                        'client_id': fedex.client_id,
+                        'client_secret': fedex.client_secret
+                    },
+                    headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                    timeout=fedex.auth_timeout_seconds
+                )
+            response.raise_for_status()
+            auth_data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.metrics.increment('carrier.auth_errors')
+            print(f"Error getting FedEx access token: {e}")
+            return None
+        self.metrics.increment('carrier.auth_refreshes')
+        self._token = auth_data.get('access_token')
+        expires_in = float(auth_data.get('expires_in', 3600))
+        self._expires_at = time.monotonic() + max(expires_in - fedex.token_refresh_margin_seconds, 0)
+        return self._token
+
+
+class CarrierClient:
+    """
+    Rate quotes through one backend, behind the get_fedex_freight_rate result contract:
+    {'success', 'data', 'quotes', 'timestamp'} plus 'cached' (and 'revalidating')
+    or 'stale'/'last_known_at' on success, {'success': False, 'error', ...} on failure.
+
+    Cached results past their TTL but within the cache's stale window are
+    returned at once, flagged 'revalidating', while one background refresh
+    per key fetches the current price.
+
+    Carrier calls (cache misses, refreshes) take a slot from the scheduler
+    at the caller's priority class (see quote_scheduler.quote_priority); a shed
+    request is answered with the last known price when there is one.
+    """
+
+    def __init__(
+        self,
+        backend: CarrierBackend,
+        settings: Optional[Settings] = None,
+        session: Optional[requests.Session] = None,
+        cache: Optional[QuoteCache] = quote_cache,
+        history_factory: Optional[Callable] = get_quote_history,
+        shared_factory: Optional[Callable] = get_shared_store,
+        scheduler: Optional[QuoteScheduler] = None,
+        metrics: Metrics = shared_metrics,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.backend = backend
+        self.settings = settings or backend.settings
+        self.session = session or build_session(self.settings.fedex.pool_size)
+        self.cache = cache
+        self.history_factory = history_factory
+        self.metrics = metrics
+        self.tokens = TokenCache(
+            self.settings, self.session, metrics,
+            shared_factory=(lambda: shared_factory(self.settings)) if shared_factory is not None else None,
+            sleep=sleep
+        )
+        self.scheduler = scheduler or QuoteScheduler.from_settings(self.settings, metrics)
+        self._sleep = sleep
+        self._revalidator = ThreadPoolExecutor(
+            max_workers=self.settings.cache.revalidate_workers, thread_name_prefix='quote-revalidate'
+        )
+        self._revalidating: Dict[Any, Future] = {}
+        self._revalidating_lock = threading.Lock()
+
+    def quote(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        shipment: Dict[str, Any],
+        options: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Quote one service for one shipment (inputs as for get_fedex_freight_rate).
+        """
+        options = options or {}
+        backend = self.backend.name
+        cache_key = self.cache_key(origin, destination, shipment, options)
+        if self.cache is not None:
+            cached_result, stale = self.cache.lookup(cache_key)
+            if cached_result is not None:
+                self.metrics.increment('carrier.cache_hits', backend=backend)
+                if stale:
+                    self.metrics.increment('carrier.stale_hits', backend=backend)
+                    self.revalidate(origin, destination, shipment, options)
+                    return dict(cached_result, cached=True, revalidating=True)
+                return dict(cached_result, cached=True)
+        self.metrics.increment('carrier.cache_misses', backend=backend)
+        return self.refresh(origin, destination, shipment, options)
+
+    def refresh(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        shipment: Dict[str, Any],
+        options: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Quote from the carrier without reading the cache (the result is still
+        cached and recorded), e.g. to revalidate or warm an entry
+        """
+        options = options or {}
+        backend = self.backend.name
+        try:
+            with self._slot(), self.metrics.timer('carrier.quote_latency', backend=backend):
+                data, error = self._fetch(origin, destination, shipment, options)
+        except QuoteShed as e:
+            self.metrics.increment('carrier.shed', backend=backend, priority=e.priority)
+            fallback = self._last_known_result(origin, destination, shipment, str(e))
+            if fallback is not None:
+                self.metrics.increment('carrier.stale_served', backend=backend)
+                return fallback
+            return _error(str(e), shed=True)
+
+        if data is None:
+            self.metrics.increment('carrier.errors', backend=backend)
+            if error.get('retryable'):
+                fallback = self._last_known_result(origin, destination, shipment, error['message'])
+                if fallback is not None:
+                    self.metrics.increment('carrier.stale_served', backend=backend)
+                    return fallback
+            error.pop('retryable', None)
+            return _error(**error)
+
+        rate_result = {
+            'success': True,
+            'data': data,
+            'quotes': normalize_quote(origin, destination, shipment, data),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        if self.cache is not None:
+            self.cache.put(self.cache_key(origin, destination, shipment, options), rate_result)
+        if rate_result['quotes'] and self.backend.history_source and self.history_factory is not None:
+            self.history_factory().record(rate_result['quotes'], source=self.backend.history_source)
+        return rate_result
+
+    def revalidate(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        shipment: Dict[str, Any],
+        options: Optional[Dict[str, Any]] = None
+    ) -> Future:
+        """Refresh a cache entry in the background; concurrent calls for one key share the refresh"""
+        cache_key = self.cache_key(origin, destination, shipment, options)
+        with self._revalidating_lock:
+            future = self._revalidating.get(cache_key)
+            if future is not None:
+                return future
+            self.metrics.increment('carrier.revalidations', backend=self.backend.name)
+            # The caller already has its answer, so an interactive hit refreshes at prefetch priority
+            priority = current_priority()
+            future = self._revalidating[cache_key] = self._revalidator.submit(
+                with_priority, PREFETCH if priority == INTERACTIVE else priority,
+                self.refresh, origin, destination, shipment, options
+            )
+        future.add_done_callback(lambda _: self._forget_revalidation(cache_key))
+        return future
+
+    def cache_key(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        shipment: Dict[str, Any],
+        options: Optional[Dict[str, Any]] = None
+    ) -> Tuple:
+        """
+        Quote cache key of a request through this client: the lane and package
+        plus backend, account and request options, since one cache (and its
+        shared and history tiers) serves every client in the process
+        """
+        scope = quote_scope(
+            self.backend.history_source or self.backend.name, self.settings.fedex.account_number, options
+        )
+        return make_quote_key(origin, destination, shipment, scope)
+
+    def _slot(self):
+        return self.scheduler.slot() if self.scheduler is not None else contextlib.nullcontext()
+
+    def _forget_revalidation(self, cache_key):
+        with self._revalidating_lock:
+            self._revalidating.pop(cache_key, None)
+
+    def _fetch(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        shipment: Dict[str, Any],
+        options: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Call the backend with retries; returns (data, None) or (None, error kwargs)"""
+        if not self.backend.requires_auth:
+            data = self.backend.quote_locally(origin, destination, shipment)
+            if data is None:
+                return None, {'message': f"No {self.backend.name} rate for this shipment"}
+            self.metrics.increment('carrier.requests', backend=self.backend.name, status=200)
+            return data, None
+
+        fedex = self.settings.fedex
+        body = self.backend.build_body(origin, destination, shipment, options)
+        refreshed_token = False
+        attempt = 0
+        while True:
+            token = self.tokens.get()
+            if not token:
+                return None, {'message': 'Failed to authenticate with FedEx API'}
+            headers = {
+                'Authorization': f'Bearer {token}',
+                'Content-Type': 'application/json',
+                'X-locale': 'en_US'
+            }
+            try:
+                response = self.session.post(
+                    self.backend.rates_url(), data=body, headers=headers, timeout=fedex.rate_timeout_seconds
+                )
+            except requests.exceptions.RequestException as e:
+                self.metrics.increment('carrier.requests', backend=self.backend.name, status='exception')
+                if attempt < fedex.max_retries:
+                    attempt += 1
+                    self._backoff(attempt)
+                    continue
+                return None, {'message': f'Failed to call FedEx API: {str(e)}', 'retryable': True}
+
+            self.metrics.increment('carrier.requests', backend=self.backend.name, status=response.status_code)
+            if response.status_code == 200:
+                return response.json(), None
+            if response.status_code == 401 and not refreshed_token:
+                # Token revoked or expired early: fetch a new one once
+                self.tokens.invalidate(token)
+                refreshed_token = True
+                continue
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < fedex.max_retries:
+                attempt += 1
+                self._backoff(attempt, response.headers.get('Retry-After'))
+                continue
+
+            try:
+                error_data = response.json() if response.content else {}
+            except ValueError:
+                error_data = {}
+            return None, {
+                'message': f'FedEx API error: {response.status_code}',
+                'error_details': error_data,
+                'retryable': response.status_code in RETRYABLE_STATUS_CODES
+            }
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None):
+        self.metrics.increment('carrier.retries', backend=self.backend.name)
+        delay = self.settings.fedex.retry_backoff_seconds * (2 ** (attempt - 1))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        # Full jitter keeps concurrent retries from arriving together
+        self._sleep(random.uniform(0, delay))
+
+    def _last_known_result(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        shipment: Dict[str, Any],
+        error: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Most recent stored price for the same ZIP3 lane, service and billable weight,
+        used when the carrier is slow or unavailable. Approximate by design, so the
+        result is flagged as stale.
+        """
+        if self.history_factory is None or is_multi_piece(shipment):
+            return None
+        try:
+            dimensions = shipment['dimensions']
+            record = self.history_factory().last_known_price(
+                postal_code(origin),
+                postal_code(destination),
+                shipment.get('service_type', 'FEDEX_GROUND'),
+                shipment['weight'],
+                dimensions['length'],
+                dimensions['width'],
+                dimensions['height'],
+                source=self.backend.history_source
+            )
+        except Exception as e:
+            print(f"Error looking up last known FedEx price: {e}")
+            return None
+        if record is None:
+            return None
+        return build_rate_result([record], stale=True, last_known_at=record['quoted_at'], error=error)
+
+
+def get_carrier_client(settings: Optional[Settings] = None) -> CarrierClient:
+    """
+    Shared client for a settings object (default: the process-wide settings);
+    the backend comes from settings.fedex.backend.
+    """
+    return _carrier_client(settings or get_settings())
+
+
+@lru_cache(maxsize=8)
+def _carrier_client(settings: Settings) -> CarrierClient:
+    backend_class = BACKENDS.get(settings.fedex.backend)
+    if backend_class is None:
+        raise ValueError(f"Unknown carrier backend: {settings.fedex.backend}")
+    return CarrierClient(backend_class(settings), settings)
@@ -0,0 +1,361 @@
+"""
+HTTP Record/Replay Cassettes
+Records FedEx (requests) and OpenAI (httpx) traffic to disk and replays it without a network
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterator, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .settings import Settings, get_settings
+
+RECORD = 'record'
+REPLAY = 'replay'
+OFF = 'off'
+
+CASSETTE_VERSION = 1
+DEFAULT_CASSETTE_DIR = Path(__file__).resolve().parent.parent / "cassettes"
+
+# Fields that change on every run (or are secrets) and are left out of request matching
+VOLATILE_FIELDS = {'shipDateStamp', 'shipTimestamp'}
+SECRET_FIELDS = {'client_id', 'client_secret', 'accountNumber', 'access_token', 'api_key'}
+_MASK = '<masked>'
+
+
+class CassetteMismatch(AssertionError):
+    """Raised for a request that has no recorded interaction"""
+
+
+def _mask(node: Any) -> Any:
+    if isinstance(node, dict):
+        return {
+            key: _MASK if key in SECRET_FIELDS or key in VOLATILE_FIELDS else _mask(value)
+            for key, value in node.items()
+        }
+    if isinstance(node, list):
+        return [_mask(value) for value in node]
+    return node
+
+
+def _decode_body(body: Union[bytes, str, None], content_type: Optional[str]) -> Any:
+    if body is None or body == b'' or body == '':
+        return None
+    text = body.decode('utf-8') if isinstance(body, bytes) else body
+    if content_type and 'x-www-form-urlencoded' in content_type:
+        return _mask(dict(parse_qsl(text)))
+    try:
+        return _mask(json.loads(text))
+    except ValueError:
+        return text
+
+
+def normalize_request(method: str, url: str, body: Union[bytes, str, None], content_type: Optional[str]) -> Dict[str, Any]:
+    """
+    Matching key for a request: method, host-less path, sorted query and the
+    decoded body with secrets and per-run fields masked.
+    """
+    parts = urlsplit(url)
+    query = '&'.join(f"{key}={value}" for key, value in sorted(parse_qsl(parts.query)))
+    return {
+        'method': method.upper(),
+        'path': parts.path + (f"?{query}" if query else ''),
+        'body': _decode_body(body, content_type)
+    }
+
+
+def _response_record(status_code: int, headers: Any, content: bytes) -> Dict[str, Any]:
+    content_type = headers.get('content-type', '')
+    text = content.decode('utf-8', errors='replace')
+    if 'json' in content_type:
+        try:
+            return {'status_code': status_code, 'content_type': content_type, 'json': _mask(json.loads(text))}
+        except ValueError:
+            pass
+    return {'status_code': status_code, 'content_type': content_type, 'text': text}
+
+
+def _response_content(response: Dict[str, Any]) -> bytes:
+    if 'json' in response:
+        return json.dumps(response['json']).encode('utf-8')
+    return response.get('text', '').encode('utf-8')
+
+
+class Cassette:
+    """
+    Recorded request/response pairs for one scenario, stored as JSON.
+
+    In record mode requests go to the network and are appended; in replay
+    mode each request is answered from the recording after its recorded
+    latency times latency_scale. Identical requests replay their recordings
+    in order, then repeat the last one. A request with no recording raises
+    CassetteMismatch, and is also remembered so check() can fail the run even
+    when the caller swallowed the exception.
+    """
+
+    def __init__(self, path: Union[str, Path], mode: str = REPLAY, latency_scale: float = 1.0):
+        if mode not in (RECORD, REPLAY, OFF):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.interactions: List[Dict[str, Any]] = []
+        self.mismatches: List[Dict[str, Any]] = []
+        self.played = 0
+        self._positions: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        if mode == REPLAY:
+            if not self.path.exists():
+                raise FileNotFoundError(f"No cassette at {self.path}; record one with CASSETTE_MODE=record")
+            with open(self.path) as f:
+                self.interactions = json.load(f)['interactions']
+        self._by_key: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for interaction in self.interactions:
+            self._by_key[self._key(interaction['request'])].append(interaction)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == RECORD
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    @staticmethod
+    def _key(request: Dict[str, Any]) -> str:
+        return json.dumps(request, sort_keys=True)
+
+    def record(self, request: Dict[str, Any], response: Dict[str, Any], latency_seconds: float):
+        interaction = {'request': request, 'response': response, 'latency_seconds': round(latency_seconds, 4)}
+        with self._lock:
+            self.interactions.append(interaction)
+            self._by_key[self._key(request)].append(interaction)
+
+    def match(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+        """Recorded response for a request and its (scaled) latency in seconds, without waiting"""
+        key = self._key(request)
+        with self._lock:
+            recorded = self._by_key.get(key)
+            if not recorded:
+                self.mismatches.append(request)
+                same_path = sum(1 for i in self.interactions if i['request']['path'] == request['path'])
+                raise CassetteMismatch(
+                    f"No recorded interaction in {self.path.name} for {request['method']} {request['path']} "
+                    f"({same_path} recorded for this path with a different body): "
+                    f"{json.dumps(request['body'], sort_keys=True)[:500]}"
+                )
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            self.played += 1
+            interaction = recorded[min(position, len(recorded) - 1)]
+        return interaction['response'], interaction['latency_seconds'] * self.latency_scale
+
+    def play(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Recorded response for a request, after its (scaled) latency"""
+        response, delay = self.match(request)
+        if delay > 0:
+            time.sleep(delay)
+        return response
+
+    def check(self):
+        """Raise CassetteMismatch if any request went unmatched"""
+        if self.mismatches:
+            paths = ', '.join(sorted({f"{r['method']} {r['path']}" for r in self.mismatches}))
+            raise CassetteMismatch(f"{len(self.mismatches)} request(s) had no recording in {self.path.name}: {paths}")
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({'version': CASSETTE_VERSION, 'interactions': self.interactions}, f, indent=1)
+
+    def requests_adapter(self, real: Optional[BaseAdapter] = None) -> "CassetteAdapter":
+        return CassetteAdapter(self, real)
+
+    def httpx_client(self) -> Optional[httpx.Client]:
+        """httpx client for OpenAI SDK / LangChain (http_client=...), or None when off"""
+        if self.mode == OFF:
+            return None
+        return httpx.Client(transport=CassetteTransport(self))
+
+    def httpx_async_client(self) -> Optional[httpx.AsyncClient]:
+        if self.mode == OFF:
+            return None
+        return httpx.AsyncClient(transport=AsyncCassetteTransport(self))
+
+
+class CassetteAdapter(BaseAdapter):
+    """requests transport adapter that records to or replays from a cassette"""
+
+    def __init__(self, cassette: Cassette, real: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.cassette = cassette
+        self.real = real
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        normalized = normalize_request(request.method, request.url, request.body, request.headers.get('Content-Type'))
+        if self.cassette.recording:
+            started = time.perf_counter()
+            response = self.real.send(request, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+            self.cassette.record(
+                normalized, _response_record(response.status_code, response.headers, response.content),
+                time.perf_counter() - started
+            )
+            return response
+
+        recorded = self.cassette.play(normalized)
+        response = requests.Response()
+        response.status_code = recorded['status_code']
+        response.headers = CaseInsensitiveDict({'Content-Type': recorded['content_type']} if recorded['content_type'] else {})
+        response._content = _response_content(recorded)
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        if self.real is not None:
+            self.real.close()
+
+
+def _httpx_response(request: httpx.Request, recorded: Dict[str, Any]) -> httpx.Response:
+    headers = {'content-type': recorded['content_type']} if recorded['content_type'] else {}
+    return httpx.Response(recorded['status_code'], headers=headers, content=_response_content(recorded), request=request)
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport that records to or replays from a cassette"""
+
+    def __init__(self, cassette: Cassette, real: Optional[httpx.BaseTransport] = None):
+        self.cassette = cassette
+        self.real = real or (httpx.HTTPTransport() if cassette.recording else None)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        normalized = normalize_request(request.method, str(request.url), request.read(), request.headers.get('content-type'))
+        if self.cassette.recording:
+            started = time.perf_counter()
+            response = self.real.handle_request(request)
+            content = response.read()
+            recorded = _response_record(response.status_code, response.headers, content)
+            self.cassette.record(normalized, recorded, time.perf_counter() - started)
+            # Re-wrap the decoded body so the client doesn't decode it twice
+            return _httpx_response(request, recorded)
+        return _httpx_response(request, self.cassette.play(normalized))
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    """Async variant of CassetteTransport; replay latency is awaited, so concurrent requests overlap"""
+
+    def __init__(self, cassette: Cassette, real: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self.real = real or (httpx.AsyncHTTPTransport() if cassette.recording else None)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        normalized = normalize_request(request.method, str(request.url), await request.aread(), request.headers.get('content-type'))
+        if self.cassette.recording:
+            started = time.perf_counter()
+            response = await self.real.handle_async_request(request)
+            content = await response.aread()
+            recorded = _response_record(response.status_code, response.headers, content)
+            self.cassette.record(normalized, recorded, time.perf_counter() - started)
+            return _httpx_response(request, recorded)
+        recorded, delay = self.cassette.match(normalized)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return _httpx_response(request, recorded)
+
+
+def cassette_mode(path: Union[str, Path], mode: Optional[str] = None) -> str:
+    """The given mode, else replay if the cassette exists and off if not"""
+    if mode:
+        return mode.lower()
+    return REPLAY if Path(path).exists() else OFF
+
+
+@contextmanager
+def use_cassette(
+    name: str,
+    mode: Optional[str] = None,
+    latency_scale: Optional[float] = None,
+    settings: Optional[Settings] = None,
+    directory: Union[str, Path] = DEFAULT_CASSETTE_DIR
+) -> Iterator[Cassette]:
+    """
+    Route FedEx carrier-client traffic through a cassette for the duration of the block.
+
+    mode and latency_scale default to settings.cassette_mode and
+    settings.cassette_latency_scale (CASSETTE_MODE, CASSETTE_LATENCY_SCALE).
+
+    The shared carrier client for settings gets the cassette adapter and a
+    fresh token cache (so the OAuth exchange is recorded too, and replays with
+    placeholder credentials); the quote cache and prefetch registry start
+    empty and the quote history is detached, so every quote reaches the
+    transport and nothing leaks into or out of the block. OpenAI clients opt in with
+    http_client=cassette.httpx_client() and cassette.settings, which carries a
+    placeholder API key when replaying.
+
+    Yields:
+        Cassette
+
+    Raises:
+        CassetteMismatch: On exit, if any request had no recording
+    """
+    # Imported here so importing this module doesn't build the carrier client
+    from .carrier_client import TokenCache, get_carrier_client
+    from .prefetch import quote_prefetcher
+    from .quote_cache import quote_cache
+
+    settings = settings or get_settings()
+    path = Path(directory) / f"{name}.json"
+    mode = cassette_mode(path, mode or settings.cassette_mode)
+    if latency_scale is None:
+        latency_scale = settings.cassette_latency_scale
+    cassette = Cassette(path, mode, latency_scale)
+    cassette.settings = settings.with_overrides(openai={'api_key': 'cassette'}) if cassette.replaying else settings
+    if mode == OFF:
+        yield cassette
+        return
+
+    client = get_carrier_client(settings)
+    token_settings = settings
+    if cassette.replaying:
+        token_settings = settings.with_overrides(fedex={'client_id': 'cassette', 'client_secret': 'cassette'})
+    saved_adapters = dict(client.session.adapters)
+    saved_tokens = client.tokens
+    saved_history = client.history_factory
+    saved_backing = quote_cache._backing_factory
+    saved_shared = quote_cache._shared_factory
+    adapter = cassette.requests_adapter(real=client.session.get_adapter('https://'))
+    client.session.mount('https://', adapter)
+    client.session.mount('http://', adapter)
+    # No shared tier: recordings must not see (or leave) quotes and tokens of other processes
+    client.tokens = TokenCache(token_settings, client.session, client.metrics)
+    client.history_factory = None
+    quote_cache.clear()
+    quote_cache.set_backing(None)
+    quote_cache.set_shared(None)
+    quote_prefetcher.clear()
+    try:
+        yield cassette
+    finally:
+        client.session.adapters.clear()
+        for prefix, saved in saved_adapters.items():
+            client.session.mount(prefix, saved)
+        client.tokens = saved_tokens
+        client.history_factory = saved_history
+        quote_cache.clear()
+        quote_cache.set_backing(saved_backing)
+        quote_cache.set_shared(saved_shared)
+        quote_prefetcher.clear()
+        if cassette.recording:
+            cassette.save()
+    cassette.check()
@@ -0,0 +1,125 @@
+"""
+Chat History Render Model
+Builds render-ready chat messages once, when they are appended, and pages older turns
+"""
+
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+RECENT_MESSAGES = 10
+HISTORY_PAGE_SIZE = 20
+
+
+def extract_copyable_details(tool_output: str) -> Optional[str]:
+    """
+    Pull the "Package: ... From: ... To: ..." summary out of a FedEx tool output.
+
+    Returns:
+        Single-line summary, or None when the output doesn't hold all three lines
+    """
+    if not tool_output or "Package:" not in tool_output or "From:" not in tool_output or "To:" not in tool_output:
+        return None
+
+    package_line = from_line = to_line = ""
+    for line in tool_output.split('\n'):
+        if line.startswith("From:"):
+            from_line = line.strip()
+        elif line.startswith("To:"):
+            to_line = line.strip()
+        elif line.startswith("Package:"):
+            package_line = line.strip()
+
+    if package_line and from_line and to_line:
+        return f"{package_line} {from_line} {to_line}"
+    return None
+
+
+def _debug_payload(debug_info: Dict[str, Any]) -> Dict[str, Any]:
+    # Keep only what the debug panel shows; raw intermediate steps hold LangChain objects
+    tools_used = [
+        {
+            'tool': tool.get('tool', 'unknown'),
+            'input': tool.get('input', {}),
+            'output': tool.get('output', '')
+        }
+        for tool in debug_info.get('tools_used', [])
+    ]
+    return {
+        'tool_calls_made': bool(debug_info.get('tool_calls_made', False)),
+        'tools_used': tools_used,
+        'error': debug_info.get('error')
+    }
+
+
+def build_chat_message(
+    role: str,
+    content: str,
+    debug_info: Optional[Dict[str, Any]] = None,
+    timestamp: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Build a chat message in render-ready form.
+
+    Everything the chat view needs (copyable shipment details, tool counts,
+    trimmed debug info) is computed here once, so reruns only draw.
+
+    Args:
+        role: "user" or "assistant"
+        content: Message text
+        debug_info: Debug info returned by LangChainFedExAgent.send_message
+        timestamp: Display timestamp (defaults to now, HH:MM:SS)
+
+    Returns:
+        Dict with keys: id, role, content, timestamp, copyable_text, debug_info (assistant only)
+    """
+    timestamp = timestamp or datetime.now().strftime("%H:%M:%S")
+    message = {
+        'id': uuid.uuid4().hex,
+        'role': role,
+        'content': content,
+        'timestamp': timestamp,
+        'copyable_text': None
+    }
+    if role == "assistant" and debug_info is not None:
+        debug = _debug_payload(debug_info)
+        message['debug_info'] = debug
+        if debug['tool_calls_made'] and debug['tools_used']:
+            message['copyable_text'] = extract_copyable_details(debug['tools_used'][0]['output'])
+    return message
+
+
+def split_history(
+    messages: List[Dict[str, Any]],
+    recent: int = RECENT_MESSAGES
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split the conversation into (older, recent) messages.
+
+    The split lands on a user message where possible, so a question and its
+    reply stay together.
+    """
+    if len(messages) <= recent:
+        return [], messages
+    split = len(messages) - recent
+    if messages[split]['role'] != 'user' and split > 0 and messages[split - 1]['role'] == 'user':
+        split -= 1
+    return messages[:split], messages[split:]
+
+
+def history_page(
+    older: List[Dict[str, Any]],
+    page: int,
+    page_size: int = HISTORY_PAGE_SIZE
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    One page of older messages, in chronological order; page 1 is the most recent.
+
+    Returns:
+        (messages on the page, number of pages)
+    """
+    page_count = max((len(older) + page_size - 1) // page_size, 1)
+    page = min(max(page, 1), page_count)
+    end = len(older) - (page - 1) * page_size
+    return older[max(end - page_size, 0):end], page_count
+
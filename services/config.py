@@ -0,0 +1,18 @@
+"""
+Environment Configuration
+Loads the .env file once per process, on first use
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def load_env() -> bool:
+    """
+    Load environment variables from .env (only the first call does any work)
+
+    Returns:
+        True if a .env file was found and loaded
+    """
+    from dotenv import load_dotenv
+    return load_dotenv()
@@ -0,0 +1,113 @@
+"""
+Shipment Consolidation
+Compares shipping an order's boxes separately, as one multi-piece shipment, or packed into one box
+"""
+
+from typing import Dict, Any, Optional, Callable
+
+from .fedexAPI import _service_executor, get_fedex_freight_rate
+from .packages import consolidate_packages, package_count, package_groups, multi_package_shipment
+from .quote_cache import extract_rates
+from .quote_scheduler import current_priority, with_priority
+
+PER_BOX = 'per_box'
+MULTI_PIECE = 'multi_piece'
+CONSOLIDATED = 'consolidated'
+
+
+def _amount(result: Dict[str, Any]) -> Optional[float]:
+    if not result.get('success'):
+        return None
+    rates = extract_rates(result.get('data'))
+    return rates[0]['amount'] if rates else None
+
+
+def compare_consolidation(
+    origin: Dict[str, Any],
+    destination: Dict[str, Any],
+    shipment: Dict[str, Any],
+    service_type: str = 'FEDEX_GROUND',
+    quote: Callable[..., Dict[str, Any]] = get_fedex_freight_rate
+) -> Dict[str, Any]:
+    """
+    Price an order three ways, with all quotes in parallel:
+
+    - per_box: every box as its own shipment (one quote per distinct box, times its count)
+    - multi_piece: all boxes in one multi-piece shipment (one quote)
+    - consolidated: all boxes packed into one box (one quote; skipped if over FedEx limits)
+
+    Args:
+        origin: Origin address (see get_fedex_freight_rate)
+        destination: Destination address (see get_fedex_freight_rate)
+        shipment: Single- or multi-piece shipment (see packages.multi_package_shipment)
+        service_type: FedEx service to compare on
+        quote: Rate function with the get_fedex_freight_rate signature
+
+    Returns:
+        Dict with keys: options ({strategy: {amount, requests, packages, error}}),
+        best (cheapest strategy or None), savings (per-box total minus best)
+    """
+    groups = package_groups(shipment)
+    fields = {key: shipment[key] for key in ('pickup_type', 'ship_date') if key in shipment}
+    fields['service_type'] = service_type
+    priority = current_priority()
+
+    futures = {
+        PER_BOX: [
+            (group, _service_executor.submit(with_priority, priority, quote, origin, destination, multi_package_shipment(
+                [{'weight': group['weight'], 'dimensions': group['dimensions']}], **fields)))
+            for group in groups
+        ]
+    }
+    if package_count(shipment) > 1:
+        futures[MULTI_PIECE] = _service_executor.submit(
+            with_priority, priority, quote, origin, destination, multi_package_shipment(groups, **fields)
+        )
+        consolidated = consolidate_packages(shipment)
+        if consolidated is not None:
+            futures[CONSOLIDATED] = (consolidated, _service_executor.submit(
+                with_priority, priority, quote, origin, destination, multi_package_shipment([consolidated], **fields)
+            ))
+
+    options: Dict[str, Dict[str, Any]] = {}
+    per_box_total = 0.0
+    per_box_error = None
+    for group, future in futures[PER_BOX]:
+        result = future.result()
+        amount = _amount(result)
+        if amount is None:
+            per_box_error = result.get('error', 'No rates returned')
+            break
+        per_box_total += amount * group['count']
+    options[PER_BOX] = {
+        'amount': None if per_box_error else round(per_box_total, 2),
+        'requests': len(groups),
+        'packages': groups,
+        'error': per_box_error
+    }
+    if MULTI_PIECE in futures:
+        result = futures[MULTI_PIECE].result()
+        amount = _amount(result)
+        options[MULTI_PIECE] = {
+            'amount': amount,
+            'requests': 1,
+            'packages': groups,
+            'error': None if amount is not None else result.get('error', 'No rates returned')
+        }
+    if CONSOLIDATED in futures:
+        consolidated, future = futures[CONSOLIDATED]
+        result = future.result()
+        amount = _amount(result)
+        options[CONSOLIDATED] = {
+            'amount': amount,
+            'requests': 1,
+            'packages': [dict(consolidated, count=1)],
+            'error': None if amount is not None else result.get('error', 'No rates returned')
+        }
+
+    priced = {strategy: option['amount'] for strategy, option in options.items() if option['amount'] is not None}
+    best = min(priced, key=priced.get) if priced else None
+    savings = None
+    if best is not None and options[PER_BOX]['amount'] is not None:
+        savings = round(options[PER_BOX]['amount'] - priced[best], 2)
+    return {'options': options, 'best': best, 'savings': savings}
@@ -64,24 +64,338 @@
 #     melted["Amount"] = pd.to_numeric(melted["Amount"], errors="coerce")
 #     melted.dropna(subset=["Amount"], inplace=True)
 #     return melted
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 
-def load_and_clean_data(uploaded_file):
-    if uploaded_file.name.endswith(".csv"):
-        df = pd.read_csv(uploaded_file)
-    else:
-        df = pd.read_excel(uploaded_file)
+from .settings import get_settings
+
+AMOUNT_COLS = ['Goods (Amt)', 'Services (Amt)', 'Construction (Amt)', 'IT (Amt)']
+CSV_CHUNK_ROWS = 100_000
+HASH_BLOCK_BYTES = 8 << 20
+HASH_MEMO_MAX_ENTRIES = 256
+CACHE_FORMAT_VERSION = 2  # Bump when the cleaning rules change so old caches are not reused
+
+
+def _is_supplier_col(column: str) -> bool:
+    return str(column).startswith('Supplier')
+
+
+def _file_name(uploaded_file: Any) -> str:
+    return str(getattr(uploaded_file, 'name', uploaded_file))
+
+
+def _open(uploaded_file: Any):
+    """Binary file object for an upload or a path; rewound to the start"""
+    if isinstance(uploaded_file, (str, Path)):
+        return open(uploaded_file, 'rb')
+    uploaded_file.seek(0)
+    return uploaded_file
+
+
+# id() -> frame returned by load_and_clean_data; only these frames are keyed by their content hash
+_loaded_frames: "weakref.WeakValueDictionary[int, pd.DataFrame]" = weakref.WeakValueDictionary()
+
+# File identity -> content hash, so a rerun with the same upload or unchanged file skips re-hashing
+_hash_memo: Dict[Tuple, str] = {}
+
+
+def _identity(uploaded_file: Any) -> Optional[Tuple]:
+    if isinstance(uploaded_file, (str, Path)):
+        stat = os.stat(uploaded_file)
+        return ('path', str(Path(uploaded_file).resolve()), stat.st_size, stat.st_mtime_ns)
+    file_id = getattr(uploaded_file, 'file_id', None)  # Streamlit UploadedFile
+    if file_id is not None:
+        return ('upload', file_id, getattr(uploaded_file, 'size', None))
+    return None
+
+
+def content_hash(uploaded_file: Any) -> str:
+    """Hash of the file contents (plus the cleaning-rules version), in fixed-size blocks"""
+    identity = _identity(uploaded_file)
+    if identity is not None and identity in _hash_memo:
+        return _hash_memo[identity]
+    digest = hashlib.sha256()
+    digest.update(f"v{CACHE_FORMAT_VERSION}:{Path(_file_name(uploaded_file)).suffix.lower()}".encode())
+    f = _open(uploaded_file)
+    try:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+            digest.update(block)
+    finally:
+        if f is not uploaded_file:
+            f.close()
+        else:
+            f.seek(0)
+    key = digest.hexdigest()[:32]
+    if identity is not None:
+        if len(_hash_memo) >= HASH_MEMO_MAX_ENTRIES:
+            _hash_memo.clear()
+        _hash_memo[identity] = key
+    return key
+
+
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Clean a chunk: amounts as float32 (unparseable values become NaN) summed
+    into Total Spend, supplier fields as categoricals with the DVB supplier
+    type spelled DVBE, and PO Date parsed (unparseable dates become NaT)
+    """
+    for col in AMOUNT_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+    for col in df.columns:
+        if _is_supplier_col(col) and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    if 'Supplier Type' in df.columns and 'DVB' in df['Supplier Type'].cat.categories:
+        df['Supplier Type'] = df['Supplier Type'].astype(object).replace('DVB', 'DVBE').astype('category')
+    if 'PO Date' in df.columns:
+        df['PO Date'] = pd.to_datetime(df['PO Date'], errors='coerce')
+    df['Total Spend'] = df[[col for col in AMOUNT_COLS if col in df.columns]].sum(axis=1).astype('float32')
+    return df
+
+
+def _concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate chunks, keeping categorical columns categorical (chunks see different categories)"""
+    if len(chunks) == 1:
+        return chunks[0]
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            categories = union_categoricals([chunk[col] for chunk in chunks]).categories
+            for chunk in chunks:
+                chunk[col] = chunk[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_spend_file(uploaded_file: Any, chunk_rows: int = CSV_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Parse a spend export with compact dtypes. CSVs are read in chunks of
+    chunk_rows, so only one chunk is ever held with pandas' inferred dtypes.
+    """
+    f = _open(uploaded_file)
+    try:
+        if _file_name(uploaded_file).lower().endswith(".csv"):
+            columns = pd.read_csv(f, nrows=0).columns
+            f.seek(0)
+            dtype = {col: 'category' for col in columns if _is_supplier_col(col)}
+            reader = pd.read_csv(f, chunksize=chunk_rows, dtype=dtype)
+            return _concat_chunks([_compact(chunk) for chunk in reader])
+        return _compact(pd.read_excel(f))
+    finally:
+        if f is not uploaded_file:
+            f.close()
+
+
+def _cache_path(key: str, cache_dir: Optional[Union[str, Path]]) -> Path:
+    return Path(cache_dir or get_settings().cache.dashboard_cache_dir) / f"{key}.feather"
+
+
+def _write_feather(df: pd.DataFrame, path: Path):
+    from pyarrow import feather
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    os.close(fd)
+    try:
+        # Uncompressed so later loads can memory-map the columns instead of decoding them
+        feather.write_feather(df, tmp, compression='uncompressed')
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _read_feather(path: Path) -> pd.DataFrame:
+    from pyarrow import feather
+
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
 
-    amount_cols = ['Goods (Amt)', 'Services (Amt)', 'Construction (Amt)', 'IT (Amt)']
-    for col in amount_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
 
+def load_and_clean_data(
+    uploaded_file: Any,
+    cache_dir: Optional[Union[str, Path]] = None,
+    chunk_rows: int = CSV_CHUNK_ROWS
+) -> pd.DataFrame:
+    """
+    Load a .csv or .xlsx spend export (an upload or a path) with the amount
+    columns as float32 and supplier columns as categoricals.
+
+    The cleaned frame is cached as Feather under a hash of the file contents
+    (default directory: settings.cache.dashboard_cache_dir), so re-opening the
+    same export - e.g. on every Streamlit rerun - memory-maps the cache instead
+    of parsing the file again.
+    """
+    key = content_hash(uploaded_file)
+    path = _cache_path(key, cache_dir)
+    if path.exists():
+        df = _read_feather(path)
+    else:
+        df = read_spend_file(uploaded_file, chunk_rows)
+        _write_feather(df, path)
+    df.attrs['content_hash'] = key
+    _loaded_frames[id(df)] = df
     return df
 
+
+CATEGORY_COLS = {
+    'goods': 'Goods (Amt)',
+    'services': 'Services (Amt)',
+    'construction': 'Construction (Amt)',
+    'it': 'IT (Amt)',
+}
+SUMMARY_MEMO_MAX_ENTRIES = 8
+
+
+def _amounts(df: pd.DataFrame) -> np.ndarray:
+    """rows x categories amount matrix (NaN where missing)"""
+    return df[list(CATEGORY_COLS.values())].to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _spend_mask(amounts: np.ndarray) -> np.ndarray:
+    """True where the category amount is present and non-zero"""
+    return ~np.isnan(amounts) & (amounts != 0)
+
+
+class CategoryViews(Mapping):
+    """
+    Per-category row subsets of a spend frame. The masks for all categories
+    come from one pass over the amount columns; a category's rows are only
+    copied out when that category is first read.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.masks = _spend_mask(_amounts(df))
+        self._views: Dict[str, pd.DataFrame] = {}
+
+    def mask(self, category: str) -> np.ndarray:
+        return self.masks[:, list(CATEGORY_COLS).index(category)]
+
+    def __getitem__(self, category: str) -> pd.DataFrame:
+        if category not in CATEGORY_COLS:
+            raise KeyError(category)
+        if category not in self._views:
+            self._views[category] = self.df[self.mask(category)]
+        return self._views[category]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CATEGORY_COLS)
+
+    def __len__(self) -> int:
+        return len(CATEGORY_COLS)
+
+
 def split_by_category(df):
-    return {
-        'goods': df[df['Goods (Amt)'].notna() & df['Goods (Amt)'] != 0],
-        'services': df[df['Services (Amt)'].notna() & df['Services (Amt)'] != 0],
-        'construction': df[df['Construction (Amt)'].notna() & df['Construction (Amt)'] != 0],
-        'it': df[df['IT (Amt)'].notna() & df['IT (Amt)'] != 0],
-    }
\ No newline at end of file
+    """Rows with a non-zero amount in each category, as lazy views (see CategoryViews)"""
+    return CategoryViews(df)
+
+
+def dataset_key(df: pd.DataFrame) -> str:
+    """
+    Content hash for a frame returned by load_and_clean_data, else a hash of
+    the frame's values. pandas copies attrs onto filtered, sliced and
+    re-indexed frames, so the content hash is only trusted on the loaded
+    frame itself.
+    """
+    key = df.attrs.get('content_hash')
+    if key is not None and _loaded_frames.get(id(df)) is df:
+        return key
+    return f"frame:{int(pd.util.hash_pandas_object(df, index=False).sum()) & (2 ** 64 - 1):x}"
+
+
+def long_spend(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (source row, category) with a non-zero amount: Category,
+    Supplier Type ('None' when missing), Supplier Name, Amount. Replaces a melt
+    over all four amount columns - rows without spend never materialize.
+    """
+    amounts = _amounts(df)
+    rows, cols = np.nonzero(_spend_mask(amounts))
+    supplier_type = df['Supplier Type'].astype('category') if 'Supplier Type' in df else pd.Series(
+        pd.Categorical([None] * len(df))
+    )
+    if 'None' not in supplier_type.cat.categories:
+        supplier_type = supplier_type.cat.add_categories('None')
+    long = pd.DataFrame({
+        'Category': pd.Categorical.from_codes(cols, categories=list(CATEGORY_COLS)),
+        'Supplier Type': supplier_type.iloc[rows].fillna('None').reset_index(drop=True),
+        'Amount': amounts[rows, cols]
+    })
+    if 'Supplier Name' in df:
+        long['Supplier Name'] = df['Supplier Name'].astype('category').iloc[rows].reset_index(drop=True)
+    return long
+
+
+def _summarize(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    long = long_spend(df)
+    has_names = 'Supplier Name' in long
+    keys = ['Category', 'Supplier Type'] + (['Supplier Name'] if has_names else [])
+    # The only pass over the spend rows: everything below rolls up this (small) table
+    grouped = long.groupby(keys, observed=True, sort=False)['Amount'].agg(['sum', 'size']).reset_index()
+    total = grouped['sum'].sum()
+
+    def rollup(by: List[str]) -> pd.DataFrame:
+        summary = grouped.groupby(by, observed=True).agg(
+            Total_Spend=('sum', 'sum'),
+            Line_Items=('size', 'sum'),
+            **({'Total_Suppliers': ('Supplier Name', 'nunique')} if has_names else {})
+        ).reset_index()
+        summary['Percent of Total'] = (summary['Total_Spend'] / total * 100 if total else 0.0)
+        return summary
+
+    by_category_type = rollup(['Category', 'Supplier Type'])
+    category_totals = by_category_type.groupby('Category', observed=True)['Total_Spend'].transform('sum')
+    by_category_type['Percent of Category'] = by_category_type['Total_Spend'] / category_totals * 100
+    summaries = {
+        'by_category_type': by_category_type,
+        'by_category': rollup(['Category']),
+        'by_supplier_type': rollup(['Supplier Type']),
+    }
+    for summary in summaries.values():
+        for col in ('Total_Spend', 'Percent of Total', 'Percent of Category'):
+            if col in summary:
+                summary[col] = summary[col].round(2)
+    return summaries
+
+
+_summary_memo: "OrderedDict[str, Dict[str, pd.DataFrame]]" = OrderedDict()
+_summary_lock = threading.Lock()
+
+
+def spend_summary(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Spend totals, line-item counts, distinct suppliers and shares, from one
+    groupby over the long-format spend, memoized per dataset (see dataset_key).
+
+    Returns:
+        Dict of DataFrames: by_category_type (Category x Supplier Type, with
+        Percent of Category), by_category, by_supplier_type. Each has
+        Total_Spend, Line_Items, Total_Suppliers (when the frame has
+        Supplier Name) and Percent of Total.
+    """
+    key = dataset_key(df)
+    with _summary_lock:
+        summaries = _summary_memo.get(key)
+        if summaries is not None:
+            _summary_memo.move_to_end(key)
+    if summaries is None:
+        summaries = _summarize(df)
+        with _summary_lock:
+            _summary_memo[key] = summaries
+            while len(_summary_memo) > SUMMARY_MEMO_MAX_ENTRIES:
+                _summary_memo.popitem(last=False)
+    return {name: summary.copy() for name, summary in summaries.items()}
+
+
+def summarize_by_supplier_type(df: pd.DataFrame) -> pd.DataFrame:
+    return spend_summary(df)['by_supplier_type']
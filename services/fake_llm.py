@@ -0,0 +1,326 @@
+"""
+Fake LLM Backend
+Local, scriptable stand-in for the OpenAI chat API with simulated latency and token rate
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Iterator, AsyncIterator, Callable, Union
+
+import httpx
+
+from .settings import Settings, get_settings
+
+FAKE_API_KEY = 'sk-fake-llm'
+DEFAULT_REPLY = "I'm a local test model. Ask me for a shipping quote with two full addresses and a weight."
+TOOL_REPLY_TEMPLATE = "Here are the results from {tool}:\n\n{output}"
+
+_TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+Arguments = Union[Dict[str, Any], Callable[[re.Match], Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    Scripted behaviour for user messages matching pattern (regex, searched
+    case-insensitively). Either reply with text - '{name}' placeholders are
+    filled from the pattern's named groups - or call tool with arguments (a dict
+    whose string values are filled the same way, or a function of the match).
+    A tool call is only made when the request offers that tool.
+    """
+
+    pattern: str
+    reply: Optional[str] = None
+    tool: Optional[str] = None
+    arguments: Arguments = field(default_factory=dict)
+
+    def match(self, text: str) -> Optional[re.Match]:
+        return re.search(self.pattern, text, re.IGNORECASE | re.DOTALL)
+
+    def tool_arguments(self, match: re.Match) -> Dict[str, Any]:
+        if callable(self.arguments):
+            return self.arguments(match)
+        groups = {key: value or '' for key, value in match.groupdict().items()}
+        return {
+            key: value.format(**groups) if isinstance(value, str) else value
+            for key, value in self.arguments.items()
+        }
+
+
+def _shipment_arguments(match: re.Match) -> Optional[Dict[str, Any]]:
+    # Imported here: the parser lives with the prefetcher, which loads the carrier client
+    from .prefetch import parse_shipment_request
+
+    shipment = parse_shipment_request(match.string)
+    if shipment is None:
+        return None
+    origin, destination = shipment['origin'], shipment['destination']
+    return {
+        'origin_street': origin['street'], 'origin_city': origin['city'],
+        'origin_state': origin['state'], 'origin_postal_code': origin['postal_code'],
+        'destination_street': destination['street'], 'destination_city': destination['city'],
+        'destination_state': destination['state'], 'destination_postal_code': destination['postal_code'],
+        'weight': shipment['weight'], **shipment['dimensions']
+    }
+
+
+# The shipping assistant's happy path: a complete shipment in the message quotes all services
+DEFAULT_RULES = (
+    Rule(pattern=r"\d+(?:\.\d+)?\s*-?\s*(?:lbs?|pounds?)\b", tool='get_fedex_all_services', arguments=_shipment_arguments),
+)
+
+
+def load_rules(path: str) -> List[Rule]:
+    """
+    Rules from a JSON file: a list of {"match", "reply"} or
+    {"match", "tool", "arguments"} objects, tried in order.
+    """
+    with open(path) as f:
+        return [
+            Rule(pattern=entry['match'], reply=entry.get('reply'), tool=entry.get('tool'),
+                 arguments=entry.get('arguments', {}))
+            for entry in json.load(f)
+        ]
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return " ".join(part.get('text', '') for part in content if isinstance(part, dict))
+    return content or ''
+
+
+class FakeLLM:
+    """
+    Deterministic chat model speaking the OpenAI chat-completions wire format.
+
+    A user message is answered by the first matching rule (then the default
+    rules, then default_reply); a tool result is answered by echoing it through
+    TOOL_REPLY_TEMPLATE, which ends the agent's tool loop. Timing follows
+    latency_seconds to the first token, then tokens_per_second (0: no delay).
+    """
+
+    def __init__(
+        self,
+        rules: Optional[List[Rule]] = None,
+        default_reply: str = DEFAULT_REPLY,
+        latency_seconds: float = 0.0,
+        tokens_per_second: float = 0.0,
+        include_default_rules: bool = True
+    ):
+        self.rules = list(rules or []) + (list(DEFAULT_RULES) if include_default_rules else [])
+        self.default_reply = default_reply
+        self.latency_seconds = latency_seconds
+        self.tokens_per_second = tokens_per_second
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    # Decisions
+
+    def respond(self, messages: List[Dict[str, Any]], tool_names: List[str]) -> Dict[str, Any]:
+        """
+        Returns:
+            {'content': str} or {'tool': name, 'arguments': dict}
+        """
+        with self._lock:
+            self.requests += 1
+        last = messages[-1] if messages else {'role': 'user', 'content': ''}
+        if last.get('role') in ('tool', 'function'):
+            return {'content': TOOL_REPLY_TEMPLATE.format(tool=last.get('name') or 'the tool', output=_text(last.get('content')))}
+
+        text = _text(last.get('content'))
+        for rule in self.rules:
+            match = rule.match(text)
+            if match is None:
+                continue
+            if rule.tool:
+                if rule.tool not in tool_names:
+                    continue
+                arguments = rule.tool_arguments(match)
+                if arguments is None:
+                    continue
+                return {'tool': rule.tool, 'arguments': arguments}
+            if rule.reply is not None:
+                return {'content': rule.reply.format(**{k: v or '' for k, v in match.groupdict().items()})}
+        return {'content': self.default_reply}
+
+    def tokens(self, text: str) -> List[str]:
+        return _TOKEN_PATTERN.findall(text)
+
+    def _delays(self, count: int) -> Iterator[float]:
+        """Seconds to wait before each of count tokens"""
+        per_token = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for index in range(count):
+            yield self.latency_seconds + per_token if index == 0 else per_token
+
+    def _stream_delays(self, chunk_count: int) -> List[float]:
+        # The closing finish_reason chunk follows the last token immediately
+        return list(self._delays(chunk_count - 1)) + [0.0]
+
+    # Wire format
+
+    @staticmethod
+    def _tool_names(body: Dict[str, Any]) -> List[str]:
+        names = [function['name'] for function in body.get('functions') or []]
+        names += [tool['function']['name'] for tool in body.get('tools') or [] if tool.get('type') == 'function']
+        return names
+
+    def _message(self, body: Dict[str, Any], decision: Dict[str, Any]) -> Dict[str, Any]:
+        if 'tool' not in decision:
+            return {'role': 'assistant', 'content': decision['content']}
+        arguments = json.dumps(decision['arguments'])
+        if body.get('tools'):
+            return {'role': 'assistant', 'content': None, 'tool_calls': [{
+                'id': f"call_{uuid.uuid4().hex[:12]}", 'type': 'function',
+                'function': {'name': decision['tool'], 'arguments': arguments}
+            }]}
+        return {'role': 'assistant', 'content': None, 'function_call': {'name': decision['tool'], 'arguments': arguments}}
+
+    @staticmethod
+    def _finish_reason(message: Dict[str, Any]) -> str:
+        if message.get('tool_calls'):
+            return 'tool_calls'
+        if message.get('function_call'):
+            return 'function_call'
+        return 'stop'
+
+    def completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Non-streaming chat completion (without the simulated wait)"""
+        message = self._message(body, self.respond(body.get('messages', []), self._tool_names(body)))
+        return {
+            'id': f"chatcmpl-{uuid.uuid4().hex[:12]}", 'object': 'chat.completion',
+            'created': int(time.time()), 'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'message': message, 'finish_reason': self._finish_reason(message)}],
+            'usage': self._usage(body, message)
+        }
+
+    def _usage(self, body: Dict[str, Any], message: Dict[str, Any]) -> Dict[str, int]:
+        completion_tokens = len(self.tokens(message.get('content') or json.dumps(message)))
+        prompt_tokens = sum(len(self.tokens(_text(m.get('content')))) for m in body.get('messages', []))
+        return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens}
+
+    def completion_delay(self, completion: Dict[str, Any]) -> float:
+        return sum(self._delays(completion['usage']['completion_tokens']))
+
+    def chunks(self, body: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming chat completion chunks, one per token (tool calls arrive in one
+        chunk), plus a usage chunk when stream_options.include_usage is set
+        """
+        message = self._message(body, self.respond(body.get('messages', []), self._tool_names(body)))
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        def chunk(delta, finish_reason=None):
+            return {
+                'id': chunk_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                'model': body.get('model', 'fake'),
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+            }
+
+        if message.get('content') is not None:
+            for index, token in enumerate(self.tokens(message['content'])):
+                yield chunk({'role': 'assistant', 'content': token} if index == 0 else {'content': token})
+        elif message.get('tool_calls'):
+            call = message['tool_calls'][0]
+            yield chunk({'role': 'assistant', 'content': None, 'tool_calls': [dict(call, index=0)]})
+        else:
+            yield chunk({'role': 'assistant', 'content': None, 'function_call': message['function_call']})
+        yield chunk({}, self._finish_reason(message))
+        if (body.get('stream_options') or {}).get('include_usage'):
+            yield dict(chunk({}), choices=[], usage=self._usage(body, message))
+
+    # HTTP
+
+    def _route(self, request: httpx.Request) -> Optional[httpx.Response]:
+        """Response for anything but a streaming completion (None for those)"""
+        path = request.url.path
+        if request.method == 'GET' and '/models/' in path:
+            model = path.rsplit('/', 1)[-1]
+            return httpx.Response(200, json={'id': model, 'object': 'model', 'created': 0, 'owned_by': 'fake-llm'})
+        if request.method == 'POST' and path.endswith('/chat/completions'):
+            return None
+        return httpx.Response(404, json={'error': {'message': f"Fake LLM has no {request.method} {path}", 'type': 'invalid_request_error'}})
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        response = self._route(request)
+        if response is not None:
+            return response
+        body = json.loads(request.read() or b'{}')
+        if not body.get('stream'):
+            completion = self.completion(body)
+            time.sleep(self.completion_delay(completion))
+            return httpx.Response(200, json=completion)
+
+        def events() -> Iterator[bytes]:
+            chunks = list(self.chunks(body))
+            for chunk, delay in zip(chunks, self._stream_delays(len(chunks))):
+                if delay:
+                    time.sleep(delay)
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+            yield b"data: [DONE]\n\n"
+
+        return httpx.Response(200, content=events(), headers={'content-type': 'text/event-stream'})
+
+    async def ahandle(self, request: httpx.Request) -> httpx.Response:
+        response = self._route(request)
+        if response is not None:
+            return response
+        body = json.loads(await request.aread() or b'{}')
+        if not body.get('stream'):
+            completion = self.completion(body)
+            await asyncio.sleep(self.completion_delay(completion))
+            return httpx.Response(200, json=completion)
+
+        async def events() -> AsyncIterator[bytes]:
+            chunks = list(self.chunks(body))
+            for chunk, delay in zip(chunks, self._stream_delays(len(chunks))):
+                if delay:
+                    await asyncio.sleep(delay)
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+            yield b"data: [DONE]\n\n"
+
+        return httpx.Response(200, content=events(), headers={'content-type': 'text/event-stream'})
+
+    def http_client(self) -> httpx.Client:
+        """httpx client for openai.OpenAI / ChatOpenAI(http_client=...)"""
+        return httpx.Client(transport=FakeLLMTransport(self))
+
+    def async_http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=AsyncFakeLLMTransport(self))
+
+
+class FakeLLMTransport(httpx.BaseTransport):
+    def __init__(self, llm: FakeLLM):
+        self.llm = llm
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self.llm.handle(request)
+
+
+class AsyncFakeLLMTransport(httpx.AsyncBaseTransport):
+    def __init__(self, llm: FakeLLM):
+        self.llm = llm
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.llm.ahandle(request)
+
+
+def fake_llm_from_settings(settings: Optional[Settings] = None) -> FakeLLM:
+    """Shared fake model configured by settings.openai (fake_* fields)"""
+    return _fake_llm((settings or get_settings()).openai)
+
+
+@lru_cache(maxsize=8)
+def _fake_llm(openai_settings) -> FakeLLM:
+    return FakeLLM(
+        rules=load_rules(openai_settings.fake_script) if openai_settings.fake_script else None,
+        latency_seconds=openai_settings.fake_latency_seconds,
+        tokens_per_second=openai_settings.fake_tokens_per_second
+    )
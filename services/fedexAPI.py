@@ -1,61 +1,45 @@
 import json
-import requests
-import os
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Dict, Any, Optional, List
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from .carrier_client import get_carrier_client
+from .quote_scheduler import current_priority, with_priority
+from .settings import Settings, get_settings
 
-# FedEx API Configuration
-FEDEX_SANDBOX_BASE_URL = "https://apis-sandbox.fedex.com"
-FEDEX_AUTH_URL = f"{FEDEX_SANDBOX_BASE_URL}/oauth/token"
-FEDEX_RATES_URL = f"{FEDEX_SANDBOX_BASE_URL}/rate/v1/rates/quotes"
+# FedEx services quoted by the direct form and the agent tools
+STANDARD_SERVICES = [
+    ('FEDEX_GROUND', '🚚 FedEx Ground'),
+    ('FEDEX_EXPRESS_SAVER', '⚡ FedEx Express Saver'),
+    ('FEDEX_2_DAY', '📦 FedEx 2Day')
+]
 
-def get_fedex_access_token() -> Optional[str]:
+# Shared pool for quoting several services of one shipment in parallel
+_service_executor = ThreadPoolExecutor(
+    max_workers=get_settings().fedex.service_workers, thread_name_prefix='fedex-rates'
+)
+
+def get_fedex_access_token(settings: Optional[Settings] = None) -> Optional[str]:
     """
-    Get FedEx API access token using client credentials from .env file.
+    Get a FedEx API access token (cached by the carrier client until it expires).
+    
+    Args:
+        settings: Settings to use (default: the process-wide settings)
     
     Returns:
         Access token string or None if authentication fails
     """
-    client_id = os.getenv('FEDEX_CLIENT_ID')
-    client_secret = os.getenv('FEDEX_CLIENT_SECRET')
-    
-    if not client_id or not client_secret:
-        print("Error: FedEx credentials not found in .env file")
-        return None
-    
-    auth_payload = {
-        'grant_type': 'client_credentials',
-        'client_id': client_id,
-        'client_secret': client_secret
-    }
-    
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    
-    try:
-        response = requests.post(FEDEX_AUTH_URL, data=auth_payload, headers=headers)
-        response.raise_for_status()
-        
-        auth_data = response.json()
-        return auth_data.get('access_token')
-        
-    except requests.exceptions.RequestException as e:
-        print(f"Error getting FedEx access token: {e}")
-        return None
+    return get_carrier_client(settings).tokens.get()
 
 def get_fedex_freight_rate(
     origin: Dict[str, str],
     destination: Dict[str, str], 
     shipment: Dict[str, Any],
-    options: Optional[Dict[str, Any]] = None
+    options: Optional[Dict[str, Any]] = None,
+    settings: Optional[Settings] = None
 ) -> Dict[str, Any]:
     """
-    Get FedEx freight rate quotes by calling the FedEx API sandbox directly.
+    Get FedEx freight rate quotes through the configured carrier backend.
     
     This function is designed to be used by AI agents with the OpenAI function schema.
     
@@ -63,8 +47,10 @@ def get_fedex_freight_rate(
         origin: Origin address with keys: city, state, postal_code, country (optional)
         destination: Destination address with keys: city, state, postal_code, country (optional)
         shipment: Shipment details with keys: weight, dimensions, service_type (optional), 
-                 pickup_type (optional), ship_date (optional)
+                 pickup_type (optional), ship_date (optional), packages (optional; several
+                 boxes quoted in one request, see packages.multi_package_shipment)
         options: Additional options with keys: rate_request_type, currency, include_transit_times
+        settings: Settings to use (default: the process-wide settings)
     
     Returns:
         Dict containing the FedEx rate quote response
@@ -93,24 +79,11 @@ def get_fedex_freight_rate(
         )
     """
     
-    # Set defaults
+    # Defaults are resolved without touching the caller's dicts so the same
+    # inputs can be shared between concurrent quote requests
     if options is None:
         options = {}
     
-    # Default values
-    origin.setdefault('country', 'US')
-    destination.setdefault('country', 'US')
-    shipment.setdefault('service_type', 'FEDEX_GROUND')
-    shipment.setdefault('pickup_type', 'DROPOFF_AT_FEDEX_LOCATION')
-    
-    if 'ship_date' not in shipment:
-        # Default to tomorrow
-        shipment['ship_date'] = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
-    
-    options.setdefault('rate_request_type', ['ACCOUNT'])
-    options.setdefault('currency', 'USD')
-    options.setdefault('include_transit_times', True)
-    
     # Validate required fields
     required_origin_fields = ['city', 'state', 'postal_code']
     required_destination_fields = ['city', 'state', 'postal_code'] 
@@ -140,125 +113,71 @@ def get_fedex_freight_rate(
                 'timestamp': datetime.utcnow().isoformat()
             }
     
-    # Validate dimensions
-    if 'dimensions' in shipment:
-        required_dim_fields = ['length', 'width', 'height']
+    # Validate dimensions (of every box for multi-piece shipments)
+    required_dim_fields = ['length', 'width', 'height']
+    for package in shipment.get('packages') or [shipment]:
         for field in required_dim_fields:
-            if field not in shipment['dimensions']:
+            if field not in package.get('dimensions', {}):
                 return {
                     'success': False,
                     'error': f'Missing required dimension field: {field}',
                     'timestamp': datetime.utcnow().isoformat()
                 }
     
-    # Get access token
-    access_token = get_fedex_access_token()
-    if not access_token:
-        return {
-            'success': False,
-            'error': 'Failed to authenticate with FedEx API',
-            'timestamp': datetime.utcnow().isoformat()
-        }
-    
-    # For sandbox testing, use FedEx provided test account numbers
-    # The account number from .env might be for production
-    sandbox_account = "740561073"  # FedEx sandbox test account
-    account_number = sandbox_account  # Use sandbox account for testing
+    # Pooling, token caching, retries, the quote cache and the stale
+    # last-known-price fallback are handled by the carrier client
+    return get_carrier_client(settings).quote(origin, destination, shipment, options)
+
+def get_fedex_service_rates(
+    origin: Dict[str, str],
+    destination: Dict[str, str],
+    shipment: Dict[str, Any],
+    service_types: Optional[List[str]] = None,
+    settings: Optional[Settings] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Get FedEx rate quotes for several services of the same shipment concurrently.
     
-    # Prepare the FedEx API payload
-    fedex_payload = {
-        "accountNumber": {
-            "value": account_number
-        },
-        "rateRequestControlParameters": {
-            "returnTransitTimes": options.get('include_transit_times', True),
-            "servicesNeededOnRateFailure": True,
-            "rateSortOrder": "SERVICENAMETRADITIONAL"
-        },
-        "requestedShipment": {
-            "shipper": {
-                "address": {
-                    "streetLines": ["1234 Test Street"],
-                    "city": origin.get('city', 'Memphis'),
-                    "stateOrProvinceCode": origin.get('state', 'TN'),
-                    "postalCode": origin['postal_code'],
-                    "countryCode": origin.get('country', 'US'),
-                    "residential": False
-                }
-            },
-            "recipient": {
-                "address": {
-                    "streetLines": ["5678 Test Avenue"],
-                    "city": destination.get('city', 'Dallas'),
-                    "stateOrProvinceCode": destination.get('state', 'TX'),
-                    "postalCode": destination['postal_code'],
-                    "countryCode": destination.get('country', 'US'),
-                    "residential": False
-                }
-            },
-            "shipDateStamp": shipment['ship_date'],
-            "rateRequestType": ["ACCOUNT", "LIST"],
-            "serviceType": shipment.get('service_type', 'FEDEX_GROUND'),
-            "packagingType": "YOUR_PACKAGING",
-            "pickupType": shipment.get('pickup_type', 'DROPOFF_AT_FEDEX_LOCATION'),
-            "requestedPackageLineItems": [
-                {
-                    "groupPackageCount": 1,
-                    "weight": {
-                        "units": "LB",
-                        "value": shipment['weight']
-                    },
-                    "dimensions": {
-                        "length": shipment['dimensions']['length'],
-                        "width": shipment['dimensions']['width'],
-                        "height": shipment['dimensions']['height'],
-                        "units": "IN"
-                    }
-                }
-            ]
-        }
-    }
+    Args:
+        origin: Origin address (see get_fedex_freight_rate)
+        destination: Destination address (see get_fedex_freight_rate)
+        shipment: Shipment details; service_type is overridden per service
+        service_types: FedEx service codes to quote (default: STANDARD_SERVICES)
+        settings: Settings to use (default: the process-wide settings)
     
-    # Set up headers
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json',
-        'X-locale': 'en_US'
+    Returns:
+        Dict mapping service code to its get_fedex_freight_rate result
+    """
+    if service_types is None:
+        service_types = [service_code for service_code, _ in STANDARD_SERVICES]
+    
+    # Pool threads don't inherit the caller's priority class, so pass it along
+    priority = current_priority()
+    futures = {
+        service_code: _service_executor.submit(
+            with_priority,
+            priority,
+            get_fedex_freight_rate,
+            origin,
+            destination,
+            dict(shipment, service_type=service_code),
+            None,
+            settings
+        )
+        for service_code in service_types
     }
     
-    try:
-        # Make the API call
-        response = requests.post(FEDEX_RATES_URL, json=fedex_payload, headers=headers)
-        
-        # Handle response
-        if response.status_code == 200:
-            result = response.json()
-            return {
-                'success': True,
-                'data': result,
-                'timestamp': datetime.utcnow().isoformat()
-            }
-        else:
-            error_data = response.json() if response.content else {}
-            return {
+    results = {}
+    for service_code, future in futures.items():
+        try:
+            results[service_code] = future.result()
+        except Exception as e:
+            results[service_code] = {
                 'success': False,
-                'error': f'FedEx API error: {response.status_code}',
-                'error_details': error_data,
+                'error': f'Unexpected error: {str(e)}',
                 'timestamp': datetime.utcnow().isoformat()
             }
-            
-    except requests.exceptions.RequestException as e:
-        return {
-            'success': False,
-            'error': f'Failed to call FedEx API: {str(e)}',
-            'timestamp': datetime.utcnow().isoformat()
-        }
-    except Exception as e:
-        return {
-            'success': False,
-            'error': f'Unexpected error: {str(e)}',
-            'timestamp': datetime.utcnow().isoformat()
-        }
+    return results
 
 # Example usage for testing
 if __name__ == "__main__":
@@ -0,0 +1,326 @@
+"""
+FedEx Rate Request Payload Templates
+Precompiles the invariant parts of FedEx rate request bodies once per account/config
+"""
+
+import json
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Tuple
+
+from .packages import package_groups
+
+# Placeholder strings marking the per-shipment fields inside a template skeleton
+_SLOT_PREFIX = "__fedex_slot_"
+_SLOT_PATTERN = re.compile(r'"__fedex_slot_(\w+?)__"')
+
+# Compact separators keep the pre-serialized request bodies small
+_JSON_SEPARATORS = (",", ":")
+
+DEFAULT_SERVICE_TYPE = "FEDEX_GROUND"
+DEFAULT_PICKUP_TYPE = "DROPOFF_AT_FEDEX_LOCATION"
+DEFAULT_PACKAGING_TYPE = "YOUR_PACKAGING"
+
+
+def _slot(name: str) -> str:
+    return f"{_SLOT_PREFIX}{name}__"
+
+
+def default_ship_date() -> str:
+    """Default ship date used by every rate request (tomorrow)"""
+    return (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def postal_code(address: Dict[str, Any]) -> str:
+    # The form path uses 'postalCode', the agent tools use 'postal_code'
+    return address.get('postal_code', address.get('postalCode', ''))
+
+
+def _v1_skeleton(account_number: str, include_transit_times: bool) -> Dict[str, Any]:
+    return {
+        "accountNumber": {
+            "value": account_number
+        },
+        "rateRequestControlParameters": {
+            "returnTransitTimes": include_transit_times,
+            "servicesNeededOnRateFailure": True,
+            "rateSortOrder": "SERVICENAMETRADITIONAL"
+        },
+        "requestedShipment": {
+            "shipper": {
+                "address": {
+                    "streetLines": ["1234 Test Street"],
+                    "city": _slot("origin_city"),
+                    "stateOrProvinceCode": _slot("origin_state"),
+                    "postalCode": _slot("origin_postal_code"),
+                    "countryCode": _slot("origin_country"),
+                    "residential": False
+                }
+            },
+            "recipient": {
+                "address": {
+                    "streetLines": ["5678 Test Avenue"],
+                    "city": _slot("destination_city"),
+                    "stateOrProvinceCode": _slot("destination_state"),
+                    "postalCode": _slot("destination_postal_code"),
+                    "countryCode": _slot("destination_country"),
+                    "residential": False
+                }
+            },
+            "shipDateStamp": _slot("ship_date"),
+            "rateRequestType": ["ACCOUNT", "LIST"],
+            "serviceType": _slot("service_type"),
+            "packagingType": DEFAULT_PACKAGING_TYPE,
+            "pickupType": _slot("pickup_type"),
+            "requestedPackageLineItems": _slot("package_line_items")
+        }
+    }
+
+
+def _v2_skeleton(account_number: str, client_id: Optional[str], packaging_type: str) -> Dict[str, Any]:
+    account = {
+        "key": client_id,
+        "value": account_number
+    }
+    return {
+        "rateRequestControlParameters": {
+            "rateSortOrder": "COMMITASCENDING",
+            "returnTransitTimes": True,
+            "servicesNeededOnRateFailure": False
+        },
+        "requestedShipment": {
+            "shipper": {
+                "accountNumber": dict(account),
+                "address": {
+                    "streetLines": _slot("origin_street_lines"),
+                    "city": _slot("origin_city"),
+                    "stateOrProvinceCode": _slot("origin_state"),
+                    "postalCode": _slot("origin_postal_code"),
+                    "countryCode": "US",
+                    "residential": False
+                }
+            },
+            "recipients": [{
+                "address": {
+                    "streetLines": _slot("destination_street_lines"),
+                    "city": _slot("destination_city"),
+                    "stateOrProvinceCode": _slot("destination_state"),
+                    "postalCode": _slot("destination_postal_code"),
+                    "countryCode": "US",
+                    "residential": False
+                }
+            }],
+            "shipTimestamp": _slot("ship_date"),
+            "pickupType": _slot("pickup_type"),
+            "packagingType": packaging_type,
+            "shippingChargesPayment": {
+                "payor": {
+                    "responsibleParty": {
+                        "accountNumber": dict(account),
+                        "address": {"countryCode": "US"}
+                    }
+                }
+            },
+            "requestedPackageLineItems": _slot("package_line_items"),
+            "preferredCurrency": "USD"
+        },
+        "carrierCodes": ["FDXG", "FDXE"],
+        "returnLocalizedDateTime": True,
+        "webSiteCountryCode": "US"
+    }
+
+
+def _compile(skeleton: Dict[str, Any]) -> Tuple[List[bytes], List[str]]:
+    """Serialize a skeleton once and split it into static byte segments around its slots"""
+    encoded = json.dumps(skeleton, separators=_JSON_SEPARATORS)
+    segments = []
+    slots = []
+    position = 0
+    for match in _SLOT_PATTERN.finditer(encoded):
+        segments.append(encoded[position:match.start()].encode('utf-8'))
+        slots.append(match.group(1))
+        position = match.end()
+    segments.append(encoded[position:].encode('utf-8'))
+    return segments, slots
+
+
+def _fill(node: Any, values: Dict[str, Any]) -> Any:
+    """Copy a skeleton, replacing slot placeholders with per-shipment values"""
+    if isinstance(node, dict):
+        return {key: _fill(value, values) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_fill(value, values) for value in node]
+    if isinstance(node, str) and node.startswith(_SLOT_PREFIX):
+        return values[node[len(_SLOT_PREFIX):-2]]
+    return node
+
+
+class FedExPayloadTemplate:
+    """
+    Rate request body for one FedEx API version, account and config.
+
+    The invariant parts of the payload are built and serialized once; each call
+    only fills in the per-shipment fields. Caller dictionaries are never
+    modified, so the same origin/destination/shipment inputs can be shared
+    across threads.
+    """
+
+    def __init__(
+        self,
+        api_version: str,
+        account_number: str,
+        client_id: Optional[str] = None,
+        include_transit_times: bool = True,
+        packaging_type: str = DEFAULT_PACKAGING_TYPE
+    ):
+        """
+        Args:
+            api_version: 'v1' (sandbox rate API) or 'v2' (production rate API)
+            account_number: FedEx account number billed for the quote
+            client_id: FedEx API key, sent alongside the account number by v2
+            include_transit_times: Ask FedEx to return transit times (v1)
+            packaging_type: FedEx packaging type (v2)
+        """
+        if api_version == 'v1':
+            skeleton = _v1_skeleton(account_number, include_transit_times)
+        elif api_version == 'v2':
+            skeleton = _v2_skeleton(account_number, client_id, packaging_type)
+        else:
+            raise ValueError(f"Unsupported FedEx rate API version: {api_version}")
+
+        self.api_version = api_version
+        self.packaging_type = packaging_type
+        self._skeleton = skeleton
+        self._segments, self._slots = _compile(skeleton)
+
+    def _package_line_items(self, shipment: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # One line item per distinct box; identical boxes share an item through groupPackageCount
+        items = []
+        for group in package_groups(shipment):
+            dimensions = group['dimensions']
+            weight = {
+                "units": "LB",
+                "value": group['weight']
+            }
+            box = {
+                "length": dimensions['length'],
+                "width": dimensions['width'],
+                "height": dimensions['height'],
+                "units": "IN"
+            }
+            if self.api_version == 'v2':
+                items.append({
+                    "groupPackageCount": group['count'],
+                    "physicalPackaging": self.packaging_type,
+                    "insuredValue": {"currency": "USD", "amount": 0},
+                    "weight": weight,
+                    "dimensions": box
+                })
+            else:
+                items.append({
+                    "groupPackageCount": group['count'],
+                    "weight": weight,
+                    "dimensions": box
+                })
+        return items
+
+    def slot_values(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        shipment: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Resolve the per-shipment fields for a request, applying defaults.
+
+        FedEx rates by postal code; a missing city or state is sent empty
+        rather than made up.
+
+        Args:
+            origin: Origin address with keys: city, state, postal_code (or postalCode),
+                    country (optional), street/apt (optional, v2)
+            destination: Destination address with the same keys as origin
+            shipment: Shipment details with keys: weight, dimensions, service_type (optional),
+                      pickup_type (optional), ship_date (optional), packages (optional,
+                      see packages.multi_package_shipment)
+
+        Returns:
+            Dict mapping slot name to value
+        """
+        return {
+            "origin_city": origin.get('city', ''),
+            "origin_state": origin.get('state', ''),
+            "origin_postal_code": postal_code(origin),
+            "origin_country": origin.get('country', 'US'),
+            "origin_street_lines": [origin.get('street', ''), origin.get('apt', '')],
+            "destination_city": destination.get('city', ''),
+            "destination_state": destination.get('state', ''),
+            "destination_postal_code": postal_code(destination),
+            "destination_country": destination.get('country', 'US'),
+            "destination_street_lines": [destination.get('street', ''), destination.get('apt', '')],
+            "ship_date": shipment.get('ship_date') or default_ship_date(),
+            "service_type": shipment.get('service_type', DEFAULT_SERVICE_TYPE),
+            "pickup_type": shipment.get('pickup_type', DEFAULT_PICKUP_TYPE),
+            "package_line_items": self._package_line_items(shipment)
+        }
+
+    def build(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        shipment: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Build the request payload as a new dict.
+
+        Returns:
+            FedEx rate request payload
+        """
+        return _fill(self._skeleton, self.slot_values(origin, destination, shipment))
+
+    def build_bytes(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        shipment: Dict[str, Any]
+    ) -> bytes:
+        """
+        Build the request payload pre-serialized as compact JSON.
+
+        Only the per-shipment fields are encoded; the static segments were
+        serialized when the template was compiled.
+
+        Returns:
+            UTF-8 encoded JSON request body
+        """
+        values = self.slot_values(origin, destination, shipment)
+        segments = self._segments
+        parts = [segments[0]]
+        for index, slot in enumerate(self._slots, 1):
+            parts.append(json.dumps(values[slot], separators=_JSON_SEPARATORS).encode('utf-8'))
+            parts.append(segments[index])
+        return b"".join(parts)
+
+
+@lru_cache(maxsize=32)
+def get_payload_template(
+    api_version: str,
+    account_number: str,
+    client_id: Optional[str] = None,
+    include_transit_times: bool = True,
+    packaging_type: str = DEFAULT_PACKAGING_TYPE
+) -> FedExPayloadTemplate:
+    """
+    Get the shared payload template for an API version, account and config.
+
+    Templates are immutable after construction, so one instance is compiled per
+    distinct configuration and reused for every request.
+    """
+    return FedExPayloadTemplate(
+        api_version,
+        account_number,
+        client_id=client_id,
+        include_transit_times=include_transit_times,
+        packaging_type=packaging_type
+    )
@@ -4,11 +4,26 @@ Allows the AI agent to call FedEx API directly for shipping quotes
 """
 
 from langchain.tools import BaseTool
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from pydantic import BaseModel, Field
 import json
 
-from .fedexAPI import get_fedex_freight_rate
+from .consolidation import compare_consolidation, PER_BOX, MULTI_PIECE, CONSOLIDATED
+from .fedexAPI import get_fedex_freight_rate, get_fedex_service_rates, STANDARD_SERVICES
+from .packages import describe_packages, is_multi_piece, multi_package_shipment
+from .prefetch import quote_prefetcher
+from .rate_estimator import estimate_fedex_rates
+from .rate_shopping import rate_shopper, DEFAULT_TOP_N
+from .ship_optimizer import ship_optimizer
+
+
+class PackageInput(BaseModel):
+    """One kind of box in a multi-box order"""
+    weight: float = Field(description="Box weight in pounds")
+    length: float = Field(description="Box length in inches", default=12.0)
+    width: float = Field(description="Box width in inches", default=12.0)
+    height: float = Field(description="Box height in inches", default=12.0)
+    count: int = Field(description="Number of identical boxes like this", default=1)
 
 
 class FedExShippingInput(BaseModel):
@@ -26,6 +41,83 @@ class FedExShippingInput(BaseModel):
     width: float = Field(description="Package width in inches", default=12.0)
     height: float = Field(description="Package height in inches", default=12.0)
     service_type: str = Field(description="FedEx service type", default="FEDEX_GROUND")
+    package_count: int = Field(description="Number of identical boxes with the weight and size above", default=1)
+    additional_packages: Optional[List[PackageInput]] = Field(
+        description="Other boxes in the same order that differ from the one above", default=None
+    )
+
+
+def _tool_shipment(
+    weight: float,
+    length: float,
+    width: float,
+    height: float,
+    package_count: int = 1,
+    additional_packages: Optional[List[Any]] = None,
+    **fields: Any
+) -> Dict[str, Any]:
+    """Shipment dict from tool arguments; several boxes become one multi-piece shipment"""
+    packages = [{'weight': weight, 'dimensions': {'length': length, 'width': width, 'height': height},
+                 'count': max(int(package_count or 1), 1)}]
+    for package in additional_packages or []:
+        package = package.model_dump() if hasattr(package, 'model_dump') else dict(package)
+        packages.append({
+            'weight': package['weight'],
+            'dimensions': {key: package.get(key, 12.0) for key in ('length', 'width', 'height')},
+            'count': package.get('count', 1)
+        })
+    if len(packages) == 1 and packages[0]['count'] == 1:
+        return dict(fields, weight=weight, dimensions=packages[0]['dimensions'])
+    return multi_package_shipment(packages, **fields)
+
+
+class FedExEstimateInput(BaseModel):
+    """Input schema for the offline FedEx rate estimate tool"""
+    origin_postal_code: str = Field(description="Origin postal/zip code")
+    destination_postal_code: str = Field(description="Destination postal/zip code")
+    weight: float = Field(description="Package weight in pounds")
+    length: float = Field(description="Package length in inches", default=12.0)
+    width: float = Field(description="Package width in inches", default=12.0)
+    height: float = Field(description="Package height in inches", default=12.0)
+
+
+class RateShoppingInput(BaseModel):
+    """Input schema for the multi-carrier rate shopping tool"""
+    origin_street: str = Field(description="Origin street address (e.g., '913 Paseo Camarillo')")
+    origin_city: str = Field(description="Origin city name")
+    origin_state: str = Field(description="Origin state code (e.g., 'CA', 'NY')")
+    origin_postal_code: str = Field(description="Origin postal/zip code")
+    destination_street: str = Field(description="Destination street address (e.g., '1 Harpst St')")
+    destination_city: str = Field(description="Destination city name")
+    destination_state: str = Field(description="Destination state code (e.g., 'GA', 'FL')")
+    destination_postal_code: str = Field(description="Destination postal/zip code")
+    weight: float = Field(description="Package weight in pounds")
+    length: float = Field(description="Package length in inches", default=12.0)
+    width: float = Field(description="Package width in inches", default=12.0)
+    height: float = Field(description="Package height in inches", default=12.0)
+    top_n: int = Field(description="How many of the cheapest options to return", default=DEFAULT_TOP_N)
+
+
+class ShipDateOptimizerInput(BaseModel):
+    """Input schema for the ship date and service optimizer tool"""
+    origin_street: str = Field(description="Origin street address (e.g., '913 Paseo Camarillo')")
+    origin_city: str = Field(description="Origin city name")
+    origin_state: str = Field(description="Origin state code (e.g., 'CA', 'NY')")
+    origin_postal_code: str = Field(description="Origin postal/zip code")
+    destination_street: str = Field(description="Destination street address (e.g., '1 Harpst St')")
+    destination_city: str = Field(description="Destination city name")
+    destination_state: str = Field(description="Destination state code (e.g., 'GA', 'FL')")
+    destination_postal_code: str = Field(description="Destination postal/zip code")
+    weight: float = Field(description="Package weight in pounds")
+    length: float = Field(description="Package length in inches", default=12.0)
+    width: float = Field(description="Package width in inches", default=12.0)
+    height: float = Field(description="Package height in inches", default=12.0)
+    deliver_by: Optional[str] = Field(
+        description="Latest delivery date: YYYY-MM-DD or a weekday name like 'friday'", default=None
+    )
+    earliest_ship_date: Optional[str] = Field(
+        description="First date the package can ship: YYYY-MM-DD or a weekday name (default tomorrow)", default=None
+    )
 
 
 class FedExShippingTool(BaseTool):
@@ -58,7 +150,9 @@ class FedExShippingTool(BaseTool):
         length: float = 12.0,
         width: float = 12.0,
         height: float = 12.0,
-        service_type: str = "FEDEX_GROUND"
+        service_type: str = "FEDEX_GROUND",
+        package_count: int = 1,
+        additional_packages: Optional[List[Any]] = None
     ) -> str:
         """Execute the FedEx API call"""
         
@@ -78,18 +172,19 @@ class FedExShippingTool(BaseTool):
                 'postal_code': destination_postal_code  # Fixed: use postal_code not postalCode
             }
             
-            shipment = {
-                'weight': weight,
-                'dimensions': {
-                    'length': length,
-                    'width': width,
-                    'height': height
-                },
-                'service_type': service_type
-            }
+            # Several boxes go to FedEx as one multi-piece request
+            shipment = _tool_shipment(
+                weight, length, width, height, package_count, additional_packages, service_type=service_type
+            )
             
-            # Call the FedEx API
-            result = get_fedex_freight_rate(origin, destination, shipment)
+            # Use a quote prefetched for this shipment if one is in flight, otherwise call the FedEx API
+            prefetched = None
+            if not is_multi_piece(shipment):
+                prefetched = quote_prefetcher.lookup(origin, destination, weight, shipment['dimensions'])
+            service_results = prefetched.result() if prefetched is not None else {}
+            result = service_results.get(service_type)
+            if result is None:
+                result = get_fedex_freight_rate(origin, destination, shipment)
             
             if result['success']:
                 # Extract and format the response
@@ -123,7 +218,9 @@ class FedExShippingTool(BaseTool):
                         response = f"FedEx Shipping Quote Results:\n"
                         response += f"From: {origin_street}, {origin_city}, {origin_state} {origin_postal_code}\n"
                         response += f"To: {destination_street}, {destination_city}, {destination_state} {destination_postal_code}\n"
-                        response += f"Package: {weight} lbs, {length}x{width}x{height} inches\n\n"
+                        response += f"Package: {describe_packages(shipment)}\n\n"
+                        if result.get('stale'):
+                            response += f"NOTE: FedEx is unavailable, showing the last known price from {result['last_known_at']}\n\n"
                         
                         for result in formatted_results:
                             response += f"• {result['service']}: {result['cost']}"
@@ -176,17 +273,12 @@ class FedExMultiServiceTool(BaseTool):
         length: float = 12.0,
         width: float = 12.0,
         height: float = 12.0,
-        service_type: str = "FEDEX_GROUND"  # This parameter is ignored for multi-service
+        service_type: str = "FEDEX_GROUND",  # This parameter is ignored for multi-service
+        package_count: int = 1,
+        additional_packages: Optional[List[Any]] = None
     ) -> str:
         """Get quotes for all FedEx services"""
         
-        # List of reliable FedEx services (removed problematic overnight services)
-        services = [
-            ('FEDEX_GROUND', '🚚 FedEx Ground'),
-            ('FEDEX_EXPRESS_SAVER', '⚡ FedEx Express Saver'),
-            ('FEDEX_2_DAY', '📦 FedEx 2Day')
-        ]
-        
         origin = {
             'street': origin_street,
             'city': origin_city,
@@ -203,20 +295,24 @@ class FedExMultiServiceTool(BaseTool):
         
         all_results = []
         errors = []
+        stale_services = []
         
-        for service_code, service_name in services:
+        # Quote all services at once, joining a prefetch already started for this shipment
+        # (prefetches are single-box, so multi-piece orders are quoted directly)
+        dimensions = {'length': length, 'width': width, 'height': height}
+        try:
+            shipment = _tool_shipment(weight, length, width, height, package_count, additional_packages)
+            if is_multi_piece(shipment):
+                service_results = get_fedex_service_rates(origin, destination, shipment)
+            else:
+                service_results = quote_prefetcher.fetch(origin, destination, weight, dimensions)
+        except Exception as e:
+            return f"Unable to get FedEx quotes. Errors: {str(e)}"
+        
+        # Reliable FedEx services (problematic overnight services removed)
+        for service_code, service_name in STANDARD_SERVICES:
             try:
-                shipment = {
-                    'weight': weight,
-                    'dimensions': {
-                        'length': length,
-                        'width': width,
-                        'height': height
-                    },
-                    'service_type': service_code
-                }
-                
-                result = get_fedex_freight_rate(origin, destination, shipment)
+                result = service_results[service_code]
                 
                 if result['success']:
                     if 'output' in result['data'] and 'rateReplyDetails' in result['data']['output']:
@@ -254,6 +350,9 @@ class FedExMultiServiceTool(BaseTool):
                                     'service_code': service_code
                                 })
                                 break  # Only take the first rate for each service
+                    
+                    if result.get('stale'):
+                        stale_services.append(f"{service_name} (from {result['last_known_at']})")
                 else:
                     errors.append(f"{service_name}: {result.get('error', 'Unknown error')}")
                     
@@ -268,7 +367,7 @@ class FedExMultiServiceTool(BaseTool):
             response = f"FedEx Shipping Quote Comparison:\n"
             response += f"From: {origin_street}, {origin_city}, {origin_state} {origin_postal_code}\n"
             response += f"To: {destination_street}, {destination_city}, {destination_state} {destination_postal_code}\n"
-            response += f"Package: {weight} lbs, {length}x{width}x{height} inches\n\n"
+            response += f"Package: {describe_packages(shipment)}\n\n"
             response += "Available Services (sorted by price):\n"
             
             for i, result in enumerate(all_results, 1):
@@ -292,6 +391,9 @@ class FedExMultiServiceTool(BaseTool):
             if errors:
                 response += f"\n\n Some services unavailable: {', '.join(errors)}"
             
+            if stale_services:
+                response += f"\n\n FedEx unavailable, last known prices shown for: {', '.join(stale_services)}"
+            
             return response
         else:
             return f"Unable to get FedEx quotes. Errors: {', '.join(errors) if errors else 'No rates returned'}"
@@ -301,6 +403,324 @@ class FedExMultiServiceTool(BaseTool):
         return self._run(*args, **kwargs)
 
 
+class FedExRateEstimateTool(BaseTool):
+    """LangChain tool for instant offline FedEx rate estimates"""
+    
+    name: str = "estimate_fedex_rate"
+    description: str = """
+    Get an INSTANT rough FedEx price estimate from recently quoted FedEx rates, without calling the 
+    FedEx API. Use this only when users ask roughly how much something costs or want a ballpark 
+    figure; it only needs the origin and destination zip codes plus package weight and dimensions.
+    Always present the result as an estimate with its range, and use get_fedex_all_services for a 
+    real quote once complete addresses are known.
+    """
+    args_schema: type[BaseModel] = FedExEstimateInput
+    
+    def _run(
+        self,
+        origin_postal_code: str,
+        destination_postal_code: str,
+        weight: float,
+        length: float = 12.0,
+        width: float = 12.0,
+        height: float = 12.0
+    ) -> str:
+        """Look up offline estimates for the standard FedEx services"""
+        
+        try:
+            dimensions = {'length': length, 'width': width, 'height': height}
+            estimates = estimate_fedex_rates(
+                origin_postal_code, destination_postal_code, weight, dimensions
+            )['estimates']
+            
+            if not estimates:
+                return ("No recent FedEx quotes to estimate from yet. "
+                        "Ask for complete addresses and use get_fedex_all_services for a live quote.")
+            
+            response = f"FedEx Rate Estimates (offline, not a live quote):\n"
+            response += f"Lane: {origin_postal_code} -> {destination_postal_code} (zone {estimates[0]['zone']})\n"
+            response += f"Package: {weight} lbs, {length}x{width}x{height} inches "
+            response += f"(billable {estimates[0]['billable_weight']:.0f} lbs)\n\n"
+            
+            for estimate in sorted(estimates, key=lambda x: x['estimate']):
+                response += f"• {estimate['service_type']}: ~${estimate['estimate']:.2f} "
+                response += f"(likely ${estimate['low']:.2f} - ${estimate['high']:.2f}, "
+                response += f"from {estimate['samples']} recent quotes)\n"
+            
+            return response
+            
+        except Exception as e:
+            return f"Error estimating FedEx rates: {str(e)}. Use get_fedex_all_services for a live quote."
+    
+    async def _arun(self, *args, **kwargs) -> str:
+        """Async version - just call the sync version"""
+        return self._run(*args, **kwargs)
+
+
+class RateShoppingTool(BaseTool):
+    """LangChain tool for comparing rates across carriers"""
+    
+    name: str = "shop_carrier_rates"
+    description: str = """
+    Compare shipping rates across ALL carriers at once (FedEx plus other carriers) and return the 
+    top options by price, along with the cheapest and the fastest option. Use this when users ask 
+    for the best or cheapest way to ship regardless of carrier, or want to compare carriers. 
+    Requires COMPLETE addresses including street addresses, city, state, and postal code for both 
+    origin and destination, plus package details (weight, dimensions). Set top_n when users ask 
+    for a specific number of options.
+    
+    IMPORTANT: Always ask for complete street addresses, not just city/state/zip!
+    """
+    args_schema: type[BaseModel] = RateShoppingInput
+    
+    def _run(
+        self,
+        origin_street: str,
+        origin_city: str,
+        origin_state: str,
+        origin_postal_code: str,
+        destination_street: str,
+        destination_city: str,
+        destination_state: str,
+        destination_postal_code: str,
+        weight: float,
+        length: float = 12.0,
+        width: float = 12.0,
+        height: float = 12.0,
+        top_n: int = DEFAULT_TOP_N
+    ) -> str:
+        """Shop all carriers and list the cheapest options"""
+        
+        origin = {'street': origin_street, 'city': origin_city, 'state': origin_state, 'postal_code': origin_postal_code}
+        destination = {
+            'street': destination_street,
+            'city': destination_city,
+            'state': destination_state,
+            'postal_code': destination_postal_code
+        }
+        dimensions = {'length': length, 'width': width, 'height': height}
+        
+        try:
+            result = rate_shopper.shop(origin, destination, weight, dimensions, top_n=max(int(top_n), 1))
+        except Exception as e:
+            return f"Unable to compare carrier rates. Errors: {str(e)}"
+        
+        if not result['options']:
+            errors = ', '.join(result['errors']) or 'No carrier responded in time'
+            return f"Unable to compare carrier rates. Errors: {errors}"
+        
+        response = f"Carrier Rate Comparison:\n"
+        response += f"From: {origin_street}, {origin_city}, {origin_state} {origin_postal_code}\n"
+        response += f"To: {destination_street}, {destination_city}, {destination_state} {destination_postal_code}\n"
+        response += f"Package: {weight} lbs, {length}x{width}x{height} inches\n\n"
+        response += f"Top {len(result['options'])} options (sorted by price):\n"
+        
+        for i, option in enumerate(result['options'], 1):
+            response += f"{i}. {option['carrier']} {option['service_name']}: ${option['amount']:.2f} {option['currency']}"
+            if option['transit_days'] is not None:
+                response += f" ({option['transit_time']})"
+            if option['source'] == 'simulated':
+                response += " [simulated]"
+            response += "\n"
+        
+        best_price, best_transit = result['best_price'], result['best_transit']
+        response += f"\n Cheapest: {best_price['carrier']} {best_price['service_name']} - ${best_price['amount']:.2f}"
+        if best_transit:
+            response += (f"\n Fastest: {best_transit['carrier']} {best_transit['service_name']} - "
+                         f"${best_transit['amount']:.2f} ({best_transit['transit_time']})")
+        
+        if result['timed_out']:
+            response += f"\n\n No reply in time from: {', '.join(result['pending'])}"
+        if result['errors']:
+            response += f"\n\n Some services unavailable: {', '.join(result['errors'])}"
+        if any(option['source'] == 'simulated' for option in result['options']):
+            response += "\n\n Options marked [simulated] come from a stand-in carrier and are not bookable."
+        
+        return response
+    
+    async def _arun(self, *args, **kwargs) -> str:
+        """Async version - just call the sync version"""
+        return self._run(*args, **kwargs)
+
+
+class ShipDateOptimizerTool(BaseTool):
+    """LangChain tool for finding the best ship date and service for a delivery deadline"""
+    
+    name: str = "optimize_ship_date"
+    description: str = """
+    Find the best FedEx ship date and service for a delivery deadline in ONE call. Use this when 
+    users ask things like "cheapest way to get it there by Friday" or "when should I ship so it 
+    arrives by the 24th". It searches several ship dates and services at once and returns the 
+    trade-offs between cost and arrival date (every option that is not both pricier and later 
+    than another one). Requires COMPLETE addresses including street addresses, city, state, and 
+    postal code for both origin and destination, plus package details (weight, dimensions).
+    
+    IMPORTANT: Always ask for complete street addresses, not just city/state/zip!
+    """
+    args_schema: type[BaseModel] = ShipDateOptimizerInput
+    
+    def _run(
+        self,
+        origin_street: str,
+        origin_city: str,
+        origin_state: str,
+        origin_postal_code: str,
+        destination_street: str,
+        destination_city: str,
+        destination_state: str,
+        destination_postal_code: str,
+        weight: float,
+        length: float = 12.0,
+        width: float = 12.0,
+        height: float = 12.0,
+        deliver_by: Optional[str] = None,
+        earliest_ship_date: Optional[str] = None
+    ) -> str:
+        """Search ship dates and services and list the cost/arrival trade-offs"""
+        
+        origin = {'street': origin_street, 'city': origin_city, 'state': origin_state, 'postal_code': origin_postal_code}
+        destination = {
+            'street': destination_street,
+            'city': destination_city,
+            'state': destination_state,
+            'postal_code': destination_postal_code
+        }
+        dimensions = {'length': length, 'width': width, 'height': height}
+        
+        try:
+            result = ship_optimizer.optimize(
+                origin, destination, weight, dimensions,
+                deliver_by=deliver_by, earliest_ship_date=earliest_ship_date
+            )
+        except ValueError as e:
+            return f"Invalid date: {str(e)}. Use YYYY-MM-DD or a weekday name."
+        except Exception as e:
+            return f"Unable to optimize the shipment. Errors: {str(e)}"
+        
+        if not result['frontier']:
+            if result['deliver_by'] and not result['errors']:
+                return (f"No FedEx service can deliver by {result['deliver_by']} "
+                        f"when shipping on {', '.join(result['ship_dates']) or 'any available date'}.")
+            return f"Unable to optimize the shipment. Errors: {', '.join(result['errors']) or 'No rates returned'}"
+        
+        response = f"FedEx Ship Date Options:\n"
+        response += f"From: {origin_street}, {origin_city}, {origin_state} {origin_postal_code}\n"
+        response += f"To: {destination_street}, {destination_city}, {destination_state} {destination_postal_code}\n"
+        response += f"Package: {weight} lbs, {length}x{width}x{height} inches\n"
+        if result['deliver_by']:
+            response += f"Deliver by: {result['deliver_by']}\n"
+        response += f"Ship dates searched: {', '.join(result['ship_dates'])}\n\n"
+        response += "Best trade-offs (earliest arrival first; each later option is cheaper):\n"
+        
+        for i, option in enumerate(result['frontier'], 1):
+            response += (f"{i}. Ship {option['ship_date']} via {option['service_name']}: "
+                         f"${option['amount']:.2f} {option['currency']}, arrives {option['arrival_date']}\n")
+        
+        cheapest, fastest = result['cheapest'], result['fastest']
+        response += f"\n Cheapest: {cheapest['service_name']} shipped {cheapest['ship_date']} - ${cheapest['amount']:.2f}"
+        response += f"\n Earliest arrival: {fastest['arrival_date']} with {fastest['service_name']} - ${fastest['amount']:.2f}"
+        
+        if result['timed_out']:
+            response += f"\n\n Not checked in time: {', '.join(result['pending'])}"
+        if result['errors']:
+            response += f"\n\n Some options unavailable: {', '.join(result['errors'])}"
+        
+        return response
+    
+    async def _arun(self, *args, **kwargs) -> str:
+        """Async version - just call the sync version"""
+        return self._run(*args, **kwargs)
+
+
+class FedExConsolidationTool(BaseTool):
+    """LangChain tool for comparing separate, multi-piece and consolidated shipping of a multi-box order"""
+    
+    name: str = "compare_fedex_consolidation"
+    description: str = """
+    For orders with SEVERAL boxes: compare shipping each box separately, sending all boxes as one 
+    multi-piece FedEx shipment, and packing everything into one box, for one FedEx service. Use 
+    this when users ask whether to combine boxes or how to ship a multi-box order most cheaply. 
+    Describe the boxes with weight/length/width/height plus package_count for identical boxes and 
+    additional_packages for different ones. Requires COMPLETE addresses including street 
+    addresses, city, state, and postal code for both origin and destination.
+    
+    IMPORTANT: Always ask for complete street addresses, not just city/state/zip!
+    """
+    args_schema: type[BaseModel] = FedExShippingInput
+    
+    def _run(
+        self,
+        origin_street: str,
+        origin_city: str,
+        origin_state: str,
+        origin_postal_code: str,
+        destination_street: str,
+        destination_city: str,
+        destination_state: str,
+        destination_postal_code: str,
+        weight: float,
+        length: float = 12.0,
+        width: float = 12.0,
+        height: float = 12.0,
+        service_type: str = "FEDEX_GROUND",
+        package_count: int = 1,
+        additional_packages: Optional[List[Any]] = None
+    ) -> str:
+        """Price the order per box, multi-piece and consolidated"""
+        
+        origin = {'street': origin_street, 'city': origin_city, 'state': origin_state, 'postal_code': origin_postal_code}
+        destination = {
+            'street': destination_street,
+            'city': destination_city,
+            'state': destination_state,
+            'postal_code': destination_postal_code
+        }
+        
+        try:
+            shipment = _tool_shipment(weight, length, width, height, package_count, additional_packages)
+            comparison = compare_consolidation(origin, destination, shipment, service_type)
+        except Exception as e:
+            return f"Unable to compare consolidation options. Errors: {str(e)}"
+        
+        labels = {
+            PER_BOX: "Each box shipped separately",
+            MULTI_PIECE: "One multi-piece shipment",
+            CONSOLIDATED: "Packed into one box"
+        }
+        response = f"FedEx Consolidation Comparison ({service_type}):\n"
+        response += f"From: {origin_street}, {origin_city}, {origin_state} {origin_postal_code}\n"
+        response += f"To: {destination_street}, {destination_city}, {destination_state} {destination_postal_code}\n"
+        response += f"Order: {describe_packages(shipment)}\n\n"
+        
+        for strategy, option in comparison['options'].items():
+            if option['amount'] is not None:
+                response += f"• {labels[strategy]}: ${option['amount']:.2f}"
+            else:
+                response += f"• {labels[strategy]}: unavailable ({option['error']})"
+            if strategy == CONSOLIDATED:
+                box = option['packages'][0]
+                dimensions = box['dimensions']
+                response += f" (one {box['weight']} lbs box, {dimensions['length']}x{dimensions['width']}x{dimensions['height']} in)"
+            response += "\n"
+        if CONSOLIDATED not in comparison['options'] and len(comparison['options']) > 1:
+            response += "• Packed into one box: not possible, the combined box exceeds FedEx size or weight limits\n"
+        
+        if comparison['best']:
+            response += f"\n Best: {labels[comparison['best']]}"
+            if comparison['savings']:
+                response += f" (saves ${comparison['savings']:.2f} over separate boxes)"
+        
+        return response
+    
+    async def _arun(self, *args, **kwargs) -> str:
+        """Async version - just call the sync version"""
+        return self._run(*args, **kwargs)
+
+
 # Create tool instances
 fedex_single_tool = FedExShippingTool()
 fedex_multi_tool = FedExMultiServiceTool()
+fedex_estimate_tool = FedExRateEstimateTool()
+rate_shopping_tool = RateShoppingTool()
+ship_date_optimizer_tool = ShipDateOptimizerTool()
+fedex_consolidation_tool = FedExConsolidationTool()
@@ -0,0 +1,286 @@
+"""
+Hedged LLM Requests
+Issues a second, identical chat request when the first token is late and streams whichever answers first
+"""
+
+import queue
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional
+
+import httpx
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict, Field
+
+from .metrics import Metrics, metrics as default_metrics
+from .settings import Settings, get_settings
+
+# First-token samples needed before the percentile replaces the configured delay
+MIN_LATENCY_SAMPLES = 20
+# Hedges that can be saved up by a run of calls that didn't need one
+BUDGET_BURST = 3.0
+
+PRIMARY = 'primary'
+HEDGE = 'hedge'
+
+
+class HedgeBudget:
+    """
+    Token bucket capping hedges to a share of calls: every call earns `ratio`
+    of a hedge (up to `burst`) and every hedge spends one.
+    """
+
+    def __init__(self, ratio: float, burst: float = BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self.tokens = min(self.tokens + self.ratio, self.burst)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+# Shared per model, so the cap holds across agents and sessions
+_budgets: Dict[Any, HedgeBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def hedge_budget(model_name: str, ratio: float) -> HedgeBudget:
+    with _budgets_lock:
+        budget = _budgets.get((model_name, ratio))
+        if budget is None:
+            budget = _budgets[(model_name, ratio)] = HedgeBudget(ratio)
+        return budget
+
+
+class _CancellableTransport(httpx.BaseTransport):
+    """
+    One attempt's view of a model's HTTP transport: requests go through the
+    shared transport (and its connection pool), and close() closes the
+    attempt's response from any thread, so a loser stalled before its first
+    token drops its connection instead of holding it until the read timeout.
+    A response that arrives after close() is closed at once.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+        self._responses: List[httpx.Response] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self._closed:
+            raise httpx.ReadError("Hedged attempt cancelled", request=request)
+        response = self._transport.handle_request(request)
+        with self._lock:
+            if not self._closed:
+                self._responses.append(response)
+                return response
+        response.close()
+        raise httpx.ReadError("Hedged attempt cancelled", request=request)
+
+    def close(self):
+        """Close this attempt's responses (not the shared transport)"""
+        with self._lock:
+            self._closed = True
+            responses, self._responses = self._responses, []
+        for response in responses:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+
+def _cancellable(model: BaseChatModel):
+    """
+    (model, transport): a copy of an OpenAI chat model whose requests go
+    through a _CancellableTransport, or the model itself and None when it
+    doesn't talk to OpenAI through httpx
+    """
+    root_client = getattr(model, 'root_client', None)
+    http_client = getattr(root_client, '_client', None)
+    transport = getattr(http_client, '_transport', None)
+    if not isinstance(transport, httpx.BaseTransport):
+        return model, None
+    cancellable = _CancellableTransport(transport)
+    root = root_client.with_options(http_client=httpx.Client(transport=cancellable, timeout=http_client.timeout))
+    return model.model_copy(update={'root_client': root, 'client': root.chat.completions}), cancellable
+
+
+class _Attempt:
+    """One streaming call on a daemon thread, reporting (attempt, kind, payload) events"""
+
+    def __init__(self, name: str, model: BaseChatModel, events: queue.Queue, messages, stop, kwargs):
+        self.name = name
+        self.model = model
+        self.cancelled = threading.Event()
+        self.started = time.perf_counter()
+        self._events = events
+        self._model, self._transport = _cancellable(model)
+        threading.Thread(target=self._run, args=(messages, stop, kwargs), daemon=True).start()
+
+    def _run(self, messages, stop, kwargs):
+        stream = None
+        try:
+            stream = self._model._stream(messages, stop=stop, **kwargs)
+            for chunk in stream:
+                if self.cancelled.is_set():
+                    return
+                self._events.put((self, 'chunk', chunk))
+            self._events.put((self, 'done', None))
+        except Exception as e:
+            self._events.put((self, 'error', e))
+        finally:
+            if stream is not None:
+                stream.close()
+
+    def cancel(self):
+        self.cancelled.set()
+        # Closing the response ends a read that is waiting for the first token
+        if self._transport is not None:
+            self._transport.close()
+
+
+def _model_name(model: BaseChatModel) -> str:
+    return getattr(model, 'model_name', None) or getattr(model, 'model', None) or model._llm_type
+
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Chat model wrapper that hedges slow first tokens.
+
+    The call goes to `model`. If no token has arrived after the hedge delay
+    (hedge_percentile of the model's recent first-token latency, at least
+    min_delay_seconds; delay_seconds until enough samples exist) and the hedge
+    budget allows, the same request goes to `hedge` (default: `model` again).
+    The first attempt to produce a token wins and the other is cancelled.
+    A failed attempt leaves the call to the other one.
+
+    Metrics: llm.hedge_calls, llm.hedges, llm.hedge_wins,
+    llm.hedge_budget_exhausted (counters) and llm.first_token_latency, by
+    model. The first-token latency is recorded for the primary model, from
+    the start of the primary attempt, whichever attempt wins.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model: BaseChatModel
+    hedge: Optional[BaseChatModel] = None
+    percentile: float = 95.0
+    delay_seconds: float = 2.0
+    min_delay_seconds: float = 0.25
+    budget: HedgeBudget
+    metrics: Metrics = Field(default_factory=lambda: default_metrics)
+
+    @property
+    def _llm_type(self) -> str:
+        return 'hedged-chat'
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {'model_name': _model_name(self.model)}
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the first token before hedging"""
+        name = _model_name(self.model)
+        latency = self.metrics.percentile('llm.first_token_latency', self.percentile, model=name)
+        if latency is None or self.metrics.sample_count('llm.first_token_latency', model=name) < MIN_LATENCY_SAMPLES:
+            return self.delay_seconds
+        return max(latency, self.min_delay_seconds)
+
+    def _first_event(self, events: queue.Queue, messages, stop, kwargs):
+        """Run the attempts until one produces output; returns (winner, kind, payload, attempts)"""
+        name = _model_name(self.model)
+        attempts = [_Attempt(PRIMARY, self.model, events, messages, stop, kwargs)]
+        hedge_at = attempts[0].started + self.hedge_delay()
+        failed = []
+        while True:
+            timeout = max(hedge_at - time.perf_counter(), 0) if hedge_at is not None else None
+            try:
+                attempt, kind, payload = events.get(timeout=timeout)
+            except queue.Empty:
+                hedge_at = None
+                if self.budget.spend():
+                    self.metrics.increment('llm.hedges', model=name)
+                    attempts.append(_Attempt(HEDGE, self.hedge or self.model, events, messages, stop, kwargs))
+                else:
+                    self.metrics.increment('llm.hedge_budget_exhausted', model=name)
+                continue
+            if kind == 'error':
+                failed.append(attempt)
+                if len(failed) < len(attempts):
+                    continue
+                # Every attempt failed; a fallback model (if any) takes over from here
+                raise payload
+            return attempt, kind, payload, attempts
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        name = _model_name(self.model)
+        self.metrics.increment('llm.hedge_calls', model=name)
+        self.budget.earn()
+
+        events: queue.Queue = queue.Queue()
+        winner, kind, payload, attempts = self._first_event(events, messages, stop, kwargs)
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.cancel()
+        # Always the primary's clock: the latency the caller saw, which is what the hedge delay targets
+        self.metrics.observe('llm.first_token_latency', time.perf_counter() - attempts[0].started, model=name)
+        if winner.name == HEDGE:
+            self.metrics.increment('llm.hedge_wins', model=name)
+
+        try:
+            while kind != 'done':
+                if kind == 'error':
+                    raise payload
+                if kind == 'chunk':
+                    if run_manager:
+                        run_manager.on_llm_new_token(payload.text, chunk=payload)
+                    yield payload
+                attempt, kind, payload = events.get()
+                while attempt is not winner:
+                    attempt, kind, payload = events.get()
+        finally:
+            winner.cancel()
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        # Hedging is decided on the first token, so blocking calls stream too
+        return generate_from_stream(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+
+def hedged(model: BaseChatModel, settings: Optional[Settings] = None, hedge: Optional[BaseChatModel] = None,
+           metrics: Optional[Metrics] = None) -> HedgedChatModel:
+    """Wrap a chat model with the hedging settings of settings.openai"""
+    openai_settings = (settings or get_settings()).openai
+    return HedgedChatModel(
+        model=model,
+        hedge=hedge,
+        percentile=openai_settings.hedge_percentile,
+        delay_seconds=openai_settings.hedge_delay_seconds,
+        min_delay_seconds=openai_settings.hedge_min_delay_seconds,
+        budget=hedge_budget(_model_name(model), openai_settings.hedge_budget),
+        metrics=metrics or default_metrics
+    )
@@ -0,0 +1,202 @@
+"""
+Background Job Queue
+In-process worker pool for slow quote and chat work, so Streamlit reruns neither block on it nor repeat it
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, List
+
+DEFAULT_JOB_WORKERS = 4
+DEFAULT_RETENTION_SECONDS = 3600
+DEFAULT_MAX_RETAINED_JOBS = 500
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+_current = threading.local()
+
+
+class Job:
+    """A unit of background work and its status, progress and result"""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ''
+        self.result: Any = None
+        self.partial: Any = None  # Latest intermediate result, for jobs that refine their answer
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel_requested = threading.Event()
+        self._finished = threading.Event()
+        self._future: Optional[Future] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_requested.is_set()
+
+    def set_progress(self, progress: float, message: str = '', partial: Any = None):
+        """Report progress (0.0-1.0), and optionally a partial result, from inside the running job"""
+        self.progress = min(max(float(progress), 0.0), 1.0)
+        if message:
+            self.message = message
+        if partial is not None:
+            self.partial = partial
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; returns False on timeout"""
+        return self._finished.wait(timeout)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly view of the job status (without the result)"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+def current_job() -> Optional[Job]:
+    """
+    The job running on this worker thread, if any.
+
+    Long-running work can use it to report progress and to stop early when
+    cancellation was requested, without taking a job argument.
+    """
+    return getattr(_current, 'job', None)
+
+
+class JobQueue:
+    """
+    Worker pool with job ids, progress polling, cancellation and result retention.
+
+    Queued jobs are cancelled immediately; a running job is cancelled
+    cooperatively (it can check current_job().cancel_requested) and its result
+    is discarded when it returns. Finished jobs are kept for retention_seconds
+    so a later rerun can still collect the result.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_JOB_WORKERS,
+        retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+        max_retained_jobs: int = DEFAULT_MAX_RETAINED_JOBS
+    ):
+        self.retention_seconds = retention_seconds
+        self.max_retained_jobs = max_retained_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-worker')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable, *args, **kwargs) -> str:
+        """
+        Queue fn(*args, **kwargs) to run in the background.
+
+        Returns:
+            Job id
+        """
+        job = Job(kind)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job._future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job: Job, fn: Callable, args: tuple, kwargs: Dict[str, Any]):
+        if job.cancel_requested:
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        _current.job = job
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if job.cancel_requested:
+                self._finish(job, CANCELLED)
+            else:
+                job.error = str(e)
+                self._finish(job, FAILED)
+            return
+        finally:
+            _current.job = None
+        if job.cancel_requested:
+            self._finish(job, CANCELLED)
+        else:
+            job.result = result
+            job.progress = 1.0
+            self._finish(job, SUCCEEDED)
+
+    def _finish(self, job: Job, status: str):
+        job.finished_at = time.time()
+        job.status = status
+        job._finished.set()
+
+    def _prune(self):
+        # Called with the lock held
+        cutoff = time.time() - self.retention_seconds
+        finished = [job for job in self._jobs.values() if job.done]
+        for job in finished:
+            if job.finished_at < cutoff:
+                del self._jobs[job.id]
+        excess = len(self._jobs) - self.max_retained_jobs
+        if excess > 0:
+            for job in sorted((job for job in finished if job.id in self._jobs), key=lambda j: j.finished_at)[:excess]:
+                del self._jobs[job.id]
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        """Look up a job; None if unknown or already expired"""
+        if not job_id:
+            return None
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        job = self.get(job_id)
+        return job.snapshot() if job else None
+
+    def cancel(self, job_id: Optional[str]) -> bool:
+        """
+        Request cancellation of a job.
+
+        Returns:
+            True if the job was still queued or running
+        """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job._cancel_requested.set()
+        if job._future is not None and job._future.cancel():
+            self._finish(job, CANCELLED)
+        return True
+
+    def jobs(self, kind: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            return [job for job in self._jobs.values() if kind is None or job.kind == kind]
+
+    def shutdown(self, wait: bool = True):
+        for job in self.jobs():
+            self.cancel(job.id)
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,192 @@
+"""
+Lane Warm-Up
+Re-quotes the most quoted lanes from quote history ahead of business hours, within a carrier request budget
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, List, Optional, Sequence
+
+from .carrier_client import CarrierClient, get_carrier_client
+from .metrics import Metrics, metrics as shared_metrics
+from .quote_history import get_quote_history
+from .quote_scheduler import BATCH, quote_priority
+from .settings import Settings, get_settings
+from .shared_cache import get_shared_store
+from .zone_index import zip3_state
+
+# Consecutive failed quotes that end a run (the carrier is down or throttling us)
+MAX_CONSECUTIVE_FAILURES = 3
+# How long a claimed run stays claimed in the shared tier
+CLAIM_TTL_SECONDS = 24 * 60 * 60
+
+
+def lane_request(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rate request inputs (origin, destination, shipment) for a quote history record.
+
+    History keeps ZIP codes only; FedEx rates by postal code, so the state comes
+    from the ZIP3 table and the city is left empty.
+    """
+    def address(postal_code: str) -> Dict[str, str]:
+        return {'city': '', 'state': zip3_state(postal_code) or '', 'postal_code': postal_code, 'country': 'US'}
+
+    return {
+        'origin': address(record['origin_postal_code']),
+        'destination': address(record['destination_postal_code']),
+        'shipment': {
+            'weight': record['weight'],
+            'dimensions': {'length': record['length'], 'width': record['width'], 'height': record['height']},
+            'service_type': record['service_type']
+        }
+    }
+
+
+class LaneWarmer:
+    """
+    Refreshes the cached quotes of the most quoted lanes from quote
+    history, paced to a requests-per-minute budget, so the day's first
+    interactive requests on common lanes are served from the cache.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[Settings] = None,
+        client: Optional[CarrierClient] = None,
+        history_factory: Callable = get_quote_history,
+        metrics: Metrics = shared_metrics,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.settings = settings or get_settings()
+        self.client = client
+        self.history_factory = history_factory
+        self.metrics = metrics
+        self._sleep = sleep
+
+    def lanes(self, top_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most quoted lanes of the lookback window, as quote history records"""
+        cache = self.settings.cache
+        since = (datetime.utcnow() - timedelta(days=cache.warmup_lookback_days)).isoformat()
+        return self.history_factory().popular_lanes(since=since, limit=top_n or cache.warmup_top_lanes)
+
+    def warm(self, top_n: Optional[int] = None, requests_per_minute: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Re-quote the top lanes once.
+
+        Returns:
+            Dict with keys: lanes, refreshed, failed, skipped (not reached after
+            repeated failures), seconds
+        """
+        client = self.client or get_carrier_client(self.settings)
+        rate = requests_per_minute or self.settings.cache.warmup_requests_per_minute
+        interval = 60.0 / rate if rate > 0 else 0.0
+        lanes = self.lanes(top_n)
+        summary = {'lanes': len(lanes), 'refreshed': 0, 'failed': 0, 'skipped': 0, 'seconds': 0.0}
+
+        started = time.monotonic()
+        consecutive_failures = 0
+        for index, record in enumerate(lanes):
+            if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                summary['skipped'] = len(lanes) - index
+                break
+            # Pace calls evenly so warm-up never bursts into the carrier's rate limit
+            wait = started + index * interval - time.monotonic()
+            if wait > 0:
+                self._sleep(wait)
+            request = lane_request(record)
+            # Warm-up only gets carrier capacity that interactive quotes leave over
+            with quote_priority(BATCH):
+                result = client.refresh(request['origin'], request['destination'], request['shipment'])
+            if result.get('success') and not result.get('stale'):
+                summary['refreshed'] += 1
+                consecutive_failures = 0
+                self.metrics.increment('warmup.refreshed')
+            else:
+                summary['failed'] += 1
+                consecutive_failures += 1
+                self.metrics.increment('warmup.failed')
+        summary['seconds'] = time.monotonic() - started
+        return summary
+
+
+def next_run(now: datetime, times: Sequence[str]) -> Optional[datetime]:
+    """The next of the daily local times ('HH:MM') after now, or None without times"""
+    candidates = []
+    for value in times:
+        hour, minute = (int(part) for part in value.split(':'))
+        candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        candidates.append(candidate)
+    return min(candidates, default=None)
+
+
+def claim_run(
+    run_at: datetime,
+    settings: Optional[Settings] = None,
+    history_factory: Callable = get_quote_history
+) -> bool:
+    """
+    Claim the warm-up run scheduled at run_at for this process: across the
+    fleet through the shared tier when one is configured, else across the
+    host's workers through the quote history database
+    """
+    shared = get_shared_store(settings or get_settings())
+    if shared is not None:
+        return shared.lock(('lane_warmup', run_at.isoformat()), CLAIM_TTL_SECONDS)
+    return history_factory().claim_run('lane_warmup', run_at.isoformat())
+
+
+class LaneWarmupScheduler:
+    """
+    Runs a LaneWarmer on a daemon thread at settings.cache.warmup_times (local
+    time). Every API worker runs a scheduler, but each run is claimed first
+    (see claim_run), so only one worker warms and the request budget holds
+    """
+
+    def __init__(
+        self,
+        warmer: Optional[LaneWarmer] = None,
+        times: Optional[Sequence[str]] = None,
+        now: Callable[[], datetime] = datetime.now,
+        claim: Optional[Callable[[datetime], bool]] = None
+    ):
+        self.warmer = warmer or LaneWarmer()
+        self.times = tuple(times if times is not None else self.warmer.settings.cache.warmup_times)
+        self._now = now
+        self._claim = claim or (lambda run_at: claim_run(run_at, self.warmer.settings, self.warmer.history_factory))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_summary: Optional[Dict[str, Any]] = None
+
+    def start(self) -> bool:
+        """Start the schedule; False when no warm-up times are configured"""
+        if not self.times or self._thread is not None:
+            return False
+        self._thread = threading.Thread(target=self._loop, name='lane-warmup', daemon=True)
+        self._thread.start()
+        return True
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = self._now()
+            run_at = next_run(now, self.times)
+            if self._stop.wait((run_at - now).total_seconds()):
+                return
+            try:
+                if self._claim(run_at):
+                    self.last_summary = self.warmer.warm()
+            except Exception as e:
+                print(f"Lane warm-up failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+if __name__ == "__main__":
+    # One warm-up run now, e.g. from cron: python -m services.lane_warmup
+    print(LaneWarmer().warm())
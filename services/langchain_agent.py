@@ -3,30 +3,37 @@ LangChain-powered OpenAI Agent with FedEx Tool Calling
 Enhanced AI agent that can directly call FedEx API for shipping quotes
 """
 
-import os
-from typing import List, Dict, Optional
-from dotenv import load_dotenv
+import time
+from typing import Any, Iterator, List, Dict, Optional
 
-from langchain_openai import ChatOpenAI
-from langchain.agents import create_openai_functions_agent, AgentExecutor
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.schema import HumanMessage, AIMessage
-from langchain.memory import ConversationBufferWindowMemory
-
-from .fedex_tool import fedex_single_tool, fedex_multi_tool
-
-# Load environment variables
-load_dotenv()
+from .settings import Settings, get_settings
 
 
 class LangChainFedExAgent:
-    def __init__(self):
-        """Initialize the LangChain agent with FedEx tools"""
-        self.api_key = os.getenv('OPENAI_API_KEY')
-        self.llm = None
+    def __init__(self, settings: Optional[Settings] = None, http_client: Any = None):
+        """
+        Initialize the LangChain agent with FedEx tools
+
+        http_client: Optional httpx.Client for the OpenAI calls (e.g. a cassette client)
+        """
+        self.settings = settings or get_settings()
+        self.http_client = http_client
+        self.http_async_client = None
+        self.api_key = self.settings.openai.api_key
+        if self.settings.openai.is_fake:
+            # Local scripted model (see services.fake_llm), unless a client was injected
+            from .fake_llm import FAKE_API_KEY, fake_llm_from_settings
+            self.api_key = self.api_key or FAKE_API_KEY
+            if http_client is None:
+                fake = fake_llm_from_settings(self.settings)
+                self.http_client = fake.http_client()
+                self.http_async_client = fake.async_http_client()
+        self.router = None
+        self._prompt = None
+        self.executors: Dict[str, Any] = {}
         self.agent_executor = None
         self.memory = None
-        self.model = "gpt-3.5-turbo"
+        self.model = self.settings.openai.model
         
         # System prompt for the shipping assistant
         self.system_prompt = """You are an expert AI shipping assistant with access to live FedEx API data. 
@@ -40,6 +47,10 @@ class LangChainFedExAgent:
         TOOLS AVAILABLE:
         1. get_fedex_shipping_quote: Get a quote for a specific FedEx service
         2. get_fedex_all_services: Get quotes for ALL FedEx services to compare options
+        3. estimate_fedex_rate: Instant ballpark estimate from recent quotes (zip codes, weight and dimensions only)
+        4. shop_carrier_rates: Compare rates across all carriers and return the top options (cheapest and fastest)
+        5. optimize_ship_date: Best ship date and service for a delivery deadline, searched in one call
+        6. compare_fedex_consolidation: For multi-box orders, compare separate boxes vs one multi-piece shipment vs one combined box
 
         WHEN TO USE TOOLS:
         - User asks for shipping rates, costs, or quotes
@@ -52,6 +63,7 @@ class LangChainFedExAgent:
         - Destination: COMPLETE street address, city, state, postal code  
         - Package weight (in pounds)
         - Package dimensions (length, width, height in inches) - use 12x12x12 as default if not provided
+        - For several boxes, quote the whole order in ONE tool call: package_count for identical boxes, additional_packages for different ones
 
         CRITICAL: Always ask for COMPLETE STREET ADDRESSES, not just city/state/zip!
         Street-level addresses provide more accurate FedEx pricing.
@@ -80,7 +92,19 @@ class LangChainFedExAgent:
         You: Perfect! I have the complete addresses. What's the weight and dimensions of your package?
         [Get details, then use tools]
 
-        Remember: Always use the tools when users ask for shipping quotes - don't provide estimated prices without calling the API!
+        ROUGH ESTIMATES:
+        - If the user only wants a ballpark ("roughly how much?"), use estimate_fedex_rate and clearly label the answer as an estimate with its range
+        - Offer to get a live quote with get_fedex_all_services once complete addresses are known
+
+        DELIVERY DEADLINES:
+        - If the user needs the package to arrive by a date ("by Friday"), call optimize_ship_date once with deliver_by instead of quoting dates one by one
+        - Present the trade-offs it returns and recommend one based on what the user cares about
+
+        COMPARING CARRIERS:
+        - If the user wants the best deal across carriers, use shop_carrier_rates (set top_n if they ask for a number of options)
+        - Options marked [simulated] come from a stand-in carrier; say so and don't present them as bookable
+
+        Remember: Always use the tools when users ask for shipping quotes - don't provide estimated prices without calling a tool!
         Always insist on complete street addresses for accurate pricing!
         """
     
@@ -90,14 +114,12 @@ class LangChainFedExAgent:
             if not self.api_key:
                 return False, "OpenAI API key not found in environment variables"
             
-            # Initialize the LLM
-            self.llm = ChatOpenAI(
-                api_key=self.api_key,
-                model=self.model,
-                temperature=0.7
-            )
+            # LangChain is imported on first connect so importing this module stays cheap
+            from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+            from langchain.memory import ConversationBufferWindowMemory
+            from .model_router import ModelRouter
             
-            # Create the prompt template
+            # Shared by every route, so a conversation can move between models
             prompt = ChatPromptTemplate.from_messages([
                 ("system", self.system_prompt),
                 MessagesPlaceholder(variable_name="chat_history"),
@@ -112,24 +134,10 @@ class LangChainFedExAgent:
                 k=10  # Keep last 10 exchanges
             )
             
-            # Create the agent with tools
-            tools = [fedex_single_tool, fedex_multi_tool]
-            agent = create_openai_functions_agent(
-                llm=self.llm,
-                tools=tools,
-                prompt=prompt
-            )
-            
-            # Create the agent executor with debugging enabled
-            self.agent_executor = AgentExecutor(
-                agent=agent,
-                tools=tools,
-                memory=self.memory,
-                verbose=True,  # Enable verbose logging for debugging
-                handle_parsing_errors=True,
-                max_iterations=3,
-                return_intermediate_steps=True  # Return tool execution details
-            )
+            # One agent executor per route (see services.model_router)
+            self.router = ModelRouter(self.settings)
+            self._prompt = prompt
+            self._build_executors()
             
             # Test the connection
             test_response = self.agent_executor.invoke({
@@ -141,6 +149,70 @@ class LangChainFedExAgent:
         except Exception as e:
             return False, f"Failed to initialize LangChain agent: {str(e)}"
     
+    def _openai_chat(self, model: str, route, base_url: Optional[str] = None, max_retries: int = 2):
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(
+            api_key=self.api_key,
+            model=model,
+            base_url=base_url,
+            temperature=route.temperature,
+            timeout=route.timeout_seconds,
+            max_retries=max_retries,
+            stream_usage=True,  # Token counts for the route metrics (the agent streams)
+            http_client=self.http_client,
+            http_async_client=self.http_async_client
+        )
+
+    def _chat_model(self, route):
+        """The route's model with its fallback chain (errors and timeouts move to the next model)"""
+        # A failing model hands over to the next one instead of retrying at length
+        max_retries = 1 if route.fallbacks else 2
+        models = [self._openai_chat(model, route, max_retries=max_retries) for model in route.models]
+        openai_settings = self.settings.openai
+        if openai_settings.hedging:
+            # Late first tokens from the primary get a second, racing request (see services.hedging)
+            from .hedging import hedged
+
+            alternate = None
+            if openai_settings.hedge_model or openai_settings.hedge_base_url:
+                alternate = self._openai_chat(
+                    openai_settings.hedge_model or route.model, route,
+                    base_url=openai_settings.hedge_base_url, max_retries=0
+                )
+            models[0] = hedged(models[0], self.settings, hedge=alternate)
+        return models[0].with_fallbacks(models[1:]) if len(models) > 1 else models[0]
+
+    def _build_executors(self):
+        from langchain.agents import create_openai_functions_agent, AgentExecutor
+        from .fedex_tool import (
+            fedex_single_tool, fedex_multi_tool, fedex_estimate_tool, rate_shopping_tool, ship_date_optimizer_tool,
+            fedex_consolidation_tool
+        )
+
+        tools = [fedex_single_tool, fedex_multi_tool, fedex_estimate_tool, rate_shopping_tool,
+                 ship_date_optimizer_tool, fedex_consolidation_tool]
+        self.executors = {}
+        for name, route in self.router.routes.items():
+            agent = create_openai_functions_agent(llm=self._chat_model(route), tools=tools, prompt=self._prompt)
+            self.executors[name] = AgentExecutor(
+                agent=agent,
+                tools=tools,
+                memory=self.memory,
+                verbose=True,  # Enable verbose logging for debugging
+                handle_parsing_errors=True,
+                max_iterations=3,
+                return_intermediate_steps=True  # Return tool execution details
+            )
+        # General-purpose executor (freeform route)
+        self.agent_executor = self.executors['freeform']
+
+    def _route(self, message: str):
+        recent = []
+        if self.memory is not None:
+            recent = [m.content for m in self.memory.chat_memory.messages if m.type == 'human']
+        return self.router.route(message, recent)
+
     def send_message(self, message: str, conversation_history: List[Dict] = None) -> tuple[str, Dict]:
         """
         Send a message to the LangChain agent
@@ -157,12 +229,21 @@ class LangChainFedExAgent:
                 return "Error: Agent not initialized. Please check your connection.", {}
             
             # The agent executor handles the conversation through memory
-            response = self.agent_executor.invoke({
-                "input": message
-            })
+            route = self._route(message)
+            started = time.perf_counter()
+            try:
+                response = self.executors[route.name].invoke(
+                    {"input": message}, config={"callbacks": [self.router.callback(route)]}
+                )
+            except Exception:
+                self.router.record_turn(route, time.perf_counter() - started, error=True)
+                raise
+            self.router.record_turn(route, time.perf_counter() - started)
             
             # Extract debug information
             debug_info = {
+                "route": route.name,
+                "model": route.model,
                 "tools_used": [],
                 "intermediate_steps": response.get("intermediate_steps", []),
                 "tool_calls_made": False
@@ -184,17 +265,64 @@ class LangChainFedExAgent:
             
         except Exception as e:
             return f"Error processing your request: {str(e)}", {"error": str(e)}
-    
+
+    def stream_message(self, message: str) -> Iterator[Dict[str, Any]]:
+        """
+        Send a message to the LangChain agent, yielding events as the agent works
+
+        Args:
+            message: User's message
+
+        Yields:
+            Event dicts: {"type": "tool", ...} when a tool is called,
+            {"type": "observation", ...} with its result, then
+            {"type": "message", "content": ...} with the final answer
+            (or {"type": "error", "error": ...})
+        """
+        if not self.agent_executor:
+            yield {"type": "error", "error": "Agent not initialized. Please check your connection."}
+            return
+
+        route = self._route(message)
+        started = time.perf_counter()
+        try:
+            # Memory is saved by the executor once the final output is produced
+            chunks = self.executors[route.name].stream(
+                {"input": message}, config={"callbacks": [self.router.callback(route)]}
+            )
+            for chunk in chunks:
+                for action in chunk.get("actions", []):
+                    yield {
+                        "type": "tool",
+                        "tool": getattr(action, 'tool', "unknown"),
+                        "input": getattr(action, 'tool_input', {})
+                    }
+                for step in chunk.get("steps", []):
+                    yield {
+                        "type": "observation",
+                        "tool": getattr(step.action, 'tool', "unknown"),
+                        "output": str(step.observation)
+                    }
+                if "output" in chunk:
+                    yield {"type": "message", "content": chunk["output"]}
+        except Exception as e:
+            self.router.record_turn(route, time.perf_counter() - started, error=True)
+            yield {"type": "error", "error": f"Error processing your request: {str(e)}"}
+            return
+        self.router.record_turn(route, time.perf_counter() - started)
+
     def set_model(self, model: str):
         """
-        Set the OpenAI model to use
+        Set the OpenAI model to use for every turn (routing keeps only its
+        per-route temperatures and fallbacks)
         
         Args:
             model: Model name (e.g., 'gpt-3.5-turbo', 'gpt-4')
         """
         self.model = model
-        if self.llm:
-            self.llm.model_name = model
+        if self.router:
+            self.router.pin_model(model)
+            self._build_executors()
     
     def clear_memory(self):
         """Clear the conversation memory"""
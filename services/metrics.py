@@ -0,0 +1,116 @@
+"""
+Service Metrics
+Thread-safe in-process counters and latency summaries, keyed by metric name and labels
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple, Iterator
+
+# Recent latency samples kept per series for percentiles
+DEFAULT_WINDOW = 512
+
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _series(name: str, labels: Dict[str, Any]) -> SeriesKey:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format(series: SeriesKey) -> str:
+    name, labels = series
+    if not labels:
+        return name
+    return f"{name}{{{','.join(f'{key}={value}' for key, value in labels)}}}"
+
+
+class Metrics:
+    """
+    Counters and latency observations.
+
+    Latencies keep count/sum/max over all time plus a sliding window of recent
+    samples, so percentiles track current behaviour.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[SeriesKey, float] = defaultdict(float)
+        self._latencies: Dict[SeriesKey, Dict[str, Any]] = {}
+
+    def increment(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[_series(name, labels)] += value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record one latency sample (in seconds)"""
+        series = _series(name, labels)
+        with self._lock:
+            summary = self._latencies.get(series)
+            if summary is None:
+                summary = self._latencies[series] = {
+                    'count': 0, 'sum': 0.0, 'max': 0.0, 'recent': deque(maxlen=self.window)
+                }
+            summary['count'] += 1
+            summary['sum'] += seconds
+            summary['max'] = max(summary['max'], seconds)
+            summary['recent'].append(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the wall time of a block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_series(name, labels), 0)
+
+    def sample_count(self, name: str, **labels) -> int:
+        """Number of recent samples of a latency series (what percentile() is computed over)"""
+        with self._lock:
+            summary = self._latencies.get(_series(name, labels))
+            return len(summary['recent']) if summary else 0
+
+    def percentile(self, name: str, q: float, **labels) -> Optional[float]:
+        """q-th percentile (0-100) of recent samples, or None without samples"""
+        with self._lock:
+            summary = self._latencies.get(_series(name, labels))
+            samples = sorted(summary['recent']) if summary else []
+        if not samples:
+            return None
+        index = min(int(round(q / 100 * (len(samples) - 1))), len(samples) - 1)
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All series as plain data, e.g. for a status page or logs"""
+        with self._lock:
+            counters = {_format(series): value for series, value in self._counters.items()}
+            latencies = {
+                _format(series): {
+                    'count': summary['count'],
+                    'mean': summary['sum'] / summary['count'],
+                    'max': summary['max'],
+                    'samples': sorted(summary['recent'])
+                }
+                for series, summary in self._latencies.items()
+            }
+        for summary in latencies.values():
+            samples = summary.pop('samples')
+            summary['p50'] = samples[len(samples) // 2]
+            summary['p95'] = samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+        return {'counters': counters, 'latencies': latencies}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._latencies.clear()
+
+
+# Shared process-wide registry
+metrics = Metrics()
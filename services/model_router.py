@@ -0,0 +1,233 @@
+"""
+Model Router
+Sends each agent turn to a fast or strong model, chosen locally from the message,
+with a fallback chain and per-route latency, token and cost metrics
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from .metrics import Metrics, metrics as default_metrics
+from .prefetch import parse_shipment_request
+from .settings import Settings, get_settings
+
+# Routes, from what the turn needs
+TOOL = 'tool'  # Enough shipment detail to call a quoting tool
+CLARIFICATION = 'clarification'  # Shipping talk that is missing details (slot filling)
+FREEFORM = 'freeform'  # General questions, explanations, small talk
+ROUTES = (TOOL, CLARIFICATION, FREEFORM)
+
+# USD per 1M (prompt, completion) tokens; unknown models are counted but not priced
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4.1-mini': (0.40, 1.60),
+    'gpt-4.1': (2.00, 8.00),
+    'gpt-4-turbo': (10.00, 30.00),
+    'gpt-4': (30.00, 60.00),
+    'gpt-3.5-turbo': (0.50, 1.50),
+}
+
+# Earlier user messages considered when a turn completes a shipment ("it's 9 lbs")
+CONTEXT_MESSAGES = 4
+
+_ZIP_PATTERN = re.compile(r"\b\d{5}(?:-\d{4})?\b")
+_WEIGHT_PATTERN = re.compile(r"\d+(?:\.\d+)?\s*-?\s*(?:lbs?|pounds?)\b", re.IGNORECASE)
+_DIMENSIONS_PATTERN = re.compile(r"\d+(?:\.\d+)?\s*(?:in(?:ches)?|\")?\s*[x×*]\s*\d", re.IGNORECASE)
+_SHIPPING_PATTERN = re.compile(
+    r"\b(?:ship(?:ping|ment)?|send|mail|quotes?|rates?|cost|price|how much|deliver(?:y|ed)?|arrive|"
+    r"fedex|ground|overnight|express|2day|carriers?|packages?|box(?:es)?|parcel|address|zip)\b",
+    re.IGNORECASE
+)
+
+
+def classify_turn(message: str, recent_user_messages: Iterable[str] = ()) -> str:
+    """
+    Route for one user message, from local pattern matching only.
+
+    tool: the message, alone or with the recent user messages, holds a complete
+    shipment (two addresses and a weight) or the zip codes and weight an
+    estimate needs. clarification: it talks about shipping or gives some
+    shipment details, so the agent will ask for the rest. freeform: anything else.
+    """
+    text = message or ""
+    context = " ".join([*list(recent_user_messages)[-CONTEXT_MESSAGES:], text])
+    gives_details = bool(_ZIP_PATTERN.search(text) or _WEIGHT_PATTERN.search(text) or _DIMENSIONS_PATTERN.search(text))
+
+    if gives_details or _SHIPPING_PATTERN.search(text):
+        if parse_shipment_request(text) or parse_shipment_request(context):
+            return TOOL
+        if len(set(_ZIP_PATTERN.findall(context))) >= 2 and _WEIGHT_PATTERN.search(context):
+            return TOOL
+        return CLARIFICATION
+    return FREEFORM
+
+
+@dataclass(frozen=True)
+class Route:
+    name: str
+    model: str
+    temperature: float
+    timeout_seconds: float
+    fallbacks: Tuple[str, ...] = ()  # Models tried in order when the primary errors or times out
+
+    @property
+    def models(self) -> Tuple[str, ...]:
+        return (self.model, *self.fallbacks)
+
+
+def model_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD for one call, matched on the longest known model-name prefix (dated snapshots included)"""
+    prefix = max((name for name in MODEL_PRICES if model.startswith(name)), key=len, default=None)
+    if prefix is None:
+        return 0.0
+    prompt_price, completion_price = MODEL_PRICES[prefix]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class ModelRouter:
+    """
+    Route table built from settings.openai.
+
+    Routes in strong_routes use strong_model with timeout_seconds, the others
+    the fast model (fast_model, default model) with fast_timeout_seconds. Each
+    route falls back to the other tier, then to the plain model setting. With
+    routing off every route uses model, and turns are still classified for metrics.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None, metrics: Optional[Metrics] = None):
+        self.settings = settings or get_settings()
+        self.metrics = metrics or default_metrics
+        self.routes = self._build_routes(self.settings.openai)
+
+    @staticmethod
+    def _build_routes(openai_settings) -> Dict[str, Route]:
+        temperatures = dict(openai_settings.route_temperatures)
+        fast = openai_settings.fast_model or openai_settings.model
+        routes = {}
+        for name in ROUTES:
+            strong = name in openai_settings.strong_routes
+            if not openai_settings.routing:
+                chain = [openai_settings.model]
+            elif strong:
+                chain = [openai_settings.strong_model, fast, openai_settings.model]
+            else:
+                chain = [fast, openai_settings.strong_model, openai_settings.model]
+            chain = list(dict.fromkeys(chain))
+            routes[name] = Route(
+                name=name,
+                model=chain[0],
+                temperature=temperatures.get(name, openai_settings.temperature),
+                timeout_seconds=(
+                    openai_settings.timeout_seconds if strong or not openai_settings.routing
+                    else openai_settings.fast_timeout_seconds
+                ),
+                fallbacks=tuple(chain[1:])
+            )
+        return routes
+
+    def route(self, message: str, recent_user_messages: Iterable[str] = ()) -> Route:
+        return self.routes[classify_turn(message, recent_user_messages)]
+
+    def pin_model(self, model: str):
+        """Send every route to one model first (set_model), keeping temperatures and fallbacks"""
+        self.routes = {
+            name: Route(
+                name=name,
+                model=model,
+                temperature=route.temperature,
+                timeout_seconds=route.timeout_seconds,
+                fallbacks=tuple(m for m in route.models if m != model)
+            )
+            for name, route in self.routes.items()
+        }
+
+    def record_turn(self, route: Route, seconds: float, error: bool = False):
+        self.metrics.observe('llm.turn_latency', seconds, route=route.name)
+        self.metrics.increment('llm.turns', route=route.name)
+        if error:
+            self.metrics.increment('llm.turn_errors', route=route.name)
+
+    def record_call(self, route: Route, model: str, seconds: float, prompt_tokens: int, completion_tokens: int):
+        self.metrics.observe('llm.call_latency', seconds, route=route.name, model=model)
+        self.metrics.increment('llm.prompt_tokens', prompt_tokens, route=route.name, model=model)
+        self.metrics.increment('llm.completion_tokens', completion_tokens, route=route.name, model=model)
+        self.metrics.increment('llm.cost_usd', model_cost(model, prompt_tokens, completion_tokens), route=route.name)
+
+    def record_model_error(self, route: Route, model: str):
+        """A model call failed; the next model in the route's chain (if any) takes over"""
+        self.metrics.increment('llm.model_errors', route=route.name, model=model)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per route: model, turns, errors, model_errors, p50/p95 turn latency (seconds), cost_usd"""
+        rows = []
+        for name, route in self.routes.items():
+            rows.append({
+                'route': name,
+                'model': route.model,
+                'turns': self.metrics.counter('llm.turns', route=name),
+                'errors': self.metrics.counter('llm.turn_errors', route=name),
+                'model_errors': sum(self.metrics.counter('llm.model_errors', route=name, model=m) for m in route.models),
+                'p50_seconds': self.metrics.percentile('llm.turn_latency', 50, route=name),
+                'p95_seconds': self.metrics.percentile('llm.turn_latency', 95, route=name),
+                'cost_usd': self.metrics.counter('llm.cost_usd', route=name)
+            })
+        return rows
+
+    def callback(self, route: Route):
+        """LangChain callback handler recording the route's model calls"""
+        return _usage_handler_class()(self, route)
+
+
+@lru_cache(maxsize=None)
+def _usage_handler_class():
+    # LangChain is only imported once an agent is built
+    import time
+
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class RouteUsageHandler(BaseCallbackHandler):
+        """Times each chat model call of a turn and records its tokens, cost and errors"""
+
+        def __init__(self, router: ModelRouter, route: Route):
+            self.router = router
+            self.route = route
+            self._lock = threading.Lock()
+            self._started: Dict[Any, Tuple[float, str]] = {}
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, invocation_params=None, **kwargs):
+            params = invocation_params or {}
+            model = params.get('model') or params.get('model_name') or self.route.model
+            with self._lock:
+                self._started[run_id] = (time.perf_counter(), model)
+
+        def _finish(self, run_id) -> Tuple[float, str]:
+            with self._lock:
+                started, model = self._started.pop(run_id, (time.perf_counter(), self.route.model))
+            return time.perf_counter() - started, model
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            seconds, model = self._finish(run_id)
+            output = response.llm_output or {}
+            usage = output.get('token_usage') or {}
+            if not usage:
+                # Streamed calls report usage on the message instead
+                message = getattr(response.generations[0][0], 'message', None) if response.generations else None
+                metadata = getattr(message, 'usage_metadata', None) or {}
+                usage = {
+                    'prompt_tokens': metadata.get('input_tokens', 0),
+                    'completion_tokens': metadata.get('output_tokens', 0)
+                }
+            self.router.record_call(
+                self.route, output.get('model_name') or model, seconds,
+                usage.get('prompt_tokens') or 0, usage.get('completion_tokens') or 0
+            )
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            _, model = self._finish(run_id)
+            self.router.record_model_error(self.route, model)
+
+    return RouteUsageHandler
@@ -3,20 +3,97 @@ OpenAI ChatCompletions API Connector
 Handles communication with OpenAI's GPT models for the chatbot
 """
 
-import os
-import openai
-from typing import List, Dict, Optional
-from dotenv import load_dotenv
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Iterator, List, Dict, Optional
+
+from .settings import OpenAISettings, Settings, get_settings
+
+# Shared SDK clients: one sync client per OpenAI settings, one async client per
+# settings and event loop (httpx async pools can't cross loops)
+_clients: Dict[OpenAISettings, Any] = {}
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def _client_options(openai_settings: OpenAISettings) -> Dict[str, Any]:
+    import openai
+
+    api_key = openai_settings.api_key
+    if openai_settings.is_fake:
+        from .fake_llm import FAKE_API_KEY
+        api_key = api_key or FAKE_API_KEY
+    return {
+        'api_key': api_key,
+        'timeout': openai.Timeout(openai_settings.timeout_seconds, connect=openai_settings.connect_timeout_seconds),
+        # Rate limits are retried by the connector (with backoff it can see and test)
+        'max_retries': 0
+    }
+
+
+def get_openai_client(settings: Optional[Settings] = None):
+    """Process-wide openai.OpenAI client (pooled keep-alive connections) for the settings"""
+    import openai
+
+    openai_settings = (settings or get_settings()).openai
+    with _clients_lock:
+        client = _clients.get(openai_settings)
+        if client is None:
+            options = _client_options(openai_settings)
+            if openai_settings.is_fake:
+                from .fake_llm import fake_llm_from_settings
+                options['http_client'] = fake_llm_from_settings(settings).http_client()
+            client = _clients[openai_settings] = openai.OpenAI(**options)
+        return client
+
+
+def get_async_openai_client(settings: Optional[Settings] = None):
+    """openai.AsyncOpenAI client shared by everything on the running event loop"""
+    import asyncio
+    import openai
+
+    openai_settings = (settings or get_settings()).openai
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(openai_settings)
+        if client is None:
+            options = _client_options(openai_settings)
+            if openai_settings.is_fake:
+                from .fake_llm import fake_llm_from_settings
+                options['http_client'] = fake_llm_from_settings(settings).async_http_client()
+            client = clients[openai_settings] = openai.AsyncOpenAI(**options)
+        return client
 
-# Load environment variables
-load_dotenv()
 
 class OpenAIConnector:
-    def __init__(self):
-        """Initialize the OpenAI connector with API key from environment"""
-        self.api_key = os.getenv('OPENAI_API_KEY')
+    def __init__(
+        self,
+        settings: Optional[Settings] = None,
+        http_client=None,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Initialize the OpenAI connector with API key from settings
+
+        http_client: Optional httpx.Client (e.g. a cassette client); without one
+        the connector uses the shared process-wide client (a local fake model
+        when settings.openai.backend is 'fake')
+        """
+        self.settings = settings or get_settings()
+        self.http_client = http_client
+        self.api_key = self.settings.openai.api_key
+        if self.settings.openai.is_fake and not self.api_key:
+            from .fake_llm import FAKE_API_KEY
+            self.api_key = FAKE_API_KEY
         self.client = None
-        self.model = "gpt-3.5-turbo"  # Default model
+        self.model = self.settings.openai.model
+        self._sleep = sleep
+        # Last user/assistant turns, kept between calls instead of rebuilt from the transcript
+        self.history: deque = deque(maxlen=self.settings.openai.history_messages)
         self.system_message = {
             "role": "system",
             "content": """You are a helpful shipping assistant AI. You help users with:
@@ -25,105 +102,215 @@ class OpenAIConnector:
             - Explaining shipping options and services
             - Answering questions about FedEx services
             - General shipping and logistics advice
-            
+
             Be friendly, professional, and helpful. If you need specific information like addresses, weights, or tracking numbers, ask the user for those details."""
         }
-    
+
     def initialize_connection(self) -> tuple[bool, str]:
         """
         Initialize connection to OpenAI API
-        
+
+        Validates the key and model with a models lookup, which uses no tokens.
+
         Returns:
             tuple: (success: bool, message: str)
         """
         try:
             if not self.api_key:
                 return False, "OpenAI API key not found in environment variables"
-            
-            # Initialize the OpenAI client
-            self.client = openai.OpenAI(api_key=self.api_key)
-            
-            # Test the connection with a simple request
-            test_response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a test assistant."},
-                    {"role": "user", "content": "Hello"}
-                ],
-                max_tokens=10
-            )
-            
+
+            # Imported on first connect so importing this module stays cheap
+            import openai
+
+            if self.http_client is not None:
+                self.client = openai.OpenAI(http_client=self.http_client, **_client_options(self.settings.openai))
+            else:
+                self.client = get_openai_client(self.settings)
+
+            self.client.models.retrieve(self.model)
+
             return True, "Successfully connected to OpenAI API"
-            
+
         except Exception as e:
+            self.client = None
             return False, f"Failed to connect to OpenAI API: {str(e)}"
-    
+
+    def _build_messages(self, message: str, conversation_history: Optional[List[Dict]]) -> List[Dict[str, str]]:
+        if conversation_history is None:
+            history = list(self.history)
+        else:
+            history = [
+                {"role": msg["role"], "content": msg["content"]}
+                for msg in conversation_history[-self.settings.openai.history_messages:]
+                if msg["role"] in ("user", "assistant")
+            ]
+        return [self.system_message, *history, {"role": "user", "content": message}]
+
+    def _remember(self, message: str, reply: str):
+        self.history.append({"role": "user", "content": message})
+        self.history.append({"role": "assistant", "content": reply})
+
+    def _request(self, messages: List[Dict[str, str]], stream: bool = False) -> Dict[str, Any]:
+        return dict(
+            model=self.model,
+            messages=messages,
+            max_tokens=self.settings.openai.max_tokens,
+            temperature=self.settings.openai.temperature,
+            top_p=1.0,
+            frequency_penalty=0.0,
+            presence_penalty=0.0,
+            stream=stream
+        )
+
+    def _retry_delay(self, attempt: int, error) -> float:
+        """Exponential backoff with full jitter, at least the server's Retry-After"""
+        delay = self.settings.openai.retry_backoff_seconds * (2 ** attempt)
+        retry_after = getattr(getattr(error, 'response', None), 'headers', {}).get('retry-after')
+        if retry_after:
+            try:
+                return max(random.uniform(0, delay), float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, delay)
+
+    def _create(self, **request):
+        """chat.completions.create, retried on RateLimitError"""
+        import openai
+
+        attempt = 0
+        while True:
+            try:
+                return self.client.chat.completions.create(**request)
+            except openai.RateLimitError as e:
+                if attempt >= self.settings.openai.max_retries:
+                    raise
+                self._sleep(self._retry_delay(attempt, e))
+                attempt += 1
+
+    def _error_message(self, error: Exception) -> str:
+        import openai
+
+        if isinstance(error, openai.RateLimitError):
+            return (f"OpenAI is rate limiting requests (still limited after "
+                    f"{self.settings.openai.max_retries} retries). Please try again shortly.")
+        if isinstance(error, openai.APIError):
+            return f"I'm having trouble connecting right now. Please try again later. (Error: {str(error)})"
+        return f"An unexpected error occurred: {str(error)}"
+
     def send_message(self, message: str, conversation_history: List[Dict] = None) -> str:
         """
         Send a message to OpenAI and get a response
-        
+
         Args:
             message: User's message
-            conversation_history: Previous conversation messages
-            
+            conversation_history: Previous conversation messages (default: the
+                connector's own history of recent turns)
+
         Returns:
             AI response as string
         """
+        if not self.client:
+            return "Error: OpenAI client not initialized. Please check your connection."
+
         try:
-            if not self.client:
-                return "Error: OpenAI client not initialized. Please check your connection."
-            
-            # Build messages list
-            messages = [self.system_message]
-            
-            # Add conversation history if provided
-            if conversation_history:
-                # Only include the last 10 messages to stay within token limits
-                recent_history = conversation_history[-10:]
-                for msg in recent_history:
-                    if msg["role"] in ["user", "assistant"]:
-                        messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
-            
-            # Add current user message
-            messages.append({"role": "user", "content": message})
-            
-            # Make API call
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7,
-                top_p=1.0,
-                frequency_penalty=0.0,
-                presence_penalty=0.0
+            response = self._create(**self._request(self._build_messages(message, conversation_history)))
+            reply = response.choices[0].message.content.strip()
+        except Exception as e:
+            return self._error_message(e)
+        self._remember(message, reply)
+        return reply
+
+    def stream_message(self, message: str, conversation_history: List[Dict] = None) -> Iterator[str]:
+        """
+        Send a message to OpenAI, yielding the response text as it is generated
+
+        Rate limits are retried before the first token; once text has been
+        yielded an error ends the stream with an error note.
+
+        Yields:
+            Text fragments (or one error message)
+        """
+        if not self.client:
+            yield "Error: OpenAI client not initialized. Please check your connection."
+            return
+
+        parts = []
+        try:
+            stream = self._create(**self._request(self._build_messages(message, conversation_history), stream=True))
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield ("\n\n" if parts else "") + self._error_message(e)
+            return
+        self._remember(message, "".join(parts).strip())
+
+    async def _acreate(self, client, **request):
+        import asyncio
+        import openai
+
+        attempt = 0
+        while True:
+            try:
+                return await client.chat.completions.create(**request)
+            except openai.RateLimitError as e:
+                if attempt >= self.settings.openai.max_retries:
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt, e))
+                attempt += 1
+
+    def _async_client(self):
+        if not self.api_key:
+            raise RuntimeError("OpenAI API key not found in environment variables")
+        return get_async_openai_client(self.settings)
+
+    async def asend_message(self, message: str, conversation_history: List[Dict] = None) -> str:
+        """Async send_message on the event loop's shared AsyncOpenAI client"""
+        try:
+            response = await self._acreate(
+                self._async_client(), **self._request(self._build_messages(message, conversation_history))
+            )
+            reply = response.choices[0].message.content.strip()
+        except Exception as e:
+            return self._error_message(e)
+        self._remember(message, reply)
+        return reply
+
+    async def astream_message(self, message: str, conversation_history: List[Dict] = None) -> AsyncIterator[str]:
+        """Async stream_message on the event loop's shared AsyncOpenAI client"""
+        parts = []
+        try:
+            stream = await self._acreate(
+                self._async_client(), **self._request(self._build_messages(message, conversation_history), stream=True)
             )
-            
-            return response.choices[0].message.content.strip()
-            
-        except openai.RateLimitError:
-            return "I'm currently experiencing high demand. Please try again in a moment."
-        except openai.APIError as e:
-            return f"I'm having trouble connecting right now. Please try again later. (Error: {str(e)})"
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
         except Exception as e:
-            return f"An unexpected error occurred: {str(e)}"
-    
+            yield ("\n\n" if parts else "") + self._error_message(e)
+            return
+        self._remember(message, "".join(parts).strip())
+
     def set_model(self, model: str):
         """
         Set the OpenAI model to use
-        
+
         Args:
             model: Model name (e.g., 'gpt-3.5-turbo', 'gpt-4')
         """
         self.model = model
-    
+
     def update_system_message(self, system_content: str):
         """
         Update the system message for the AI assistant
-        
+
         Args:
             system_content: New system message content
         """
         self.system_message["content"] = system_content
+
+    def clear_history(self):
+        """Forget the remembered conversation turns"""
+        self.history.clear()
@@ -0,0 +1,127 @@
+"""
+Multi-Package Shipments
+Groups identical boxes for FedEx multi-piece requests and plans local box consolidation
+"""
+
+from typing import Dict, Any, Optional, List, Tuple
+
+DEFAULT_DIMENSION = 12.0
+
+# FedEx Ground/Express per-package limits
+MAX_PACKAGE_WEIGHT_LBS = 150.0
+MAX_LENGTH_PLUS_GIRTH_IN = 165.0
+
+
+def _box(package: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    dimensions = package.get('dimensions', {})
+    return (
+        round(float(package['weight']), 2),
+        round(float(dimensions.get('length', DEFAULT_DIMENSION)), 2),
+        round(float(dimensions.get('width', DEFAULT_DIMENSION)), 2),
+        round(float(dimensions.get('height', DEFAULT_DIMENSION)), 2)
+    )
+
+
+def package_groups(shipment: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    The boxes of a shipment with identical boxes merged, in first-seen order.
+
+    A shipment without 'packages' is one box of shipment['weight'] and
+    shipment['dimensions'].
+
+    Returns:
+        List of dicts with keys: weight (per box), dimensions, count
+
+    Raises:
+        ValueError: For a box count below 1
+    """
+    packages = shipment.get('packages') or [
+        {'weight': shipment['weight'], 'dimensions': shipment.get('dimensions', {}), 'count': 1}
+    ]
+    groups: Dict[Tuple, Dict[str, Any]] = {}
+    for package in packages:
+        count = int(package.get('count', 1))
+        if count < 1:
+            raise ValueError(f"Package count must be at least 1, got {count}")
+        box = _box(package)
+        group = groups.get(box)
+        if group is None:
+            weight, length, width, height = box
+            groups[box] = {
+                'weight': weight,
+                'dimensions': {'length': length, 'width': width, 'height': height},
+                'count': count
+            }
+        else:
+            group['count'] += count
+    return list(groups.values())
+
+
+def package_count(shipment: Dict[str, Any]) -> int:
+    return sum(group['count'] for group in package_groups(shipment))
+
+
+def is_multi_piece(shipment: Dict[str, Any]) -> bool:
+    return bool(shipment.get('packages')) and package_count(shipment) > 1
+
+
+def total_weight(shipment: Dict[str, Any]) -> float:
+    return round(sum(group['weight'] * group['count'] for group in package_groups(shipment)), 2)
+
+
+def multi_package_shipment(packages: List[Dict[str, Any]], **fields: Any) -> Dict[str, Any]:
+    """
+    Shipment dict for several boxes (each with weight, dimensions and an optional count).
+
+    'weight' is the total weight and 'dimensions' those of the first box, so
+    code that only reads a single package still sees sensible values. A single
+    box comes back as a plain one-package shipment.
+    """
+    groups = package_groups({'packages': packages})
+    if len(groups) == 1 and groups[0]['count'] == 1:
+        return dict(fields, weight=groups[0]['weight'], dimensions=groups[0]['dimensions'])
+    return dict(
+        fields,
+        weight=total_weight({'packages': groups}),
+        dimensions=dict(groups[0]['dimensions']),
+        packages=groups
+    )
+
+
+def consolidate_packages(shipment: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    One box holding every box of the shipment, if FedEx would accept it.
+
+    Boxes are stacked on the largest footprint: length and width are the
+    largest box sides, height is the sum of the box heights (each box laid on
+    its largest face).
+
+    Returns:
+        Package dict (weight, dimensions) or None if the combined box is over
+        the per-package weight or size limits
+    """
+    groups = package_groups(shipment)
+    weight = total_weight(shipment)
+    length = width = height = 0.0
+    for group in groups:
+        sides = sorted(group['dimensions'].values(), reverse=True)
+        length = max(length, sides[0])
+        width = max(width, sides[1])
+        height += sides[2] * group['count']
+    length, width, height = sorted((length, width, height), reverse=True)
+    if weight > MAX_PACKAGE_WEIGHT_LBS or length + 2 * (width + height) > MAX_LENGTH_PLUS_GIRTH_IN:
+        return None
+    return {'weight': weight, 'dimensions': {'length': length, 'width': width, 'height': height}}
+
+
+def describe_packages(shipment: Dict[str, Any]) -> str:
+    """'9.0 lbs, 4.0x5.0x7.0 inches', or a per-box breakdown for multi-piece shipments"""
+    if not is_multi_piece(shipment):
+        dimensions = shipment['dimensions']
+        return f"{shipment['weight']} lbs, {dimensions['length']}x{dimensions['width']}x{dimensions['height']} inches"
+    boxes = ', '.join(
+        f"{group['count']} × {group['weight']} lbs "
+        f"({group['dimensions']['length']}x{group['dimensions']['width']}x{group['dimensions']['height']} in)"
+        for group in package_groups(shipment)
+    )
+    return f"{package_count(shipment)} boxes, {total_weight(shipment)} lbs total: {boxes}"
@@ -0,0 +1,311 @@
+"""
+Predictive Quote Prefetch
+Starts multi-service FedEx quotes as soon as a chat message or form holds a complete shipment
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+
+from .fedexAPI import get_fedex_service_rates
+from .quote_scheduler import PREFETCH, PRIORITIES, current_priority, with_priority
+from .settings import get_settings
+
+DEFAULT_PREFETCH_TTL_SECONDS = 120
+DEFAULT_PREFETCH_WORKERS = 4
+
+# Same defaults as the agent tools, so a prefetch matches the tool call the LLM will make
+DEFAULT_DIMENSION = 12.0
+
+# "913 Paseo Camarillo, Camarillo, CA 93010"
+_ADDRESS_PATTERN = re.compile(
+    r"(?P<street>\d+(?:(?!\b(?:from|to)\b)[A-Za-z0-9 .'#/-])*?),\s*(?P<city>[A-Za-z][A-Za-z .'-]*?),\s*"
+    r"(?P<state>[A-Za-z]{2})\.?\s+(?P<postal_code>\d{5})(?:-\d{4})?\b",
+    re.IGNORECASE
+)
+_WEIGHT_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*-?\s*(?:lbs?|pounds?)\b", re.IGNORECASE)
+_DIMENSIONS_PATTERN = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(?:in(?:ches)?|\")?\s*[x×*]\s*(\d+(?:\.\d+)?)\s*(?:in(?:ches)?|\")?\s*[x×*]\s*(\d+(?:\.\d+)?)",
+    re.IGNORECASE
+)
+_ROLE_PATTERN = re.compile(r"\b(from|to)\b\W*$", re.IGNORECASE)
+
+
+def parse_shipment_request(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Extract a complete shipment from free text, if the text holds one.
+
+    A shipment is complete when it has two full street addresses and a weight;
+    dimensions default to 12x12x12 like the agent tools.
+
+    Returns:
+        Dict with keys: origin, destination (street, city, state, postal_code),
+        weight, dimensions - or None
+    """
+    if not text:
+        return None
+
+    addresses = []
+    for match in _ADDRESS_PATTERN.finditer(text):
+        role = _ROLE_PATTERN.search(text[max(match.start() - 12, 0):match.start()])
+        addresses.append((
+            role.group(1).lower() if role else None,
+            {
+                'street': match.group('street').strip(),
+                'city': match.group('city').strip(),
+                'state': match.group('state').upper(),
+                'postal_code': match.group('postal_code')
+            }
+        ))
+    weight_match = _WEIGHT_PATTERN.search(text)
+    if len(addresses) < 2 or not weight_match:
+        return None
+
+    origin = next((address for role, address in addresses if role == 'from'), None)
+    destination = next((address for role, address in addresses if role == 'to'), None)
+    if origin is None or destination is None or origin is destination:
+        origin, destination = addresses[0][1], addresses[1][1]
+
+    dimensions = {'length': DEFAULT_DIMENSION, 'width': DEFAULT_DIMENSION, 'height': DEFAULT_DIMENSION}
+    dimensions_match = _DIMENSIONS_PATTERN.search(text)
+    if dimensions_match:
+        length, width, height = (float(value) for value in dimensions_match.groups())
+        dimensions = {'length': length, 'width': width, 'height': height}
+
+    return {
+        'origin': origin,
+        'destination': destination,
+        'weight': float(weight_match.group(1)),
+        'dimensions': dimensions
+    }
+
+
+def _shipment_key(
+    origin: Dict[str, Any],
+    destination: Dict[str, Any],
+    weight: float,
+    dimensions: Dict[str, float]
+) -> Tuple:
+    return (
+        str(origin.get('postal_code', origin.get('postalCode', ''))).strip(),
+        str(destination.get('postal_code', destination.get('postalCode', ''))).strip(),
+        round(float(weight), 2),
+        round(float(dimensions.get('length', DEFAULT_DIMENSION)), 2),
+        round(float(dimensions.get('width', DEFAULT_DIMENSION)), 2),
+        round(float(dimensions.get('height', DEFAULT_DIMENSION)), 2)
+    )
+
+
+def _fedex_address(address: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        'city': address.get('city', ''),
+        'state': address.get('state', ''),
+        'postal_code': address.get('postal_code', address.get('postalCode', ''))
+    }
+
+
+class _Prefetch:
+    """One shipment's fetch: its future and the most urgent priority class waiting on it"""
+    __slots__ = ('started_at', 'future', 'priority')
+
+    def __init__(self, priority: str):
+        self.started_at = time.monotonic()
+        self.future: Optional[Future] = None
+        self.priority = priority
+
+
+def _more_urgent(priority: str, than: str) -> bool:
+    return PRIORITIES.index(priority) < PRIORITIES.index(than)
+
+
+class QuotePrefetcher:
+    """
+    Registry of speculative multi-service FedEx quote fetches.
+
+    prefetch() starts the standard-service quotes for a shipment in the
+    background (once per shipment within the TTL); fetch() returns the
+    in-flight or completed result, so a later tool call or form submit for the
+    same shipment waits on the speculative request instead of issuing its own.
+
+    A caller joining at a more urgent priority class (a user waiting on a
+    prefetch) raises the fetch to its class: a fetch still queued for a worker
+    is cancelled and re-issued by the caller, and services of a running fetch
+    that were shed at the lower class are quoted again at the caller's.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_PREFETCH_WORKERS, ttl_seconds: float = DEFAULT_PREFETCH_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='quote-prefetch')
+        self._inflight: Dict[Tuple, _Prefetch] = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.reused = 0
+
+    def _usable(self, entry: Optional[_Prefetch]) -> bool:
+        if entry is None:
+            return False
+        if time.monotonic() - entry.started_at > self.ttl_seconds:
+            return False
+        future = entry.future
+        if future.cancelled():
+            return False
+        if future.done():
+            # Don't hand out a finished fetch in which every service failed
+            if future.exception() is not None:
+                return False
+            return any(result.get('success') for result in future.result().values())
+        return True
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [k for k, entry in self._inflight.items() if now - entry.started_at > self.ttl_seconds]:
+            del self._inflight[key]
+
+    def _join(self, key: Tuple, priority: str) -> Optional[Future]:
+        """
+        The usable fetch for key, raised to priority; None if there is none or
+        it was still queued and has been cancelled (call with the lock held)
+        """
+        entry = self._inflight.get(key)
+        if not self._usable(entry):
+            return None
+        if _more_urgent(priority, entry.priority):
+            entry.priority = priority
+            if entry.future.cancel():
+                del self._inflight[key]
+                return None
+        return entry.future
+
+    def _run(self, entry: _Prefetch, origin: Dict[str, Any], destination: Dict[str, Any], shipment: Dict[str, Any]):
+        """Quote the standard services at the entry's priority, re-quoting shed ones if it was raised meanwhile"""
+        priority = entry.priority
+        results = with_priority(priority, get_fedex_service_rates, origin, destination, shipment)
+        while _more_urgent(entry.priority, priority):
+            shed = [service_code for service_code, result in results.items() if result.get('shed')]
+            if not shed:
+                break
+            priority = entry.priority
+            results.update(with_priority(priority, get_fedex_service_rates, origin, destination, shipment, shed))
+        return results
+
+    def _start(
+        self,
+        key: Tuple,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        weight: float,
+        dimensions: Dict[str, float],
+        priority: str
+    ) -> Tuple[_Prefetch, tuple]:
+        """Register a new fetch for key (call with the lock held); returns the entry and _run's arguments"""
+        self._prune()
+        shipment = {
+            'weight': weight,
+            'dimensions': {
+                'length': dimensions.get('length', DEFAULT_DIMENSION),
+                'width': dimensions.get('width', DEFAULT_DIMENSION),
+                'height': dimensions.get('height', DEFAULT_DIMENSION)
+            }
+        }
+        entry = self._inflight[key] = _Prefetch(priority)
+        self.started += 1
+        return entry, (entry, _fedex_address(origin), _fedex_address(destination), shipment)
+
+    def prefetch(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        weight: float,
+        dimensions: Dict[str, float],
+        priority: str = PREFETCH
+    ) -> Future:
+        """
+        Start (or join) the standard-service quote fetch for a shipment, at
+        the given quote priority class (speculative fetches yield to quotes a
+        user is waiting for)
+
+        Returns:
+            Future resolving to the get_fedex_service_rates result
+        """
+        key = _shipment_key(origin, destination, weight, dimensions)
+        with self._lock:
+            future = self._join(key, priority)
+            if future is not None:
+                self.reused += 1
+                return future
+            entry, args = self._start(key, origin, destination, weight, dimensions, priority)
+            entry.future = self._executor.submit(self._run, *args)
+            return entry.future
+
+    def prefetch_text(self, text: str) -> Optional[Future]:
+        """Start a prefetch if the text contains a complete shipment"""
+        shipment = parse_shipment_request(text)
+        if shipment is None:
+            return None
+        return self.prefetch(shipment['origin'], shipment['destination'], shipment['weight'], shipment['dimensions'])
+
+    def lookup(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        weight: float,
+        dimensions: Dict[str, float]
+    ) -> Optional[Future]:
+        """
+        Return the in-flight or completed fetch for a shipment without
+        starting one, raised to the caller's priority (None when a fetch that
+        hadn't started was cancelled so the caller quotes at its own priority)
+        """
+        key = _shipment_key(origin, destination, weight, dimensions)
+        with self._lock:
+            return self._join(key, current_priority())
+
+    def fetch(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        weight: float,
+        dimensions: Dict[str, float],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the standard-service quotes for a shipment, reusing any prefetch.
+        Without one the quotes are fetched on the calling thread, at its
+        priority, rather than queued behind other prefetches (timeout only
+        applies to waiting on a prefetch).
+        """
+        key = _shipment_key(origin, destination, weight, dimensions)
+        with self._lock:
+            future = self._join(key, current_priority())
+            if future is not None:
+                self.reused += 1
+            else:
+                entry, args = self._start(key, origin, destination, weight, dimensions, current_priority())
+                entry.future = Future()
+                entry.future.set_running_or_notify_cancel()
+        if future is not None:
+            return future.result(timeout)
+        try:
+            results = self._run(*args)
+        except BaseException as e:
+            entry.future.set_exception(e)
+            raise
+        entry.future.set_result(results)
+        return results
+
+    def clear(self):
+        """Forget every prefetch, so the next fetch issues fresh requests"""
+        with self._lock:
+            self._inflight.clear()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# Shared process-wide prefetcher
+quote_prefetcher = QuotePrefetcher(
+    max_workers=get_settings().cache.prefetch_workers,
+    ttl_seconds=get_settings().cache.prefetch_ttl_seconds
+)
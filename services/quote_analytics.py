@@ -0,0 +1,147 @@
+"""
+Quote Analytics
+Dashboard queries (spend by lane, service mix, price drift) answered from the quote history's daily rollup
+"""
+
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+import pandas as pd
+
+from .fedexAPI import STANDARD_SERVICES
+from .quote_history import QuoteHistoryStore, get_quote_history
+
+SERVICE_NAMES = dict(STANDARD_SERVICES)
+DAILY_MEMO_MAX_ENTRIES = 32
+
+# (store path, since, until, service_type) -> (rollup version, frame)
+_daily_memo: Dict[Tuple, Tuple[int, pd.DataFrame]] = {}
+_memo_lock = threading.Lock()
+
+
+def _service_name(service_type: str) -> str:
+    return SERVICE_NAMES.get(service_type, service_type.replace('_', ' ').title())
+
+
+def daily_frame(
+    store: Optional[QuoteHistoryStore] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    service_type: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    The per-day/lane/service rollup as a DataFrame, re-read only when the
+    rollup has new quotes (store.rollup_version(), which also sees quotes
+    written by other worker processes).
+
+    Columns: day (datetime), lane ('930→955'), origin_zip3, destination_zip3,
+    service_type, zone, quote_count, amount_sum, amount_min, amount_max,
+    amount_per_lb_sum
+    """
+    store = store or get_quote_history()
+    key = (store.path, since, until, service_type)
+    version = store.rollup_version()
+    with _memo_lock:
+        entry = _daily_memo.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    df = pd.DataFrame(
+        store.daily_aggregates(since=since, until=until, service_type=service_type),
+        columns=[
+            'day', 'origin_zip3', 'destination_zip3', 'service_type', 'zone',
+            'quote_count', 'amount_sum', 'amount_min', 'amount_max', 'amount_per_lb_sum'
+        ]
+    )
+    df['day'] = pd.to_datetime(df['day'])
+    df['lane'] = df['origin_zip3'] + '→' + df['destination_zip3']
+    with _memo_lock:
+        if len(_daily_memo) >= DAILY_MEMO_MAX_ENTRIES:
+            _daily_memo.clear()
+        _daily_memo[key] = (version, df)
+    return df
+
+
+def spend_by_lane(
+    store: Optional[QuoteHistoryStore] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    top: int = 10
+) -> pd.DataFrame:
+    """Quoted spend per ZIP3 lane, largest first: lane, zone, quotes, total_quoted, avg_price, min_price, max_price"""
+    df = daily_frame(store, since, until)
+    lanes = df.groupby(['lane', 'zone'], as_index=False).agg(
+        quotes=('quote_count', 'sum'),
+        total_quoted=('amount_sum', 'sum'),
+        min_price=('amount_min', 'min'),
+        max_price=('amount_max', 'max')
+    )
+    lanes['avg_price'] = (lanes['total_quoted'] / lanes['quotes']).round(2)
+    lanes['total_quoted'] = lanes['total_quoted'].round(2)
+    return lanes.sort_values('total_quoted', ascending=False).head(top).reset_index(drop=True)
+
+
+def service_mix(
+    store: Optional[QuoteHistoryStore] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> pd.DataFrame:
+    """Quotes per service: service_type, display_name, quotes, share (percent), avg_price"""
+    df = daily_frame(store, since, until)
+    mix = df.groupby('service_type', as_index=False).agg(
+        quotes=('quote_count', 'sum'),
+        total_quoted=('amount_sum', 'sum')
+    )
+    mix['display_name'] = mix['service_type'].map(_service_name)
+    total = mix['quotes'].sum()
+    mix['share'] = (mix['quotes'] / total * 100).round(2) if total else 0.0
+    mix['avg_price'] = (mix['total_quoted'] / mix['quotes']).round(2)
+    return mix[['service_type', 'display_name', 'quotes', 'share', 'avg_price']].sort_values(
+        'quotes', ascending=False
+    ).reset_index(drop=True)
+
+
+def price_drift(
+    store: Optional[QuoteHistoryStore] = None,
+    service_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    freq: str = 'W'
+) -> pd.DataFrame:
+    """
+    Average quoted price per service and period (pandas frequency, e.g. 'D', 'W', 'M').
+
+    avg_price_per_lb (price over billable weight) separates rate changes from a
+    changing package mix; drift_pct is its change since the service's first period.
+
+    Columns: period, service_type, display_name, quotes, avg_price, avg_price_per_lb, drift_pct
+    """
+    df = daily_frame(store, since, until, service_type)
+    periods = df.assign(period=df['day'].dt.to_period(freq).dt.start_time).groupby(
+        ['period', 'service_type'], as_index=False
+    ).agg(
+        quotes=('quote_count', 'sum'),
+        amount_sum=('amount_sum', 'sum'),
+        amount_per_lb_sum=('amount_per_lb_sum', 'sum')
+    )
+    periods['display_name'] = periods['service_type'].map(_service_name)
+    periods['avg_price'] = (periods['amount_sum'] / periods['quotes']).round(2)
+    periods['avg_price_per_lb'] = (periods['amount_per_lb_sum'] / periods['quotes']).round(4)
+    first = periods.groupby('service_type')['avg_price_per_lb'].transform('first')
+    periods['drift_pct'] = ((periods['avg_price_per_lb'] / first - 1) * 100).round(2)
+    return periods[[
+        'period', 'service_type', 'display_name', 'quotes', 'avg_price', 'avg_price_per_lb', 'drift_pct'
+    ]]
+
+
+def quote_dashboard(
+    store: Optional[QuoteHistoryStore] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> Dict[str, Any]:
+    """Everything a quote-activity dashboard renders, in one call"""
+    return {
+        'spend_by_lane': spend_by_lane(store, since, until),
+        'service_mix': service_mix(store, since, until),
+        'price_drift': price_drift(store, since=since, until=until)
+    }
@@ -0,0 +1,315 @@
+"""
+FedEx Quote Cache
+In-process cache of FedEx rate replies plus the normalized quote records derived from them
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple, Iterator, Hashable, Callable
+
+from .packages import is_multi_piece, package_groups
+from .settings import get_settings
+
+DEFAULT_TTL_SECONDS = 15 * 60
+DEFAULT_STALE_TTL_SECONDS = 4 * 60 * 60
+DEFAULT_MAX_ENTRIES = 2048
+
+
+def _postal_code(address: Dict[str, Any]) -> str:
+    return str(address.get('postal_code', address.get('postalCode', ''))).strip()
+
+
+def _round(value: Any) -> float:
+    return round(float(value), 2)
+
+
+def quote_scope(source: str, account_number: Optional[str], options: Optional[Dict[str, Any]] = None) -> Tuple:
+    """
+    What besides the shipment shapes a carrier reply: the source (backend or
+    quote history label), the account, and request options such as
+    packaging_type and rate_request_type
+    """
+    return (source, account_number or '', tuple(sorted((key, str(value)) for key, value in (options or {}).items())))
+
+
+def make_quote_key(
+    origin: Dict[str, Any],
+    destination: Dict[str, Any],
+    shipment: Dict[str, Any],
+    scope: Tuple = ()
+) -> Tuple:
+    """
+    Build the cache key for a single-service rate request.
+
+    Carrier replies are keyed by the exact lane (postal codes and countries),
+    package, service, pickup type and ship date, so a reply is only ever
+    served for the request it answers; /quotes/batch de-duplicates on this
+    key too.
+
+    scope (see quote_scope) separates backends, accounts and request options
+    sharing one cache; the last element of the key.
+    """
+    dimensions = shipment.get('dimensions', {})
+    lane = (_postal_code(origin), origin.get('country', 'US'), _postal_code(destination), destination.get('country', 'US'))
+    service_type = shipment.get('service_type', 'FEDEX_GROUND')
+    if is_multi_piece(shipment):
+        # Multi-piece requests are keyed per box group and never served from single-box history
+        package_key = ('pieces',) + lane + (service_type,) + tuple(
+            (group['weight'], group['dimensions']['length'], group['dimensions']['width'],
+             group['dimensions']['height'], group['count'])
+            for group in package_groups(shipment)
+        )
+    else:
+        package_key = ('lane',) + lane + (
+            _round(shipment['weight']),
+            _round(dimensions.get('length', 0)),
+            _round(dimensions.get('width', 0)),
+            _round(dimensions.get('height', 0)),
+            service_type
+        )
+    return package_key + (
+        shipment.get('pickup_type', 'DROPOFF_AT_FEDEX_LOCATION'),
+        shipment.get('ship_date'),
+        tuple(scope)
+    )
+
+
+def extract_rates(fedex_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Pull the rate lines out of a FedEx rate reply.
+
+    Args:
+        fedex_data: The 'data' section of a successful get_fedex_freight_rate result
+
+    Returns:
+        List of dicts with keys: service_name, service_type, amount, currency, transit_time
+    """
+    rates = []
+    for rate in (fedex_data or {}).get('output', {}).get('rateReplyDetails', []):
+        if not rate.get('ratedShipmentDetails'):
+            continue
+        rate_detail = rate['ratedShipmentDetails'][0]
+        rates.append({
+            'service_name': rate.get('serviceName'),
+            'service_type': rate.get('serviceType'),
+            'amount': float(rate_detail.get('totalNetCharge', 0) or 0),
+            'currency': rate_detail.get('currency', 'USD'),
+            'transit_time': rate.get('operationalDetail', {}).get('transitTime', 'N/A')
+        })
+    return rates
+
+
+def normalize_quote(
+    origin: Dict[str, Any],
+    destination: Dict[str, Any],
+    shipment: Dict[str, Any],
+    fedex_data: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Turn a FedEx rate reply into flat quote records (one per returned rate).
+
+    Records carry the lane and package profile next to the price so they can be
+    used on their own, e.g. to train the offline rate estimator. Multi-piece
+    replies have no single package profile and produce no records.
+    """
+    if is_multi_piece(shipment):
+        return []
+    dimensions = shipment.get('dimensions', {})
+    requested_service = shipment.get('service_type', 'FEDEX_GROUND')
+    quoted_at = datetime.utcnow().isoformat()
+    records = []
+    for rate in extract_rates(fedex_data):
+        records.append({
+            'origin_postal_code': _postal_code(origin),
+            'destination_postal_code': _postal_code(destination),
+            'weight': float(shipment['weight']),
+            'length': float(dimensions.get('length', 0)),
+            'width': float(dimensions.get('width', 0)),
+            'height': float(dimensions.get('height', 0)),
+            'service_type': rate['service_type'] or requested_service,
+            'amount': rate['amount'],
+            'currency': rate['currency'],
+            'transit_time': rate['transit_time'],
+            'quoted_at': quoted_at
+        })
+    return records
+
+
+def build_rate_result(records: List[Dict[str, Any]], **extra: Any) -> Dict[str, Any]:
+    """
+    Rebuild a get_fedex_freight_rate style result from stored quote records.
+
+    The 'data' section mirrors the FedEx rateReplyDetails layout so existing
+    parsers handle it like a live reply.
+    """
+    rate_details = []
+    for record in records:
+        rate_details.append({
+            'serviceType': record['service_type'],
+            'ratedShipmentDetails': [{
+                'totalNetCharge': record['amount'],
+                'currency': record.get('currency', 'USD')
+            }],
+            'operationalDetail': {'transitTime': record.get('transit_time') or 'N/A'}
+        })
+    result = {
+        'success': True,
+        'data': {'output': {'rateReplyDetails': rate_details}},
+        'quotes': records,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+    result.update(extra)
+    return result
+
+
+class QuoteCache:
+    """
+    Thread-safe LRU cache of rate results with a freshness TTL.
+
+    Entries past their TTL are no longer served by get(). For another
+    stale_ttl_seconds lookup() still returns them, flagged stale, so callers
+    can answer at once and refresh in the background (stale-while-revalidate).
+    Older entries stay in the cache (until evicted) as training data for the
+    offline estimator.
+
+    Misses go to an optional shared tier (L2, a shared_cache.SharedStore seen
+    by every worker process) and then an optional backing tier (anything with
+    a load(key, max_age_seconds) method, e.g. the quote history store). Writes
+    go through to the shared tier, with their age, so every process applies
+    the same freshness.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        stale_ttl_seconds: float = 0.0
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._backing_factory: Optional[Callable[[], Any]] = None
+        self._shared_factory: Optional[Callable[[], Any]] = None
+        self.version = 0  # Bumped on every write so readers can detect new data
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.backing_hits = 0
+
+    def set_shared(self, shared_factory: Optional[Callable[[], Any]]):
+        """
+        Attach the shared tier (a factory returning a SharedStore, or None when
+        none is configured); called on first use like the backing tier
+        """
+        self._shared_factory = shared_factory
+
+    def _shared(self) -> Optional[Any]:
+        return self._shared_factory() if self._shared_factory is not None else None
+
+    def set_backing(self, backing_factory: Optional[Callable[[], Any]]):
+        """
+        Attach a backing tier. The factory is only called on the first miss, so
+        attaching a store does not open it at import time.
+        """
+        self._backing_factory = backing_factory
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key if it is still fresh"""
+        return self._lookup(key, 0.0)[0]
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Return (result, stale): a fresh result, else one at most stale_ttl_seconds
+        past its TTL with stale=True, else (None, False)
+        """
+        return self._lookup(key, self.stale_ttl_seconds)
+
+    def _lookup(self, key: Hashable, stale_seconds: float) -> Tuple[Optional[Dict[str, Any]], bool]:
+        with self._lock:
+            entry = self._entries.get(key)
+            age_seconds = time.monotonic() - entry[0] if entry is not None else None
+            if age_seconds is not None and age_seconds <= self.ttl_seconds + stale_seconds:
+                self._entries.move_to_end(key)
+                stale = age_seconds > self.ttl_seconds
+                if stale:
+                    self.stale_hits += 1
+                else:
+                    self.hits += 1
+                return entry[1], stale
+            self.misses += 1
+
+        max_age_seconds = self.ttl_seconds + stale_seconds
+        shared = self._shared()
+        if shared is not None:
+            entry = shared.get_result(key)
+            if entry is not None:
+                result, stored_at = entry
+                age_seconds = max(time.time() - stored_at, 0.0)
+                if age_seconds <= max_age_seconds:
+                    self.shared_hits += 1
+                    self.put(key, result, age_seconds=age_seconds, share=False)
+                    return result, age_seconds > self.ttl_seconds
+
+        if self._backing_factory is None:
+            return None, False
+        try:
+            result = self._backing_factory().load(key, max_age_seconds)
+        except Exception as e:
+            print(f"Error reading quote cache backing tier: {e}")
+            return None, False
+        if result is None:
+            return None, False
+        self.backing_hits += 1
+        try:
+            age_seconds = (datetime.utcnow() - datetime.fromisoformat(result['timestamp'])).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            age_seconds = 0.0
+        age_seconds = max(age_seconds, 0.0)
+        self.put(key, result, age_seconds=age_seconds)
+        return result, age_seconds > self.ttl_seconds
+
+    def put(self, key: Hashable, result: Dict[str, Any], age_seconds: float = 0.0, share: bool = True):
+        """
+        Store a successful rate result (age_seconds backdates results that are
+        already old); share=False keeps it out of the shared tier
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() - age_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.version += 1
+        shared = self._shared() if share else None
+        if shared is not None:
+            shared.put_result(
+                key, result, stored_at=time.time() - age_seconds,
+                ttl_seconds=self.ttl_seconds + self.stale_ttl_seconds - age_seconds
+            )
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the normalized quote records of every retained entry"""
+        with self._lock:
+            results = [entry[1] for entry in self._entries.values()]
+        for result in results:
+            yield from result.get('quotes', [])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.version += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared process-wide cache instance
+quote_cache = QuoteCache(
+    ttl_seconds=get_settings().cache.quote_ttl_seconds,
+    max_entries=get_settings().cache.quote_max_entries,
+    stale_ttl_seconds=get_settings().cache.quote_stale_ttl_seconds
+)
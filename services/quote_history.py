@@ -0,0 +1,526 @@
+"""
+Persistent Quote History Store
+SQLite (WAL mode) record of every normalized FedEx quote, with indexed lane and date lookups
+"""
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterator, Hashable
+
+from .quote_cache import build_rate_result
+from .settings import DEFAULT_HISTORY_PATH, Settings, get_settings
+from .zone_index import lane_zone, billable_weight
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL_SECONDS = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    quoted_at TEXT NOT NULL,
+    origin_postal_code TEXT NOT NULL,
+    destination_postal_code TEXT NOT NULL,
+    origin_zip3 TEXT NOT NULL,
+    destination_zip3 TEXT NOT NULL,
+    zone INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    length REAL NOT NULL,
+    width REAL NOT NULL,
+    height REAL NOT NULL,
+    billable_weight REAL NOT NULL,
+    service_type TEXT NOT NULL,
+    amount REAL NOT NULL,
+    currency TEXT NOT NULL,
+    transit_time TEXT,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_quotes_lane
+    ON quotes (origin_zip3, destination_zip3, service_type, billable_weight, quoted_at);
+CREATE INDEX IF NOT EXISTS idx_quotes_price_class
+    ON quotes (zone, billable_weight, service_type, quoted_at);
+CREATE INDEX IF NOT EXISTS idx_quotes_quoted_at
+    ON quotes (quoted_at);
+CREATE TABLE IF NOT EXISTS quote_daily (
+    day TEXT NOT NULL,
+    origin_zip3 TEXT NOT NULL,
+    destination_zip3 TEXT NOT NULL,
+    service_type TEXT NOT NULL,
+    zone INTEGER NOT NULL,
+    quote_count INTEGER NOT NULL,
+    amount_sum REAL NOT NULL,
+    amount_min REAL NOT NULL,
+    amount_max REAL NOT NULL,
+    amount_per_lb_sum REAL NOT NULL,
+    PRIMARY KEY (day, origin_zip3, destination_zip3, service_type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS aggregate_state (
+    name TEXT PRIMARY KEY,
+    last_quote_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_runs (
+    name TEXT NOT NULL,
+    run_at TEXT NOT NULL,
+    claimed_at TEXT NOT NULL,
+    PRIMARY KEY (name, run_at)
+) WITHOUT ROWID;
+"""
+
+# Folds quotes with last_id < id <= max_id into the per-day/lane/service rollup
+_FOLD_DAILY = """
+INSERT INTO quote_daily (
+    day, origin_zip3, destination_zip3, service_type, zone,
+    quote_count, amount_sum, amount_min, amount_max, amount_per_lb_sum
+)
+SELECT substr(quoted_at, 1, 10), origin_zip3, destination_zip3, service_type, MAX(zone),
+    COUNT(*), SUM(amount), MIN(amount), MAX(amount), SUM(amount / MAX(billable_weight, 1))
+FROM quotes WHERE id > ? AND id <= ?
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (day, origin_zip3, destination_zip3, service_type) DO UPDATE SET
+    quote_count = quote_count + excluded.quote_count,
+    amount_sum = amount_sum + excluded.amount_sum,
+    amount_min = MIN(amount_min, excluded.amount_min),
+    amount_max = MAX(amount_max, excluded.amount_max),
+    amount_per_lb_sum = amount_per_lb_sum + excluded.amount_per_lb_sum
+"""
+
+_DAILY_COLUMNS = (
+    "day, origin_zip3, destination_zip3, service_type, zone, "
+    "quote_count, amount_sum, amount_min, amount_max, amount_per_lb_sum"
+)
+
+_INSERT = """
+INSERT INTO quotes (
+    quoted_at, origin_postal_code, destination_postal_code, origin_zip3, destination_zip3, zone,
+    weight, length, width, height, billable_weight, service_type, amount, currency, transit_time, source
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_RECORD_COLUMNS = (
+    "origin_postal_code, destination_postal_code, weight, length, width, height, "
+    "service_type, amount, currency, transit_time, quoted_at"
+)
+
+_STOP = object()
+
+
+def _row_to_record(row: sqlite3.Row) -> Dict[str, Any]:
+    return {key: row[key] for key in row.keys()}
+
+
+def _fold_aggregates(conn: sqlite3.Connection) -> int:
+    """
+    Fold quotes added since the last fold into quote_daily. Must run inside a
+    write transaction so the watermark and the rollup move together.
+
+    Returns:
+        Number of quotes folded
+    """
+    row = conn.execute("SELECT last_quote_id FROM aggregate_state WHERE name = 'quote_daily'").fetchone()
+    last_id = row[0] if row else 0
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM quotes").fetchone()[0]
+    if max_id <= last_id:
+        return 0
+    conn.execute(_FOLD_DAILY, (last_id, max_id))
+    conn.execute(
+        "INSERT INTO aggregate_state (name, last_quote_id) VALUES ('quote_daily', ?) "
+        "ON CONFLICT (name) DO UPDATE SET last_quote_id = excluded.last_quote_id",
+        (max_id,)
+    )
+    return max_id - last_id
+
+
+def _cutoff(max_age_seconds: Optional[float]) -> str:
+    if max_age_seconds is None:
+        return ""
+    return (datetime.utcnow() - timedelta(seconds=max_age_seconds)).isoformat()
+
+
+class QuoteHistoryStore:
+    """
+    Append-only SQLite store of normalized quote records.
+
+    record() only enqueues; a background writer thread inserts records in
+    batched transactions so callers never wait on disk I/O. Reads use one
+    connection per thread and WAL mode, so they run alongside the writer.
+
+    Each batch also folds its quotes into quote_daily, a per-day, per-lane
+    (ZIP3 pair), per-service rollup, in the same transaction; a watermark
+    makes the fold pick up rows written by other processes or before the
+    rollup existed.
+    """
+
+    def __init__(
+        self,
+        path: Any = DEFAULT_HISTORY_PATH,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS
+    ):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.version = 0  # Bumped after every committed batch
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            _fold_aggregates(conn)
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="quote-history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # Writes
+
+    def record(self, records: List[Dict[str, Any]], source: str = "fedex_api"):
+        """
+        Queue normalized quote records for persistence (non-blocking).
+
+        Args:
+            records: Quote records as produced by quote_cache.normalize_quote
+            source: Where the quotes came from
+        """
+        if self._closed:
+            return
+        for record in records:
+            self._queue.put((record, source))
+
+    def _to_row(self, record: Dict[str, Any], source: str) -> tuple:
+        origin = str(record['origin_postal_code']).strip()
+        destination = str(record['destination_postal_code']).strip()
+        return (
+            record.get('quoted_at') or datetime.utcnow().isoformat(),
+            origin,
+            destination,
+            origin[:3],
+            destination[:3],
+            lane_zone(origin, destination),
+            record['weight'],
+            record['length'],
+            record['width'],
+            record['height'],
+            billable_weight(record['weight'], record['length'], record['width'], record['height']),
+            record['service_type'],
+            record['amount'],
+            record.get('currency', 'USD'),
+            record.get('transit_time'),
+            source
+        )
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._write_batch(conn, batch)
+                self.version += 1
+            except Exception as e:
+                print(f"Error writing quote history batch: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                break
+        conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[tuple]):
+        """Insert a batch in one transaction, skipping (and logging) records that can't be stored"""
+        rows = []
+        for record, source in batch:
+            try:
+                rows.append(self._to_row(record, source))
+            except Exception as e:
+                print(f"Skipping unstorable quote history record {record!r}: {e}")
+        with conn:
+            conn.execute("SAVEPOINT batch")
+            try:
+                conn.executemany(_INSERT, rows)
+            except sqlite3.IntegrityError:
+                # Undo the rows inserted before the failure, then go row by row in the same transaction
+                conn.execute("ROLLBACK TO batch")
+                for row in rows:
+                    try:
+                        conn.execute(_INSERT, row)
+                    except sqlite3.IntegrityError as e:
+                        print(f"Skipping unstorable quote history row {row!r}: {e}")
+            _fold_aggregates(conn)
+
+    def claim_run(self, name: str, run_at: str) -> bool:
+        """
+        Claim one scheduled run of a job (e.g. 'lane_warmup' at an ISO time)
+        for this process; False when another process on the database already
+        has it
+        """
+        conn = self._reader()
+        with conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO job_runs (name, run_at, claimed_at) VALUES (?, ?, ?)",
+                (name, run_at, datetime.utcnow().isoformat())
+            )
+        return cursor.rowcount == 1
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        if not self._closed:
+            self._queue.join()
+
+    def close(self):
+        """Flush pending records and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join(timeout=10)
+
+    # Reads
+
+    def lane_history(
+        self,
+        origin_postal_code: str,
+        destination_postal_code: str,
+        service_type: Optional[str] = None,
+        since: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Most recent quotes for a ZIP3 lane, newest first.
+
+        Args:
+            origin_postal_code: Origin ZIP (only the ZIP3 prefix is used)
+            destination_postal_code: Destination ZIP (only the ZIP3 prefix is used)
+            service_type: Restrict to one FedEx service
+            since: ISO timestamp lower bound
+            limit: Maximum number of rows
+        """
+        query = f"SELECT {_RECORD_COLUMNS} FROM quotes WHERE origin_zip3 = ? AND destination_zip3 = ?"
+        params: List[Any] = [str(origin_postal_code).strip()[:3], str(destination_postal_code).strip()[:3]]
+        if service_type:
+            query += " AND service_type = ?"
+            params.append(service_type)
+        if since:
+            query += " AND quoted_at >= ?"
+            params.append(since)
+        query += " ORDER BY quoted_at DESC LIMIT ?"
+        params.append(limit)
+        return [_row_to_record(row) for row in self._reader().execute(query, params)]
+
+    def quotes_between(self, start: str, end: str, service_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """All quotes with start <= quoted_at < end (ISO timestamps), oldest first"""
+        query = f"SELECT {_RECORD_COLUMNS} FROM quotes WHERE quoted_at >= ? AND quoted_at < ?"
+        params: List[Any] = [start, end]
+        if service_type:
+            query += " AND service_type = ?"
+            params.append(service_type)
+        query += " ORDER BY quoted_at"
+        return [_row_to_record(row) for row in self._reader().execute(query, params)]
+
+    def records(self, since: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate over stored quote records (optionally only those since an ISO timestamp)"""
+        query = f"SELECT {_RECORD_COLUMNS} FROM quotes"
+        params: List[Any] = []
+        if since:
+            query += " WHERE quoted_at >= ?"
+            params.append(since)
+        for row in self._reader().execute(query, params):
+            yield _row_to_record(row)
+
+    def popular_lanes(self, since: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        The most quoted lanes (postal codes, package and service, as the quote
+        cache keys them), most quoted first.
+
+        Returns:
+            The most recent quote record of each lane, plus quote_count
+        """
+        rows = self._reader().execute(
+            f"SELECT {_RECORD_COLUMNS}, quote_count FROM ("
+            "SELECT MAX(id) AS id, COUNT(*) AS quote_count FROM quotes WHERE quoted_at >= ? "
+            "GROUP BY origin_postal_code, destination_postal_code, weight, length, width, height, service_type "
+            "ORDER BY quote_count DESC LIMIT ?"
+            ") JOIN quotes USING (id) ORDER BY quote_count DESC, id DESC",
+            (since or "", limit)
+        )
+        return [_row_to_record(row) for row in rows]
+
+    def rollup_version(self) -> int:
+        """
+        Watermark of the quote_daily rollup (the last quote id folded into it);
+        moves when any process writes quotes, unlike self.version
+        """
+        row = self._reader().execute(
+            "SELECT last_quote_id FROM aggregate_state WHERE name = 'quote_daily'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def daily_aggregates(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        service_type: Optional[str] = None,
+        origin_postal_code: Optional[str] = None,
+        destination_postal_code: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rows of the quote_daily rollup, oldest day first.
+
+        Args:
+            since: First day included ('YYYY-MM-DD' or an ISO timestamp)
+            until: First day excluded
+            service_type: Restrict to one FedEx service
+            origin_postal_code: Restrict to an origin ZIP3 (prefix of the ZIP)
+            destination_postal_code: Restrict to a destination ZIP3 (prefix of the ZIP)
+        """
+        query = f"SELECT {_DAILY_COLUMNS} FROM quote_daily WHERE 1 = 1"
+        params: List[Any] = []
+        if since:
+            query += " AND day >= ?"
+            params.append(since[:10])
+        if until:
+            query += " AND day < ?"
+            params.append(until[:10])
+        if service_type:
+            query += " AND service_type = ?"
+            params.append(service_type)
+        if origin_postal_code:
+            query += " AND origin_zip3 = ?"
+            params.append(str(origin_postal_code).strip()[:3])
+        if destination_postal_code:
+            query += " AND destination_zip3 = ?"
+            params.append(str(destination_postal_code).strip()[:3])
+        query += " ORDER BY day"
+        return [_row_to_record(row) for row in self._reader().execute(query, params)]
+
+    def last_known_price(
+        self,
+        origin_postal_code: str,
+        destination_postal_code: str,
+        service_type: str,
+        weight: float,
+        length: float,
+        width: float,
+        height: float,
+        max_age_seconds: Optional[float] = None,
+        source: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Most recent quote for the same ZIP3 lane, service and billable weight
+        (from one source, e.g. 'fedex_api_v2', when given).
+
+        Deliberately approximate: this is the last-resort price when the
+        carrier can't be reached, where a neighbouring lane's price (flagged
+        stale by the caller) beats no price. Exact replies are served by
+        load(), which matches the exact lane and package.
+
+        Returns:
+            Quote record or None
+        """
+        query = (
+            f"SELECT {_RECORD_COLUMNS} FROM quotes "
+            "WHERE origin_zip3 = ? AND destination_zip3 = ? AND service_type = ? "
+            "AND billable_weight = ? AND quoted_at >= ?"
+        )
+        params = [
+            str(origin_postal_code).strip()[:3],
+            str(destination_postal_code).strip()[:3],
+            service_type,
+            billable_weight(weight, length, width, height),
+            _cutoff(max_age_seconds)
+        ]
+        if source is not None:
+            query += " AND source = ?"
+            params.append(source)
+        row = self._reader().execute(query + " ORDER BY quoted_at DESC LIMIT 1", params).fetchone()
+        return _row_to_record(row) if row else None
+
+    def load(self, key: Hashable, max_age_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Quote cache backing lookup: rebuild a rate result from the most recent
+        quote of the same exact lane, package and service, if it is recent enough.
+
+        Only domestic single-package entries for the default pickup type, ship
+        date and request options are served from history, and only from
+        quotes of the key's source (see quote_cache.quote_scope), so sandbox
+        and production prices never mix.
+        """
+        if not key or key[0] != 'lane' or key[-2] is not None or key[-3] != 'DROPOFF_AT_FEDEX_LOCATION':
+            return None
+        _, origin_postal_code, origin_country, destination_postal_code, destination_country = key[:5]
+        weight, length, width, height, service_type = key[5:10]
+        scope = key[-1]
+        if origin_country != 'US' or destination_country != 'US' or (scope and scope[2]):
+            return None
+        query = (
+            f"SELECT {_RECORD_COLUMNS} FROM quotes "
+            "WHERE origin_zip3 = ? AND destination_zip3 = ? AND service_type = ? AND billable_weight = ? "
+            "AND origin_postal_code = ? AND destination_postal_code = ? "
+            "AND weight = ? AND length = ? AND width = ? AND height = ? AND quoted_at >= ?"
+        )
+        params = [
+            origin_postal_code[:3], destination_postal_code[:3], service_type,
+            billable_weight(weight, length, width, height),
+            origin_postal_code, destination_postal_code,
+            weight, length, width, height, _cutoff(max_age_seconds)
+        ]
+        if scope:
+            query += " AND source = ?"
+            params.append(scope[0])
+        row = self._reader().execute(query + " ORDER BY quoted_at DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        return build_rate_result([_row_to_record(row)], timestamp=row['quoted_at'])
+
+
+def history_from_settings(settings: Settings) -> QuoteHistoryStore:
+    """Open a quote history store configured by settings.cache"""
+    return QuoteHistoryStore(
+        settings.cache.history_path,
+        batch_size=settings.cache.history_batch_size,
+        flush_interval=settings.cache.history_flush_interval_seconds
+    )
+
+
+@lru_cache(maxsize=1)
+def get_quote_history() -> QuoteHistoryStore:
+    """Get the shared quote history store (path from QUOTE_HISTORY_PATH, default data/quote_history.db)"""
+    return history_from_settings(get_settings())
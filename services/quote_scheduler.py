@@ -0,0 +1,239 @@
+"""
+Quote Scheduler
+Admission control for carrier calls: priority classes share the carrier quota by weighted fair queuing, and
+low-priority work is shed when it has waited too long
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+from .metrics import Metrics, metrics as shared_metrics
+from .settings import Settings
+
+# Priority classes, most urgent first
+INTERACTIVE = 'interactive'  # A user is waiting: chat tool calls, the quote form, /quotes
+PREFETCH = 'prefetch'  # Speculative or background work for users: prefetches, revalidations
+BATCH = 'batch'  # Bulk work: /quotes/batch, lane warm-up
+PRIORITIES = (INTERACTIVE, PREFETCH, BATCH)
+
+_priority: ContextVar[str] = ContextVar('quote_priority', default=INTERACTIVE)
+
+
+def current_priority() -> str:
+    """Priority class of quotes made from here (interactive unless set with quote_priority)"""
+    return _priority.get()
+
+
+@contextmanager
+def quote_priority(priority: str) -> Iterator[None]:
+    """Quote at the given priority class within the block"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown quote priority: {priority}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def with_priority(priority: str, function: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Call function at a priority class, e.g. executor.submit(with_priority,
+    current_priority(), ...), since worker threads don't inherit the caller's
+    """
+    with quote_priority(priority):
+        return function(*args, **kwargs)
+
+
+class QuoteShed(Exception):
+    """A low-priority quote waited past its class's target and was dropped"""
+
+    def __init__(self, priority: str, waited_seconds: float):
+        super().__init__(f"Quote shed under load ({priority} request queued {waited_seconds:.1f} s)")
+        self.priority = priority
+        self.waited_seconds = waited_seconds
+
+
+class _Waiter:
+    __slots__ = ('priority', 'finish_tag', 'sequence', 'enqueued_at', 'admitted')
+
+    def __init__(self, priority: str, finish_tag: float, sequence: int):
+        self.priority = priority
+        self.finish_tag = finish_tag
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+        self.admitted = False
+
+
+class QuoteScheduler:
+    """
+    Slots for concurrent carrier calls, handed out by priority class.
+
+    Waiting requests are served in order of their virtual finish time
+    (self-clocked weighted fair queuing): under contention each class gets
+    slots in proportion to its weight, so interactive quotes go ahead of a
+    large batch while the batch still uses whatever capacity is left.
+    reserved_slots are held back for interactive quotes, so a burst of
+    low-priority calls never occupies every slot.
+
+    Classes with a shed target wait at most that long; past it the request
+    raises QuoteShed, and new requests of the class are shed at once while
+    its oldest waiter is over the target.
+
+    Metrics, by priority: scheduler.admitted and scheduler.shed (counters),
+    scheduler.wait and scheduler.queue_depth (seen by each arriving request).
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        weights: Sequence[Tuple[str, float]] = ((INTERACTIVE, 8.0), (PREFETCH, 3.0), (BATCH, 1.0)),
+        shed_wait_seconds: Sequence[Tuple[str, float]] = ((PREFETCH, 2.0), (BATCH, 5.0)),
+        reserved_slots: int = 1,
+        metrics: Metrics = shared_metrics
+    ):
+        self.capacity = capacity
+        self.weights = {priority: 1.0 for priority in PRIORITIES}
+        self.weights.update(weights)
+        self.shed_wait_seconds = dict(shed_wait_seconds)
+        self.reserved_slots = min(max(reserved_slots, 0), capacity - 1)
+        self.metrics = metrics
+        self.in_flight = 0
+        self._in_flight_by_priority = {priority: 0 for priority in PRIORITIES}
+        self._waiting: List[_Waiter] = []
+        self._virtual_time = 0.0
+        self._last_finish = {priority: 0.0 for priority in PRIORITIES}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_settings(cls, settings: Settings, metrics: Metrics = shared_metrics) -> Optional["QuoteScheduler"]:
+        """Scheduler configured by settings.fedex, or None when max_concurrent_quotes is 0"""
+        fedex = settings.fedex
+        if fedex.max_concurrent_quotes <= 0:
+            return None
+        return cls(
+            fedex.max_concurrent_quotes,
+            weights=fedex.priority_weights,
+            shed_wait_seconds=fedex.shed_wait_seconds,
+            reserved_slots=fedex.interactive_reserved_slots,
+            metrics=metrics
+        )
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None) -> Iterator[None]:
+        """Hold one slot for the block (priority: default current_priority())"""
+        priority = self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def acquire(self, priority: Optional[str] = None) -> str:
+        """
+        Wait for a slot.
+
+        Returns:
+            The priority class the slot was taken for (pass it to release)
+
+        Raises:
+            QuoteShed: The class's shed target passed before a slot was free
+        """
+        priority = priority or current_priority()
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown quote priority: {priority}")
+        target = self.shed_wait_seconds.get(priority)
+        with self._condition:
+            depth = sum(1 for waiter in self._waiting if waiter.priority == priority)
+            self.metrics.observe('scheduler.queue_depth', depth, priority=priority)
+            if target is not None and self._oldest_wait(priority) > target:
+                self._shed(priority, 0.0)
+
+            start = max(self._virtual_time, self._last_finish[priority])
+            self._last_finish[priority] = start + 1.0 / self.weights[priority]
+            waiter = _Waiter(priority, self._last_finish[priority], next(self._sequence))
+            self._waiting.append(waiter)
+            self._dispatch()
+
+            deadline = waiter.enqueued_at + target if target is not None else None
+            while not waiter.admitted:
+                timeout = deadline - time.monotonic() if deadline is not None else None
+                if timeout is not None and timeout <= 0:
+                    self._withdraw(waiter)
+                    self._shed(priority, time.monotonic() - waiter.enqueued_at)
+                self._condition.wait(timeout)
+
+        self.metrics.increment('scheduler.admitted', priority=priority)
+        self.metrics.observe('scheduler.wait', time.monotonic() - waiter.enqueued_at, priority=priority)
+        return priority
+
+    def release(self, priority: str):
+        with self._condition:
+            self.in_flight -= 1
+            self._in_flight_by_priority[priority] -= 1
+            self._dispatch()
+
+    def _oldest_wait(self, priority: str) -> float:
+        enqueued = [waiter.enqueued_at for waiter in self._waiting if waiter.priority == priority]
+        return time.monotonic() - min(enqueued) if enqueued else 0.0
+
+    def _withdraw(self, waiter: _Waiter):
+        """
+        Remove a waiter that leaves unserved, giving back its share of the
+        class's virtual time so later requests of the class aren't pushed back
+        (call with the lock held)
+        """
+        self._waiting.remove(waiter)
+        cost = 1.0 / self.weights[waiter.priority]
+        for later in self._waiting:
+            if later.priority == waiter.priority and later.sequence > waiter.sequence:
+                later.finish_tag -= cost
+        self._last_finish[waiter.priority] -= cost
+
+    def _shed(self, priority: str, waited_seconds: float):
+        self.metrics.increment('scheduler.shed', priority=priority)
+        raise QuoteShed(priority, waited_seconds)
+
+    def _dispatch(self):
+        """Admit waiters, smallest finish tag first, while slots are free (call with the lock held)"""
+        admitted = False
+        while self._waiting and self.in_flight < self.capacity:
+            # Low-priority requests can't take the reserved slots
+            eligible = [
+                waiter for waiter in self._waiting
+                if waiter.priority == INTERACTIVE or self.in_flight < self.capacity - self.reserved_slots
+            ]
+            if not eligible:
+                break
+            waiter = min(eligible, key=lambda w: (w.finish_tag, w.sequence))
+            self._waiting.remove(waiter)
+            waiter.admitted = True
+            self._virtual_time = max(self._virtual_time, waiter.finish_tag)
+            self.in_flight += 1
+            self._in_flight_by_priority[waiter.priority] += 1
+            admitted = True
+        if admitted:
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per priority class: queued, in_flight, admitted, shed, p50/p95 wait (seconds)"""
+        with self._condition:
+            queued = {priority: 0 for priority in PRIORITIES}
+            for waiter in self._waiting:
+                queued[waiter.priority] += 1
+            in_flight = dict(self._in_flight_by_priority)
+        return {
+            priority: {
+                'queued': queued[priority],
+                'in_flight': in_flight[priority],
+                'admitted': self.metrics.counter('scheduler.admitted', priority=priority),
+                'shed': self.metrics.counter('scheduler.shed', priority=priority),
+                'p50_wait_seconds': self.metrics.percentile('scheduler.wait', 50, priority=priority),
+                'p95_wait_seconds': self.metrics.percentile('scheduler.wait', 95, priority=priority)
+            }
+            for priority in PRIORITIES
+        }
@@ -1,102 +1,35 @@
-import os
-import requests
-from dotenv import load_dotenv
+from functools import lru_cache
 
-load_dotenv()
+from .carrier_client import CarrierError, get_carrier_client
+from .fedex_payload import get_payload_template
+from .settings import load_settings
 
-FEDEX_CLIENT_ID = os.getenv("FEDEX_CLIENT_ID")
-FEDEX_CLIENT_SECRET = os.getenv("FEDEX_CLIENT_SECRET")
-FEDEX_ACCOUNT_NUMBER = os.getenv("FEDEX_ACCOUNT_NUMBER")
 
-def get_fedex_token():
-    url = "https://apis.fedex.com/oauth/token"
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": FEDEX_CLIENT_ID,
-        "client_secret": FEDEX_CLIENT_SECRET
-    }
-    response = requests.post(url, headers=headers, data=data)
-    response.raise_for_status()
-    return response.json()["access_token"]
+@lru_cache(maxsize=1)
+def _prod_settings():
+    # This module talks to the production v2 rate API whatever the active profile is
+    return load_settings('prod')
 
-def build_fedex_payload(origin, destination, weight_lbs, dimensions, packaging_type):
-    return {
-        "rateRequestControlParameters": {
-            "rateSortOrder": "COMMITASCENDING",
-            "returnTransitTimes": True,
-            "servicesNeededOnRateFailure": False
-        },
-        "requestedShipment": {
-            "shipper": {
-                "accountNumber": {
-                    "key": FEDEX_CLIENT_ID,
-                    "value": FEDEX_ACCOUNT_NUMBER
-                },
-                "address": {
-                    "streetLines": [origin.get("street", ""), origin.get("apt", "")],
-                    "city": origin["city"],
-                    "stateOrProvinceCode": origin["state"],
-                    "postalCode": origin["postalCode"],
-                    "countryCode": "US",
-                    "residential": False
-                }
-            },
-            "recipients": [{
-                "address": {
-                    "streetLines": [destination.get("street", ""), destination.get("apt", "")],
-                    "city": destination["city"],
-                    "stateOrProvinceCode": destination["state"],
-                    "postalCode": destination["postalCode"],
-                    "countryCode": "US",
-                    "residential": False
-                }
-            }],
-            "shipTimestamp": "2025-07-31",
-            "pickupType": "DROPOFF_AT_FEDEX_LOCATION",
-            "packagingType": packaging_type,
-            "shippingChargesPayment": {
-                "payor": {
-                    "responsibleParty": {
-                        "accountNumber": {
-                            "key": FEDEX_CLIENT_ID,
-                            "value": FEDEX_ACCOUNT_NUMBER
-                        },
-                        "address": {"countryCode": "US"}
-                    }
-                }
-            },
-            "requestedPackageLineItems": [{
-                "groupPackageCount": 1,
-                "physicalPackaging": packaging_type,
-                "insuredValue": {"currency": "USD", "amount": 0},
-                "weight": {"units": "LB", "value": weight_lbs},
-                "dimensions": {
-                    "length": dimensions["length"],
-                    "width": dimensions["width"],
-                    "height": dimensions["height"],
-                    "units": "IN"
-                }
-            }],
-            "preferredCurrency": "USD"
-        },
-        "carrierCodes": ["FDXG", "FDXE"],
-        "returnLocalizedDateTime": True,
-        "webSiteCountryCode": "US"
-    }
 
-def get_all_quotes(origin, destination, weight, dimensions, packaging_type):
-    token = get_fedex_token()
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {token}"
-    }
-    payload = build_fedex_payload(origin, destination, weight, dimensions, packaging_type)
+def get_fedex_token(settings=None):
+    token = get_carrier_client(settings or _prod_settings()).tokens.get()
+    if not token:
+        raise CarrierError("Failed to authenticate with FedEx API")
+    return token
 
-    response = requests.post(
-        "https://apis.fedex.com/rate/v2/rates/quotes",
-        headers=headers,
-        json=payload
+def build_fedex_payload(origin, destination, weight_lbs, dimensions, packaging_type, ship_date=None, settings=None):
+    fedex = (settings or _prod_settings()).fedex
+    template = get_payload_template(
+        "v2", fedex.account_number, client_id=fedex.client_id, packaging_type=packaging_type
     )
-    response.raise_for_status()
-    return response.json()
\ No newline at end of file
+    shipment = {"weight": weight_lbs, "dimensions": dimensions, "ship_date": ship_date}
+    return template.build(origin, destination, shipment)
+
+def get_all_quotes(origin, destination, weight, dimensions, packaging_type, settings=None):
+    client = get_carrier_client(settings or _prod_settings())
+    result = client.quote(
+        origin, destination, {"weight": weight, "dimensions": dimensions}, {"packaging_type": packaging_type}
+    )
+    if not result['success']:
+        raise CarrierError(result['error'])
+    return result['data']
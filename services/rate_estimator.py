@@ -0,0 +1,327 @@
+"""
+Offline FedEx Rate Estimator
+Instant rate estimates learned from previously quoted FedEx replies
+"""
+
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Iterable
+
+import numpy as np
+
+from .quote_history import QuoteHistoryStore, get_quote_history
+from .zone_index import lane_zone, billable_weight, UNKNOWN_ZONE
+
+# Services the estimator keeps tables for (the same services the tools quote, plus overnight)
+SERVICE_TYPES = (
+    'FEDEX_GROUND',
+    'GROUND_HOME_DELIVERY',
+    'FEDEX_EXPRESS_SAVER',
+    'FEDEX_2_DAY',
+    'FEDEX_2_DAY_AM',
+    'STANDARD_OVERNIGHT',
+    'PRIORITY_OVERNIGHT',
+    'FIRST_OVERNIGHT'
+)
+
+MIN_ZONE = 2
+MAX_ZONE = 9
+
+# Upper edge (lbs) of each billable-weight bucket
+WEIGHT_BREAKS = np.array([1, 2, 3, 4, 5, 7, 10, 15, 20, 30, 40, 50, 70, 100, 150], dtype=np.float32)
+
+# Relative spread applied when a table cell has too few samples to trust its variance
+MIN_RELATIVE_SPREAD = 0.05
+SPARSE_RELATIVE_SPREAD = 0.25
+SPARSE_SAMPLE_COUNT = 3
+# Extra uncertainty when borrowing prices from a neighbouring zone or extrapolating
+ZONE_STEP_PRICE_FACTOR = 0.08
+BORROWED_RELATIVE_SPREAD = 0.10
+
+
+class RateEstimator:
+    """
+    Lookup tables of observed FedEx prices by service, zone and billable weight.
+
+    Tables are small float32 NumPy arrays shaped (services, zones, weight buckets);
+    estimates interpolate along the weight axis, so a lookup takes microseconds.
+    """
+
+    def __init__(self):
+        shape = (len(SERVICE_TYPES), MAX_ZONE - MIN_ZONE + 1, len(WEIGHT_BREAKS))
+        self.counts = np.zeros(shape, dtype=np.uint32)
+        self.mean_price = np.zeros(shape, dtype=np.float32)
+        self.std_price = np.zeros(shape, dtype=np.float32)
+        self.mean_weight = np.zeros(shape, dtype=np.float32)
+        self._service_index = {service: i for i, service in enumerate(SERVICE_TYPES)}
+
+    @property
+    def samples(self) -> int:
+        return int(self.counts.sum())
+
+    def fit(self, records: Iterable[Dict[str, Any]]) -> "RateEstimator":
+        """
+        Rebuild the lookup tables from normalized quote records.
+
+        Args:
+            records: Quote records as produced by quote_cache.normalize_quote
+
+        Returns:
+            self
+        """
+        cells, prices, weights = [], [], []
+        for record in records:
+            service = self._service_index.get(record.get('service_type'))
+            if service is None or not record.get('amount'):
+                continue
+            zone = lane_zone(record['origin_postal_code'], record['destination_postal_code'])
+            if zone == UNKNOWN_ZONE:
+                continue
+            weight = billable_weight(record['weight'], record['length'], record['width'], record['height'])
+            cells.append((service, zone - MIN_ZONE, self._bucket(weight)))
+            prices.append(record['amount'])
+            weights.append(weight)
+
+        shape = self.counts.shape
+        counts = np.zeros(shape, dtype=np.float64)
+        price_sum = np.zeros(shape, dtype=np.float64)
+        price_sq_sum = np.zeros(shape, dtype=np.float64)
+        weight_sum = np.zeros(shape, dtype=np.float64)
+        if cells:
+            index = tuple(np.array(cells).T)
+            price_array = np.array(prices, dtype=np.float64)
+            np.add.at(counts, index, 1)
+            np.add.at(price_sum, index, price_array)
+            np.add.at(price_sq_sum, index, price_array ** 2)
+            np.add.at(weight_sum, index, np.array(weights, dtype=np.float64))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(counts > 0, price_sum / counts, 0.0)
+            variance = np.where(counts > 0, price_sq_sum / counts - mean ** 2, 0.0)
+            mean_weight = np.where(counts > 0, weight_sum / counts, 0.0)
+        self.counts = counts.astype(np.uint32)
+        self.mean_price = mean.astype(np.float32)
+        self.std_price = np.sqrt(np.clip(variance, 0, None)).astype(np.float32)
+        self.mean_weight = mean_weight.astype(np.float32)
+        return self
+
+    @staticmethod
+    def _bucket(weight: float) -> int:
+        return min(int(np.searchsorted(WEIGHT_BREAKS, weight, side='left')), len(WEIGHT_BREAKS) - 1)
+
+    def _nearest_zone_row(self, service: int, zone_index: int) -> Optional[int]:
+        zone_count = self.counts.shape[1]
+        for step in range(zone_count):
+            for candidate in (zone_index - step, zone_index + step):
+                if 0 <= candidate < zone_count and self.counts[service, candidate].any():
+                    return candidate
+        return None
+
+    def estimate(
+        self,
+        origin_postal_code: str,
+        destination_postal_code: str,
+        weight: float,
+        length: float = 12.0,
+        width: float = 12.0,
+        height: float = 12.0,
+        service_type: str = 'FEDEX_GROUND'
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Estimate the price of one FedEx service for a lane and package.
+
+        Returns:
+            Dict with keys: service_type, estimate, low, high, currency, zone,
+            billable_weight, samples, source - or None when there is no data
+            for the service yet
+        """
+        service = self._service_index.get(service_type)
+        if service is None:
+            return None
+
+        zone = lane_zone(origin_postal_code, destination_postal_code)
+        if zone == UNKNOWN_ZONE:
+            return None
+        weight_lbs = billable_weight(weight, length, width, height)
+        row = self._nearest_zone_row(service, zone - MIN_ZONE)
+        if row is None:
+            return None
+
+        populated = self.counts[service, row] > 0
+        x = self.mean_weight[service, row, populated]
+        prices = self.mean_price[service, row, populated]
+        spreads = self.std_price[service, row, populated]
+        counts = self.counts[service, row, populated]
+
+        estimate = float(np.interp(weight_lbs, x, prices))
+        spread = float(np.interp(weight_lbs, x, spreads))
+        samples = int(counts.sum())
+
+        relative_spread = MIN_RELATIVE_SPREAD
+        if samples < SPARSE_SAMPLE_COUNT:
+            relative_spread = SPARSE_RELATIVE_SPREAD
+        zone_steps = abs(row - (zone - MIN_ZONE))
+        if zone_steps:
+            # Prices rise with zone; adjust a borrowed row towards the requested zone
+            estimate *= 1 + ZONE_STEP_PRICE_FACTOR * (zone - MIN_ZONE - row)
+            relative_spread += BORROWED_RELATIVE_SPREAD * zone_steps
+        if weight_lbs < x[0] or weight_lbs > x[-1]:
+            relative_spread += BORROWED_RELATIVE_SPREAD
+        spread = max(spread, estimate * relative_spread)
+
+        return {
+            'service_type': service_type,
+            'estimate': round(estimate, 2),
+            'low': round(max(estimate - 1.96 * spread, 0.0), 2),
+            'high': round(estimate + 1.96 * spread, 2),
+            'currency': 'USD',
+            'zone': zone,
+            'billable_weight': weight_lbs,
+            'samples': samples,
+            'source': 'offline_estimate'
+        }
+
+    def estimate_services(
+        self,
+        origin_postal_code: str,
+        destination_postal_code: str,
+        weight: float,
+        length: float = 12.0,
+        width: float = 12.0,
+        height: float = 12.0,
+        service_types: Iterable[str] = ('FEDEX_GROUND', 'FEDEX_EXPRESS_SAVER', 'FEDEX_2_DAY')
+    ) -> List[Dict[str, Any]]:
+        """Estimate several services at once, skipping services without data"""
+        estimates = []
+        for service_type in service_types:
+            estimate = self.estimate(
+                origin_postal_code, destination_postal_code, weight, length, width, height, service_type
+            )
+            if estimate is not None:
+                estimates.append(estimate)
+        return estimates
+
+    def save(self, path: str):
+        """Persist the lookup tables as a compressed .npz file"""
+        np.savez_compressed(
+            path,
+            counts=self.counts,
+            mean_price=self.mean_price,
+            std_price=self.std_price,
+            mean_weight=self.mean_weight,
+            service_types=np.array(SERVICE_TYPES)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "RateEstimator":
+        """Load lookup tables written by save()"""
+        estimator = cls()
+        with np.load(path) as tables:
+            if tuple(tables['service_types']) != SERVICE_TYPES:
+                raise ValueError("Estimator tables were built for a different service list")
+            estimator.counts = tables['counts']
+            estimator.mean_price = tables['mean_price']
+            estimator.std_price = tables['std_price']
+            estimator.mean_weight = tables['mean_weight']
+        return estimator
+
+
+# How much history the shared estimator trains on, and how often it may refit
+TRAINING_WINDOW_DAYS = 90
+MIN_REFIT_INTERVAL_SECONDS = 30.0
+
+_estimator_lock = threading.Lock()
+# Keyed by the source object itself (weakly), so a freed source's id() can't pick up its estimator
+_estimators: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+def _fit(source: Any) -> RateEstimator:
+    if isinstance(source, QuoteHistoryStore):
+        since = (datetime.utcnow() - timedelta(days=TRAINING_WINDOW_DAYS)).isoformat()
+        return RateEstimator().fit(source.records(since=since))
+    return RateEstimator().fit(source.records())
+
+
+def _refit(source: Any, state: Dict[str, Any], version: Any):
+    """Fit on the source's current data and swap the new tables in"""
+    try:
+        estimator = _fit(source)
+    except Exception as e:
+        print(f"Error refitting rate estimator: {e}")
+        estimator = None
+    with _estimator_lock:
+        if estimator is not None:
+            state['estimator'] = estimator
+            state['version'] = version
+        state['refitting'] = False
+
+
+def get_rate_estimator(
+    source: Any = None,
+    min_refit_interval: float = MIN_REFIT_INTERVAL_SECONDS,
+    background: bool = True
+) -> RateEstimator:
+    """
+    Get a shared estimator for a quote source, refitting it when the source has new data.
+
+    Only the first fit of a source happens in the caller. Refits run on a
+    background thread (background=False: in the caller) while the previous
+    tables keep answering, so estimates never wait on a refit.
+
+    Args:
+        source: Anything with a 'version' counter and a records() iterator - the
+                quote history store (default) or a QuoteCache
+        min_refit_interval: Minimum seconds between refits of the same source
+        background: Refit on a background thread
+    """
+    if source is None:
+        source = get_quote_history()
+    now = time.monotonic()
+    with _estimator_lock:
+        state = _estimators.get(source)
+        if state is not None:
+            if (state['refitting'] or state['version'] == source.version
+                    or now - state['fitted_at'] < min_refit_interval):
+                return state['estimator']
+            state['refitting'] = True
+            state['fitted_at'] = now
+
+    version = source.version
+    if state is None:
+        state = {'estimator': _fit(source), 'version': version, 'fitted_at': now, 'refitting': False}
+        with _estimator_lock:
+            return _estimators.setdefault(source, state)['estimator']
+    if background:
+        current = state['estimator']
+        threading.Thread(target=_refit, args=(source, state, version), name='estimator-refit', daemon=True).start()
+        return current
+    _refit(source, state, version)
+    return state['estimator']
+
+
+def estimate_fedex_rates(
+    origin_postal_code: str,
+    destination_postal_code: str,
+    weight: float,
+    dimensions: Dict[str, float]
+) -> Dict[str, Any]:
+    """
+    Instant offline estimates for the standard FedEx services.
+
+    Returns:
+        Dictionary with 'estimates' (list of per-service estimates) and 'timestamp'
+    """
+    estimator = get_rate_estimator()
+    return {
+        'estimates': estimator.estimate_services(
+            origin_postal_code,
+            destination_postal_code,
+            weight,
+            dimensions.get('length', 12),
+            dimensions.get('width', 12),
+            dimensions.get('height', 12)
+        ),
+        'timestamp': datetime.utcnow().isoformat()
+    }
@@ -0,0 +1,308 @@
+"""
+Multi-Carrier Rate Shopping
+Fans one shipment out to several carrier adapters at once and collects the best options within a global deadline
+"""
+
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple, Iterator, Callable
+
+from .carrier_client import mock_rate
+from .fedexAPI import STANDARD_SERVICES, get_fedex_freight_rate
+from .prefetch import quote_prefetcher
+from .quote_cache import extract_rates
+from .settings import Settings, get_settings
+
+DEFAULT_TOP_N = 5
+DEFAULT_SHOP_WORKERS = 16
+
+_TRANSIT_WORDS = {'ONE': 1, 'TWO': 2, 'THREE': 3, 'FOUR': 4, 'FIVE': 5, 'SIX': 6, 'SEVEN': 7}
+
+# Used when the carrier reply has no transit time (the FedEx sandbox often omits it)
+FALLBACK_TRANSIT_DAYS = {
+    'FEDEX_GROUND': 4,
+    'FEDEX_EXPRESS_SAVER': 3,
+    'FEDEX_2_DAY': 2
+}
+
+
+def transit_days(transit_time: Any) -> Optional[int]:
+    """Business days from 'FOUR_DAYS', '4 business days' or 4; None if unknown"""
+    if isinstance(transit_time, (int, float)):
+        return int(transit_time)
+    text = str(transit_time or '').upper()
+    word = text.split('_')[0]
+    if word in _TRANSIT_WORDS:
+        return _TRANSIT_WORDS[word]
+    match = re.search(r'\d+', text)
+    return int(match.group()) if match else None
+
+
+def format_transit(days: Optional[int]) -> str:
+    if days is None:
+        return 'N/A'
+    return f"{days} business day{'s' if days != 1 else ''}"
+
+
+def _address(address: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        'street': address.get('street', ''),
+        'city': address.get('city', ''),
+        'state': address.get('state', ''),
+        'postal_code': str(address.get('postal_code', address.get('postalCode', ''))).strip()
+    }
+
+
+def _option(carrier: str, service_code: str, service_name: str, amount: float, currency: str,
+            transit_time: Any, source: str) -> Dict[str, Any]:
+    days = transit_days(transit_time)
+    if days is None:
+        days = FALLBACK_TRANSIT_DAYS.get(service_code)
+    return {
+        'carrier': carrier,
+        'service_code': service_code,
+        'service_name': service_name,
+        'amount': float(amount),
+        'currency': currency,
+        'transit_days': days,
+        'transit_time': format_transit(days),
+        'source': source
+    }
+
+
+class CarrierAdapter:
+    """One carrier in a rate shop: its services and how to quote one of them"""
+
+    name = 'carrier'
+    simulated = False
+
+    def services(self) -> List[Tuple[str, str]]:
+        """(service code, display name) pairs to quote"""
+        raise NotImplementedError
+
+    def quote(
+        self,
+        origin: Dict[str, str],
+        destination: Dict[str, str],
+        shipment: Dict[str, Any],
+        service_code: str,
+        service_name: str
+    ) -> Dict[str, Any]:
+        """
+        Returns:
+            Rate option dict, or {'error': message}
+        """
+        raise NotImplementedError
+
+
+class FedExAdapter(CarrierAdapter):
+    """FedEx through the carrier client, joining an in-flight prefetch when there is one"""
+
+    name = 'FedEx'
+
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings
+
+    def services(self):
+        return list(STANDARD_SERVICES)
+
+    def quote(self, origin, destination, shipment, service_code, service_name):
+        result = None
+        # Prefetches quote the default ship date with the shared settings
+        if self.settings is None and not shipment.get('ship_date'):
+            prefetched = quote_prefetcher.lookup(origin, destination, shipment['weight'], shipment['dimensions'])
+            if prefetched is not None:
+                result = prefetched.result().get(service_code)
+        if result is None:
+            result = get_fedex_freight_rate(
+                origin, destination, dict(shipment, service_type=service_code), settings=self.settings
+            )
+        if not result.get('success'):
+            return {'error': result.get('error', 'Unknown error')}
+        rates = extract_rates(result.get('data'))
+        if not rates:
+            return {'error': 'No rates returned'}
+        source = 'last_known_price' if result.get('stale') else 'cache' if result.get('cached') else 'live'
+        rate = rates[0]
+        return _option(self.name, service_code, service_name, rate['amount'], rate['currency'],
+                       rate['transit_time'], source)
+
+
+# Stand-in service -> (display name, FedEx service with a comparable price curve, price factor)
+STAND_IN_SERVICES = {
+    'ECONOMY_GROUND': ('Economy Ground', 'FEDEX_GROUND', 0.94),
+    'TWO_DAY': ('2-Day', 'FEDEX_2_DAY', 0.97),
+    'NEXT_DAY': ('Next Day', 'STANDARD_OVERNIGHT', 1.03),
+}
+
+
+class StandInCarrierAdapter(CarrierAdapter):
+    """
+    Local stand-in for a second carrier until a real integration exists.
+
+    Prices come from the offline mock tariff (scaled per service) after a
+    simulated API latency; results are marked as simulated.
+    """
+
+    simulated = True
+
+    def __init__(self, name: str = 'Stand-in Carrier', latency_seconds: float = 0.3):
+        self.name = name
+        self.latency_seconds = latency_seconds
+
+    def services(self):
+        return [(code, display_name) for code, (display_name, _, _) in STAND_IN_SERVICES.items()]
+
+    def quote(self, origin, destination, shipment, service_code, service_name):
+        time.sleep(self.latency_seconds)
+        _, reference_service, factor = STAND_IN_SERVICES[service_code]
+        dimensions = shipment['dimensions']
+        rate = mock_rate(
+            origin['postal_code'], destination['postal_code'], shipment['weight'],
+            dimensions['length'], dimensions['width'], dimensions['height'], reference_service
+        )
+        if rate is None:
+            return {'error': 'No rate for this service'}
+        amount, transit = rate
+        return _option(self.name, service_code, service_name, round(amount * factor, 2), 'USD',
+                       transit, 'simulated')
+
+
+def _result_set(
+    options: List[Dict[str, Any]],
+    errors: List[str],
+    pending: List[str],
+    requested: int,
+    started: float,
+    top_n: int,
+    timed_out: bool = False
+) -> Dict[str, Any]:
+    by_price = sorted(options, key=lambda option: option['amount'])
+    timed = [option for option in options if option['transit_days'] is not None]
+    return {
+        'options': by_price[:top_n],
+        'best_price': by_price[0] if by_price else None,
+        'best_transit': min(timed, key=lambda option: (option['transit_days'], option['amount'])) if timed else None,
+        'received': requested - len(pending),
+        'requested': requested,
+        'pending': list(pending),
+        'errors': list(errors),
+        'complete': not pending,
+        'timed_out': timed_out,
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+
+class RateShopper:
+    """
+    Concurrent rate shopping across carrier adapters.
+
+    Every (carrier, service) quote runs at once, so the wait is bounded by the
+    slowest quote that finishes within the deadline rather than by their sum.
+    Quotes still missing at the deadline are reported as pending.
+    """
+
+    def __init__(
+        self,
+        adapters: Optional[List[CarrierAdapter]] = None,
+        max_workers: int = DEFAULT_SHOP_WORKERS,
+        deadline_seconds: Optional[float] = None
+    ):
+        self.adapters = adapters if adapters is not None else [FedExAdapter(), StandInCarrierAdapter()]
+        self.deadline_seconds = deadline_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rate-shop')
+
+    def stream(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        weight: float,
+        dimensions: Dict[str, float],
+        top_n: int = DEFAULT_TOP_N,
+        deadline_seconds: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Shop all carriers, yielding the updated result set as each quote arrives.
+
+        The last result set yielded is final (complete, or timed out at the deadline).
+        """
+        started = time.monotonic()
+        if deadline_seconds is None:
+            deadline_seconds = self.deadline_seconds or get_settings().rate_shop_deadline_seconds
+        origin, destination = _address(origin), _address(destination)
+        shipment = {
+            'weight': float(weight),
+            'dimensions': {key: float(dimensions.get(key, 12.0)) for key in ('length', 'width', 'height')}
+        }
+
+        futures = {}
+        for adapter in self.adapters:
+            for service_code, service_name in adapter.services():
+                future = self._executor.submit(adapter.quote, origin, destination, shipment, service_code, service_name)
+                futures[future] = f"{adapter.name} {service_name}"
+
+        options: List[Dict[str, Any]] = []
+        errors: List[str] = []
+        pending = dict(futures)
+        if not futures:
+            yield _result_set(options, errors, [], 0, started, top_n)
+            return
+
+        try:
+            for future in as_completed(futures, timeout=max(started + deadline_seconds - time.monotonic(), 0)):
+                label = pending.pop(future)
+                try:
+                    option = future.result()
+                except Exception as e:
+                    option = {'error': str(e)}
+                if 'error' in option:
+                    errors.append(f"{label}: {option['error']}")
+                else:
+                    options.append(option)
+                yield _result_set(options, errors, pending.values(), len(futures), started, top_n)
+        except FuturesTimeout:
+            for future in pending:
+                future.cancel()
+            yield _result_set(options, errors, pending.values(), len(futures), started, top_n, timed_out=True)
+
+    def shop(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        weight: float,
+        dimensions: Dict[str, float],
+        top_n: int = DEFAULT_TOP_N,
+        deadline_seconds: Optional[float] = None,
+        on_update: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Shop all carriers and return the final result set.
+
+        Args:
+            origin: Address with city, state and postal_code (or postalCode)
+            destination: Address with city, state and postal_code (or postalCode)
+            weight: Package weight in pounds
+            dimensions: length, width, height in inches
+            top_n: Number of cheapest options to return
+            deadline_seconds: Global deadline (default: settings.rate_shop_deadline_seconds)
+            on_update: Called with each intermediate result set
+
+        Returns:
+            Dict with keys: options (top_n by price), best_price, best_transit,
+            received, requested, pending, errors, complete, timed_out, elapsed_seconds
+        """
+        result = None
+        for result in self.stream(origin, destination, weight, dimensions, top_n, deadline_seconds):
+            if on_update is not None:
+                on_update(result)
+        return result
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# Shared process-wide rate shopper (FedEx + stand-in carrier)
+rate_shopper = RateShopper()
@@ -0,0 +1,299 @@
+"""
+Application Settings
+One immutable, typed settings object loaded once at startup, with sandbox, prod and mock profiles
+"""
+
+import os
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from .config import load_env
+
+PROFILE_ENV_VAR = 'SHIPPING_AGENT_PROFILE'
+DEFAULT_PROFILE = 'sandbox'
+
+# FedEx's published sandbox test account
+FEDEX_SANDBOX_ACCOUNT_NUMBER = "740561073"
+
+DEFAULT_HISTORY_PATH = Path(__file__).resolve().parent.parent / "data" / "quote_history.db"
+DEFAULT_DASHBOARD_CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "dashboard_cache"
+
+
+@dataclass(frozen=True)
+class FedExSettings:
+    base_url: str
+    backend: str = 'fedex_v1'  # Carrier client backend: fedex_v1, fedex_v2 or mock
+    client_id: Optional[str] = None
+    client_secret: Optional[str] = None
+    account_number: Optional[str] = None
+    auth_timeout_seconds: float = 10.0
+    rate_timeout_seconds: float = 10.0
+    service_workers: int = 8  # Parallel service quotes per shipment
+    pool_size: int = 16  # Keep-alive connections to the carrier API
+    max_retries: int = 2  # For 429/5xx and connection errors
+    retry_backoff_seconds: float = 0.5
+    token_refresh_margin_seconds: float = 60.0
+    # Admission control for carrier calls (see services.quote_scheduler)
+    max_concurrent_quotes: int = 16  # Carrier calls in flight per process (0: unscheduled)
+    priority_weights: Tuple[Tuple[str, float], ...] = (('interactive', 8.0), ('prefetch', 3.0), ('batch', 1.0))
+    shed_wait_seconds: Tuple[Tuple[str, float], ...] = (('prefetch', 2.0), ('batch', 5.0))  # Others: never shed
+    interactive_reserved_slots: int = 1  # Slots only interactive quotes may take
+
+    @property
+    def auth_url(self) -> str:
+        return f"{self.base_url}/oauth/token"
+
+    @property
+    def rates_url(self) -> str:
+        return f"{self.base_url}/rate/v1/rates/quotes"
+
+    @property
+    def rates_v2_url(self) -> str:
+        return f"{self.base_url}/rate/v2/rates/quotes"
+
+    @property
+    def has_credentials(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+
+
+@dataclass(frozen=True)
+class OpenAISettings:
+    api_key: Optional[str] = None
+    backend: str = 'openai'  # 'openai' or 'fake' (local scripted model, see services.fake_llm)
+    model: str = "gpt-3.5-turbo"
+    temperature: float = 0.7
+    timeout_seconds: float = 30.0
+    connect_timeout_seconds: float = 5.0
+    max_retries: int = 3  # For rate limits (429)
+    retry_backoff_seconds: float = 1.0
+    max_tokens: int = 500
+    history_messages: int = 10  # Recent user/assistant messages sent with each chat request
+    fake_latency_seconds: float = 0.0  # Fake backend: time to first token
+    fake_tokens_per_second: float = 0.0  # Fake backend: generation speed (0: instant)
+    fake_script: Optional[str] = None  # Fake backend: JSON rules file
+    # Per-turn model routing (see services.model_router)
+    routing: bool = True
+    fast_model: Optional[str] = None  # Default: model
+    strong_model: str = "gpt-4o"
+    strong_routes: Tuple[str, ...] = ('tool',)  # Routes sent to the strong model
+    route_temperatures: Tuple[Tuple[str, float], ...] = (('tool', 0.0), ('clarification', 0.3))  # Others: temperature
+    fast_timeout_seconds: float = 15.0  # Strong model: timeout_seconds
+    # Hedged requests (see services.hedging): a second call when the first token is late
+    hedging: bool = False
+    hedge_percentile: float = 95.0  # Hedge after this percentile of recent first-token latency
+    hedge_delay_seconds: float = 2.0  # Until enough latency samples exist
+    hedge_min_delay_seconds: float = 0.25
+    hedge_budget: float = 0.1  # Hedges per call, at most (token bucket)
+    hedge_model: Optional[str] = None  # Default: the same model
+    hedge_base_url: Optional[str] = None  # Default: the same endpoint
+
+    @property
+    def is_fake(self) -> bool:
+        return self.backend == 'fake'
+
+
+@dataclass(frozen=True)
+class CacheSettings:
+    quote_ttl_seconds: float = 15 * 60
+    quote_stale_ttl_seconds: float = 4 * 60 * 60  # Served while refreshing in the background (0: off)
+    quote_max_entries: int = 2048
+    revalidate_workers: int = 2
+    # Cross-process tier for quotes and the FedEx token (see services.shared_cache):
+    # 'redis://host:6379/0' (comma-separated for several nodes) or 'sqlite:///path'
+    shared_cache_url: Optional[str] = None
+    shared_cache_timeout_seconds: float = 0.25
+    prefetch_ttl_seconds: float = 120
+    prefetch_workers: int = 4
+    history_path: str = str(DEFAULT_HISTORY_PATH)
+    history_batch_size: int = 200
+    history_flush_interval_seconds: float = 0.5
+    dashboard_cache_dir: str = str(DEFAULT_DASHBOARD_CACHE_DIR)  # Parsed spend uploads, keyed by content hash
+    # Scheduled re-quoting of the most quoted lanes (see services.lane_warmup)
+    warmup_times: Tuple[str, ...] = ('06:30',)  # Local HH:MM; empty: off
+    warmup_top_lanes: int = 50
+    warmup_lookback_days: int = 14
+    warmup_requests_per_minute: float = 30.0  # Carrier calls the warm-up may spend
+
+
+@dataclass(frozen=True)
+class Settings:
+    profile: str
+    fedex: FedExSettings
+    openai: OpenAISettings = field(default_factory=OpenAISettings)
+    cache: CacheSettings = field(default_factory=CacheSettings)
+    job_workers: int = 4
+    api_concurrency: int = 16  # Concurrent upstream calls per API worker
+    rate_shop_deadline_seconds: float = 8.0  # Global deadline for a multi-carrier rate shop
+    # HTTP record/replay (see services.cassette): record, replay or off; None picks replay when a cassette exists
+    cassette_mode: Optional[str] = None
+    cassette_latency_scale: float = 1.0  # Multiplier on recorded latencies when replaying
+
+    def with_overrides(self, **sections: Dict[str, Any]) -> "Settings":
+        """
+        Copy with some fields replaced, e.g.
+        settings.with_overrides(fedex={'rate_timeout_seconds': 3}, job_workers=8)
+        """
+        changes = {}
+        for name, value in sections.items():
+            if isinstance(value, dict):
+                changes[name] = replace(getattr(self, name), **value)
+            else:
+                changes[name] = value
+        return replace(self, **changes)
+
+
+def _env(name: str, default: Any = None) -> Any:
+    value = os.getenv(name)
+    return default if value in (None, '') else value
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(_env(name, default))
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(_env(name, default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = _env(name)
+    return default if value is None else value.strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def _env_list(name: str, default: Tuple[str, ...]) -> Tuple[str, ...]:
+    value = _env(name)
+    return default if value is None else tuple(item.strip() for item in value.split(',') if item.strip())
+
+
+def _env_float_map(name: str, default: Tuple[Tuple[str, float], ...]) -> Tuple[Tuple[str, float], ...]:
+    """'tool=0,clarification=0.3' -> (('tool', 0.0), ('clarification', 0.3))"""
+    return tuple(
+        (key.strip(), float(value))
+        for key, value in (item.split('=', 1) for item in _env_list(name, ()))
+    ) or default
+
+
+def _fedex_settings(profile: str) -> FedExSettings:
+    tuning = {
+        'auth_timeout_seconds': _env_float('FEDEX_AUTH_TIMEOUT_SECONDS', 10.0),
+        'rate_timeout_seconds': _env_float('FEDEX_RATE_TIMEOUT_SECONDS', 10.0),
+        'service_workers': _env_int('FEDEX_SERVICE_WORKERS', 8),
+        'pool_size': _env_int('FEDEX_POOL_SIZE', 16),
+        'max_retries': _env_int('FEDEX_MAX_RETRIES', 2),
+        'retry_backoff_seconds': _env_float('FEDEX_RETRY_BACKOFF_SECONDS', 0.5),
+        'token_refresh_margin_seconds': _env_float('FEDEX_TOKEN_REFRESH_MARGIN_SECONDS', 60.0),
+        'max_concurrent_quotes': _env_int('FEDEX_MAX_CONCURRENT_QUOTES', 16),
+        'priority_weights': _env_float_map(
+            'FEDEX_PRIORITY_WEIGHTS', (('interactive', 8.0), ('prefetch', 3.0), ('batch', 1.0))
+        ),
+        'shed_wait_seconds': _env_float_map('FEDEX_SHED_WAIT_SECONDS', (('prefetch', 2.0), ('batch', 5.0))),
+        'interactive_reserved_slots': _env_int('FEDEX_INTERACTIVE_RESERVED_SLOTS', 1),
+    }
+    if profile == 'prod':
+        return FedExSettings(
+            base_url=_env('FEDEX_BASE_URL', "https://apis.fedex.com"),
+            backend=_env('FEDEX_BACKEND', 'fedex_v2'),
+            client_id=_env('FEDEX_CLIENT_ID'),
+            client_secret=_env('FEDEX_CLIENT_SECRET'),
+            account_number=_env('FEDEX_ACCOUNT_NUMBER'),
+            **tuning
+        )
+    if profile == 'mock':
+        # Local stand-in for the FedEx API; no network or real credentials involved
+        return FedExSettings(
+            base_url=_env('FEDEX_BASE_URL', "http://127.0.0.1:8089"),
+            backend=_env('FEDEX_BACKEND', 'mock'),
+            client_id='mock-client',
+            client_secret='mock-secret',
+            account_number=FEDEX_SANDBOX_ACCOUNT_NUMBER,
+            **tuning
+        )
+    # The account number in .env may be a production account, so the sandbox
+    # uses FedEx's test account unless one is set explicitly
+    return FedExSettings(
+        base_url=_env('FEDEX_BASE_URL', "https://apis-sandbox.fedex.com"),
+        backend=_env('FEDEX_BACKEND', 'fedex_v1'),
+        client_id=_env('FEDEX_CLIENT_ID'),
+        client_secret=_env('FEDEX_CLIENT_SECRET'),
+        account_number=_env('FEDEX_SANDBOX_ACCOUNT_NUMBER', FEDEX_SANDBOX_ACCOUNT_NUMBER),
+        **tuning
+    )
+
+
+def load_settings(profile: Optional[str] = None) -> Settings:
+    """
+    Build settings from the environment (.env included).
+
+    Args:
+        profile: 'sandbox', 'prod' or 'mock' (default: SHIPPING_AGENT_PROFILE, else sandbox)
+
+    Returns:
+        Settings
+    """
+    load_env()
+    profile = (profile or _env(PROFILE_ENV_VAR, DEFAULT_PROFILE)).lower()
+    if profile not in ('sandbox', 'prod', 'mock'):
+        raise ValueError(f"Unknown settings profile: {profile}")
+
+    return Settings(
+        profile=profile,
+        fedex=_fedex_settings(profile),
+        openai=OpenAISettings(
+            api_key=_env('OPENAI_API_KEY'),
+            backend=_env('OPENAI_BACKEND', 'openai'),
+            model=_env('OPENAI_MODEL', "gpt-3.5-turbo"),
+            temperature=_env_float('OPENAI_TEMPERATURE', 0.7),
+            timeout_seconds=_env_float('OPENAI_TIMEOUT_SECONDS', 30.0),
+            connect_timeout_seconds=_env_float('OPENAI_CONNECT_TIMEOUT_SECONDS', 5.0),
+            max_retries=_env_int('OPENAI_MAX_RETRIES', 3),
+            fake_latency_seconds=_env_float('FAKE_LLM_LATENCY_SECONDS', 0.0),
+            fake_tokens_per_second=_env_float('FAKE_LLM_TOKENS_PER_SECOND', 0.0),
+            fake_script=_env('FAKE_LLM_SCRIPT'),
+            routing=_env_bool('OPENAI_ROUTING', True),
+            fast_model=_env('OPENAI_FAST_MODEL'),
+            strong_model=_env('OPENAI_STRONG_MODEL', "gpt-4o"),
+            strong_routes=_env_list('OPENAI_STRONG_ROUTES', ('tool',)),
+            route_temperatures=_env_float_map(
+                'OPENAI_ROUTE_TEMPERATURES', (('tool', 0.0), ('clarification', 0.3))
+            ),
+            fast_timeout_seconds=_env_float('OPENAI_FAST_TIMEOUT_SECONDS', 15.0),
+            hedging=_env_bool('OPENAI_HEDGING', False),
+            hedge_percentile=_env_float('OPENAI_HEDGE_PERCENTILE', 95.0),
+            hedge_delay_seconds=_env_float('OPENAI_HEDGE_DELAY_SECONDS', 2.0),
+            hedge_min_delay_seconds=_env_float('OPENAI_HEDGE_MIN_DELAY_SECONDS', 0.25),
+            hedge_budget=_env_float('OPENAI_HEDGE_BUDGET', 0.1),
+            hedge_model=_env('OPENAI_HEDGE_MODEL'),
+            hedge_base_url=_env('OPENAI_HEDGE_BASE_URL')
+        ),
+        cache=CacheSettings(
+            quote_ttl_seconds=_env_float('QUOTE_CACHE_TTL_SECONDS', 15 * 60),
+            quote_stale_ttl_seconds=_env_float('QUOTE_STALE_TTL_SECONDS', 4 * 60 * 60),
+            quote_max_entries=_env_int('QUOTE_CACHE_MAX_ENTRIES', 2048),
+            revalidate_workers=_env_int('QUOTE_REVALIDATE_WORKERS', 2),
+            shared_cache_url=_env('SHARED_CACHE_URL'),
+            shared_cache_timeout_seconds=_env_float('SHARED_CACHE_TIMEOUT_SECONDS', 0.25),
+            prefetch_ttl_seconds=_env_float('PREFETCH_TTL_SECONDS', 120),
+            prefetch_workers=_env_int('PREFETCH_WORKERS', 4),
+            history_path=_env('QUOTE_HISTORY_PATH', str(DEFAULT_HISTORY_PATH)),
+            history_batch_size=_env_int('QUOTE_HISTORY_BATCH_SIZE', 200),
+            history_flush_interval_seconds=_env_float('QUOTE_HISTORY_FLUSH_SECONDS', 0.5),
+            dashboard_cache_dir=_env('DASHBOARD_CACHE_DIR', str(DEFAULT_DASHBOARD_CACHE_DIR)),
+            warmup_times=_env_list('WARMUP_TIMES', ('06:30',)),
+            warmup_top_lanes=_env_int('WARMUP_TOP_LANES', 50),
+            warmup_lookback_days=_env_int('WARMUP_LOOKBACK_DAYS', 14),
+            warmup_requests_per_minute=_env_float('WARMUP_REQUESTS_PER_MINUTE', 30.0)
+        ),
+        job_workers=_env_int('JOB_WORKERS', 4),
+        api_concurrency=_env_int('API_CONCURRENCY', 16),
+        rate_shop_deadline_seconds=_env_float('RATE_SHOP_DEADLINE_SECONDS', 8.0),
+        cassette_mode=_env('CASSETTE_MODE'),
+        cassette_latency_scale=_env_float('CASSETTE_LATENCY_SCALE', 1.0)
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Process-wide settings, loaded on first use"""
+    return load_settings()
@@ -0,0 +1,417 @@
+"""
+Shared Quote Cache
+Cross-process cache tier (Redis-compatible servers or a host-local SQLite file) for quote results and the FedEx token
+"""
+
+import bisect
+import hashlib
+import json
+import queue
+import socket
+import sqlite3
+import struct
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Any, Hashable, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from .metrics import Metrics, metrics as shared_metrics
+from .settings import Settings, get_settings
+
+NAMESPACE = 'shipping-agent:v1'
+RING_REPLICAS = 64  # Virtual nodes per server on the consistent-hash ring
+NODE_RETRY_SECONDS = 5.0  # A server that failed is skipped (treated as a miss) for this long
+POOL_SIZE = 8
+
+# Result encoding: version, stored_at (epoch seconds), timestamp, record count
+_HEADER = struct.Struct('<Bd')
+_NUMBERS = struct.Struct('<5d')  # weight, length, width, height, amount
+_COUNT = struct.Struct('<H')
+_TEXT_LENGTH = struct.Struct('<H')
+_FORMAT_VERSION = 1
+_TEXT_FIELDS = (
+    'origin_postal_code', 'destination_postal_code', 'service_type', 'currency', 'transit_time', 'quoted_at'
+)
+
+
+def key_digest(key: Hashable, kind: str = 'quote') -> str:
+    """
+    Process- and host-independent name for a cache key (Python's hash() is
+    salted per process): a digest of the key's canonical JSON form
+    """
+    canonical = json.dumps(key, separators=(',', ':'), default=str)
+    return f"{NAMESPACE}:{kind}:{hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()}"
+
+
+def _pack_text(value: Any) -> bytes:
+    data = ('' if value is None else str(value)).encode()
+    return _TEXT_LENGTH.pack(len(data)) + data
+
+
+def _unpack_text(buffer: bytes, offset: int) -> Tuple[str, int]:
+    (length,) = _TEXT_LENGTH.unpack_from(buffer, offset)
+    offset += _TEXT_LENGTH.size
+    return buffer[offset:offset + length].decode(), offset + length
+
+
+def encode_result(result: Dict[str, Any], stored_at: float) -> Optional[bytes]:
+    """
+    Compact binary form of a rate result: its quote records (numbers as
+    doubles, strings length-prefixed) plus the service names of the reply.
+    Results without quote records (multi-piece) are not shared: None.
+    """
+    records = result.get('quotes') or []
+    if not records:
+        return None
+    names = {
+        rate.get('serviceType'): rate.get('serviceName')
+        for rate in (result.get('data') or {}).get('output', {}).get('rateReplyDetails', [])
+    }
+    parts = [_HEADER.pack(_FORMAT_VERSION, stored_at), _pack_text(result.get('timestamp')), _COUNT.pack(len(records))]
+    for record in records:
+        parts.append(_NUMBERS.pack(
+            record['weight'], record['length'], record['width'], record['height'], record['amount']
+        ))
+        parts.extend(_pack_text(record.get(field)) for field in _TEXT_FIELDS)
+        parts.append(_pack_text(names.get(record['service_type'])))
+    return b''.join(parts)
+
+
+def decode_result(payload: bytes) -> Tuple[Dict[str, Any], float]:
+    """(rate result, stored_at) from encode_result's bytes"""
+    from .quote_cache import build_rate_result
+
+    version, stored_at = _HEADER.unpack_from(payload, 0)
+    if version != _FORMAT_VERSION:
+        raise ValueError(f"Unknown shared cache format: {version}")
+    timestamp, offset = _unpack_text(payload, _HEADER.size)
+    (count,) = _COUNT.unpack_from(payload, offset)
+    offset += _COUNT.size
+    records, names = [], []
+    for _ in range(count):
+        weight, length, width, height, amount = _NUMBERS.unpack_from(payload, offset)
+        offset += _NUMBERS.size
+        record = {'weight': weight, 'length': length, 'width': width, 'height': height, 'amount': amount}
+        for field in _TEXT_FIELDS:
+            record[field], offset = _unpack_text(payload, offset)
+        record['transit_time'] = record['transit_time'] or None
+        name, offset = _unpack_text(payload, offset)
+        records.append(record)
+        names.append(name or None)
+    result = build_rate_result(records, timestamp=timestamp)
+    for rate, name in zip(result['data']['output']['rateReplyDetails'], names):
+        if name:
+            rate['serviceName'] = name
+    return result, stored_at
+
+
+# Backends: get/set/add/delete on bytes with a TTL, expired entries never returned
+
+
+class RespConnection:
+    """One connection to a Redis-compatible server (RESP2, the commands used here only)"""
+
+    def __init__(self, host: str, port: int, db: int, password: Optional[str], timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.command('AUTH', password)
+        if db:
+            self.command('SELECT', db)
+
+    def command(self, *args: Any) -> Any:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.sock.sendall(b''.join(parts))
+        return self._reply()
+
+    def _reply(self) -> Any:
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode()
+        if kind == b'-':
+            raise RuntimeError(body.decode())
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            return [self._reply() for _ in range(int(body))]
+        raise ConnectionError(f"Unexpected reply: {line!r}")
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class _RespNode:
+    """Connection pool for one server; failures take it out of rotation for NODE_RETRY_SECONDS"""
+
+    def __init__(self, url: str, timeout: float):
+        parsed = urlparse(url)
+        self.url = url
+        self.address = (parsed.hostname or '127.0.0.1', parsed.port or 6379)
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = parsed.password
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[RespConnection]" = queue.LifoQueue(maxsize=POOL_SIZE)
+        self._down_until = 0.0
+
+    def command(self, *args: Any) -> Any:
+        if time.monotonic() < self._down_until:
+            raise ConnectionError(f"{self.url} is marked down")
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = None
+        try:
+            if connection is None:
+                connection = RespConnection(*self.address, self.db, self.password, self.timeout)
+            reply = connection.command(*args)
+        except RuntimeError:
+            # An error reply leaves an established connection usable
+            if connection is not None:
+                self._release(connection)
+            raise
+        except (OSError, ConnectionError):
+            if connection is not None:
+                connection.close()
+            self._down_until = time.monotonic() + NODE_RETRY_SECONDS
+            raise
+        self._release(connection)
+        return reply
+
+    def _release(self, connection: RespConnection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class RedisBackend:
+    """
+    Redis-compatible servers (Redis, Valkey, KeyDB, ...), keys spread over
+    several servers by a consistent-hash ring so adding a node moves ~1/N keys
+    """
+
+    def __init__(self, urls: Sequence[str], timeout: float = 0.25):
+        self.nodes = [_RespNode(url, timeout) for url in urls]
+        self._ring: List[Tuple[int, int]] = sorted(
+            (self._hash(f"{node.url}#{replica}"), index)
+            for index, node in enumerate(self.nodes)
+            for replica in range(RING_REPLICAS)
+        )
+        self._points = [point for point, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+    def node_for(self, key: str) -> _RespNode:
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._ring)
+        return self.nodes[self._ring[index][1]]
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.node_for(key).command('GET', key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: float):
+        self.node_for(key).command('SET', key, value, 'PX', max(int(ttl_seconds * 1000), 1))
+
+    def add(self, key: str, value: bytes, ttl_seconds: float) -> bool:
+        """Set only if absent (a short cross-process lock)"""
+        return self.node_for(key).command('SET', key, value, 'PX', max(int(ttl_seconds * 1000), 1), 'NX') == 'OK'
+
+    def delete(self, key: str):
+        self.node_for(key).command('DEL', key)
+
+    def close(self):
+        for node in self.nodes:
+            node.close()
+
+
+class SQLiteBackend:
+    """
+    Host-local tier for several worker processes on one machine: a WAL-mode
+    SQLite file (put it on /dev/shm to keep it in shared memory)
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS shared_cache ("
+        "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID"
+    )
+    PURGE_EVERY = 512  # Writes between sweeps of expired entries
+
+    def __init__(self, path: str, timeout: float = 0.25):
+        self.path = str(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        self._connect().execute(self._SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connect().execute(
+            "SELECT value FROM shared_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key: str, value: bytes, ttl_seconds: float):
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO shared_cache (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, value, time.time() + ttl_seconds)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM shared_cache WHERE expires_at <= ?", (time.time(),))
+
+    def add(self, key: str, value: bytes, ttl_seconds: float) -> bool:
+        conn = self._connect()
+        now = time.time()
+        cursor = conn.execute(
+            "INSERT INTO shared_cache (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE shared_cache.expires_at <= ?",
+            (key, value, now + ttl_seconds, now)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str):
+        self._connect().execute("DELETE FROM shared_cache WHERE key = ?", (key,))
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class SharedStore:
+    """
+    Quote results and tokens on a shared backend.
+
+    Every operation is best effort: a backend error counts as a miss (and in
+    shared_cache.errors) so an unavailable tier only costs a local cache miss.
+    """
+
+    def __init__(self, backend: Any, metrics: Metrics = shared_metrics):
+        self.backend = backend
+        self.metrics = metrics
+
+    def _call(self, method: str, *args: Any) -> Any:
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception as e:
+            self.metrics.increment('shared_cache.errors', operation=method)
+            print(f"Shared cache {method} failed: {e}")
+            return None
+
+    def get_result(self, key: Hashable) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(rate result, stored_at epoch seconds) or None"""
+        payload = self._call('get', key_digest(key))
+        if payload is None:
+            self.metrics.increment('shared_cache.misses')
+            return None
+        try:
+            decoded = decode_result(payload)
+        except (ValueError, struct.error, UnicodeDecodeError) as e:
+            self.metrics.increment('shared_cache.errors', operation='decode')
+            print(f"Shared cache entry unreadable: {e}")
+            return None
+        self.metrics.increment('shared_cache.hits')
+        return decoded
+
+    def put_result(self, key: Hashable, result: Dict[str, Any], stored_at: float, ttl_seconds: float):
+        payload = encode_result(result, stored_at)
+        if payload is not None and ttl_seconds > 0:
+            self._call('set', key_digest(key), payload, ttl_seconds)
+
+    def get_token(self, name: Hashable) -> Optional[Tuple[str, float]]:
+        """(token, expires_at epoch seconds) or None"""
+        payload = self._call('get', key_digest(name, 'token'))
+        if payload is None:
+            return None
+        try:
+            token, expires_at = json.loads(payload)
+        except ValueError:
+            return None
+        return (token, expires_at) if expires_at > time.time() else None
+
+    def put_token(self, name: Hashable, token: str, expires_at: float):
+        ttl_seconds = expires_at - time.time()
+        if ttl_seconds > 0:
+            self._call('set', key_digest(name, 'token'), json.dumps([token, expires_at]).encode(), ttl_seconds)
+
+    def delete_token(self, name: Hashable, token: Optional[str] = None):
+        """Forget the shared token (only if it is still the given one)"""
+        current = self.get_token(name)
+        if current is not None and (token is None or current[0] == token):
+            self._call('delete', key_digest(name, 'token'))
+
+    def lock(self, name: Hashable, ttl_seconds: float) -> bool:
+        """Best-effort cross-process lock that expires on its own"""
+        return bool(self._call('add', key_digest(name, 'lock'), b'1', ttl_seconds))
+
+    def unlock(self, name: Hashable):
+        self._call('delete', key_digest(name, 'lock'))
+
+    def close(self):
+        self._call('close')
+
+
+def open_backend(url: str, timeout: float = 0.25) -> Any:
+    """
+    Backend for a URL: 'redis://[:password@]host:port/db' (several, comma
+    separated, form one consistent-hash ring; 'rediss' is not supported) or
+    'sqlite:///path/to/cache.db'
+    """
+    urls = [part.strip() for part in url.split(',') if part.strip()]
+    schemes = {urlparse(part).scheme for part in urls}
+    if schemes == {'redis'}:
+        return RedisBackend(urls, timeout=timeout)
+    if schemes == {'sqlite'} and len(urls) == 1:
+        return SQLiteBackend(urlparse(urls[0]).path, timeout=timeout)
+    raise ValueError(f"Unsupported shared cache URL: {url}")
+
+
+def get_shared_store(settings: Optional[Settings] = None) -> Optional[SharedStore]:
+    """Shared store configured by settings.cache.shared_cache_url (None when unset)"""
+    cache = (settings or get_settings()).cache
+    if not cache.shared_cache_url:
+        return None
+    return _shared_store(cache.shared_cache_url, cache.shared_cache_timeout_seconds)
+
+
+@lru_cache(maxsize=4)
+def _shared_store(url: str, timeout: float) -> SharedStore:
+    return SharedStore(open_backend(url, timeout))
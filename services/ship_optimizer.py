@@ -0,0 +1,319 @@
+"""
+Ship Date and Service Optimizer
+Searches ship date x service combinations against a delivery deadline and returns the cost/arrival Pareto frontier
+"""
+
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_for
+from functools import partial
+from datetime import date, timedelta
+from typing import Dict, Any, Optional, List, Tuple, Callable, Hashable, Union
+
+from .quote_cache import make_quote_key
+from .rate_shopping import CarrierAdapter, FedExAdapter, _address
+from .settings import get_settings
+
+DEFAULT_HORIZON_DAYS = 5  # Ship dates searched (business days) when there is no delivery deadline
+DEFAULT_OPTIMIZER_WORKERS = 16
+# How much cheaper a service could plausibly be on another ship date; a
+# candidate is only quoted if this discount could put it on the frontier
+DEFAULT_PRICE_SLACK = 0.05
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+DateLike = Union[date, str, None]
+
+
+def parse_date(value: DateLike, today: Optional[date] = None) -> Optional[date]:
+    """
+    Parse 'YYYY-MM-DD', 'today', 'tomorrow' or a weekday name ('friday' is the
+    next Friday, today included); None stays None.
+
+    Raises:
+        ValueError: For anything else
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, date):
+        return value
+    today = today or date.today()
+    text = str(value).strip().lower()
+    if text.startswith('next '):
+        text = text[5:]
+    if text == 'today':
+        return today
+    if text == 'tomorrow':
+        return today + timedelta(days=1)
+    if text in WEEKDAYS:
+        return today + timedelta(days=(WEEKDAYS.index(text) - today.weekday()) % 7)
+    return date.fromisoformat(text)
+
+
+def add_business_days(start: date, days: int) -> date:
+    current = start
+    while days > 0:
+        current += timedelta(days=1)
+        if current.weekday() < 5:
+            days -= 1
+    return current
+
+
+def business_days(first: date, last: date) -> List[date]:
+    """Weekdays from first to last, inclusive"""
+    days = []
+    current = first
+    while current <= last:
+        if current.weekday() < 5:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+def pareto_frontier(options: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Options not beaten on both price and arrival, earliest arrival first.
+
+    Each option needs 'amount' and 'arrival_date'; ties on both keep the earlier ship date.
+    """
+    frontier = []
+    for option in sorted(options, key=lambda o: (o['arrival_date'], o['amount'], o['ship_date'])):
+        if not frontier or option['amount'] < frontier[-1]['amount']:
+            frontier.append(option)
+    return frontier
+
+
+class SubQuoteMemo:
+    """
+    Single-flight memo of sub-quote futures (one carrier service on one ship date).
+
+    Concurrent searches for the same sub-quote share one request; finished
+    quotes are reused for ttl_seconds, failed ones are retried.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Hashable, Tuple[float, Future]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _reusable(self, entry: Optional[Tuple[float, Future]]) -> bool:
+        if entry is None:
+            return False
+        started_at, future = entry
+        if time.monotonic() - started_at > self.ttl_seconds:
+            return False
+        if future.done():
+            return future.exception() is None and 'error' not in future.result()
+        return True
+
+    def get_or_start(self, key: Hashable, start: Callable[[], Future]) -> Tuple[Future, bool]:
+        """
+        Returns:
+            (future, True if it came from the memo)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if self._reusable(entry):
+                self.hits += 1
+                return entry[1], True
+            now = time.monotonic()
+            for stale in [k for k, (started_at, _) in self._entries.items() if now - started_at > self.ttl_seconds]:
+                del self._entries[stale]
+            future = start()
+            self._entries[key] = (now, future)
+            self.misses += 1
+            return future, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ShipOptimizer:
+    """
+    Ship date x service search for a delivery deadline.
+
+    The earliest ship date is quoted first (all services in parallel); its
+    prices and transit times then prune the remaining candidates - those that
+    would arrive after the deadline, and those an already quoted option beats
+    on arrival and on price even if their price were price_slack lower - and
+    the survivors are quoted in one more parallel wave.
+    """
+
+    def __init__(
+        self,
+        adapters: Optional[List[CarrierAdapter]] = None,
+        max_workers: int = DEFAULT_OPTIMIZER_WORKERS,
+        memo_ttl_seconds: Optional[float] = None,
+        price_slack: float = DEFAULT_PRICE_SLACK
+    ):
+        self.adapters = adapters if adapters is not None else [FedExAdapter()]
+        self.price_slack = price_slack
+        self.memo = SubQuoteMemo(
+            memo_ttl_seconds if memo_ttl_seconds is not None else get_settings().cache.quote_ttl_seconds
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ship-optimizer')
+
+    def optimize(
+        self,
+        origin: Dict[str, Any],
+        destination: Dict[str, Any],
+        weight: float,
+        dimensions: Dict[str, float],
+        deliver_by: DateLike = None,
+        earliest_ship_date: DateLike = None,
+        horizon_days: int = DEFAULT_HORIZON_DAYS,
+        time_budget_seconds: Optional[float] = None,
+        today: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Find the cost/arrival trade-offs for a shipment.
+
+        Args:
+            origin: Address with city, state and postal_code (or postalCode)
+            destination: Address with city, state and postal_code (or postalCode)
+            weight: Package weight in pounds
+            dimensions: length, width, height in inches
+            deliver_by: Latest acceptable arrival (date, 'YYYY-MM-DD' or weekday name)
+            earliest_ship_date: First possible ship date (default: tomorrow)
+            horizon_days: Maximum number of ship dates to search
+            time_budget_seconds: Search time limit (default: settings.rate_shop_deadline_seconds)
+            today: Reference date for relative dates (default: today)
+
+        Returns:
+            Dict with keys: frontier (earliest arrival first), cheapest, fastest,
+            deliver_by, ship_dates, quoted, memo_hits, pruned, errors, pending,
+            timed_out, elapsed_seconds
+
+        Raises:
+            ValueError: If a date can't be parsed
+        """
+        started = time.monotonic()
+        if time_budget_seconds is None:
+            time_budget_seconds = get_settings().rate_shop_deadline_seconds
+        today = today or date.today()
+        deliver_by = parse_date(deliver_by, today)
+        first = parse_date(earliest_ship_date, today) or today + timedelta(days=1)
+        last = deliver_by - timedelta(days=1) if deliver_by else first + timedelta(days=horizon_days * 2)
+        ship_dates = business_days(first, last)[:max(horizon_days, 1)]
+
+        origin, destination = _address(origin), _address(destination)
+        shipment = {
+            'weight': float(weight),
+            'dimensions': {key: float(dimensions.get(key, 12.0)) for key in ('length', 'width', 'height')}
+        }
+
+        transit: Dict[Tuple[str, str], Optional[int]] = {}
+        options: List[Dict[str, Any]] = []
+        errors: List[str] = []
+        pending: List[str] = []
+        pruned: Dict[str, int] = defaultdict(int)
+        quoted = memo_hits = 0
+        timed_out = False
+
+        def arrival_bound(adapter, service_code, ship_date) -> Optional[date]:
+            # Only transit times seen in this search; ground transit varies too much by lane to assume one
+            days = transit.get((adapter.name, service_code))
+            return add_business_days(ship_date, days) if days is not None else None
+
+        def prune_reason(adapter, service_code, ship_date) -> Optional[str]:
+            arrival = arrival_bound(adapter, service_code, ship_date)
+            if arrival is None:
+                return None
+            if deliver_by and arrival > deliver_by:
+                return 'past_deadline'
+            known = [o['amount'] for o in options if (o['carrier'], o['service_code']) == (adapter.name, service_code)]
+            if known:
+                floor = min(known) * (1 - self.price_slack)
+                if any(o['amount'] <= floor and o['arrival_date'] <= arrival.isoformat() for o in options):
+                    return 'dominated'
+            return None
+
+        candidates = [
+            (adapter, service_code, service_name, ship_date)
+            for ship_date in ship_dates
+            for adapter in self.adapters
+            for service_code, service_name in adapter.services()
+        ]
+        waves = [
+            [c for c in candidates if c[3] == ship_dates[0]],
+            [c for c in candidates if c[3] != ship_dates[0]]
+        ] if ship_dates else []
+
+        for wave in waves:
+            running = []
+            for adapter, service_code, service_name, ship_date in wave:
+                reason = prune_reason(adapter, service_code, ship_date)
+                if reason:
+                    pruned[reason] += 1
+                    continue
+                sub_shipment = dict(shipment, ship_date=ship_date.isoformat())
+                key = make_quote_key(origin, destination, dict(sub_shipment, service_type=service_code)) + (adapter.name,)
+                future, from_memo = self.memo.get_or_start(key, partial(
+                    self._executor.submit, adapter.quote, origin, destination, sub_shipment, service_code, service_name
+                ))
+                if from_memo:
+                    memo_hits += 1
+                else:
+                    quoted += 1
+                running.append((future, adapter, service_code, service_name, ship_date))
+
+            # Unfinished sub-quotes keep running and land in the memo for the next search
+            remaining = max(started + time_budget_seconds - time.monotonic(), 0)
+            done, _ = wait_for([entry[0] for entry in running], timeout=remaining)
+            for future, adapter, service_code, service_name, ship_date in running:
+                label = f"{adapter.name} {service_name} on {ship_date.isoformat()}"
+                if future not in done:
+                    pending.append(label)
+                    continue
+                try:
+                    option = future.result()
+                except Exception as e:
+                    option = {'error': str(e)}
+                if 'error' in option:
+                    errors.append(f"{label}: {option['error']}")
+                    continue
+                if option['transit_days'] is not None:
+                    transit[(adapter.name, service_code)] = option['transit_days']
+                arrival = add_business_days(ship_date, option['transit_days']) if option['transit_days'] is not None else None
+                options.append(dict(
+                    option,
+                    ship_date=ship_date.isoformat(),
+                    arrival_date=arrival.isoformat() if arrival else None
+                ))
+            if pending:
+                timed_out = True
+                break
+
+        feasible = [
+            option for option in options
+            if option['arrival_date'] and (deliver_by is None or option['arrival_date'] <= deliver_by.isoformat())
+        ]
+        frontier = pareto_frontier(feasible)
+        return {
+            'frontier': frontier,
+            'cheapest': frontier[-1] if frontier else None,
+            'fastest': frontier[0] if frontier else None,
+            'deliver_by': deliver_by.isoformat() if deliver_by else None,
+            'ship_dates': [ship_date.isoformat() for ship_date in ship_dates],
+            'quoted': quoted,
+            'memo_hits': memo_hits,
+            'pruned': dict(pruned),
+            'errors': errors,
+            'pending': pending,
+            'timed_out': timed_out,
+            'elapsed_seconds': round(time.monotonic() - started, 3)
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# Shared process-wide optimizer (FedEx services)
+ship_optimizer = ShipOptimizer()
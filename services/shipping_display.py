@@ -0,0 +1,131 @@
+"""
+FedEx Shipping Display Helpers
+Streamlit and pandas rendering for results from shipping_integration
+"""
+
+import re
+from typing import Dict, Any, List
+
+import pandas as pd
+import streamlit as st
+
+
+def format_fedex_results(results: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Format FedEx results into a pandas DataFrame for display
+    
+    Args:
+        results: Results from get_fedex_shipping_quotes
+        
+    Returns:
+        Formatted DataFrame with FedEx shipping options
+    """
+    
+    if not results['quotes']:
+        return pd.DataFrame()
+    
+    # Convert to DataFrame
+    df = pd.DataFrame.from_dict(results['quotes'], orient='index').reset_index()
+    df = df.rename(columns={"index": "service_name"})
+    
+    # Extract numeric shipping amount
+    def extract_price(price_str):
+        try:
+            # Remove currency symbols and extract numeric value
+            price_match = re.search(r'[\d.]+', str(price_str))
+            return float(price_match.group()) if price_match else 0.0
+        except:
+            return 0.0
+    
+    df["shipping_amount_usd"] = df["shipping_amount"].apply(extract_price)
+    
+    # Use service name as display name (already formatted with emojis)
+    df["display_name"] = df["service_name"]
+    
+    # Add FedEx indicator
+    df["is_fedex_api"] = True
+    
+    return df
+
+
+def display_fedex_summary(df: pd.DataFrame):
+    """
+    Display FedEx shipping summary with metrics and tables
+    
+    Args:
+        df: Formatted DataFrame with FedEx shipping options
+    """
+    
+    if df.empty:
+        st.warning("No FedEx shipping quotes available")
+        return
+    
+    # Display all FedEx options
+    st.markdown("### 🔴 Live FedEx API Results")
+    
+    # Create a display dataframe - sort first, then select columns
+    sorted_df = df.sort_values("shipping_amount_usd")
+    display_df = sorted_df[["display_name", "shipping_amount", "transit_time"]].copy()
+    display_df = display_df.rename(columns={
+        "display_name": "Service",
+        "shipping_amount": "Price",
+        "transit_time": "Transit Time"
+    })
+    
+    st.dataframe(
+        display_df,
+        use_container_width=True,
+        hide_index=True
+    )
+
+
+def display_errors(errors: List[str]):
+    """
+    Display any errors that occurred during quote retrieval
+    
+    Args:
+        errors: List of error messages
+    """
+    
+    if errors:
+        with st.expander("⚠️ Errors and Warnings", expanded=False):
+            for error in errors:
+                st.warning(error)
+
+
+def display_rate_shop(result: Dict[str, Any]):
+    """
+    Display a multi-carrier rate shop: best price and fastest metrics plus the top options
+
+    Args:
+        result: Result set from RateShopper.shop (or an intermediate one from stream)
+    """
+
+    if not result or not result['options']:
+        st.warning("No carrier rates available yet")
+        return
+
+    st.markdown("### 📦 Carrier Comparison")
+
+    best_price, best_transit = result['best_price'], result['best_transit']
+    col1, col2 = st.columns(2)
+    col1.metric("Cheapest", f"${best_price['amount']:.2f}", f"{best_price['carrier']} {best_price['service_name']}",
+                delta_color="off")
+    if best_transit:
+        col2.metric("Fastest", best_transit['transit_time'],
+                    f"{best_transit['carrier']} {best_transit['service_name']} · ${best_transit['amount']:.2f}",
+                    delta_color="off")
+
+    display_df = pd.DataFrame([{
+        "Carrier": option['carrier'],
+        "Service": option['service_name'],
+        "Price": f"${option['amount']:.2f} {option['currency']}",
+        "Transit Time": option['transit_time'],
+        "Source": option['source']
+    } for option in result['options']])
+    st.dataframe(display_df, use_container_width=True, hide_index=True)
+
+    if result['timed_out']:
+        st.caption(f"No reply within the deadline from: {', '.join(result['pending'])}")
+    if any(option['source'] == 'simulated' for option in result['options']):
+        st.caption("Simulated rates come from a stand-in carrier and are not bookable.")
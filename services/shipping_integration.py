@@ -3,12 +3,11 @@ FedEx-Only Shipping Integration Service
 Provides FedEx shipping quotes using the direct FedEx API
 """
 
-import streamlit as st
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-import pandas as pd
 
-from .fedexAPI import get_fedex_freight_rate
+from .fedexAPI import STANDARD_SERVICES
+from .prefetch import quote_prefetcher
 
 
 def get_fedex_shipping_quotes(
@@ -53,30 +52,21 @@ def get_fedex_shipping_quotes(
             'postal_code': destination.get('postalCode', '')
         }
         
-        fedex_shipment = {
-            'weight': weight,
-            'dimensions': {
-                'length': dimensions.get('length', 12),
-                'width': dimensions.get('width', 12),
-                'height': dimensions.get('height', 12)
-            },
-            'service_type': 'FEDEX_GROUND'
+        fedex_dimensions = {
+            'length': dimensions.get('length', 12),
+            'width': dimensions.get('width', 12),
+            'height': dimensions.get('height', 12)
         }
         
-        # Try different FedEx services
-        # Use the same reliable FedEx services as the AI agent tools
-        fedex_services = [
-            ('FEDEX_GROUND', '🚚 FedEx Ground'),
-            ('FEDEX_EXPRESS_SAVER', '⚡ FedEx Express Saver'),
-            ('FEDEX_2_DAY', '📦 FedEx 2Day')
-        ]
+        # Quote the same reliable FedEx services as the AI agent tools, all at once.
+        # Reuses a prefetch already started for this shipment (e.g. from the chat).
+        service_results = quote_prefetcher.fetch(
+            fedex_origin, fedex_destination, weight, fedex_dimensions
+        )
         
-        for service_code, service_name in fedex_services:
+        for service_code, service_name in STANDARD_SERVICES:
             try:
-                fedex_shipment['service_type'] = service_code
-                fedex_result = get_fedex_freight_rate(
-                    fedex_origin, fedex_destination, fedex_shipment
-                )
+                fedex_result = service_results[service_code]
                 
                 if fedex_result['success']:
                     # Extract rate information
@@ -114,13 +104,20 @@ def get_fedex_shipping_quotes(
                                     'carrier_code': 'fedex',
                                     'service_type': service_code,
                                     'transit_time': transit_time,
-                                    'source': 'fedex_api_direct'
+                                    'source': 'last_known_price' if fedex_result.get('stale') else 'fedex_api_direct'
                                 }
                                 
                                 # Store the first successful result as primary
                                 if results['fedex_response'] is None:
                                     results['fedex_response'] = fedex_result
-                                    
+
+                    # FedEx was unavailable and a stored price was served instead
+                    if fedex_result.get('stale'):
+                        results['errors'].append(
+                            f"Showing last known price for {service_name} from {fedex_result['last_known_at']} "
+                            f"({fedex_result.get('error', 'FedEx unavailable')})"
+                        )
+
                 else:
                     results['errors'].append(f"FedEx API error for {service_name}: {fedex_result.get('error', 'Unknown error')}")
                     
@@ -133,85 +130,13 @@ def get_fedex_shipping_quotes(
     return results
 
 
-def format_fedex_results(results: Dict[str, Any]) -> pd.DataFrame:
-    """
-    Format FedEx results into a pandas DataFrame for display
-    
-    Args:
-        results: Results from get_fedex_shipping_quotes
-        
-    Returns:
-        Formatted DataFrame with FedEx shipping options
-    """
-    
-    if not results['quotes']:
-        return pd.DataFrame()
-    
-    # Convert to DataFrame
-    df = pd.DataFrame.from_dict(results['quotes'], orient='index').reset_index()
-    df = df.rename(columns={"index": "service_name"})
-    
-    # Extract numeric shipping amount
-    def extract_price(price_str):
-        try:
-            # Remove currency symbols and extract numeric value
-            import re
-            price_match = re.search(r'[\d.]+', str(price_str))
-            return float(price_match.group()) if price_match else 0.0
-        except:
-            return 0.0
-    
-    df["shipping_amount_usd"] = df["shipping_amount"].apply(extract_price)
-    
-    # Use service name as display name (already formatted with emojis)
-    df["display_name"] = df["service_name"]
-    
-    # Add FedEx indicator
-    df["is_fedex_api"] = True
-    
-    return df
-
-
-def display_fedex_summary(df: pd.DataFrame):
-    """
-    Display FedEx shipping summary with metrics and tables
-    
-    Args:
-        df: Formatted DataFrame with FedEx shipping options
-    """
-    
-    if df.empty:
-        st.warning("No FedEx shipping quotes available")
-        return
-    
-    # Display all FedEx options
-    st.markdown("### 🔴 Live FedEx API Results")
-    
-    # Create a display dataframe - sort first, then select columns
-    sorted_df = df.sort_values("shipping_amount_usd")
-    display_df = sorted_df[["display_name", "shipping_amount", "transit_time"]].copy()
-    display_df = display_df.rename(columns={
-        "display_name": "Service",
-        "shipping_amount": "Price",
-        "transit_time": "Transit Time"
-    })
-    
-    st.dataframe(
-        display_df,
-        use_container_width=True,
-        hide_index=True
-    )
+# Streamlit/pandas display helpers live in shipping_display; they are still
+# importable from here but only loaded on first access
+_DISPLAY_HELPERS = ('format_fedex_results', 'display_fedex_summary', 'display_errors')
 
 
-def display_errors(errors: List[str]):
-    """
-    Display any errors that occurred during quote retrieval
-    
-    Args:
-        errors: List of error messages
-    """
-    
-    if errors:
-        with st.expander("⚠️ Errors and Warnings", expanded=False):
-            for error in errors:
-                st.warning(error)
+def __getattr__(name: str):
+    if name in _DISPLAY_HELPERS:
+        from . import shipping_display
+        return getattr(shipping_display, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,157 @@
+"""
+ZIP3 Zone Index and Dimensional Weight Engine
+Local FedEx price drivers: lane zone from a ZIP3 x ZIP3 matrix and billable (dimensional) weight
+"""
+
+import csv
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional
+
+import numpy as np
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+ZONE_MATRIX_PATH = DATA_DIR / "zip3_zones.npy"
+ZIP3_CENTROIDS_PATH = DATA_DIR / "zip3_centroids.csv"
+
+UNKNOWN_ZONE = 0
+LOCAL_ZONE = 2
+FAR_ZONE = 8
+NONCONTIGUOUS_ZONE = 9  # Alaska, Hawaii and Puerto Rico
+
+DIM_DIVISOR = 139  # FedEx domestic dimensional weight divisor (cubic inches per lb)
+
+# Upper distance (miles) of FedEx Ground zones 2-7; anything further is zone 8
+ZONE_DISTANCE_BANDS = np.array([150, 300, 600, 1000, 1400, 1800], dtype=np.float64)
+
+
+def _zip3(postal_code: Any) -> int:
+    digits = str(postal_code).strip()[:3]
+    return int(digits) if len(digits) == 3 and digits.isdigit() else -1
+
+
+def build_zone_matrix(centroids_path: Path = ZIP3_CENTROIDS_PATH) -> np.ndarray:
+    """
+    Build the 1000 x 1000 ZIP3 zone matrix from the ZIP3 centroid table.
+
+    Zones follow the FedEx Ground distance bands between ZIP3 centroids. Pairs
+    involving a non-contiguous area are zone 9 and unassigned ZIP3s are zone 0.
+    The bundled matrix can be replaced with an official FedEx zone chart saved
+    in the same shape and dtype.
+    """
+    latitude = np.full(1000, np.nan)
+    longitude = np.full(1000, np.nan)
+    contiguous = np.zeros(1000, dtype=bool)
+    with open(centroids_path, newline='') as f:
+        for row in csv.DictReader(f):
+            prefixes = slice(int(row['zip3_start']), int(row['zip3_end']) + 1)
+            latitude[prefixes] = float(row['latitude'])
+            longitude[prefixes] = float(row['longitude'])
+            contiguous[prefixes] = row['contiguous'] == '1'
+
+    lat = np.radians(latitude)
+    lon = np.radians(longitude)
+    h = (np.sin((lat[None, :] - lat[:, None]) / 2) ** 2
+         + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin((lon[None, :] - lon[:, None]) / 2) ** 2)
+    miles = 3958.8 * 2 * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+    zones = (np.searchsorted(ZONE_DISTANCE_BANDS, miles, side='left') + LOCAL_ZONE).astype(np.uint8)
+    known = ~np.isnan(latitude)
+    zones[~contiguous[:, None] | ~contiguous[None, :]] = NONCONTIGUOUS_ZONE
+    zones[~known[:, None] | ~known[None, :]] = UNKNOWN_ZONE
+    diagonal = np.arange(1000)[known]
+    zones[diagonal, diagonal] = np.where(contiguous[known], LOCAL_ZONE, NONCONTIGUOUS_ZONE)
+    return zones
+
+
+class ZoneIndex:
+    """
+    In-memory ZIP3 x ZIP3 zone lookup backed by a memory-mapped uint8 matrix.
+    """
+
+    def __init__(self, matrix_path: Path = ZONE_MATRIX_PATH):
+        self.matrix = np.load(matrix_path, mmap_mode='r')
+        if self.matrix.shape != (1000, 1000):
+            raise ValueError(f"Zone matrix must be 1000x1000, got {self.matrix.shape}")
+
+    def zone(self, origin_postal_code: Any, destination_postal_code: Any) -> int:
+        """Zone for one lane, or 0 when either ZIP3 is unknown"""
+        origin_zip3 = _zip3(origin_postal_code)
+        destination_zip3 = _zip3(destination_postal_code)
+        if origin_zip3 < 0 or destination_zip3 < 0:
+            return UNKNOWN_ZONE
+        return int(self.matrix[origin_zip3, destination_zip3])
+
+    def zones(self, origin_postal_codes: Iterable[Any], destination_postal_codes: Iterable[Any]) -> np.ndarray:
+        """Vectorized zone lookup for a batch of lanes"""
+        origins = np.fromiter((_zip3(code) for code in origin_postal_codes), dtype=np.int32)
+        destinations = np.fromiter((_zip3(code) for code in destination_postal_codes), dtype=np.int32)
+        valid = (origins >= 0) & (destinations >= 0)
+        zones = np.zeros(len(origins), dtype=np.uint8)
+        zones[valid] = self.matrix[origins[valid], destinations[valid]]
+        return zones
+
+
+@lru_cache(maxsize=1)
+def get_zone_index() -> ZoneIndex:
+    """Get the shared zone index (the matrix is mapped once per process)"""
+    return ZoneIndex()
+
+
+@lru_cache(maxsize=1)
+def _zip3_states() -> Dict[int, str]:
+    states = {}
+    with open(ZIP3_CENTROIDS_PATH, newline='') as f:
+        for row in csv.DictReader(f):
+            for prefix in range(int(row['zip3_start']), int(row['zip3_end']) + 1):
+                states[prefix] = row['state']
+    return states
+
+
+def zip3_state(postal_code: Any) -> Optional[str]:
+    """State of a US ZIP code from the bundled ZIP3 table (None when unknown)"""
+    return _zip3_states().get(_zip3(postal_code))
+
+
+def lane_zone(origin_postal_code: Any, destination_postal_code: Any) -> int:
+    """FedEx zone for a lane from the bundled ZIP3 matrix (0 when unknown)"""
+    return get_zone_index().zone(origin_postal_code, destination_postal_code)
+
+
+def billable_weights(
+    weights: Any,
+    lengths: Any,
+    widths: Any,
+    heights: Any,
+    divisor: float = DIM_DIVISOR
+) -> np.ndarray:
+    """
+    Vectorized billable weight: the greater of actual and dimensional weight,
+    rounded up to whole pounds.
+
+    Args:
+        weights: Package weights in pounds
+        lengths, widths, heights: Package dimensions in inches
+        divisor: Dimensional weight divisor
+
+    Returns:
+        Float array of billable weights
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    cubic_inches = (np.ceil(np.asarray(lengths, dtype=np.float64))
+                    * np.ceil(np.asarray(widths, dtype=np.float64))
+                    * np.ceil(np.asarray(heights, dtype=np.float64)))
+    dim_weights = np.ceil(cubic_inches / divisor)
+    return np.maximum(np.maximum(np.ceil(weights), dim_weights), 1.0)
+
+
+def billable_weight(weight: float, length: float, width: float, height: float) -> float:
+    """Billable weight of a single package in whole pounds"""
+    return float(billable_weights([weight], [length], [width], [height])[0])
+
+
+if __name__ == "__main__":
+    # Rebuild the bundled zone matrix from the ZIP3 centroid table
+    matrix = build_zone_matrix()
+    np.save(ZONE_MATRIX_PATH, matrix)
+    print(f"Wrote {ZONE_MATRIX_PATH} ({matrix.nbytes} bytes, {int((matrix > 0).sum())} known lanes)")
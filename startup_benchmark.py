@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Startup Import Benchmark
+Measures cold import cost of the service modules with `python -X importtime`
+and fails when a module pulls in a heavy dependency or exceeds its time budget.
+
+Usage:
+    python startup_benchmark.py              # check every module against its budget
+    python startup_benchmark.py --top 15     # also list the slowest imports
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+# Dependencies that only the UI or the LLM agent should load
+HEAVY_MODULES = ('streamlit', 'pandas', 'langchain', 'langchain_core', 'langchain_openai', 'openai')
+
+# Cumulative import budget per entry point, in milliseconds
+IMPORT_BUDGETS_MS = {
+    'services.shipping_integration': 600,
+    'services.langchain_agent': 100,
+    'services.openai_connector': 100,
+    'services.fedexAPI': 600,
+    'services.prefetch': 600,
+    'services.job_queue': 100,
+    'api_server': 1200,
+}
+
+ROOT = Path(__file__).resolve().parent
+
+
+def measure_import(module: str) -> Dict[str, Any]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        Dict with keys: module, total_ms (cumulative time for the module),
+        imports (list of (name, cumulative_ms)), heavy (heavy modules loaded)
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    imports: List[Tuple[str, float]] = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time:   self [us] |   cumulative |   (indented) module"
+        _, cumulative, name = line.split('|')
+        imports.append((name.strip(), int(cumulative) / 1000))
+
+    loaded = {name for name, _ in imports}
+    total_ms = next((ms for name, ms in imports if name == module), 0.0)
+    return {
+        'module': module,
+        'total_ms': total_ms,
+        'imports': imports,
+        'heavy': sorted(heavy for heavy in HEAVY_MODULES if heavy in loaded)
+    }
+
+
+def check_budgets(budgets: Dict[str, float] = IMPORT_BUDGETS_MS, top: int = 0) -> List[str]:
+    """Measure every module in budgets; returns a list of violations (empty when all pass)"""
+    violations = []
+    for module, budget_ms in budgets.items():
+        result = measure_import(module)
+        status = "✅" if result['total_ms'] <= budget_ms and not result['heavy'] else "❌"
+        print(f"{status} {module}: {result['total_ms']:.0f} ms (budget {budget_ms} ms)")
+        if result['heavy']:
+            violations.append(f"{module} imports {', '.join(result['heavy'])}")
+        if result['total_ms'] > budget_ms:
+            violations.append(f"{module} took {result['total_ms']:.0f} ms (budget {budget_ms} ms)")
+        if top:
+            for name, ms in sorted(result['imports'], key=lambda item: -item[1])[:top]:
+                print(f"      {ms:8.1f} ms  {name}")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cold import time of the service modules")
+    parser.add_argument('--top', type=int, default=0, help="Show the N slowest imports per module")
+    args = parser.parse_args()
+
+    violations = check_budgets(top=args.top)
+    for violation in violations:
+        print(f"❌ {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
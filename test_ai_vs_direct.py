@@ -2,13 +2,17 @@
 """
 Test script to compare AI Agent tool calling vs Direct FedEx API calls
 This will help identify if the AI is hallucinating or using real API data
+
+FedEx and OpenAI traffic goes through cassettes/ai_vs_direct.json when it
+exists (replayed offline); record it with CASSETTE_MODE=record and live credentials.
 """
 
 from services.langchain_agent import LangChainFedExAgent
 from services.shipping_integration import get_fedex_shipping_quotes, format_fedex_results
+from services.cassette import use_cassette
 import json
 
-def test_ai_vs_direct_comparison():
+def run_ai_vs_direct_comparison(settings=None, http_client=None):
     print("🧪 Testing AI Agent vs Direct FedEx API Comparison")
     print("=" * 70)
     
@@ -67,7 +71,7 @@ def test_ai_vs_direct_comparison():
     
     try:
         # Initialize AI agent
-        agent = LangChainFedExAgent()
+        agent = LangChainFedExAgent(settings=settings, http_client=http_client)
         success, message = agent.initialize_connection()
         
         if success:
@@ -113,5 +117,9 @@ def test_ai_vs_direct_comparison():
     print("4. Look for any discrepancies in pricing or services")
     print("=" * 70)
 
+def test_ai_vs_direct_comparison():
+    with use_cassette('ai_vs_direct') as cassette:
+        run_ai_vs_direct_comparison(cassette.settings, cassette.httpx_client())
+
 if __name__ == "__main__":
     test_ai_vs_direct_comparison()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test script for the headless quote API
+Stubs the FedEx call and the agent - no credentials needed
+"""
+
+import json
+import threading
+
+import pytest
+from starlette.testclient import TestClient
+
+import api_server
+from services import rate_shopping
+from services.ship_optimizer import ShipOptimizer
+from services.prefetch import QuotePrefetcher
+from services.quote_cache import build_rate_result
+from services.quote_history import QuoteHistoryStore
+
+ORIGIN = {'street': '913 Paseo Camarillo', 'city': 'Camarillo', 'state': 'CA', 'postalCode': '93010'}
+DESTINATION = {'street': '1 Harpst St', 'city': 'Arcata', 'state': 'CA', 'postalCode': '95521'}
+PRICES = {'FEDEX_GROUND': 18.5, 'FEDEX_EXPRESS_SAVER': 41.2, 'FEDEX_2_DAY': 52.75}
+
+
+@pytest.fixture(autouse=True)
+def isolated_shutdown(monkeypatch, tmp_path):
+    # The app's lifespan shuts these down; keep the shared instances alive
+    monkeypatch.setattr(api_server, 'quote_prefetcher', QuotePrefetcher(max_workers=1))
+    store = QuoteHistoryStore(tmp_path / "history.db")
+    monkeypatch.setattr(api_server, 'get_quote_history', lambda: store)
+
+
+def _stub_rates(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def fake_rate(origin, destination, shipment, **kwargs):
+        with lock:
+            calls.append((origin['postal_code'], destination['postal_code'], shipment['weight'], shipment['service_type']))
+        return build_rate_result([{
+            'service_type': shipment['service_type'],
+            'amount': PRICES[shipment['service_type']],
+            'currency': 'USD',
+            'transit_time': 'N/A'
+        }])
+
+    monkeypatch.setattr(api_server, 'get_fedex_freight_rate', fake_rate)
+    return calls
+
+
+def test_quotes_endpoint(monkeypatch):
+    print("🧪 Testing /quotes")
+    calls = _stub_rates(monkeypatch)
+    with TestClient(api_server.app) as client:
+        response = client.post('/quotes', json={
+            'origin': ORIGIN, 'destination': DESTINATION, 'weight': 9,
+            'dimensions': {'length': 4, 'width': 5, 'height': 7}
+        })
+        assert response.status_code == 200
+        body = response.json()
+        assert body['success']
+        assert [quote['amount'] for quote in body['quotes']] == sorted(PRICES.values())
+        assert len(calls) == 3
+
+        bad = client.post('/quotes', json={'origin': ORIGIN, 'weight': 9})
+        assert bad.status_code == 400
+        assert 'destination' in bad.json()['error']
+    print("✅ Single-shipment quotes returned, bad requests rejected")
+
+
+def test_optimize_endpoint(monkeypatch):
+    print("🧪 Testing /quotes/optimize")
+    _stub_rates(monkeypatch)
+    monkeypatch.setattr(rate_shopping, 'get_fedex_freight_rate', api_server.get_fedex_freight_rate)
+    monkeypatch.setattr(api_server, 'ship_optimizer', ShipOptimizer())
+    with TestClient(api_server.app) as client:
+        body = {
+            'origin': ORIGIN, 'destination': DESTINATION, 'weight': 9,
+            'dimensions': {'length': 4, 'width': 5, 'height': 7}
+        }
+        response = client.post('/quotes/optimize', json=dict(body, deliver_by='2099-01-09', earliest_ship_date='2099-01-05'))
+        assert response.status_code == 200
+        result = response.json()
+        assert result['success']
+        assert result['ship_dates'] == ['2099-01-05', '2099-01-06', '2099-01-07', '2099-01-08']
+        assert [option['amount'] for option in result['frontier']] == [52.75, 41.2, 18.5]
+
+        bad = client.post('/quotes/optimize', json=dict(body, deliver_by='someday'))
+        assert bad.status_code == 400
+    print("✅ Ship date frontier returned, bad dates rejected")
+
+
+def test_batch_dedupes_identical_shipments(monkeypatch):
+    print("🧪 Testing /quotes/batch de-duplication")
+    calls = _stub_rates(monkeypatch)
+    shipment = {'origin': ORIGIN, 'destination': DESTINATION, 'weight': 9, 'service_types': ['FEDEX_GROUND']}
+    with TestClient(api_server.app) as client:
+        response = client.post('/quotes/batch', json={'shipments': [
+            shipment,
+            dict(shipment),  # The same request again
+            dict(shipment, weight=8.6),  # Same billable weight, but a different request
+            dict(shipment, weight=30),
+            {'origin': ORIGIN}
+        ]})
+    body = response.json()
+    assert response.status_code == 200
+    assert body['unique_quotes'] == 3
+    assert len(calls) == 3
+    assert [result['success'] for result in body['results']] == [True, True, True, True, False]
+    print("✅ Identical shipments quoted once")
+
+
+def test_chat_streams_ndjson(monkeypatch):
+    print("🧪 Testing /chat streaming")
+
+    class FakeAgent:
+        def stream_message(self, message):
+            yield {'type': 'tool', 'tool': 'get_fedex_all_services', 'input': {}}
+            yield {'type': 'message', 'content': f"echo: {message}"}
+
+    monkeypatch.setattr(api_server.ChatSessions, '_connect', lambda self, session: (FakeAgent(), None))
+    with TestClient(api_server.app) as client:
+        response = client.post('/chat', json={'message': 'hello', 'session_id': 'abc'})
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event['type'] for event in events] == ['session', 'tool', 'message', 'done']
+    assert events[0]['session_id'] == 'abc'
+    assert events[2]['content'] == 'echo: hello'
+    print("✅ Chat events streamed as NDJSON")
+
+
+def test_chat_sessions_connect_once_and_serialise_turns(monkeypatch):
+    print("🧪 Testing chat session locking")
+    import services.langchain_agent
+
+    created = []
+    active = []
+    overlaps = []
+
+    class SlowAgent:
+        def __init__(self):
+            created.append(self)
+
+        def initialize_connection(self):
+            threading.Event().wait(0.05)
+            return True, "ok"
+
+    monkeypatch.setattr(services.langchain_agent, 'LangChainFedExAgent', SlowAgent)
+    sessions = api_server.ChatSessions()
+
+    def turn():
+        with sessions.turn('abc') as (agent, error):
+            assert error is None
+            active.append(agent)
+            if len(active) > 1:
+                overlaps.append(len(active))
+            threading.Event().wait(0.02)
+            active.remove(agent)
+
+    threads = [threading.Thread(target=turn) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=2)
+    assert len(created) == 1
+    assert overlaps == []
+    assert sessions.get('abc') == (created[0], None)
+    print("✅ One agent per session, one turn at a time")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test script for the unified carrier client
+Uses a fake HTTP session and the local mock backend - no credentials needed
+"""
+
+import pytest
+
+from services.carrier_client import CarrierClient, FedExV1Backend, FedExV2Backend, MockBackend
+from services.metrics import Metrics
+from services.quote_cache import QuoteCache, make_quote_key
+from services.quote_history import QuoteHistoryStore
+from services.settings import load_settings
+
+ORIGIN = {'city': 'Camarillo', 'state': 'CA', 'postal_code': '93010'}
+DESTINATION = {'city': 'Arcata', 'state': 'CA', 'postal_code': '95521'}
+SHIPMENT = {'weight': 9.0, 'dimensions': {'length': 4, 'width': 5, 'height': 7}}
+RATE_REPLY = {'output': {'rateReplyDetails': [{
+    'serviceType': 'FEDEX_GROUND',
+    'ratedShipmentDetails': [{'totalNetCharge': 18.5, 'currency': 'USD'}]
+}]}}
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body or {}
+        self.headers = headers or {}
+        self.content = b'{}'
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    """Replays scripted rate responses; auth always succeeds"""
+
+    def __init__(self, rate_responses):
+        self.rate_responses = list(rate_responses)
+        self.calls = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.calls.append((url, timeout, data))
+        if url.endswith('/oauth/token'):
+            return FakeResponse(200, {'access_token': f'token-{len(self.calls)}', 'expires_in': 3600})
+        return self.rate_responses.pop(0)
+
+
+@pytest.fixture
+def store(tmp_path):
+    history = QuoteHistoryStore(tmp_path / "history.db")
+    yield history
+    history.close()
+
+
+def _client(backend_class, session, store, settings=None, metrics=None):
+    settings = settings or load_settings('sandbox').with_overrides(
+        fedex={'client_id': 'id', 'client_secret': 'secret', 'base_url': "http://fedex.test", 'account_number': '555'}
+    )
+    return CarrierClient(
+        backend_class(settings),
+        session=session,
+        cache=QuoteCache(),
+        history_factory=lambda: store,
+        metrics=metrics or Metrics(),
+        sleep=lambda seconds: None
+    )
+
+
+def test_token_cached_and_requests_use_settings(store):
+    print("🧪 Testing token cache and settings")
+    session = FakeSession([FakeResponse(200, RATE_REPLY), FakeResponse(200, RATE_REPLY)])
+    client = _client(FedExV1Backend, session, store)
+    assert client.quote(ORIGIN, DESTINATION, SHIPMENT)['success']
+    # A different price class misses the quote cache but reuses the token
+    assert client.quote(ORIGIN, DESTINATION, dict(SHIPMENT, weight=30))['success']
+    assert [url for url, _, _ in session.calls] == [
+        "http://fedex.test/oauth/token",
+        "http://fedex.test/rate/v1/rates/quotes",
+        "http://fedex.test/rate/v1/rates/quotes"
+    ]
+    assert session.calls[1][1] == client.settings.fedex.rate_timeout_seconds
+    assert b'"555"' in session.calls[1][2]
+    assert client.quote(ORIGIN, DESTINATION, SHIPMENT)['cached']
+    print("✅ One token fetch, cached repeat quote")
+
+
+def test_retries_and_token_refresh(store):
+    print("🧪 Testing retries")
+    metrics = Metrics()
+    session = FakeSession([
+        FakeResponse(503),
+        FakeResponse(401),
+        FakeResponse(200, RATE_REPLY)
+    ])
+    client = _client(FedExV2Backend, session, store, metrics=metrics)
+    result = client.quote(ORIGIN, DESTINATION, SHIPMENT)
+    assert result['success']
+    assert session.calls[1][0] == "http://fedex.test/rate/v2/rates/quotes"
+    assert sum(url.endswith('/oauth/token') for url, _, _ in session.calls) == 2
+    assert metrics.counter('carrier.retries', backend='fedex_v2') == 1
+    print("✅ 503 retried, 401 refreshed the token")
+
+
+def test_stale_fallback_after_retries(store):
+    print("🧪 Testing last-known-price fallback")
+    session = FakeSession([FakeResponse(200, RATE_REPLY)] + [FakeResponse(503)] * 3)
+    client = _client(FedExV1Backend, session, store)
+    assert client.quote(ORIGIN, DESTINATION, SHIPMENT)['success']
+    store.flush()
+    client.cache.clear()
+
+    result = client.quote(ORIGIN, DESTINATION, SHIPMENT)
+    assert result['stale'] and result['quotes'][0]['amount'] == 18.5
+    assert 'FedEx API error: 503' in result['error']
+    print("✅ Stale price served once retries are exhausted")
+
+
+def test_mock_backend_offline(store):
+    print("🧪 Testing mock backend")
+    session = FakeSession([])
+    client = _client(MockBackend, session, store, settings=load_settings('mock'))
+    ground = client.quote(ORIGIN, DESTINATION, SHIPMENT)
+    express = client.quote(ORIGIN, DESTINATION, dict(SHIPMENT, service_type='FEDEX_2_DAY'))
+    assert session.calls == []
+    assert 0 < ground['quotes'][0]['amount'] < express['quotes'][0]['amount']
+    assert not client.quote(ORIGIN, DESTINATION, dict(SHIPMENT, service_type='NOT_A_SERVICE'))['success']
+    store.flush()
+    assert store.lane_history('93010', '95521') == []
+    print("✅ Mock rates served locally and kept out of history")
+
+
+def test_expired_quote_served_while_revalidating(store):
+    print("🧪 Testing stale-while-revalidate")
+    newer = {'output': {'rateReplyDetails': [dict(RATE_REPLY['output']['rateReplyDetails'][0],
+                                                   ratedShipmentDetails=[{'totalNetCharge': 19.0, 'currency': 'USD'}])]}}
+    session = FakeSession([FakeResponse(200, RATE_REPLY), FakeResponse(200, newer)])
+    client = _client(FedExV1Backend, session, store)
+    client.cache = QuoteCache(ttl_seconds=60, stale_ttl_seconds=3600)
+    first = client.refresh(ORIGIN, DESTINATION, SHIPMENT)
+    key = client.cache_key(ORIGIN, DESTINATION, SHIPMENT)
+    client.cache.put(key, first, age_seconds=120)
+
+    served = client.quote(ORIGIN, DESTINATION, SHIPMENT)
+    assert served['cached'] and served['revalidating'] and served['quotes'][0]['amount'] == 18.5
+    client.quote(ORIGIN, DESTINATION, SHIPMENT)
+    client._revalidator.shutdown(wait=True)
+
+    fresh = client.quote(ORIGIN, DESTINATION, SHIPMENT)
+    assert fresh['quotes'][0]['amount'] == 19.0 and not fresh.get('revalidating')
+    # The two stale hits shared one background refresh
+    assert client.metrics.counter('carrier.revalidations', backend='fedex_v1') == 1
+    client.cache.put(key, first, age_seconds=60 + 3600 + 1)
+    assert client.cache.lookup(key) == (None, False)
+    print("✅ Stale price served at once, refreshed in the background")
+
+
+def test_backends_and_options_do_not_share_quotes(store):
+    print("🧪 Testing cache and history scoping")
+    v1 = _client(FedExV1Backend, FakeSession([FakeResponse(200, RATE_REPLY)]), store)
+    assert v1.quote(ORIGIN, DESTINATION, SHIPMENT)['success']
+    store.flush()
+
+    v2_origin = {'postalCode': '93010', 'countryCode': 'US'}
+    v2_destination = {'postalCode': '95521', 'countryCode': 'US'}
+    v2 = _client(FedExV2Backend, FakeSession([FakeResponse(503)] * 3), store)
+    v2.cache = v1.cache
+    assert v1.cache_key(ORIGIN, DESTINATION, SHIPMENT) != v2.cache_key(v2_origin, v2_destination, SHIPMENT)
+    assert (v2.cache_key(v2_origin, v2_destination, SHIPMENT, {'packaging_type': 'FEDEX_BOX'})
+            != v2.cache_key(v2_origin, v2_destination, SHIPMENT))
+    # v1's reply is neither a cache hit nor a last known price for v2
+    result = v2.quote(v2_origin, v2_destination, SHIPMENT)
+    assert not result['success'] and not result.get('stale')
+
+    v2.session = FakeSession([FakeResponse(200, RATE_REPLY)] + [FakeResponse(503)] * 3)
+    assert v2.quote(v2_origin, v2_destination, SHIPMENT)['success']
+    store.flush()
+    v2.cache.clear()
+    stale = v2.quote(v2_origin, v2_destination, SHIPMENT)
+    assert stale['stale'] and stale['quotes'][0]['amount'] == 18.5
+    print("✅ Quotes are kept per backend, account and options")
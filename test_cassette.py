@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script for the record/replay cassettes
+Records against in-process fake transports - no network or credentials needed
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from services.carrier_client import get_carrier_client
+from services.cassette import RECORD, REPLAY, Cassette, CassetteMismatch, CassetteTransport, use_cassette
+from services.settings import load_settings
+
+ORIGIN = {'city': 'Camarillo', 'state': 'CA', 'postal_code': '93010'}
+DESTINATION = {'city': 'Arcata', 'state': 'CA', 'postal_code': '95521'}
+SHIPMENT = {'weight': 9.0, 'dimensions': {'length': 4, 'width': 5, 'height': 7}}
+RATE_REPLY = {'output': {'rateReplyDetails': [{
+    'serviceType': 'FEDEX_GROUND',
+    'ratedShipmentDetails': [{'totalNetCharge': 18.5, 'currency': 'USD'}]
+}]}}
+SETTINGS = load_settings('sandbox').with_overrides(
+    fedex={'client_id': 'live-id', 'client_secret': 'live-secret', 'base_url': "https://fedex.test", 'account_number': '555'}
+)
+
+
+class UpstreamAdapter(BaseAdapter):
+    """Stands in for FedEx: OAuth tokens and one scripted rate reply"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request.url)
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        body = {'access_token': 'secret-token', 'expires_in': 3600} if 'oauth' in request.url else RATE_REPLY
+        response._content = json.dumps(body).encode()
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class OfflineAdapter(UpstreamAdapter):
+    def send(self, request, **kwargs):
+        raise AssertionError(f"Replay reached the network: {request.url}")
+
+
+def _quote(upstream, tmp_path, mode, shipment=SHIPMENT):
+    client = get_carrier_client(SETTINGS)
+    client.session.mount('https://', upstream)
+    with use_cassette('fedex', mode=mode, latency_scale=0, settings=SETTINGS, directory=tmp_path):
+        return client.quote(ORIGIN, DESTINATION, shipment)
+
+
+def test_fedex_traffic_replays_without_network(tmp_path):
+    recorded = _quote(UpstreamAdapter(), tmp_path, RECORD)
+    stored = (tmp_path / "fedex.json").read_text()
+    assert 'live-secret' not in stored and 'secret-token' not in stored
+
+    replayed = _quote(OfflineAdapter(), tmp_path, REPLAY)
+
+    assert replayed['success'] and not replayed.get('cached')
+    assert replayed['quotes'][0]['amount'] == recorded['quotes'][0]['amount'] == 18.5
+
+
+def test_unmatched_request_fails_loudly(tmp_path):
+    _quote(UpstreamAdapter(), tmp_path, RECORD)
+
+    with pytest.raises(CassetteMismatch, match='rates'):
+        _quote(OfflineAdapter(), tmp_path, REPLAY, dict(SHIPMENT, weight=40.0))
+
+
+def test_httpx_replay_scales_recorded_latency(tmp_path):
+    path = tmp_path / "openai.json"
+    upstream = httpx.MockTransport(lambda request: httpx.Response(200, json={'choices': [{'text': 'hi'}]}))
+    recording = Cassette(path, RECORD)
+    with httpx.Client(transport=CassetteTransport(recording, upstream)) as client:
+        client.post("https://api.openai.test/v1/chat/completions", json={'model': 'gpt-4o', 'api_key': 'sk-live'})
+    recording.interactions[0]['latency_seconds'] = 0.4
+    recording.save()
+    assert 'sk-live' not in path.read_text()
+
+    replay = Cassette(path, REPLAY, latency_scale=0.25)
+    with replay.httpx_client() as client:
+        started = time.perf_counter()
+        response = client.post("https://api.openai.test/v1/chat/completions", json={'model': 'gpt-4o', 'api_key': 'sk-x'})
+        elapsed = time.perf_counter() - started
+
+    assert response.json() == {'choices': [{'text': 'hi'}]}
+    assert 0.09 <= elapsed < 0.3
+    with pytest.raises(CassetteMismatch):
+        replay.play({'method': 'POST', 'path': '/v1/embeddings', 'body': None})
+    with pytest.raises(CassetteMismatch):
+        replay.check()
+
+
+def test_async_replays_overlap(tmp_path):
+    path = tmp_path / "openai.json"
+    upstream = httpx.MockTransport(lambda request: httpx.Response(200, json={'choices': [{'text': 'hi'}]}))
+    recording = Cassette(path, RECORD)
+    with httpx.Client(transport=CassetteTransport(recording, upstream)) as client:
+        client.post("https://api.openai.test/v1/chat/completions", json={'model': 'gpt-4o'})
+    recording.interactions[0]['latency_seconds'] = 0.2
+    recording.save()
+
+    async def replay_all():
+        # The recorded latency is awaited, so the event loop serves all four at once
+        async with Cassette(path, REPLAY).httpx_async_client() as client:
+            return await asyncio.gather(*(
+                client.post("https://api.openai.test/v1/chat/completions", json={'model': 'gpt-4o'})
+                for _ in range(4)
+            ))
+
+    started = time.perf_counter()
+    responses = asyncio.run(replay_all())
+    elapsed = time.perf_counter() - started
+
+    assert [r.json() for r in responses] == [{'choices': [{'text': 'hi'}]}] * 4
+    assert elapsed < 0.6
+
+
+def test_mode_and_latency_scale_come_from_settings(tmp_path):
+    _quote(UpstreamAdapter(), tmp_path, RECORD)
+    settings = SETTINGS.with_overrides(cassette_mode=REPLAY, cassette_latency_scale=0.0)
+    get_carrier_client(settings).session.mount('https://', OfflineAdapter())
+    with use_cassette('fedex', settings=settings, directory=tmp_path) as cassette:
+        assert cassette.replaying and cassette.latency_scale == 0.0
+        assert get_carrier_client(settings).quote(ORIGIN, DESTINATION, SHIPMENT)['success']
+    assert cassette.played >= 1
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the render-ready chat history model
+Runs offline - no Streamlit session needed
+"""
+
+from services.chat_history import build_chat_message, split_history, history_page
+
+TOOL_OUTPUT = ("FedEx Ground Quote\nPackage: 9.0 lbs (4x5x7 in)\nFrom: Camarillo, CA 93010\n"
+               "To: Arcata, CA 95521\nPrice: 18.50 USD")
+
+
+def test_message_parsed_once_at_append():
+    print("🧪 Testing render-ready messages")
+    debug_info = {
+        'tool_calls_made': True,
+        'intermediate_steps': [object()],
+        'tools_used': [{'tool': 'get_fedex_shipping_quote', 'input': {'weight': 9}, 'output': TOOL_OUTPUT}]
+    }
+    message = build_chat_message("assistant", "Ground is $18.50", debug_info)
+    assert message['copyable_text'] == "Package: 9.0 lbs (4x5x7 in) From: Camarillo, CA 93010 To: Arcata, CA 95521"
+    assert 'intermediate_steps' not in message['debug_info']
+
+    no_tools = build_chat_message("assistant", "Hello!", {'tool_calls_made': False, 'tools_used': []})
+    assert no_tools['copyable_text'] is None and not no_tools['debug_info']['tool_calls_made']
+
+    user = build_chat_message("user", "hi")
+    assert 'debug_info' not in user and user['id'] != message['id']
+    print("✅ Copyable details and debug info precomputed")
+
+
+def test_history_pagination():
+    print("🧪 Testing history paging")
+    messages = [build_chat_message("user" if i % 2 == 0 else "assistant", str(i)) for i in range(55)]
+    older, recent = split_history(messages, recent=10)
+    assert len(older) + len(recent) == 55
+    assert recent[0]['role'] == 'user'
+
+    page, page_count = history_page(older, 1, page_size=20)
+    assert page_count == 3
+    assert page[-1] is older[-1] and len(page) == 20
+    last_page, _ = history_page(older, 99, page_size=20)
+    assert last_page[0] is messages[0]
+
+    assert split_history(messages[:4], recent=10) == ([], messages[:4])
+    print("✅ Older turns paged, newest first")
+
+
+if __name__ == "__main__":
+    test_message_parsed_once_at_append()
+    test_history_pagination()
+    print("🎉 Chat history tests completed successfully!")
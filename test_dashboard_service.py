@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for the dashboard spend-file loader
+Uses small generated exports - no uploads needed
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from services import dashboardService
+from services.dashboardService import AMOUNT_COLS, load_and_clean_data, spend_summary, split_by_category
+
+CSV = (
+    "Supplier Name,Supplier Type,PO Date,Goods (Amt),Services (Amt),Construction (Amt),IT (Amt)\n"
+    "Acme,SB,2024-01-02,100.5,,0,\n"
+    "Beta,DVBE,2024-01-03,,n/a,250,\n"
+    "Acme,SB,2024-01-04,,,,75\n"
+    "Gamma,MB,2024-01-05,20,30,,\n"
+    "Beta,DVBE,2024-01-06,5,,,\n"
+)
+
+
+def _upload(text=CSV, name="spend.csv"):
+    upload = io.BytesIO(text.encode())
+    upload.name = name
+    return upload
+
+
+def test_chunks_load_with_compact_dtypes(tmp_path):
+    df = load_and_clean_data(_upload(), cache_dir=tmp_path, chunk_rows=2)
+
+    assert len(df) == 5
+    assert all(df[col].dtype == np.float32 for col in AMOUNT_COLS)
+    assert np.isnan(df.loc[1, 'Services (Amt)'])
+    # Categories from different chunks are merged, not decayed to object
+    assert isinstance(df['Supplier Name'].dtype, pd.CategoricalDtype)
+    assert sorted(df['Supplier Name'].cat.categories) == ['Acme', 'Beta', 'Gamma']
+    assert df['Goods (Amt)'].sum() == 125.5
+
+
+def test_same_content_reloads_from_cache(tmp_path, monkeypatch):
+    first = load_and_clean_data(_upload(), cache_dir=tmp_path)
+    assert len(list(tmp_path.glob('*.feather'))) == 1
+
+    def no_parse(*args, **kwargs):
+        raise AssertionError("cached export was parsed again")
+
+    monkeypatch.setattr(dashboardService, 'read_spend_file', no_parse)
+    again = load_and_clean_data(_upload(name="renamed.csv"), cache_dir=tmp_path)
+
+    pd.testing.assert_frame_equal(first, again)
+
+
+def test_split_keeps_only_nonzero_rows_and_copies_lazily(tmp_path):
+    df = load_and_clean_data(_upload(), cache_dir=tmp_path)
+    views = split_by_category(df)
+
+    assert views._views == {}
+    # Row 0 has Construction 0 and row 1 has an unparseable Services amount: neither counts
+    assert list(views['construction'].index) == [1]
+    assert list(views['services'].index) == [3]
+    assert list(views['goods'].index) == [0, 3, 4]
+    assert set(views._views) == {'construction', 'services', 'goods'}
+
+
+def test_spend_summary_is_one_groupby_memoized_per_dataset(tmp_path, monkeypatch):
+    df = load_and_clean_data(_upload(), cache_dir=tmp_path)
+    summary = spend_summary(df)
+
+    by_type = summary['by_supplier_type'].set_index('Supplier Type')
+    assert by_type.loc['SB', 'Total_Spend'] == 175.5 and by_type.loc['SB', 'Line_Items'] == 2
+    assert by_type.loc['DVBE', 'Total_Suppliers'] == 1
+    assert round(by_type['Percent of Total'].sum()) == 100
+    goods = summary['by_category_type'].query("Category == 'goods'").set_index('Supplier Type')
+    assert goods.loc['SB', 'Percent of Category'] == 80.08
+
+    def no_recompute(frame):
+        raise AssertionError("summary recomputed for the same dataset")
+
+    monkeypatch.setattr(dashboardService, '_summarize', no_recompute)
+    again = load_and_clean_data(_upload(), cache_dir=tmp_path)
+    pd.testing.assert_frame_equal(spend_summary(again)['by_category'], summary['by_category'])
+
+
+def test_filtered_frame_gets_its_own_summary(tmp_path):
+    df = load_and_clean_data(_upload(), cache_dir=tmp_path)
+    spend_summary(df)
+
+    # The filtered frame inherits the export's attrs but not its summary
+    dvbe = df[df['Supplier Type'] == 'DVBE']
+    assert dvbe.attrs['content_hash'] == df.attrs['content_hash']
+    by_type = spend_summary(dvbe)['by_supplier_type'].set_index('Supplier Type')
+    assert list(by_type.index) == ['DVBE'] and by_type.loc['DVBE', 'Total_Spend'] == 255
+
+
+def test_reindexed_subsets_do_not_share_a_summary(tmp_path):
+    df = load_and_clean_data(_upload(), cache_dir=tmp_path)
+    head = df.head(2)
+    dvbe = df[df['Supplier Type'] == 'DVBE'].reset_index(drop=True)
+    assert head.attrs == dvbe.attrs == df.attrs
+
+    spend_summary(head)
+    by_type = spend_summary(dvbe)['by_supplier_type'].set_index('Supplier Type')
+    assert list(by_type.index) == ['DVBE'] and by_type.loc['DVBE', 'Total_Spend'] == 255
+
+
+def test_cleaning_rules_are_applied_before_caching(tmp_path):
+    text = CSV + "Delta,DVB,not a date,10,,,4\n"
+    df = load_and_clean_data(_upload(text), cache_dir=tmp_path, chunk_rows=2)
+    cached = load_and_clean_data(_upload(text), cache_dir=tmp_path)
+
+    for frame in (df, cached):
+        assert sorted(frame['Supplier Type'].cat.categories) == ['DVBE', 'MB', 'SB']
+        assert frame['PO Date'].dtype.kind == 'M'
+        assert frame.loc[0, 'PO Date'] == pd.Timestamp('2024-01-02') and pd.isna(frame.loc[5, 'PO Date'])
+        assert list(frame['Total Spend']) == [100.5, 250.0, 75.0, 50.0, 5.0, 14.0]
+    by_type = spend_summary(df)['by_supplier_type'].set_index('Supplier Type')
+    assert by_type.loc['DVBE', 'Total_Spend'] == 269 and by_type.loc['DVBE', 'Total_Suppliers'] == 2
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the local fake LLM backend
+Talks to the fake model through the real OpenAI SDK - no API key or network needed
+"""
+
+import json
+import time
+
+import openai
+
+from services.fake_llm import FakeLLM, Rule
+from services.openai_connector import OpenAIConnector
+from services.settings import load_settings
+
+SHIPMENT_TEXT = "Quote 9 lbs, 4x5x7, from 913 Paseo Camarillo, Camarillo, CA 93010 to 1 Harpst St, Arcata, CA 95521"
+QUOTE_TOOL = {'type': 'function', 'function': {'name': 'get_fedex_all_services', 'parameters': {'type': 'object'}}}
+
+
+def _client(llm):
+    return openai.OpenAI(api_key='sk-fake', http_client=llm.http_client(), max_retries=0)
+
+
+def test_rules_script_replies_and_tool_calls():
+    llm = FakeLLM(rules=[
+        Rule(pattern=r"track (?P<number>\d+)", reply="Tracking {number}: in transit."),
+        Rule(pattern=r"zone for (?P<zip>\d{5})", tool='lookup_zone', arguments={'postal_code': '{zip}'}),
+    ])
+    client = _client(llm)
+
+    reply = client.chat.completions.create(model='gpt-test', messages=[{'role': 'user', 'content': 'track 1234'}])
+    assert reply.choices[0].message.content == "Tracking 1234: in transit."
+
+    # A rule's tool is only called when the request offers it
+    tool = dict(QUOTE_TOOL, function={'name': 'lookup_zone', 'parameters': {'type': 'object'}})
+    call = client.chat.completions.create(
+        model='gpt-test', messages=[{'role': 'user', 'content': 'zone for 93010'}], tools=[tool]
+    ).choices[0]
+    assert call.finish_reason == 'tool_calls'
+    assert json.loads(call.message.tool_calls[0].function.arguments) == {'postal_code': '93010'}
+    without_tool = client.chat.completions.create(model='gpt-test', messages=[{'role': 'user', 'content': 'zone for 93010'}])
+    assert without_tool.choices[0].message.content == llm.default_reply
+
+
+def test_default_rule_quotes_a_complete_shipment_then_answers_the_tool_result():
+    client = _client(FakeLLM())
+    messages = [{'role': 'user', 'content': SHIPMENT_TEXT}]
+
+    call = client.chat.completions.create(model='gpt-test', messages=messages, tools=[QUOTE_TOOL]).choices[0].message
+    arguments = json.loads(call.tool_calls[0].function.arguments)
+    assert arguments['origin_postal_code'] == '93010' and arguments['weight'] == 9.0 and arguments['height'] == 7.0
+
+    messages += [call.model_dump(exclude_none=True), {'role': 'tool', 'tool_call_id': call.tool_calls[0].id, 'content': 'Ground $18.50'}]
+    answer = client.chat.completions.create(model='gpt-test', messages=messages, tools=[QUOTE_TOOL])
+    assert answer.choices[0].finish_reason == 'stop' and 'Ground $18.50' in answer.choices[0].message.content
+
+
+def test_streaming_follows_latency_and_token_rate():
+    llm = FakeLLM(rules=[Rule(pattern='hi', reply="one two three four five")], latency_seconds=0.1, tokens_per_second=50)
+    client = _client(llm)
+
+    started = time.perf_counter()
+    stream = client.chat.completions.create(model='gpt-test', messages=[{'role': 'user', 'content': 'hi'}], stream=True)
+    arrivals, parts = [], []
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            arrivals.append(time.perf_counter() - started)
+            parts.append(chunk.choices[0].delta.content)
+
+    assert "".join(parts) == "one two three four five"
+    assert 0.1 <= arrivals[0] < 0.3
+    assert arrivals[-1] - arrivals[0] >= 4 / 50 * 0.9
+
+
+def test_connector_selects_the_fake_backend_from_settings():
+    settings = load_settings('mock').with_overrides(openai={'backend': 'fake', 'api_key': None})
+    connector = OpenAIConnector(settings)
+
+    assert connector.initialize_connection()[0]
+    assert "".join(connector.stream_message("hello")).startswith("I'm a local test model")
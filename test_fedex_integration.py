@@ -2,6 +2,9 @@
 """
 Test script for FedEx-only shipping integration
 This script tests the complete workflow without Streamlit
+
+FedEx traffic goes through cassettes/fedex_integration.json when it exists
+(replayed offline); record it with CASSETTE_MODE=record and live credentials.
 """
 
 from services.shipping_integration import (
@@ -9,9 +12,10 @@ from services.shipping_integration import (
     format_fedex_results,
     display_errors
 )
+from services.cassette import use_cassette
 import json
 
-def test_fedex_integration():
+def run_fedex_integration():
     print("🧪 Testing Complete FedEx Integration Workflow")
     print("=" * 60)
     
@@ -117,6 +121,10 @@ def test_fedex_integration():
     
     return True
 
+def test_fedex_integration():
+    with use_cassette('fedex_integration'):
+        return run_fedex_integration()
+
 if __name__ == "__main__":
     success = test_fedex_integration()
     exit(0 if success else 1)
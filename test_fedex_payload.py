@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for the precompiled FedEx payload templates
+Runs offline - no FedEx credentials needed
+"""
+
+import copy
+import json
+
+from services.fedex_payload import get_payload_template
+from services.packages import multi_package_shipment
+from services.quotes import build_fedex_payload
+
+ORIGIN = {'city': 'Camarillo', 'state': 'CA', 'postal_code': '93010'}
+DESTINATION = {'city': 'Arcata', 'state': 'CA', 'postal_code': '95521'}
+SHIPMENT = {
+    'weight': 9.0,
+    'dimensions': {'length': 4.0, 'width': 5.0, 'height': 7.0},
+    'service_type': 'FEDEX_2_DAY',
+    'ship_date': '2025-08-01'
+}
+
+
+def test_v1_template_fills_shipment_fields():
+    print("🧪 Testing v1 payload template")
+    template = get_payload_template('v1', '740561073')
+    payload = template.build(ORIGIN, DESTINATION, SHIPMENT)
+
+    shipment = payload['requestedShipment']
+    assert payload['accountNumber'] == {'value': '740561073'}
+    assert shipment['shipper']['address']['postalCode'] == '93010'
+    assert shipment['shipper']['address']['countryCode'] == 'US'
+    assert shipment['recipient']['address']['city'] == 'Arcata'
+    assert shipment['serviceType'] == 'FEDEX_2_DAY'
+    assert shipment['shipDateStamp'] == '2025-08-01'
+    assert shipment['pickupType'] == 'DROPOFF_AT_FEDEX_LOCATION'
+    assert shipment['requestedPackageLineItems'][0]['weight'] == {'units': 'LB', 'value': 9.0}
+    print("✅ v1 payload fields filled")
+
+
+def test_bytes_match_dict_payload():
+    print("🧪 Testing pre-serialized payloads")
+    for template in (get_payload_template('v1', '740561073'),
+                     get_payload_template('v2', '123456789', client_id='key')):
+        payload = template.build(ORIGIN, DESTINATION, SHIPMENT)
+        assert json.loads(template.build_bytes(ORIGIN, DESTINATION, SHIPMENT)) == payload
+    print("✅ Byte payloads decode to the dict payloads")
+
+
+def test_identical_boxes_share_a_line_item():
+    print("🧪 Testing multi-piece line items")
+    shipment = multi_package_shipment([
+        {'weight': 9.0, 'dimensions': SHIPMENT['dimensions']},
+        {'weight': 20.0, 'dimensions': {'length': 12, 'width': 12, 'height': 12}},
+        {'weight': 9.0, 'dimensions': SHIPMENT['dimensions'], 'count': 2},
+    ], service_type='FEDEX_GROUND')
+    for template in (get_payload_template('v1', '740561073'),
+                     get_payload_template('v2', '123456789', client_id='key')):
+        items = template.build(ORIGIN, DESTINATION, shipment)['requestedShipment']['requestedPackageLineItems']
+        assert [(item['groupPackageCount'], item['weight']['value']) for item in items] == [(3, 9.0), (1, 20.0)]
+    print("✅ Identical boxes grouped with groupPackageCount")
+
+
+def test_inputs_are_not_mutated():
+    print("🧪 Testing caller input is left untouched")
+    origin, destination, shipment = (copy.deepcopy(d) for d in (ORIGIN, DESTINATION, {'weight': 1, 'dimensions': SHIPMENT['dimensions']}))
+    template = get_payload_template('v1', '740561073')
+    first = template.build(origin, destination, shipment)
+    first['requestedShipment']['shipper']['address']['streetLines'].append('mutated')
+
+    assert origin == ORIGIN and destination == DESTINATION
+    assert 'ship_date' not in shipment and 'service_type' not in shipment
+    second = template.build(origin, destination, shipment)
+    assert second['requestedShipment']['shipper']['address']['streetLines'] == ['1234 Test Street']
+    print("✅ Inputs and template unchanged")
+
+
+def test_v2_builder_uses_template():
+    print("🧪 Testing quotes.build_fedex_payload")
+    origin = {'street': '913 Paseo Camarillo', 'city': 'Camarillo', 'state': 'CA', 'postalCode': '93010'}
+    payload = build_fedex_payload(origin, {**origin, 'postalCode': '95521'}, 9.0, SHIPMENT['dimensions'], 'YOUR_PACKAGING')
+    shipment = payload['requestedShipment']
+    assert shipment['shipper']['address']['streetLines'] == ['913 Paseo Camarillo', '']
+    assert shipment['recipients'][0]['address']['postalCode'] == '95521'
+    assert shipment['requestedPackageLineItems'][0]['physicalPackaging'] == 'YOUR_PACKAGING'
+    assert shipment['shipTimestamp']
+    # Missing city and state are sent empty, never filled with another address
+    payload = build_fedex_payload({'postalCode': '93010'}, {'postalCode': '95521'}, 9.0, SHIPMENT['dimensions'], 'YOUR_PACKAGING')
+    assert payload['requestedShipment']['shipper']['address']['city'] == ''
+    assert payload['requestedShipment']['recipients'][0]['address']['stateOrProvinceCode'] == ''
+    print("✅ v2 payload built from template")
+
+
+if __name__ == "__main__":
+    test_v1_template_fills_shipment_fields()
+    test_bytes_match_dict_payload()
+    test_identical_boxes_share_a_line_item()
+    test_inputs_are_not_mutated()
+    test_v2_builder_uses_template()
+    print("🎉 Payload template tests completed successfully!")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script for hedged LLM requests
+Races stalled and healthy fake models - no API key or network needed
+"""
+
+import threading
+import time
+
+import httpx
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+
+from services.fake_llm import FakeLLM, Rule
+from services.hedging import MIN_LATENCY_SAMPLES, HedgeBudget, HedgedChatModel
+from services.metrics import Metrics
+
+STALL_SECONDS = 1.5
+
+
+def _chat(stall_first: bool, model: str = 'gpt-test'):
+    llm = FakeLLM(rules=[Rule(pattern='hi', reply="hello there")])
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if stall_first and len(calls) == 1:
+            time.sleep(STALL_SECONDS)
+        return llm.handle(request)
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    return ChatOpenAI(api_key='sk-fake', model=model, http_client=client, max_retries=0), calls
+
+
+def _hedged(model, budget, metrics, **fields):
+    budget.earn()  # Allow the first call to hedge
+    return HedgedChatModel(model=model, budget=budget, metrics=metrics, delay_seconds=0.1, **fields)
+
+
+def test_stalled_call_is_hedged_and_the_fast_answer_wins():
+    metrics = Metrics()
+    model, calls = _chat(stall_first=True)
+    hedged = _hedged(model, HedgeBudget(ratio=1.0), metrics)
+
+    started = time.perf_counter()
+    reply = hedged.invoke([HumanMessage("hi")])
+    elapsed = time.perf_counter() - started
+
+    assert reply.content == "hello there"
+    assert elapsed < STALL_SECONDS / 2
+    assert len(calls) == 2
+    assert metrics.counter('llm.hedges', model='gpt-test') == 1
+    assert metrics.counter('llm.hedge_wins', model='gpt-test') == 1
+    # The hedge won, but the latency recorded is the primary's, since the primary started
+    assert metrics.percentile('llm.first_token_latency', 50, model='gpt-test') >= 0.1
+
+
+class StalledStream(httpx.SyncByteStream):
+    """An SSE body whose first token never comes, until the response is closed"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+        self.finished = threading.Event()
+
+    def __iter__(self):
+        try:
+            self.closed.wait(30)
+            yield from ()
+        finally:
+            self.finished.set()
+
+    def close(self):
+        self.closed.set()
+
+
+def test_stalled_loser_drops_its_connection():
+    llm = FakeLLM(rules=[Rule(pattern='hi', reply="hello there")])
+    stalled = StalledStream()
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            # Headers arrive at once, the first token never does
+            return httpx.Response(200, headers={'content-type': 'text/event-stream'}, stream=stalled)
+        return llm.handle(request)
+
+    model = ChatOpenAI(api_key='sk-fake', model='gpt-test', max_retries=0,
+                       http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+    hedged = _hedged(model, HedgeBudget(ratio=1.0), Metrics())
+
+    assert hedged.invoke([HumanMessage("hi")]).content == "hello there"
+    # The loser's response was closed when the hedge won, not at the read timeout
+    assert stalled.closed.wait(1) and stalled.finished.wait(1)
+
+
+def test_budget_caps_hedges_and_alternate_model_is_used():
+    metrics = Metrics()
+    model, calls = _chat(stall_first=True)
+    alternate, alternate_calls = _chat(stall_first=False, model='gpt-alt')
+    hedged = _hedged(model, HedgeBudget(ratio=0.0), metrics, hedge=alternate)
+    # An exhausted budget waits for the stalled call instead of hedging
+    hedged.budget.tokens = 0
+
+    started = time.perf_counter()
+    assert hedged.invoke([HumanMessage("hi")]).content == "hello there"
+    assert time.perf_counter() - started >= STALL_SECONDS
+    assert not alternate_calls
+    assert metrics.counter('llm.hedge_budget_exhausted', model='gpt-test') == 1
+
+    model, calls = _chat(stall_first=True)
+    hedged = _hedged(model, HedgeBudget(ratio=1.0), metrics, hedge=alternate)
+    assert hedged.invoke([HumanMessage("hi")]).content == "hello there"
+    assert len(alternate_calls) == 1
+    assert metrics.percentile('llm.first_token_latency', 100, model='gpt-alt') is None
+
+
+def test_hedge_delay_follows_the_latency_percentile():
+    metrics = Metrics()
+    model, _ = _chat(stall_first=False)
+    hedged = _hedged(model, HedgeBudget(ratio=0.1), metrics, percentile=95, min_delay_seconds=0.05)
+    assert hedged.hedge_delay() == 0.1
+
+    # Calls alone don't count: the percentile needs enough latency samples
+    for _ in range(MIN_LATENCY_SAMPLES):
+        metrics.increment('llm.hedge_calls', model='gpt-test')
+    metrics.observe('llm.first_token_latency', 0.3, model='gpt-test')
+    assert hedged.hedge_delay() == 0.1
+    metrics.reset()
+
+    for index in range(MIN_LATENCY_SAMPLES):
+        metrics.observe('llm.first_token_latency', 0.3 if index % 10 == 9 else 0.01, model='gpt-test')
+    assert hedged.hedge_delay() == 0.3
+    metrics.reset()
+    for _ in range(MIN_LATENCY_SAMPLES):
+        metrics.observe('llm.first_token_latency', 0.001, model='gpt-test')
+    assert hedged.hedge_delay() == 0.05
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the background job queue
+Runs offline with plain Python callables
+"""
+
+import threading
+import time
+
+from services.job_queue import JobQueue, current_job, SUCCEEDED, FAILED, CANCELLED
+
+
+def test_submit_and_collect_result():
+    print("🧪 Testing job results")
+    jobs = JobQueue(max_workers=2)
+
+    def work(x):
+        current_job().set_progress(0.5, "halfway")
+        return x * 2
+
+    job_id = jobs.submit("double", work, 21)
+    failing_id = jobs.submit("fail", lambda: 1 / 0)
+    assert jobs.get(job_id).wait(5) and jobs.get(failing_id).wait(5)
+    assert jobs.get(job_id).status == SUCCEEDED
+    assert jobs.get(job_id).result == 42
+    assert jobs.status(job_id)['progress'] == 1.0
+    assert jobs.get(failing_id).status == FAILED
+    assert 'division' in jobs.get(failing_id).error
+    jobs.shutdown()
+    print("✅ Results and errors collected")
+
+
+def test_cancel_queued_and_running_jobs():
+    print("🧪 Testing cancellation")
+    jobs = JobQueue(max_workers=1)
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        while not current_job().cancel_requested:
+            time.sleep(0.01)
+        return "finished anyway"
+
+    running_id = jobs.submit("slow", slow)
+    queued_id = jobs.submit("slow", slow)
+    assert started.wait(5)
+    assert jobs.cancel(queued_id)
+    assert jobs.get(queued_id).status == CANCELLED
+
+    assert jobs.cancel(running_id)
+    assert jobs.get(running_id).wait(5)
+    assert jobs.get(running_id).status == CANCELLED
+    assert jobs.get(running_id).result is None
+    assert not jobs.cancel(running_id)
+    jobs.shutdown()
+    print("✅ Queued jobs dropped, running jobs stopped cooperatively")
+
+
+def test_finished_jobs_expire():
+    print("🧪 Testing result retention")
+    jobs = JobQueue(max_workers=1, retention_seconds=0.05, max_retained_jobs=2)
+    first = jobs.submit("noop", lambda: 1)
+    jobs.get(first).wait(5)
+    time.sleep(0.1)
+    second = jobs.submit("noop", lambda: 2)
+    assert jobs.get(first) is None
+    assert jobs.get(second).wait(5)
+    jobs.shutdown()
+    print("✅ Expired jobs pruned")
+
+
+if __name__ == "__main__":
+    test_submit_and_collect_result()
+    test_cancel_queued_and_running_jobs()
+    test_finished_jobs_expire()
+    print("🎉 Job queue tests completed successfully!")
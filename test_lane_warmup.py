@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the scheduled lane warm-up
+Warms from a temporary quote history through the local mock backend - no credentials needed
+"""
+
+import time
+from datetime import datetime
+
+from services.carrier_client import CarrierClient, MockBackend
+from services.lane_warmup import LaneWarmer, LaneWarmupScheduler, claim_run, next_run
+from services.metrics import Metrics
+from services.quote_cache import QuoteCache
+from services.quote_history import QuoteHistoryStore
+from services.settings import load_settings
+
+
+def _record(origin, destination, weight, service_type='FEDEX_GROUND'):
+    return {
+        'origin_postal_code': origin, 'destination_postal_code': destination, 'weight': weight,
+        'length': 10.0, 'width': 10.0, 'height': 10.0, 'service_type': service_type,
+        'amount': 20.0, 'currency': 'USD', 'transit_time': 'THREE_DAYS',
+        'quoted_at': datetime.utcnow().isoformat()
+    }
+
+
+def test_top_lanes_are_requoted_within_budget(tmp_path):
+    store = QuoteHistoryStore(tmp_path / "history.db")
+    # Lanes are exact: 93012 -> 95519 prices like 93010 -> 95521 but is counted on its own
+    store.record([_record('93010', '95521', 9.0)] * 3 + [_record('93012', '95519', 9.0)] * 2)
+    store.record([_record('10001', '60601', 30.0)] * 2 + [_record('10001', '60601', 30.0, 'FEDEX_2_DAY')])
+    store.flush()
+
+    settings = load_settings('mock')
+    cache = QuoteCache()
+    client = CarrierClient(MockBackend(settings), settings, cache=cache, history_factory=None, metrics=Metrics())
+    sleeps = []
+    warmer = LaneWarmer(settings, client=client, history_factory=lambda: store, sleep=sleeps.append)
+
+    lanes = warmer.lanes(top_n=2)
+    assert [(lane['origin_postal_code'], lane['quote_count']) for lane in lanes] == [('93010', 3), ('10001', 2)]
+
+    summary = warmer.warm(top_n=3, requests_per_minute=600)
+    assert summary['refreshed'] == 3 and summary['failed'] == 0
+    assert len(cache) == 3
+    # Calls are scheduled 0.1 s apart (the fake sleep doesn't advance the clock)
+    assert len(sleeps) == 2 and 0.05 < sleeps[0] <= 0.1 and 0.15 < sleeps[1] <= 0.2
+    cached = client.quote({'city': 'Camarillo', 'state': 'CA', 'postal_code': '93010'},
+                          {'city': 'Arcata', 'state': 'CA', 'postal_code': '95521'},
+                          {'weight': 9.0, 'dimensions': {'length': 10, 'width': 10, 'height': 10}})
+    assert cached['cached']
+    store.close()
+
+
+def test_next_run_picks_the_next_daily_time():
+    now = datetime(2024, 3, 4, 7, 0)
+    assert next_run(now, ('06:30', '12:00')) == datetime(2024, 3, 4, 12, 0)
+    assert next_run(now, ('06:30',)) == datetime(2024, 3, 5, 6, 30)
+    assert next_run(now, ()) is None
+
+
+def test_each_run_is_claimed_by_one_worker(tmp_path):
+    store = QuoteHistoryStore(tmp_path / "history.db")
+    settings = load_settings('mock')
+    run_at = datetime(2024, 3, 4, 6, 30)
+    assert claim_run(run_at, settings, lambda: store)
+    assert not claim_run(run_at, settings, lambda: store)
+    assert claim_run(datetime(2024, 3, 5, 6, 30), settings, lambda: store)
+
+    # Across hosts the claim goes through the shared tier
+    shared = settings.with_overrides(cache={'shared_cache_url': f"sqlite:///{tmp_path / 'shared.db'}"})
+    assert claim_run(run_at, shared, lambda: store)
+    assert not claim_run(run_at, shared, lambda: store)
+
+    # Two workers' schedulers wake for the same 06:30 run; only one warms
+    runs = []
+    schedulers = []
+    for _ in range(2):
+        warmer = LaneWarmer(settings, history_factory=lambda: store)
+        warmer.warm = lambda: runs.append(1)
+        clock = iter([datetime(2024, 3, 6, 6, 29, 59, 990000)])
+        schedulers.append(LaneWarmupScheduler(
+            warmer, times=('06:30',), now=lambda clock=clock: next(clock, datetime(2024, 3, 6, 6, 31))
+        ))
+    for scheduler in schedulers:
+        scheduler.start()
+    time.sleep(0.2)
+    for scheduler in schedulers:
+        scheduler.stop()
+    assert runs == [1]
+    store.close()
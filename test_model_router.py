@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for per-turn model routing
+Runs the agent against the local fake LLM - no API key or network needed
+"""
+
+import json
+
+import httpx
+
+from services.fake_llm import FakeLLM
+from services.langchain_agent import LangChainFedExAgent
+from services.metrics import Metrics
+from services.model_router import CLARIFICATION, FREEFORM, TOOL, ModelRouter, classify_turn, model_cost
+from services.settings import load_settings
+
+ADDRESSES = "from 913 Paseo Camarillo, Camarillo, CA 93010 to 1 Harpst St, Arcata, CA 95521"
+
+
+def test_turns_are_classified_locally():
+    assert classify_turn(f"Quote 9 lbs {ADDRESSES}") == TOOL
+    # Slot filling completes the shipment from the earlier turn
+    assert classify_turn("It's 9 lbs", [f"I need to ship a box {ADDRESSES}"]) == TOOL
+    assert classify_turn("Roughly how much for 5 lb from 93010 to 95521?") == TOOL
+    assert classify_turn("How much to ship a package to Atlanta?") == CLARIFICATION
+    assert classify_turn("12x12x12") == CLARIFICATION
+    assert classify_turn("Thanks, that's all!") == FREEFORM
+
+
+def test_routes_follow_settings():
+    settings = load_settings('mock').with_overrides(openai={
+        'model': 'gpt-3.5-turbo', 'fast_model': 'gpt-4o-mini', 'strong_model': 'gpt-4o',
+        'route_temperatures': (('tool', 0.0),), 'temperature': 0.7
+    })
+    routes = ModelRouter(settings, Metrics()).routes
+
+    assert routes[TOOL].models == ('gpt-4o', 'gpt-4o-mini', 'gpt-3.5-turbo')
+    assert routes[FREEFORM].models == ('gpt-4o-mini', 'gpt-4o', 'gpt-3.5-turbo')
+    assert (routes[TOOL].temperature, routes[FREEFORM].temperature) == (0.0, 0.7)
+    assert routes[TOOL].timeout_seconds > routes[FREEFORM].timeout_seconds
+
+    unrouted = ModelRouter(settings.with_overrides(openai={'routing': False}), Metrics()).routes
+    assert {route.models for route in unrouted.values()} == {('gpt-3.5-turbo',)}
+    assert model_cost('gpt-4o-mini-2024-07-18', 1_000_000, 0) == 0.15
+
+
+def test_agent_falls_back_and_records_route_metrics():
+    # No tool calls: the turn exercises routing, not FedEx
+    llm = FakeLLM(include_default_rules=False)
+    requested = []
+
+    def handler(request):
+        model = json.loads(request.content)['model'] if request.content else None
+        requested.append(model)
+        if model == 'gpt-4o':
+            return httpx.Response(500, json={'error': {'message': 'overloaded', 'type': 'server_error'}})
+        return llm.handle(request)
+
+    settings = load_settings('mock').with_overrides(openai={
+        'api_key': 'sk-test', 'fast_model': 'gpt-4o-mini', 'strong_model': 'gpt-4o'
+    })
+    agent = LangChainFedExAgent(settings, http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+    assert agent.initialize_connection()[0]
+    agent.router.metrics = metrics = Metrics()
+
+    reply, debug = agent.send_message("What does dimensional weight mean?")
+    assert debug['route'] == FREEFORM and requested[-1] == 'gpt-4o-mini'
+
+    del requested[:]
+    reply, debug = agent.send_message(f"Quote 9 lbs, 4x5x7, {ADDRESSES}")
+    assert debug['route'] == TOOL
+    assert requested[0] == 'gpt-4o' and 'gpt-4o-mini' in requested
+    assert metrics.counter('llm.model_errors', route=TOOL, model='gpt-4o') >= 1
+    assert metrics.counter('llm.turns', route=TOOL) == 1
+    assert metrics.counter('llm.prompt_tokens', route=FREEFORM, model='gpt-4o-mini') > 0
+    assert metrics.counter('llm.cost_usd', route=TOOL) > 0
+    assert {row['route'] for row in agent.router.summary()} == {TOOL, CLARIFICATION, FREEFORM}
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for the OpenAI chat connector
+Serves the OpenAI API from an in-process httpx transport - no API key or tokens used
+"""
+
+import asyncio
+import json
+
+import httpx
+
+from services import openai_connector
+from services.openai_connector import OpenAIConnector
+from services.settings import load_settings
+
+SETTINGS = load_settings('mock').with_overrides(openai={'api_key': 'sk-test', 'retry_backoff_seconds': 0.01})
+
+
+def _completion(text):
+    return {
+        'id': 'chatcmpl-1', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-test',
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': text}}]
+    }
+
+
+def _sse(parts):
+    events = [
+        {'id': 'c', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'gpt-test',
+         'choices': [{'index': 0, 'delta': {'content': part}, 'finish_reason': None}]}
+        for part in parts
+    ]
+    return "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+
+
+class FakeOpenAI:
+    """Answers models.retrieve and chat completions; the first rate_limited completions get a 429"""
+
+    def __init__(self, rate_limited=0):
+        self.rate_limited = rate_limited
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        if request.url.path.startswith('/v1/models/'):
+            return httpx.Response(200, json={'id': 'gpt-test', 'object': 'model', 'created': 0, 'owned_by': 'test'})
+        if self.rate_limited:
+            self.rate_limited -= 1
+            return httpx.Response(429, json={'error': {'message': 'Rate limit reached', 'type': 'rate_limit'}})
+        body = json.loads(request.content)
+        if body.get('stream'):
+            return httpx.Response(200, content=_sse(["Ground ", "is ", "cheapest."]),
+                                  headers={'content-type': 'text/event-stream'})
+        return httpx.Response(200, json=_completion(f"Seen {len(body['messages'])} messages"))
+
+
+def _connector(fake, sleeps=None):
+    connector = OpenAIConnector(
+        SETTINGS, http_client=httpx.Client(transport=httpx.MockTransport(fake)),
+        sleep=(sleeps.append if sleeps is not None else lambda seconds: None)
+    )
+    assert connector.initialize_connection() == (True, "Successfully connected to OpenAI API")
+    return connector
+
+
+def test_validation_uses_no_completion_and_history_is_kept():
+    fake = FakeOpenAI()
+    connector = _connector(fake)
+    assert [r.url.path for r in fake.requests] == ['/v1/models/gpt-3.5-turbo']
+
+    assert connector.send_message("Hi") == "Seen 2 messages"
+    assert connector.send_message("Quote a box?") == "Seen 4 messages"
+    assert len(connector.history) == 4
+
+
+def test_rate_limits_are_retried_with_backoff():
+    sleeps = []
+    connector = _connector(FakeOpenAI(rate_limited=2), sleeps)
+
+    assert connector.send_message("Hi") == "Seen 2 messages"
+    assert len(sleeps) == 2
+
+    exhausted = _connector(FakeOpenAI(rate_limited=10))
+    assert "rate limiting" in exhausted.send_message("Hi")
+    assert len(exhausted.history) == 0
+
+
+def test_streaming_yields_tokens_and_remembers_the_reply():
+    connector = _connector(FakeOpenAI(rate_limited=1))
+
+    assert list(connector.stream_message("Cheapest?")) == ["Ground ", "is ", "cheapest."]
+    assert connector.history[-1] == {"role": "assistant", "content": "Ground is cheapest."}
+
+
+def test_async_api_shares_one_client_per_loop(monkeypatch):
+    fake = FakeOpenAI()
+    import openai
+    real_async_client = openai.AsyncOpenAI
+
+    def async_client(**options):
+        return real_async_client(http_client=httpx.AsyncClient(transport=httpx.MockTransport(fake)), **options)
+
+    monkeypatch.setattr(openai, 'AsyncOpenAI', async_client)
+    monkeypatch.setattr(openai_connector, '_async_clients', openai_connector.weakref.WeakKeyDictionary())
+    connector = OpenAIConnector(SETTINGS)
+
+    async def run():
+        reply = await connector.asend_message("Hi")
+        parts = [part async for part in connector.astream_message("Cheapest?")]
+        assert openai_connector.get_async_openai_client(SETTINGS) is openai_connector.get_async_openai_client(SETTINGS)
+        return reply, parts
+
+    reply, parts = asyncio.run(run())
+    assert reply == "Seen 2 messages"
+    assert "".join(parts) == "Ground is cheapest."
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-package shipments and consolidation
+Uses a fake rate function - no FedEx credentials needed
+"""
+
+from services.consolidation import compare_consolidation, PER_BOX, MULTI_PIECE, CONSOLIDATED
+from services.packages import (
+    consolidate_packages, describe_packages, multi_package_shipment, package_count, total_weight
+)
+from services.quote_cache import build_rate_result, make_quote_key, normalize_quote
+
+ORIGIN = {'city': 'Camarillo', 'state': 'CA', 'postal_code': '93010'}
+DESTINATION = {'city': 'Arcata', 'state': 'CA', 'postal_code': '95521'}
+SMALL = {'length': 4, 'width': 5, 'height': 7}
+ORDER = multi_package_shipment([
+    {'weight': 9, 'dimensions': SMALL, 'count': 3},
+    {'weight': 20, 'dimensions': {'length': 12, 'width': 12, 'height': 12}},
+])
+
+
+def test_multi_package_shipment_groups_boxes():
+    print("🧪 Testing box grouping")
+    assert package_count(ORDER) == 4
+    assert total_weight(ORDER) == 47.0
+    assert ORDER['weight'] == 47.0 and len(ORDER['packages']) == 2
+    assert describe_packages(ORDER).startswith("4 boxes, 47.0 lbs total")
+
+    single = multi_package_shipment([{'weight': 9, 'dimensions': SMALL}])
+    assert 'packages' not in single and single['weight'] == 9.0
+    print("✅ Boxes grouped, single boxes stay plain shipments")
+
+
+def test_multi_piece_quotes_keyed_apart_and_kept_out_of_history():
+    print("🧪 Testing multi-piece cache keys")
+    first_box = {'weight': 9, 'dimensions': SMALL}
+    assert make_quote_key(ORIGIN, DESTINATION, ORDER) != make_quote_key(ORIGIN, DESTINATION, first_box)
+    assert make_quote_key(ORIGIN, DESTINATION, ORDER)[0] == 'pieces'
+    data = build_rate_result([{'service_type': 'FEDEX_GROUND', 'amount': 80.0}])['data']
+    assert normalize_quote(ORIGIN, DESTINATION, ORDER, data) == []
+    print("✅ Multi-piece quotes don't collide with single-box quotes")
+
+
+def test_consolidated_box_respects_limits():
+    print("🧪 Testing consolidation plan")
+    box = consolidate_packages(ORDER)
+    assert box == {'weight': 47.0, 'dimensions': {'length': 24.0, 'width': 12.0, 'height': 12.0}}
+
+    heavy = multi_package_shipment([{'weight': 60, 'dimensions': SMALL, 'count': 3}])
+    assert consolidate_packages(heavy) is None
+    print("✅ Combined box sized by stacking, rejected over FedEx limits")
+
+
+def test_compare_consolidation_prices_each_strategy():
+    print("🧪 Testing consolidation comparison")
+    calls = []
+
+    def fake_quote(origin, destination, shipment):
+        calls.append(shipment)
+        # $10 per box plus $0.50 per pound, like a per-package tariff
+        boxes = shipment.get('packages') or [{'weight': shipment['weight'], 'count': 1}]
+        amount = sum((10 + 0.5 * box['weight']) * box['count'] for box in boxes)
+        return build_rate_result([{'service_type': shipment['service_type'], 'amount': amount}])
+
+    result = compare_consolidation(ORIGIN, DESTINATION, ORDER, quote=fake_quote)
+
+    options = result['options']
+    assert options[PER_BOX]['amount'] == 3 * 14.5 + 20.0
+    assert options[MULTI_PIECE]['amount'] == options[PER_BOX]['amount']
+    assert options[CONSOLIDATED]['amount'] == 10 + 0.5 * 47
+    assert result['best'] == CONSOLIDATED and result['savings'] == 30.0
+    # One quote per distinct box, one multi-piece, one consolidated - not one per box
+    assert len(calls) == 4
+    print("✅ Per-box, multi-piece and consolidated prices compared")
+
+
+if __name__ == "__main__":
+    test_multi_package_shipment_groups_boxes()
+    test_multi_piece_quotes_keyed_apart_and_kept_out_of_history()
+    test_consolidated_box_respects_limits()
+    test_compare_consolidation_prices_each_strategy()
+    print("🎉 Multi-package tests completed successfully!")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test script for predictive quote prefetching
+Stubs the FedEx call - no FedEx credentials needed
+"""
+
+import threading
+import time
+
+import services.prefetch as prefetch
+from services.prefetch import QuotePrefetcher, parse_shipment_request
+from services.quote_scheduler import INTERACTIVE, PREFETCH, current_priority
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+EXAMPLE = ("Get all FedEx quotes for 9lb package (4 x 5 x 7in) from 913 Paseo Camarillo, "
+           "Camarillo, CA 93010 to 1 Harpst St, Arcata, CA 95521")
+
+
+def test_parse_complete_shipment():
+    print("🧪 Testing shipment parsing")
+    shipment = parse_shipment_request(EXAMPLE)
+    assert shipment['origin'] == {'street': '913 Paseo Camarillo', 'city': 'Camarillo', 'state': 'CA', 'postal_code': '93010'}
+    assert shipment['destination'] == {'street': '1 Harpst St', 'city': 'Arcata', 'state': 'CA', 'postal_code': '95521'}
+    assert shipment['weight'] == 9.0
+    assert shipment['dimensions'] == {'length': 4.0, 'width': 5.0, 'height': 7.0}
+
+    reversed_roles = parse_shipment_request(
+        "Ship 2 lbs to 1 Harpst St, Arcata, CA 95521 from 913 Paseo Camarillo, Camarillo, CA 93010"
+    )
+    assert reversed_roles['origin']['postal_code'] == '93010'
+    assert reversed_roles['dimensions'] == {'length': 12.0, 'width': 12.0, 'height': 12.0}
+
+    assert parse_shipment_request("How much to ship a 5lb package from Los Angeles to Atlanta?") is None
+    assert parse_shipment_request("from 913 Paseo Camarillo, Camarillo, CA 93010 to 1 Harpst St, Arcata, CA 95521") is None
+    print("✅ Complete shipments parsed, incomplete ones ignored")
+
+
+def test_tool_fetch_joins_inflight_prefetch():
+    print("🧪 Testing in-flight prefetch reuse")
+    calls = []
+    release = threading.Event()
+
+    def fake_service_rates(origin, destination, shipment):
+        calls.append((origin['postal_code'], destination['postal_code'], shipment['weight']))
+        release.wait(5)
+        return {'FEDEX_GROUND': {'success': True, 'data': {}}}
+
+    original = prefetch.get_fedex_service_rates
+    prefetch.get_fedex_service_rates = fake_service_rates
+    try:
+        prefetcher = QuotePrefetcher()
+        future = prefetcher.prefetch_text(EXAMPLE)
+        assert future is not None and not future.done()
+
+        # The tool call arrives while the prefetch is still running
+        tool_origin = {'street': '913 Paseo Camarillo', 'city': 'Camarillo', 'state': 'CA', 'postal_code': '93010'}
+        tool_destination = {'city': 'Arcata', 'state': 'CA', 'postalCode': '95521'}
+        assert prefetcher.lookup(tool_origin, tool_destination, 9.0, {'length': 4, 'width': 5, 'height': 7}) is future
+        time.sleep(0.05)
+        release.set()
+        results = prefetcher.fetch(tool_origin, tool_destination, 9.0, {'length': 4, 'width': 5, 'height': 7})
+        assert results['FEDEX_GROUND']['success']
+        assert len(calls) == 1 and prefetcher.reused == 1
+        prefetcher.shutdown()
+    finally:
+        prefetch.get_fedex_service_rates = original
+    print("✅ Tool call reused the prefetched quotes")
+
+
+def test_interactive_caller_raises_a_queued_prefetch():
+    print("🧪 Testing an interactive caller joining a queued prefetch")
+    calls = []
+    release = threading.Event()
+
+    def fake_service_rates(origin, destination, shipment, service_types=None):
+        calls.append((origin['postal_code'], current_priority()))
+        if origin['postal_code'] == '10001':
+            release.wait(5)
+        return {'FEDEX_GROUND': {'success': True, 'data': {}}}
+
+    original = prefetch.get_fedex_service_rates
+    prefetch.get_fedex_service_rates = fake_service_rates
+    try:
+        prefetcher = QuotePrefetcher(max_workers=1)
+        dimensions = {'length': 4, 'width': 5, 'height': 7}
+        # The only worker is busy, so the prefetch for our shipment waits in the pool
+        busy = prefetcher.prefetch({'postal_code': '10001'}, {'postal_code': '30241'}, 2.0, dimensions)
+        queued = prefetcher.prefetch({'postal_code': '93010'}, {'postal_code': '95521'}, 9.0, dimensions)
+        _wait_for(lambda: calls)
+
+        results = prefetcher.fetch({'postal_code': '93010'}, {'postal_code': '95521'}, 9.0, dimensions)
+        assert results['FEDEX_GROUND']['success']
+        assert queued.cancelled()
+        assert calls[-1] == ('93010', INTERACTIVE)
+        release.set()
+        busy.result(5)
+        prefetcher.shutdown()
+    finally:
+        prefetch.get_fedex_service_rates = original
+    print("✅ Queued prefetch re-issued at the caller's priority")
+
+
+def test_shed_services_are_requoted_for_a_raised_prefetch():
+    print("🧪 Testing shed services of a raised prefetch")
+    calls = []
+    joined = threading.Event()
+
+    def fake_service_rates(origin, destination, shipment, service_types=None):
+        calls.append((current_priority(), service_types))
+        if current_priority() == PREFETCH:
+            joined.wait(5)
+            return {
+                'FEDEX_GROUND': {'success': True, 'data': {}},
+                'FEDEX_2_DAY': {'success': False, 'shed': True, 'error': 'shed'}
+            }
+        return {code: {'success': True, 'data': {}} for code in service_types}
+
+    original = prefetch.get_fedex_service_rates
+    prefetch.get_fedex_service_rates = fake_service_rates
+    try:
+        prefetcher = QuotePrefetcher()
+        dimensions = {'length': 4, 'width': 5, 'height': 7}
+        running = prefetcher.prefetch({'postal_code': '93010'}, {'postal_code': '95521'}, 9.0, dimensions)
+        _wait_for(lambda: calls)
+        assert prefetcher.lookup({'postal_code': '93010'}, {'postal_code': '95521'}, 9.0, dimensions) is running
+        joined.set()
+
+        results = running.result(5)
+        assert results['FEDEX_2_DAY']['success'] and results['FEDEX_GROUND']['success']
+        assert calls == [(PREFETCH, None), (INTERACTIVE, ['FEDEX_2_DAY'])]
+        prefetcher.shutdown()
+    finally:
+        prefetch.get_fedex_service_rates = original
+    print("✅ Shed services re-quoted at the caller's priority")
+
+
+if __name__ == "__main__":
+    test_parse_complete_shipment()
+    test_tool_fetch_joins_inflight_prefetch()
+    test_interactive_caller_raises_a_queued_prefetch()
+    test_shed_services_are_requoted_for_a_raised_prefetch()
+    print("🎉 Prefetch tests completed successfully!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for the quote history rollup and dashboard queries
+Uses a temporary database - no FedEx credentials needed
+"""
+
+import sqlite3
+
+from services.quote_analytics import daily_frame, price_drift, service_mix, spend_by_lane
+from services.quote_history import QuoteHistoryStore
+from test_quote_history import _record
+
+
+def test_rollup_folds_each_batch_and_catches_up_on_open(tmp_path):
+    path = tmp_path / 'history.db'
+    store = QuoteHistoryStore(path, flush_interval=0.01)
+    store.record([_record(10.0, quoted_at='2026-10-01T09:00:00'), _record(14.0, quoted_at='2026-10-01T15:00:00')])
+    store.flush()
+    store.record([_record(12.0, quoted_at='2026-10-01T18:00:00'), _record(30.0, 'FEDEX_2_DAY', quoted_at='2026-10-02T08:00:00')])
+    store.flush()
+
+    ground = store.daily_aggregates(service_type='FEDEX_GROUND')
+    assert [(r['day'], r['quote_count'], r['amount_sum'], r['amount_min'], r['amount_max']) for r in ground] == [
+        ('2026-10-01', 3, 36.0, 10.0, 14.0)
+    ]
+    store.close()
+
+    # Rows written without the rollup (older versions, other tools) are folded when the store opens
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "INSERT INTO quotes (quoted_at, origin_postal_code, destination_postal_code, origin_zip3, destination_zip3, "
+            "zone, weight, length, width, height, billable_weight, service_type, amount, currency) "
+            "VALUES ('2026-10-02T10:00:00', '93010', '95521', '930', '955', 4, 9, 4, 5, 7, 9, 'FEDEX_2_DAY', 34, 'USD')"
+        )
+    reopened = QuoteHistoryStore(path)
+    two_day = reopened.daily_aggregates(since='2026-10-02', service_type='FEDEX_2_DAY')
+    assert [(r['quote_count'], r['amount_sum']) for r in two_day] == [(2, 64.0)]
+    reopened.close()
+
+
+def test_dashboard_queries_read_the_rollup(tmp_path):
+    store = QuoteHistoryStore(tmp_path / 'history.db', flush_interval=0.01)
+    store.record([
+        _record(10.0, quoted_at='2026-10-01T09:00:00'),
+        _record(11.0, quoted_at='2026-10-08T09:00:00'),
+        _record(40.0, 'FEDEX_2_DAY', quoted_at='2026-10-08T09:00:00'),
+        _record(20.0, origin='10001', destination='30241', quoted_at='2026-10-08T10:00:00'),
+    ])
+    store.flush()
+
+    lanes = spend_by_lane(store)
+    assert list(lanes['lane']) == ['930→955', '100→302']
+    assert lanes.loc[0, 'total_quoted'] == 61.0 and lanes.loc[0, 'quotes'] == 3
+
+    mix = service_mix(store).set_index('service_type')
+    assert mix.loc['FEDEX_GROUND', 'quotes'] == 3 and mix.loc['FEDEX_GROUND', 'share'] == 75.0
+
+    drift = price_drift(store, service_type='FEDEX_GROUND', freq='W')
+    assert list(drift['quotes']) == [1, 2]
+    assert drift['drift_pct'].iloc[0] == 0.0
+
+    # Unchanged store: the frame is served from the memo
+    assert daily_frame(store) is daily_frame(store)
+
+    # Quotes written by another worker process invalidate it too
+    other_worker = QuoteHistoryStore(tmp_path / 'history.db', flush_interval=0.01)
+    other_worker.record([_record(12.0, quoted_at='2026-10-08T11:00:00')])
+    other_worker.flush()
+    other_worker.close()
+    assert daily_frame(store)['quote_count'].sum() == 5
+    store.close()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQLite quote history store
+Uses a temporary database - no FedEx credentials needed
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from services.quote_cache import QuoteCache, make_quote_key
+from services.quote_history import QuoteHistoryStore
+
+
+def _record(amount, service_type='FEDEX_GROUND', origin='93010', destination='95521', quoted_at=None):
+    return {
+        'origin_postal_code': origin,
+        'destination_postal_code': destination,
+        'weight': 9.0,
+        'length': 4.0,
+        'width': 5.0,
+        'height': 7.0,
+        'service_type': service_type,
+        'amount': amount,
+        'currency': 'USD',
+        'transit_time': 'FOUR_DAYS',
+        'quoted_at': quoted_at or datetime.utcnow().isoformat()
+    }
+
+
+def _store(directory):
+    return QuoteHistoryStore(os.path.join(directory, 'history.db'), flush_interval=0.01)
+
+
+def test_records_are_batched_and_queryable():
+    print("🧪 Testing batched writes and lane lookups")
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory)
+        old = (datetime.utcnow() - timedelta(days=3)).isoformat()
+        store.record([_record(12.0, quoted_at=old), _record(13.5), _record(30.0, 'FEDEX_2_DAY')])
+        store.record([_record(20.0, origin='10001', destination='30241')])
+        store.flush()
+
+        lane = store.lane_history('93099', '95500')
+        assert [r['amount'] for r in lane] in ([13.5, 30.0, 12.0], [30.0, 13.5, 12.0])
+        assert len(store.lane_history('93010', '95521', service_type='FEDEX_2_DAY')) == 1
+
+        yesterday = (datetime.utcnow() - timedelta(days=1)).isoformat()
+        tomorrow = (datetime.utcnow() + timedelta(days=1)).isoformat()
+        assert len(store.quotes_between(yesterday, tomorrow)) == 3
+
+        last = store.last_known_price('93010', '95521', 'FEDEX_GROUND', 9.0, 4.0, 5.0, 7.0)
+        assert last['amount'] == 13.5
+        store.close()
+    print("✅ History lookups work")
+
+
+def test_backs_quote_cache():
+    print("🧪 Testing history as the quote cache backing tier")
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory)
+        store.record([_record(13.5)])
+        store.flush()
+
+        cache = QuoteCache()
+        cache.set_backing(lambda: store)
+        key = make_quote_key(
+            {'postal_code': '93010'}, {'postal_code': '95521'},
+            {'weight': 9.0, 'dimensions': {'length': 4.0, 'width': 5.0, 'height': 7.0}}
+        )
+        result = cache.get(key)
+        assert result['success'] and result['quotes'][0]['amount'] == 13.5
+        assert result['data']['output']['rateReplyDetails'][0]['ratedShipmentDetails'][0]['totalNetCharge'] == 13.5
+        assert cache.backing_hits == 1 and cache.get(key) is result
+        store.close()
+    print("✅ Cache misses are served from history")
+
+
+def test_bad_record_does_not_drop_its_batch():
+    print("🧪 Testing a batch with unstorable records")
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory)
+        missing_weight = _record(11.0)
+        del missing_weight['weight']
+        store.record([_record(13.5), missing_weight, _record(None), _record(14.0, 'FEDEX_2_DAY')])
+        store.flush()
+
+        assert sorted(r['amount'] for r in store.lane_history('93010', '95521')) == [13.5, 14.0]
+        assert sum(r['quote_count'] for r in store.daily_aggregates()) == 2
+        store.close()
+    print("✅ Good records of the batch were kept")
+
+
+if __name__ == "__main__":
+    test_records_are_batched_and_queryable()
+    test_backs_quote_cache()
+    test_bad_record_does_not_drop_its_batch()
+    print("🎉 Quote history tests completed successfully!")
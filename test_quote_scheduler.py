@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for the quote scheduler (priority classes, fair queuing, load shedding)
+Uses the local mock backend - no credentials needed
+"""
+
+import threading
+import time
+
+import pytest
+
+from services.carrier_client import CarrierClient, MockBackend
+from services.metrics import Metrics
+from services.quote_cache import QuoteCache
+from services.quote_scheduler import (
+    BATCH, INTERACTIVE, PREFETCH, QuoteScheduler, QuoteShed, current_priority, quote_priority, with_priority
+)
+from services.settings import load_settings
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_interactive_goes_ahead_of_a_queued_batch():
+    print("🧪 Testing weighted fair queuing")
+    scheduler = QuoteScheduler(1, reserved_slots=0, shed_wait_seconds=(), metrics=Metrics())
+    holder = scheduler.acquire(INTERACTIVE)
+    order = []
+
+    def quote(priority):
+        with scheduler.slot(priority):
+            order.append(priority)
+
+    # The batch arrives first, then interactive requests
+    threads = [threading.Thread(target=quote, args=(BATCH,)) for _ in range(4)]
+    threads += [threading.Thread(target=quote, args=(INTERACTIVE,)) for _ in range(4)]
+    for queued, thread in enumerate(threads, start=1):
+        thread.start()
+        _wait_for(lambda: sum(s['queued'] for s in scheduler.stats().values()) == queued)
+    scheduler.release(holder)
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert order[:4] == [INTERACTIVE] * 4
+    assert order[4:] == [BATCH] * 4
+    stats = scheduler.stats()
+    assert stats[BATCH]['admitted'] == 4 and stats[BATCH]['p95_wait_seconds'] >= stats[INTERACTIVE]['p50_wait_seconds']
+
+
+def test_reserved_slot_and_shedding():
+    print("🧪 Testing reserved slots and load shedding")
+    metrics = Metrics()
+    scheduler = QuoteScheduler(2, shed_wait_seconds=((BATCH, 0.05),), reserved_slots=1, metrics=metrics)
+    batch = scheduler.acquire(BATCH)
+
+    # The last slot is held back for interactive quotes
+    started = time.monotonic()
+    with pytest.raises(QuoteShed):
+        scheduler.acquire(BATCH)
+    assert time.monotonic() - started >= 0.05
+    interactive = scheduler.acquire(INTERACTIVE)
+    assert scheduler.in_flight == 2
+    assert metrics.counter('scheduler.shed', priority=BATCH) == 1
+
+    scheduler.release(interactive)
+    scheduler.release(batch)
+    assert scheduler.acquire(BATCH) == BATCH
+
+
+def test_shed_request_gives_back_its_virtual_time():
+    print("🧪 Testing fair-queuing state after shedding")
+    scheduler = QuoteScheduler(1, shed_wait_seconds=((BATCH, 0.02),), reserved_slots=0, metrics=Metrics())
+    holder = scheduler.acquire(INTERACTIVE)
+    for _ in range(3):
+        with pytest.raises(QuoteShed):
+            scheduler.acquire(BATCH)
+    # Shed requests were never served, so the next batch request is tagged as if they never came
+    assert scheduler._last_finish[BATCH] <= scheduler._virtual_time
+    scheduler.release(holder)
+
+
+def test_priority_follows_the_caller():
+    print("🧪 Testing priority classes")
+    assert current_priority() == INTERACTIVE
+    with quote_priority(BATCH):
+        assert current_priority() == BATCH
+        assert with_priority(PREFETCH, current_priority) == PREFETCH
+    assert current_priority() == INTERACTIVE
+    with pytest.raises(ValueError):
+        with quote_priority('urgent'):
+            pass
+
+
+def test_shed_quote_is_an_error_result():
+    print("🧪 Testing a shed carrier call")
+    settings = load_settings('mock')
+    metrics = Metrics()
+    scheduler = QuoteScheduler(1, shed_wait_seconds=((BATCH, 0.01),), reserved_slots=0, metrics=metrics)
+    client = CarrierClient(
+        MockBackend(settings), settings, cache=QuoteCache(), history_factory=None,
+        scheduler=scheduler, metrics=metrics
+    )
+    origin = {'city': 'Camarillo', 'state': 'CA', 'postal_code': '93010'}
+    destination = {'city': 'Arcata', 'state': 'CA', 'postal_code': '95521'}
+    shipment = {'weight': 9.0, 'dimensions': {'length': 4, 'width': 5, 'height': 7}}
+
+    holder = scheduler.acquire(INTERACTIVE)
+    with quote_priority(BATCH):
+        result = client.quote(origin, destination, shipment)
+    assert not result['success'] and result['shed']
+    assert metrics.counter('carrier.shed', backend='mock', priority=BATCH) == 1
+    scheduler.release(holder)
+    assert client.quote(origin, destination, shipment)['success']
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline FedEx rate estimator
+Trains on synthetic quote records - no FedEx credentials needed
+"""
+
+import time
+
+from services.quote_cache import QuoteCache
+from services.rate_estimator import RateEstimator, get_rate_estimator
+
+
+def _record(weight, amount, service_type='FEDEX_GROUND', origin='93010', destination='95521'):
+    return {
+        'origin_postal_code': origin,
+        'destination_postal_code': destination,
+        'weight': weight,
+        'length': 4.0,
+        'width': 5.0,
+        'height': 7.0,
+        'service_type': service_type,
+        'amount': amount,
+        'currency': 'USD',
+        'transit_time': 'N/A',
+        'quoted_at': '2025-07-30T00:00:00'
+    }
+
+
+def test_estimate_interpolates_between_weights():
+    print("🧪 Testing weight interpolation")
+    records = [_record(2, 10.0), _record(2, 10.4), _record(10, 18.0), _record(10, 18.6)]
+    estimator = RateEstimator().fit(records)
+
+    estimate = estimator.estimate('93010', '95521', 6, 4, 5, 7, 'FEDEX_GROUND')
+    assert estimate is not None
+    assert 10.2 < estimate['estimate'] < 18.3
+    assert estimate['low'] < estimate['estimate'] < estimate['high']
+    assert estimate['samples'] == 4
+    assert estimator.estimate('93010', '95521', 6, service_type='FEDEX_2_DAY') is None
+    print(f"✅ Estimate ${estimate['estimate']:.2f} (${estimate['low']:.2f}-${estimate['high']:.2f})")
+
+
+def test_estimator_refits_from_quote_cache():
+    print("🧪 Testing refit from quote cache entries")
+    cache = QuoteCache()
+    assert get_rate_estimator(cache, min_refit_interval=0).samples == 0
+    cache.put('lane', {'success': True, 'quotes': [_record(9, 14.5, 'FEDEX_2_DAY')]})
+    # The refit runs in the background; the previous tables answer meanwhile
+    assert get_rate_estimator(cache, min_refit_interval=0).samples == 0
+    deadline = time.monotonic() + 2
+    while get_rate_estimator(cache, min_refit_interval=0).samples == 0:
+        assert time.monotonic() < deadline, "refit did not finish"
+        time.sleep(0.01)
+    estimator = get_rate_estimator(cache, min_refit_interval=0)
+    assert estimator.samples == 1
+    assert estimator.estimate('93010', '95521', 9, 4, 5, 7, 'FEDEX_2_DAY')['estimate'] == 14.5
+    print("✅ Estimator picked up new cache entries")
+
+
+def test_estimate_is_fast():
+    print("🧪 Testing estimate latency")
+    estimator = RateEstimator().fit(_record(w, 8 + w) for w in range(1, 60))
+    start = time.perf_counter()
+    for _ in range(1000):
+        estimator.estimate('93010', '30241', 12, 10, 10, 10)
+    per_call_ms = (time.perf_counter() - start)
+    assert per_call_ms < 1.0
+    print(f"✅ {per_call_ms:.3f} ms per estimate")
+
+
+if __name__ == "__main__":
+    test_estimate_interpolates_between_weights()
+    test_estimator_refits_from_quote_cache()
+    test_estimate_is_fast()
+    print("🎉 Rate estimator tests completed successfully!")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-carrier rate shopping
+Uses scripted carrier adapters and the offline stand-in carrier - no credentials needed
+"""
+
+import time
+
+from services.rate_shopping import CarrierAdapter, RateShopper, StandInCarrierAdapter, transit_days
+
+ORIGIN = {'city': 'Camarillo', 'state': 'CA', 'postalCode': '93010'}
+DESTINATION = {'city': 'Arcata', 'state': 'CA', 'postal_code': '95521'}
+DIMENSIONS = {'length': 4, 'width': 5, 'height': 7}
+
+
+class ScriptedAdapter(CarrierAdapter):
+    """Quotes fixed prices after a fixed delay per service"""
+
+    def __init__(self, name, quotes):
+        self.name = name
+        self.quotes = quotes  # service code -> (amount, transit days, delay seconds)
+
+    def services(self):
+        return [(code, code.title()) for code in self.quotes]
+
+    def quote(self, origin, destination, shipment, service_code, service_name):
+        amount, days, delay = self.quotes[service_code]
+        time.sleep(delay)
+        if amount is None:
+            return {'error': 'Service unavailable'}
+        return {
+            'carrier': self.name, 'service_code': service_code, 'service_name': service_name,
+            'amount': amount, 'currency': 'USD', 'transit_days': days,
+            'transit_time': f"{days} business days", 'source': 'live'
+        }
+
+
+def test_transit_days_parses_carrier_formats():
+    assert transit_days('FOUR_DAYS') == 4
+    assert transit_days('2 business days') == 2
+    assert transit_days(1) == 1
+    assert transit_days('N/A') is None
+
+
+def test_shop_ranks_by_price_and_transit():
+    shopper = RateShopper([
+        ScriptedAdapter('A', {'GROUND': (12.0, 5, 0), 'EXPRESS': (30.0, 1, 0)}),
+        ScriptedAdapter('B', {'ECONOMY': (10.0, 6, 0), 'BROKEN': (None, None, 0)}),
+    ])
+
+    result = shopper.shop(ORIGIN, DESTINATION, 9.0, DIMENSIONS, top_n=2, deadline_seconds=5)
+
+    assert result['complete'] and not result['timed_out']
+    assert [option['amount'] for option in result['options']] == [10.0, 12.0]
+    assert result['best_price']['carrier'] == 'B'
+    assert result['best_transit']['service_code'] == 'EXPRESS'
+    assert result['errors'] == ['B Broken: Service unavailable']
+    shopper.shutdown()
+
+
+def test_deadline_bounds_latency_and_reports_pending():
+    shopper = RateShopper([
+        ScriptedAdapter('Fast', {'GROUND': (15.0, 4, 0.05)}),
+        ScriptedAdapter('Slow', {'GROUND': (9.0, 4, 2.0)}),
+    ])
+
+    started = time.monotonic()
+    updates = list(shopper.stream(ORIGIN, DESTINATION, 9.0, DIMENSIONS, deadline_seconds=0.5))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0
+    assert updates[0]['received'] == 1 and updates[0]['best_price']['carrier'] == 'Fast'
+    final = updates[-1]
+    assert final['timed_out'] and not final['complete']
+    assert final['pending'] == ['Slow Ground']
+    shopper.shutdown(wait=False)
+
+
+def test_carriers_are_quoted_concurrently():
+    shopper = RateShopper([
+        ScriptedAdapter('A', {'GROUND': (12.0, 5, 0.3)}),
+        ScriptedAdapter('B', {'GROUND': (11.0, 5, 0.3)}),
+        ScriptedAdapter('C', {'GROUND': (13.0, 5, 0.3)}),
+    ])
+
+    result = shopper.shop(ORIGIN, DESTINATION, 9.0, DIMENSIONS, deadline_seconds=5)
+
+    assert result['complete']
+    assert result['elapsed_seconds'] < 0.8
+    shopper.shutdown()
+
+
+def test_stand_in_carrier_is_marked_simulated():
+    shopper = RateShopper([StandInCarrierAdapter(latency_seconds=0)])
+
+    result = shopper.shop(ORIGIN, DESTINATION, 9.0, DIMENSIONS, deadline_seconds=5)
+
+    assert result['options']
+    assert all(option['source'] == 'simulated' for option in result['options'])
+    assert result['best_transit']['service_code'] == 'NEXT_DAY'
+    shopper.shutdown()
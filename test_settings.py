@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for the settings profiles and settings injection
+Stubs the FedEx HTTP calls - no credentials needed
+"""
+
+import dataclasses
+
+import pytest
+
+from services.carrier_client import get_carrier_client
+from services.settings import FEDEX_SANDBOX_ACCOUNT_NUMBER, load_settings
+
+
+def test_profiles_and_env_overrides(monkeypatch):
+    print("🧪 Testing settings profiles")
+    monkeypatch.setenv('FEDEX_ACCOUNT_NUMBER', '123456789')
+    monkeypatch.setenv('FEDEX_RATE_TIMEOUT_SECONDS', '2.5')
+    monkeypatch.setenv('QUOTE_CACHE_TTL_SECONDS', '60')
+
+    sandbox = load_settings('sandbox')
+    assert sandbox.fedex.rates_url == "https://apis-sandbox.fedex.com/rate/v1/rates/quotes"
+    assert sandbox.fedex.account_number == FEDEX_SANDBOX_ACCOUNT_NUMBER
+    assert sandbox.fedex.rate_timeout_seconds == 2.5
+    assert sandbox.cache.quote_ttl_seconds == 60
+
+    prod = load_settings('prod')
+    assert prod.fedex.auth_url == "https://apis.fedex.com/oauth/token"
+    assert prod.fedex.account_number == '123456789'
+
+    mock = load_settings('mock')
+    assert mock.fedex.has_credentials and mock.fedex.base_url.startswith("http://127.0.0.1")
+
+    monkeypatch.setenv('SHIPPING_AGENT_PROFILE', 'prod')
+    assert load_settings().profile == 'prod'
+    with pytest.raises(ValueError):
+        load_settings('staging')
+    print("✅ Profiles and overrides resolved")
+
+
+def test_settings_are_immutable():
+    print("🧪 Testing immutability")
+    settings = load_settings('sandbox')
+    original_timeout = settings.fedex.rate_timeout_seconds
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        settings.fedex.rate_timeout_seconds = 1
+    tuned = settings.with_overrides(fedex={'rate_timeout_seconds': 3.0}, job_workers=9)
+    assert tuned.fedex.rate_timeout_seconds == 3.0 and tuned.job_workers == 9
+    assert settings.fedex.rate_timeout_seconds == original_timeout
+    print("✅ Settings copied, never mutated")
+
+
+def test_carrier_client_follows_profile():
+    print("🧪 Testing settings injection into the carrier client")
+    sandbox = load_settings('sandbox').with_overrides(fedex={'rate_timeout_seconds': 4.0})
+    client = get_carrier_client(sandbox)
+    assert client.backend.name == 'fedex_v1'
+    assert client.settings.fedex.rate_timeout_seconds == 4.0
+    assert get_carrier_client(sandbox) is client
+    assert get_carrier_client(load_settings('prod')).backend.name == 'fedex_v2'
+    assert get_carrier_client(load_settings('mock')).backend.name == 'mock'
+    print("✅ Each profile gets its backend and settings")
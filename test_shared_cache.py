@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared (cross-process) quote cache
+Uses stand-in RESP servers on localhost and temporary SQLite files - no Redis needed
+"""
+
+import json
+import socketserver
+import threading
+import time
+
+import pytest
+
+from services.carrier_client import TokenCache
+from services.metrics import Metrics
+from services.quote_cache import QuoteCache, build_rate_result
+from services.settings import load_settings
+from services.shared_cache import RedisBackend, SharedStore, SQLiteBackend, decode_result, encode_result
+
+RECORD = {
+    'origin_postal_code': '93010', 'destination_postal_code': '95521', 'weight': 9.0, 'length': 4.0,
+    'width': 5.0, 'height': 7.0, 'service_type': 'FEDEX_GROUND', 'amount': 18.5, 'currency': 'USD',
+    'transit_time': 'TWO_DAYS', 'quoted_at': '2026-10-19T06:30:00'
+}
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """GET, SET (PX, NX), DEL and PING of RESP2, enough for the shared cache"""
+
+    def _command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        data = self.server.data
+        while True:
+            args = self._command()
+            if args is None:
+                return
+            name = args[0].upper()
+            if name == b'PING':
+                self.wfile.write(b'+PONG\r\n')
+            elif name == b'GET':
+                value, expires_at = data.get(args[1], (None, 0))
+                if value is None or expires_at < time.monotonic():
+                    self.wfile.write(b'$-1\r\n')
+                else:
+                    self.wfile.write(b'$%d\r\n%s\r\n' % (len(value), value))
+            elif name == b'SET':
+                options = [arg.upper() for arg in args[3:]]
+                ttl = int(args[4 + options.index(b'PX')]) / 1000 if b'PX' in options else 3600
+                current = data.get(args[1])
+                if b'NX' in options and current and current[1] >= time.monotonic():
+                    self.wfile.write(b'$-1\r\n')
+                    continue
+                data[args[1]] = (args[2], time.monotonic() + ttl)
+                self.wfile.write(b'+OK\r\n')
+            elif name == b'DEL':
+                self.wfile.write(b':%d\r\n' % int(data.pop(args[1], None) is not None))
+            else:
+                self.wfile.write(b'-ERR unknown command\r\n')
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), RespHandler)
+        self.data = {}
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+
+@pytest.fixture
+def servers():
+    started = [RespServer(), RespServer()]
+    yield started
+    for server in started:
+        server.shutdown()
+        server.server_close()
+
+
+def test_result_round_trip_is_compact():
+    print("🧪 Testing shared result encoding")
+    result = build_rate_result([RECORD], timestamp='2026-10-19T06:30:00')
+    payload = encode_result(result, stored_at=1000.0)
+    decoded, stored_at = decode_result(payload)
+    assert stored_at == 1000.0
+    assert decoded['quotes'] == [RECORD]
+    assert decoded['data'] == result['data']
+    assert len(payload) < len(json.dumps(result)) / 2
+    # Multi-piece results have no records and stay process-local
+    assert encode_result({'success': True, 'quotes': [], 'data': {}}, 1000.0) is None
+
+
+def test_redis_ring_spreads_keys_and_tolerates_a_down_server(servers):
+    print("🧪 Testing the consistent-hash ring")
+    metrics = Metrics()
+    store = SharedStore(RedisBackend([server.url for server in servers], timeout=0.5), metrics)
+    result = build_rate_result([RECORD])
+    for weight in range(40):
+        store.put_result(('lane', weight), result, stored_at=time.time(), ttl_seconds=60)
+    assert all(len(server.data) > 5 for server in servers)
+    assert sum(len(server.data) for server in servers) == 40
+    assert store.get_result(('lane', 3))[0]['quotes'] == [RECORD]
+
+    # Keys on a stopped server are misses, the others still hit
+    servers[1].shutdown()
+    servers[1].server_close()
+    for node in store.backend.nodes:
+        node.close()
+    found = [store.get_result(('lane', weight)) is not None for weight in range(40)]
+    assert 0 < sum(found) < 40
+    assert metrics.counter('shared_cache.errors', operation='get') >= 1
+    store.close()
+
+
+def test_quote_caches_share_one_sqlite_file(tmp_path):
+    print("🧪 Testing two processes' caches on one SQLite tier")
+    path = str(tmp_path / "shared.db")
+    # Two QuoteCache instances stand in for two worker processes on one host
+    first_store = SharedStore(SQLiteBackend(path), Metrics())
+    second_store = SharedStore(SQLiteBackend(path), Metrics())
+    first, second = QuoteCache(ttl_seconds=60, stale_ttl_seconds=600), QuoteCache(ttl_seconds=60, stale_ttl_seconds=600)
+    first.set_shared(lambda: first_store)
+    second.set_shared(lambda: second_store)
+
+    key = ('price', 5, 9.0, 'FEDEX_GROUND')
+    first.put(key, build_rate_result([RECORD]))
+    result, stale = second.lookup(key)
+    assert result['quotes'] == [RECORD] and not stale
+    assert second.shared_hits == 1
+
+    # Age travels with the entry: an old quote is stale in every process
+    old_key = ('price', 5, 30.0, 'FEDEX_GROUND')
+    first.put(old_key, build_rate_result([RECORD]), age_seconds=120)
+    assert second.lookup(old_key)[1] is True
+    assert second.get(old_key) is None
+    assert second.lookup(('price', 6, 9.0, 'FEDEX_GROUND')) == (None, False)
+    first_store.close()
+    second_store.close()
+
+
+class AuthSession:
+    def __init__(self):
+        self.auth_calls = 0
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.auth_calls += 1
+        return type('Response', (), {
+            'raise_for_status': lambda self: None,
+            'json': lambda self: {'access_token': 'shared-token', 'expires_in': 3600}
+        })()
+
+
+def test_token_is_fetched_once_for_all_processes(tmp_path):
+    print("🧪 Testing the shared FedEx token")
+    settings = load_settings('sandbox').with_overrides(
+        fedex={'client_id': 'id', 'client_secret': 'secret', 'base_url': "http://fedex.test"}
+    )
+    shared = SharedStore(SQLiteBackend(str(tmp_path / "shared.db")), Metrics())
+    session = AuthSession()
+    first = TokenCache(settings, session, Metrics(), shared_factory=lambda: shared)
+    second = TokenCache(settings, session, Metrics(), shared_factory=lambda: shared)
+    assert first.get() == 'shared-token'
+    assert second.get() == 'shared-token'
+    assert session.auth_calls == 1
+
+    # A rejected token is dropped everywhere
+    first.invalidate('shared-token')
+    assert shared.get_token(first._shared_name) is None
+    shared.close()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for the ship date and service optimizer
+Uses a scripted carrier adapter - no credentials needed
+"""
+
+import threading
+from datetime import date
+
+import pytest
+
+from services.rate_shopping import CarrierAdapter
+from services.ship_optimizer import ShipOptimizer, add_business_days, parse_date, pareto_frontier
+
+MONDAY = date(2026, 10, 19)
+ORIGIN = {'city': 'Camarillo', 'state': 'CA', 'postal_code': '93010'}
+DESTINATION = {'city': 'Arcata', 'state': 'CA', 'postal_code': '95521'}
+DIMENSIONS = {'length': 4, 'width': 5, 'height': 7}
+
+
+class DatedAdapter(CarrierAdapter):
+    """Fixed price and transit per service, with optional per-date prices; records every call"""
+
+    name = 'FedEx'
+
+    def __init__(self, quotes, date_prices=None):
+        self.quotes = quotes  # service code -> (amount, transit days)
+        self.date_prices = date_prices or {}  # (service code, ship date) -> amount
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def services(self):
+        return [(code, code.title()) for code in self.quotes]
+
+    def quote(self, origin, destination, shipment, service_code, service_name):
+        with self._lock:
+            self.calls.append((service_code, shipment['ship_date']))
+        amount, days = self.quotes[service_code]
+        amount = self.date_prices.get((service_code, shipment['ship_date']), amount)
+        return {
+            'carrier': self.name, 'service_code': service_code, 'service_name': service_name,
+            'amount': amount, 'currency': 'USD', 'transit_days': days,
+            'transit_time': f"{days} business days", 'source': 'live'
+        }
+
+
+def test_dates_and_business_days():
+    assert parse_date('friday', MONDAY) == date(2026, 10, 23)
+    assert parse_date('monday', MONDAY) == MONDAY
+    assert parse_date('2026-11-02', MONDAY) == date(2026, 11, 2)
+    assert add_business_days(date(2026, 10, 23), 1) == date(2026, 10, 26)
+    with pytest.raises(ValueError):
+        parse_date('someday', MONDAY)
+
+
+def test_pareto_frontier_drops_dominated_options():
+    options = [
+        {'amount': 20.0, 'arrival_date': '2026-10-23', 'ship_date': '2026-10-20'},
+        {'amount': 25.0, 'arrival_date': '2026-10-23', 'ship_date': '2026-10-20'},
+        {'amount': 40.0, 'arrival_date': '2026-10-21', 'ship_date': '2026-10-20'},
+        {'amount': 45.0, 'arrival_date': '2026-10-22', 'ship_date': '2026-10-20'},
+    ]
+    assert [o['amount'] for o in pareto_frontier(options)] == [40.0, 20.0]
+
+
+def test_deadline_prunes_and_frontier_trades_cost_for_arrival():
+    adapter = DatedAdapter({'FEDEX_GROUND': (18.0, 4), 'FEDEX_EXPRESS_SAVER': (38.0, 3), 'FEDEX_2_DAY': (48.0, 2)})
+    optimizer = ShipOptimizer([adapter])
+
+    result = optimizer.optimize(ORIGIN, DESTINATION, 9.0, DIMENSIONS, deliver_by='friday', today=MONDAY)
+
+    assert result['ship_dates'] == ['2026-10-20', '2026-10-21', '2026-10-22']
+    # Only the first ship date is quoted: later dates are too late (Ground, Express Saver) or dominated (2Day)
+    assert len(adapter.calls) == 3
+    assert result['pruned'] == {'past_deadline': 5, 'dominated': 1}
+    assert [(o['service_code'], o['ship_date'], o['arrival_date']) for o in result['frontier']] == [
+        ('FEDEX_2_DAY', '2026-10-20', '2026-10-22'),
+        ('FEDEX_EXPRESS_SAVER', '2026-10-20', '2026-10-23'),
+    ]
+    assert result['cheapest']['amount'] == 38.0
+    optimizer.shutdown()
+
+
+def test_cheaper_later_ship_date_reaches_frontier():
+    adapter = DatedAdapter({'FEDEX_GROUND': (18.0, 1)}, date_prices={('FEDEX_GROUND', '2026-10-21'): 12.0})
+    optimizer = ShipOptimizer([adapter])
+
+    result = optimizer.optimize(ORIGIN, DESTINATION, 9.0, DIMENSIONS, deliver_by='2026-10-23', today=MONDAY)
+
+    assert [(o['ship_date'], o['amount']) for o in result['frontier']] == [('2026-10-20', 18.0), ('2026-10-21', 12.0)]
+    optimizer.shutdown()
+
+
+def test_sub_quotes_are_memoized_across_searches():
+    adapter = DatedAdapter({'FEDEX_GROUND': (18.0, 4), 'FEDEX_2_DAY': (48.0, 2)})
+    optimizer = ShipOptimizer([adapter])
+
+    first = optimizer.optimize(ORIGIN, DESTINATION, 9.0, DIMENSIONS, today=MONDAY)
+    calls = len(adapter.calls)
+    second = optimizer.optimize(ORIGIN, DESTINATION, 9.0, DIMENSIONS, today=MONDAY)
+
+    assert len(adapter.calls) == calls
+    assert second['quoted'] == 0 and second['memo_hits'] == first['quoted']
+    assert second['frontier'] == first['frontier']
+    optimizer.shutdown()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test script for cold-start imports
+Checks core service modules don't load UI or LLM dependencies at import time
+"""
+
+import subprocess
+import sys
+
+from startup_benchmark import IMPORT_BUDGETS_MS, measure_import
+
+
+def test_core_modules_skip_heavy_dependencies():
+    print("🧪 Testing import-time dependencies")
+    for module in IMPORT_BUDGETS_MS:
+        result = measure_import(module)
+        assert result['heavy'] == [], f"{module} imports {result['heavy']}"
+        print(f"✅ {module}: {result['total_ms']:.0f} ms")
+
+
+def test_display_helpers_still_importable_from_integration():
+    print("🧪 Testing lazy display re-exports")
+    code = (
+        "import sys\n"
+        "import services.shipping_integration as integration\n"
+        "assert 'streamlit' not in sys.modules\n"
+        "from services.shipping_integration import display_errors\n"
+        "from services.shipping_display import display_errors as moved\n"
+        "assert display_errors is moved and 'streamlit' in sys.modules\n"
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)
+    print("✅ Display helpers load on first access")
+
+
+if __name__ == "__main__":
+    test_core_modules_skip_heavy_dependencies()
+    test_display_helpers_still_importable_from_integration()
+    print("🎉 Startup tests completed successfully!")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script for the ZIP3 zone index and dimensional weight engine
+Runs offline against the bundled zone matrix
+"""
+
+import numpy as np
+
+from services.quote_cache import make_quote_key
+from services.zone_index import (
+    billable_weights,
+    build_zone_matrix,
+    get_zone_index,
+    lane_zone
+)
+
+
+def test_bundled_matrix_matches_centroid_table():
+    print("🧪 Testing bundled zone matrix")
+    index = get_zone_index()
+    assert isinstance(index.matrix, np.memmap)
+    assert np.array_equal(np.asarray(index.matrix), build_zone_matrix())
+    print("✅ Bundled matrix is up to date")
+
+
+def test_lane_zones():
+    print("🧪 Testing lane zones")
+    assert lane_zone('93010', '93012') == 2
+    assert lane_zone('93010', '30241') == 8
+    assert lane_zone('38118', '75063') == 4
+    assert lane_zone('10001', '99501') == 9
+    assert lane_zone('93010', 'ABCDE') == 0
+    zones = get_zone_index().zones(['93010', '38118', ''], ['30241', '75063', '75063'])
+    assert zones.tolist() == [8, 4, 0]
+    print("✅ Lane zones look right")
+
+
+def test_billable_weights():
+    print("🧪 Testing vectorized billable weight")
+    weights = billable_weights([9.0, 1.2, 0.1], [4, 20, 1], [5, 20, 1], [7, 20, 1])
+    # 20x20x20 = 8000 cubic inches / 139 -> 58 lbs dimensional
+    assert weights.tolist() == [9.0, 58.0, 1.0]
+    print("✅ Billable weights computed")
+
+
+def test_quote_keys_are_per_lane():
+    print("🧪 Testing quote keys")
+    # Carrier replies are cached per exact lane, never shared across lanes in the same zone
+    shipment = {'weight': 9.0, 'dimensions': {'length': 4, 'width': 5, 'height': 7}}
+    assert lane_zone('93010', '30241') == lane_zone('93012', '30303')
+    assert (make_quote_key({'postal_code': '93010'}, {'postal_code': '30241'}, shipment)
+            != make_quote_key({'postalCode': '93012'}, {'postalCode': '30303'}, {**shipment, 'weight': 8.4}))
+    assert (make_quote_key({'postal_code': '93010'}, {'postal_code': '30241'}, shipment)
+            == make_quote_key({'postalCode': '93010'}, {'postalCode': '30241'}, shipment))
+    print("✅ Lanes in the same zone don't share a quote key")
+
+
+if __name__ == "__main__":
+    test_bundled_matrix_matches_centroid_table()
+    test_lane_zones()
+    test_billable_weights()
+    test_quote_keys_are_per_lane()
+    print("🎉 Zone index tests completed successfully!")